@@ -19,6 +19,7 @@ import concurrent.futures
 import copy
 import os
 import platform
+import threading
 from contextvars import ContextVar
 from datetime import datetime, timezone
 from typing import Dict, List, Any, AsyncGenerator, Optional, Tuple, Callable
@@ -81,6 +82,7 @@ __all__ = [
     
     # Tool execution and management
     'ToolExecutor',
+    'get_tool_concurrency',
     'ToolDefinitionLoader', 
     'ToolResultFormatter',
     'OpenAIStreamingHandler',
@@ -363,19 +365,14 @@ class ToolExecutor:
         
         This is useful when calling from within an existing event loop context.
         Works correctly whether called from main thread, async context, or executor thread.
+        The call runs on the least busy loop of the shared tool loop pool rather
+        than a loop created per call.
         """
         try:
-            # Try to get the running loop
-            try:
-                loop = asyncio.get_running_loop()
-                # We're in an async context with a running loop
-                # We need to run in a new thread to avoid blocking
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(self._run_async_in_new_loop, tool_name, arguments)
-                    return future.result()
-            except RuntimeError:
-                # No running loop - we can create one safely
-                return asyncio.run(self.execute_tool_call(tool_name, arguments))
+            if _tool_loop.in_loop_thread() or _tool_workers.in_loop_thread():
+                # Called from a tool running on a shared loop; blocking on the pool could deadlock
+                return self._run_async_in_new_loop(tool_name, arguments)
+            return _tool_workers.submit(self.execute_tool_call(tool_name, arguments)).result()
         except Exception as e:
             return {"success": False, "error": str(e)}
     
@@ -388,6 +385,204 @@ class ToolExecutor:
             return new_loop.run_until_complete(self.execute_tool_call(tool_name, arguments))
         finally:
             new_loop.close()
+    
+    async def execute_tool_calls(self, calls: List[Tuple[str, Dict[str, Any]]],
+                                 max_concurrency: Optional[int] = None) -> AsyncGenerator[Tuple[int, Dict[str, Any]], None]:
+        """
+        Execute independent tool calls concurrently, yielding results as they complete.
+        
+        Only read-only tools overlap; writes, the terminal and unknown tools
+        run in the order given once every earlier call has finished.
+        
+        Args:
+            calls: List of (tool_name, arguments) pairs
+            max_concurrency: Maximum calls in flight (default: AGENT_TOOL_CONCURRENCY)
+            
+        Yields:
+            (index, result) tuples in completion order, where index refers to calls
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or get_tool_concurrency())
+        ordering = _ToolCallOrdering()
+        
+        async def _indexed(i: int, tool_name: str, arguments: Dict[str, Any], slot):
+            return i, await self._execute_limited(semaphore, slot, tool_name, arguments)
+        
+        tasks = [asyncio.create_task(_indexed(i, name, args, ordering.claim(name)))
+                 for i, (name, args) in enumerate(calls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def submit_tool_calls(self, calls: List[Tuple[str, Dict[str, Any]]],
+                          max_concurrency: Optional[int] = None) -> List[concurrent.futures.Future]:
+        """
+        Schedule tool calls on the shared tool loop for synchronous callers.
+        
+        Same concurrency and ordering rules as execute_tool_calls. Ordering is
+        handled on the shared tool loop while the tool bodies run on the tool
+        loop pool, so a tool that blocks its loop does not hold up other calls.
+        If execute_tool_call_sync has been replaced on this instance (custom
+        agent executors), the replacement runs on executor threads instead.
+        
+        Args:
+            calls: List of (tool_name, arguments) pairs
+            max_concurrency: Maximum calls in flight (default: AGENT_TOOL_CONCURRENCY)
+            
+        Returns:
+            One future per call, in the order given
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or get_tool_concurrency())
+        ordering = _ToolCallOrdering()
+        sync_override = self.__dict__.get('execute_tool_call_sync')
+        return [
+            _tool_loop.submit(self._execute_limited(semaphore, ordering.claim(name), name, args,
+                                                    sync_override, offload=True))
+            for name, args in calls
+        ]
+    
+    async def _execute_limited(self, semaphore: asyncio.Semaphore,
+                               slot: Tuple[List[asyncio.Event], asyncio.Event],
+                               tool_name: str, arguments: Dict[str, Any],
+                               sync_fn: Optional[Callable] = None, offload: bool = False) -> Dict[str, Any]:
+        waits, done = slot
+        try:
+            for event in waits:
+                await event.wait()
+            async with semaphore:
+                if sync_fn is not None:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(None, sync_fn, tool_name, arguments)
+                if offload:
+                    return await asyncio.wrap_future(_tool_workers.submit(self.execute_tool_call(tool_name, arguments)))
+                return await self.execute_tool_call(tool_name, arguments)
+        except Exception as e:
+            logger.error(f"Error executing tool {tool_name}: {e}")
+            return {"success": False, "error": f"Tool execution failed: {str(e)}"}
+        finally:
+            done.set()
+
+
+def get_tool_concurrency() -> int:
+    """Maximum tool calls from one model turn that run at once (AGENT_TOOL_CONCURRENCY)."""
+    try:
+        return max(1, int(os.environ.get("AGENT_TOOL_CONCURRENCY", "4")))
+    except ValueError:
+        return 4
+
+
+# Tools that only read files or the web; calls to these may overlap
+_READ_ONLY_TOOLS = frozenset({"read_file", "read_doc", "semantic_search", "web_search", "web_fetch"})
+
+
+class _ToolCallOrdering:
+    """
+    Ordering for one batch of tool calls, claimed in call order.
+
+    Read-only tools run concurrently. Every other tool (file writes, the
+    terminal, tools we know nothing about) is a barrier: it starts once all
+    earlier calls have finished, and later calls start once it has.
+    """
+
+    def __init__(self):
+        self._barrier: Optional[asyncio.Event] = None
+        self._since_barrier: List[asyncio.Event] = []
+
+    def claim(self, tool_name: str) -> Tuple[List[asyncio.Event], asyncio.Event]:
+        """Reserve the next call; returns the events to wait for and the one to set when done."""
+        done = asyncio.Event()
+        previous = [self._barrier] if self._barrier else []
+        if tool_name in _READ_ONLY_TOOLS:
+            self._since_barrier.append(done)
+            return previous, done
+        waits = previous + self._since_barrier
+        self._barrier, self._since_barrier = done, []
+        return waits, done
+
+
+def get_tool_loop_count() -> int:
+    """Number of persistent loops that run tool bodies (AGENT_TOOL_LOOPS)."""
+    try:
+        return max(1, int(os.environ.get("AGENT_TOOL_LOOPS", "4")))
+    except ValueError:
+        return 4
+
+
+class _ToolLoop:
+    """
+    Persistent event loop on a daemon thread for running async tools from
+    synchronous code (the streaming handlers are plain generators).
+    """
+    
+    def __init__(self, name: str = "agent-tool-loop"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._run, args=(loop,), name=self._name, daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+    
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+    
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+    
+    def submit(self, coro) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+
+class _ToolLoopPool:
+    """
+    Small pool of tool loops. Each call goes to the loop with the fewest calls
+    in flight, so a tool that blocks its loop (subprocess.run, requests,
+    vendor SDK calls) only holds up that loop instead of every chat's tools.
+    """
+    
+    def __init__(self, size: Optional[int] = None):
+        self._size = size
+        self._loops: List[_ToolLoop] = []
+        self._in_flight: List[int] = []
+        self._lock = threading.Lock()
+    
+    def in_loop_thread(self) -> bool:
+        return any(loop.in_loop_thread() for loop in self._loops)
+    
+    def submit(self, coro) -> concurrent.futures.Future:
+        with self._lock:
+            if not self._loops:
+                size = self._size or get_tool_loop_count()
+                self._loops = [_ToolLoop(f"agent-tool-worker-{i}") for i in range(size)]
+                self._in_flight = [0] * size
+            index = min(range(len(self._loops)), key=self._in_flight.__getitem__)
+            self._in_flight[index] += 1
+        try:
+            future = self._loops[index].submit(coro)
+        except BaseException:
+            self._release(index)
+            raise
+        future.add_done_callback(lambda _: self._release(index))
+        return future
+    
+    def _release(self, index: int) -> None:
+        with self._lock:
+            self._in_flight[index] -= 1
+
+
+# Dispatch (ordering, concurrency limits) runs on _tool_loop; tool bodies on _tool_workers
+_tool_loop = _ToolLoop()
+_tool_workers = _ToolLoopPool()
 
 
 class ToolDefinitionLoader:
@@ -1124,53 +1319,63 @@ class OpenAIStreamingHandler:
         }
         messages.append(assistant_message)
         
-        # Execute each tool call
-        for tc in tool_calls_list:
+        # Validate and parse every call up front; tool messages keep the call order
+        tool_messages: List[Optional[Dict[str, Any]]] = [None] * len(tool_calls_list)
+        pending: List[Tuple[int, str, Dict[str, Any]]] = []
+        for i, tc in enumerate(tool_calls_list):
+            function = tc.get('function') or {}
+            tool_name = function.get('name')
+            arguments_str = function.get('arguments')
+            
+            # Validate that we have a tool name
+            if not tool_name:
+                yield f"❌ **Error**: Tool name is empty\n"
+                # Still add error response to conversation
+                tool_messages[i] = {
+                    "role": "tool",
+                    "tool_call_id": tc.get('id', 'unknown'),
+                    "content": json.dumps({"error": "Tool name is empty"})
+                }
+                continue
+            
+            # Parse arguments safely
             try:
-                tool_name = tc['function']['name']
-                arguments_str = tc['function']['arguments']
-                
-                # Validate that we have a tool name
-                if not tool_name:
-                    yield f"❌ **Error**: Tool name is empty\n"
-                    # Still add error response to conversation
-                    tool_message = {
-                        "role": "tool",
-                        "tool_call_id": tc.get('id', 'unknown'),
-                        "content": json.dumps({"error": "Tool name is empty"})
-                    }
-                    messages.append(tool_message)
-                    continue
-                
-                # Parse arguments safely
-                try:
-                    arguments = json.loads(arguments_str) if arguments_str else {}
-                except json.JSONDecodeError as e:
-                    yield f"❌ **Error**: Invalid JSON arguments for {tool_name}: {str(e)}\n"
-                    # Still add error response to conversation
-                    tool_message = {
-                        "role": "tool",
-                        "tool_call_id": tc.get('id', 'unknown'),
-                        "content": json.dumps({"error": f"Invalid JSON arguments: {str(e)}"})
-                    }
-                    messages.append(tool_message)
-                    continue
-                
-                # Debug logging for image generation tool calls
-                if tool_name == 'generate_image':
-                    logger.info(f"🎨 Image generation tool call - aspect_ratio: {arguments.get('aspect_ratio', 'NOT SET')}, "
-                              f"mode: {arguments.get('mode', 'NOT SET')}, image_data: {bool(arguments.get('image_data'))}")
+                arguments = json.loads(arguments_str) if arguments_str else {}
+            except json.JSONDecodeError as e:
+                yield f"❌ **Error**: Invalid JSON arguments for {tool_name}: {str(e)}\n"
+                # Still add error response to conversation
+                tool_messages[i] = {
+                    "role": "tool",
+                    "tool_call_id": tc.get('id', 'unknown'),
+                    "content": json.dumps({"error": f"Invalid JSON arguments: {str(e)}"})
+                }
+                continue
+            
+            # Debug logging for image generation tool calls
+            if tool_name == 'generate_image':
+                logger.info(f"🎨 Image generation tool call - aspect_ratio: {arguments.get('aspect_ratio', 'NOT SET')}, "
+                          f"mode: {arguments.get('mode', 'NOT SET')}, image_data: {bool(arguments.get('image_data'))}")
+            pending.append((i, tool_name, arguments))
+        
+        # Run independent calls concurrently and stream each result as it completes
+        futures = self.tool_executor.submit_tool_calls([(name, args) for _, name, args in pending]) if pending else []
+        by_future = dict(zip(futures, pending))
+        if len(pending) > 1:
+            logger.info(f"Dispatched {len(pending)} tool calls (concurrency={get_tool_concurrency()})")
+        
+        for future in concurrent.futures.as_completed(futures):
+            i, tool_name, arguments = by_future[future]
+            tc = tool_calls_list[i]
+            try:
+                result = future.result()
                 
-                # Show tool call start
+                # Show tool call start; emitted with its result so each call stays paired in the stream
                 yield self.formatter.format_tool_call_start(tool_name, arguments)
                 
-                # Execute the tool
-                result = self.tool_executor.execute_tool_call_sync(tool_name, arguments)
-                
                 # Log tool execution to debug interceptor (non-blocking)
                 if self.debug_interceptor:
                     try:
-                        async def _log_tool():
+                        async def _log_tool(tool_name=tool_name, arguments=arguments, result=result):
                             try:
                                 await self.debug_interceptor.log_tool_execution(tool_name, arguments, result)
                             except Exception as e:
@@ -1187,9 +1392,9 @@ class OpenAIStreamingHandler:
                     chunk_size = 1024  # 1KB chunks
                     total_chunks = (len(formatted_result) + chunk_size - 1) // chunk_size
                     logger.info(f"Streaming large tool result in {total_chunks} chunks ({len(formatted_result)} chars total)")
-                    for i in range(0, len(formatted_result), chunk_size):
-                        chunk = formatted_result[i:i+chunk_size]
-                        logger.debug(f"Yielding chunk {i//chunk_size + 1}/{total_chunks}: {len(chunk)} chars")
+                    for start in range(0, len(formatted_result), chunk_size):
+                        chunk = formatted_result[start:start+chunk_size]
+                        logger.debug(f"Yielding chunk {start//chunk_size + 1}/{total_chunks}: {len(chunk)} chars")
                         yield chunk
                     logger.info(f"Finished streaming {total_chunks} chunks for {tool_name}")
                 else:
@@ -1204,12 +1409,11 @@ class OpenAIStreamingHandler:
                     "error": sanitized_result.get('error', 'Unknown error')
                 }
                 
-                tool_message = {
+                tool_messages[i] = {
                     "role": "tool",
                     "tool_call_id": tc['id'],
                     "content": json.dumps(tool_content)
                 }
-                messages.append(tool_message)
                 
             except Exception as e:
                 error_msg = f"❌ **Tool Error**: {str(e)}\n"
@@ -1217,12 +1421,13 @@ class OpenAIStreamingHandler:
                 logger.error(f"Tool execution error: {e}")
                 
                 # Add error to conversation
-                tool_message = {
+                tool_messages[i] = {
                     "role": "tool", 
                     "tool_call_id": tc.get('id', 'unknown'),
                     "content": json.dumps({"success": False, "error": str(e)})
                 }
-                messages.append(tool_message)
+        
+        messages.extend(m for m in tool_messages if m is not None)
 
 
 def create_agent_chat_function(agent_name: str, system_prompt: str, model_name: str):
@@ -1573,21 +1778,22 @@ def create_agent_context(workspace_root: Optional[str] = None) -> Dict[str, Any]
         tool_count = 0
         logger.warning(f"Could not load tool registry for context: {e}")
     
-    # 6. File system context
+    # 6. File system context (size and project markers come from the cached snapshot)
     fs_context = {}
     if workspace_root and os.path.exists(workspace_root):
+        from ..services.context_snapshot import get_context_snapshot_service
+        snapshot = get_context_snapshot_service(workspace_root).get_snapshot()
         fs_context = {
             "workspace_exists": True,
             "workspace_readable": os.access(workspace_root, os.R_OK),
             "workspace_writable": os.access(workspace_root, os.W_OK),
-            "workspace_size_mb": _get_directory_size(workspace_root) / (1024 * 1024)
+            "workspace_size_mb": snapshot["size_bytes"] / (1024 * 1024),
+            "workspace_size_ready": snapshot["ready"]
         }
         
         # Common project indicators
-        common_files = ["package.json", "requirements.txt", "pyproject.toml", "README.md", "Dockerfile"]
-        for file in common_files:
-            file_path = os.path.join(workspace_root, file)
-            fs_context[f"has_{file.replace('.', '_')}"] = os.path.exists(file_path)
+        for file, present in snapshot["markers"].items():
+            fs_context[f"has_{file.replace('.', '_')}"] = present
     else:
         fs_context = {"workspace_exists": False}
     
@@ -1709,30 +1915,6 @@ def get_workspace_path() -> str:
     return os.getcwd()
 
 
-def _get_directory_size(directory: str) -> int:
-    """
-    Calculate the total size of a directory in bytes.
-    
-    Args:
-        directory: Directory path to calculate size for
-        
-    Returns:
-        Size in bytes (0 if error or inaccessible)
-    """
-    try:
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(directory):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                try:
-                    total_size += os.path.getsize(file_path)
-                except (OSError, IOError):
-                    continue  # Skip files we can't access
-        return total_size
-    except Exception:
-        return 0
-
-
 def format_agent_context_for_prompt(context: Dict[str, Any]) -> str:
     """
     Format the agent context dictionary into a human-readable string 
@@ -1787,7 +1969,8 @@ def add_context_to_agent_prompt(base_prompt: str, workspace_root: Optional[str]
     Convenience function to add context information to an existing agent system prompt.
     
     Includes dynamic hop context information so agent knows current workspace location.
-    Works in both sync and async contexts by using asyncio.
+    Works in both sync and async contexts; workspace and hop details come from
+    the cached context snapshot, so no filesystem walk happens per prompt.
     
     Args:
         base_prompt: The original system prompt
@@ -1798,35 +1981,10 @@ def add_context_to_agent_prompt(base_prompt: str, workspace_root: Optional[str]
     """
     context = create_agent_context(workspace_root)
     
-    # Add dynamic hop context information
-    # This needs to be async, so we handle it carefully
+    # Add dynamic hop context information (cached; refreshed on hop.status events)
     try:
-        import asyncio
-        from .tools.context_helpers import get_current_context
-        
-        # Try to get current event loop
-        try:
-            loop = asyncio.get_running_loop()
-            # We're in an async context, but this function is sync
-            # Create a task and run it
-            import concurrent.futures
-            import threading
-            
-            def get_context_sync():
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                try:
-                    return new_loop.run_until_complete(get_current_context())
-                finally:
-                    new_loop.close()
-            
-            # Run in thread pool to avoid blocking
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(get_context_sync)
-                hop_context = future.result(timeout=2)  # 2 second timeout
-        except RuntimeError:
-            # No event loop running, we can safely create one
-            hop_context = asyncio.run(get_current_context())
+        from ..services.context_snapshot import get_hop_context_cache
+        hop_context = get_hop_context_cache().get()
         
         context_id = hop_context.get('contextId', 'local')
         is_hopped = context_id != 'local' and hop_context.get('status') == 'connected'
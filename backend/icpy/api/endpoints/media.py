@@ -71,19 +71,14 @@ async def get_image(
         # Cache-first fast path
         if not thumbnail:
             try:
-                if cache and cache.has(image_id):
-                    b64 = cache.get(image_id)
-                    if b64:
-                        logger.info(f"[Media API] Cache hit for {image_id}; serving from memory")
-                        try:
-                            content = base64.b64decode(b64)
-                        except Exception:
-                            content = base64.b64decode(b64 + "==")  # tolerate padding issues
-                        return Response(
-                            content=content,
-                            media_type=image_ref.mime_type or "image/png",
-                            headers={"Content-Disposition": f"inline; filename={image_ref.current_filename}"}
-                        )
+                content = cache.get_bytes(image_id) if cache else None
+                if content:
+                    logger.info(f"[Media API] Cache hit for {image_id}; serving cached bytes")
+                    return Response(
+                        content=content,
+                        media_type=image_ref.mime_type or "image/png",
+                        headers={"Content-Disposition": f"inline; filename={image_ref.current_filename}"}
+                    )
             except Exception as cache_err:
                 logger.debug(f"[Media API] Cache check failed for {image_id}: {cache_err}")
 
@@ -507,8 +507,9 @@ class RestAPI:
         """Register filesystem-related routes."""
         
         @self.app.get("/api/files")
-        async def list_files(path: str = "/", include_hidden: bool = False, namespace: Optional[str] = None):
-            """List files in directory."""
+        async def list_files(path: str = "/", include_hidden: bool = False, namespace: Optional[str] = None,
+                             refresh: bool = False):
+            """List files in directory. refresh=true bypasses cached remote listings."""
             try:
                 fs = self.filesystem_service
                 if self.context_router is not None:
@@ -534,7 +535,10 @@ class RestAPI:
                     except Exception as e:
                         logger.warning(f"[REST] FS routing error, falling back local: {e}")
                         pass
-                files = await fs.list_directory(path, include_hidden=include_hidden)
+                if refresh:
+                    files = await fs.list_directory(path, include_hidden=include_hidden, refresh=True)
+                else:
+                    files = await fs.list_directory(path, include_hidden=include_hidden)
                 return SuccessResponse(data=files)
             except Exception as e:
                 logger.error(f"Error listing files: {e}")
@@ -1567,10 +1571,11 @@ class RestAPI:
         
         # Get message history
         @self.app.get("/api/chat/messages")
-        async def get_chat_messages(session_id: Optional[str] = None, limit: int = 50, offset: int = 0):
-            """Get chat message history with pagination."""
+        async def get_chat_messages(session_id: Optional[str] = None, limit: int = 50, offset: int = 0,
+                                    from_end: bool = False):
+            """Get chat message history with pagination (from_end pages backward from the newest)."""
             try:
-                messages = await self.chat_service.get_message_history(session_id, limit, offset)
+                messages = await self.chat_service.get_message_history(session_id, limit, offset, from_end=from_end)
                 return SuccessResponse(
                     data=[message.to_dict() for message in messages],
                     message=f"Retrieved {len(messages)} messages"
@@ -20,11 +20,14 @@ import asyncio
 import fnmatch
 import json
 import logging
+import os
+import re
 import time
 import uuid
 from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
 from typing import Dict, Any, Optional, List, Set, Callable, Deque
 from fastapi import WebSocket, WebSocketDisconnect, status
 from fastapi.websockets import WebSocketState
@@ -34,12 +37,35 @@ from ..core.connection_manager import get_connection_manager
 from ..core.protocol import JsonRpcRequest, JsonRpcResponse, ProtocolError, ErrorCode
 from ..services import get_workspace_service, get_filesystem_service, get_terminal_service, get_code_execution_service, get_preview_service
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Global service instance
 _websocket_api = None
 
 
+def _encode_json(data: Any) -> tuple[str, int]:
+    """Encode a message for the wire. Returns (text, encoded size in bytes)."""
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+            return encoded.decode('utf-8'), len(encoded)
+        except TypeError:
+            pass  # Types only the stdlib encoder accepts
+    text = json.dumps(data)
+    return text, len(text)  # ensure_ascii: one byte per character
+
+
+@lru_cache(maxsize=1024)
+def _compile_topic_pattern(pattern: str) -> re.Pattern:
+    """Compile an fnmatch-style topic pattern once."""
+    return re.compile(fnmatch.translate(pattern))
+
+
 class WebSocketConnectionState(Enum):
     """WebSocket connection states."""
     CONNECTING = "connecting"
@@ -58,6 +84,56 @@ class WebSocketMessage:
     timestamp: float = field(default_factory=time.time)
     session_id: Optional[str] = None
     user_id: Optional[str] = None
+    encoded: Optional[str] = field(default=None, repr=False, compare=False)
+    encoded_size: int = field(default=0, repr=False, compare=False)
+    
+    def encode(self) -> str:
+        """Return the JSON text of data, encoding it on first use only."""
+        if self.encoded is None:
+            self.encoded, self.encoded_size = _encode_json(self.data)
+        return self.encoded
+
+
+class MessageHistory:
+    """Ring buffer of sent messages bounded by count and by encoded bytes.
+    
+    Messages are shared with the send path, so the history holds
+    references rather than copies; the byte budget is measured on the
+    encoded JSON. A message larger than the whole budget is not kept.
+    """
+    
+    def __init__(self, max_messages: int = 1000, max_bytes: int = 1048576):
+        """Initialize history.
+        
+        Args:
+            max_messages: Maximum number of messages kept
+            max_bytes: Maximum total encoded size of kept messages
+        """
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evicted = 0
+        self._messages: Deque[WebSocketMessage] = deque()
+    
+    def append(self, message: WebSocketMessage):
+        """Add a message, evicting the oldest ones beyond the budget."""
+        message.encode()
+        self._messages.append(message)
+        self.bytes += message.encoded_size
+        while self._messages and (len(self._messages) > self.max_messages or self.bytes > self.max_bytes):
+            self.bytes -= self._messages.popleft().encoded_size
+            self.evicted += 1
+    
+    def clear(self):
+        """Drop all messages."""
+        self._messages.clear()
+        self.bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def __iter__(self):
+        return iter(self._messages)
 
 
 @dataclass
@@ -70,8 +146,11 @@ class WebSocketConnection:
     user_id: Optional[str] = None
     created_at: float = field(default_factory=time.time)
     last_activity: float = field(default_factory=time.time)
-    message_queue: Deque[WebSocketMessage] = field(default_factory=lambda: deque(maxlen=100))
+    message_queue: MessageHistory = field(default_factory=lambda: MessageHistory(max_messages=100, max_bytes=262144))
     subscriptions: Set[str] = field(default_factory=set)
+    outbox: Deque[str] = field(default_factory=deque)  # encoded frames awaiting send
+    sender: Optional[asyncio.Task] = None
+    send_started: Optional[float] = None  # monotonic time of the send in progress
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert connection to dictionary representation."""
@@ -83,7 +162,9 @@ class WebSocketConnection:
             'created_at': self.created_at,
             'last_activity': self.last_activity,
             'message_queue_size': len(self.message_queue),
-            'subscriptions': list(self.subscriptions)
+            'message_queue_bytes': self.message_queue.bytes,
+            'subscriptions': list(self.subscriptions),
+            'pending_sends': len(self.outbox)
         }
 
 
@@ -115,8 +196,21 @@ class WebSocketAPI:
         self.user_connections: Dict[str, Set[str]] = defaultdict(set)  # user_id -> connection_ids
         self.session_connections: Dict[str, Set[str]] = defaultdict(set)  # session_id -> connection_ids
         
-        # Message history for replay
-        self.message_history: Dict[str, Deque[WebSocketMessage]] = defaultdict(lambda: deque(maxlen=1000))
+        # Subscription index: subscription -> connection_ids, and per broadcast
+        # pattern the resolved recipients (cleared whenever subscriptions change)
+        self.subscription_index: Dict[str, Set[str]] = defaultdict(set)
+        self._pattern_recipients: Dict[str, Set[str]] = {}
+        self._send_watchdog: Optional[asyncio.Task] = None
+        
+        # Message history for replay, bounded per session by count and encoded bytes
+        try:
+            self.history_max_bytes = int(os.getenv('WS_HISTORY_MAX_BYTES', '1048576'))
+        except ValueError:
+            self.history_max_bytes = 1048576
+        self.history_max_messages = 1000
+        self.message_history: Dict[str, MessageHistory] = defaultdict(
+            lambda: MessageHistory(self.history_max_messages, self.history_max_bytes)
+        )
         
         # Statistics
         self.stats = {
@@ -127,6 +221,8 @@ class WebSocketAPI:
             'reconnections': 0,
             'authentication_attempts': 0,
             'authentication_successes': 0,
+            'broadcasts': 0,
+            'slow_consumer_evictions': 0,
             'startup_time': 0.0
         }
         
@@ -139,6 +235,17 @@ class WebSocketAPI:
         self.connection_timeout = 3600.0  # 1 hour
         self.cleanup_interval = 300.0  # 5 minutes
         
+        # Broadcast send queues: a connection with more pending frames than this,
+        # or whose send takes longer than send_timeout, is disconnected
+        try:
+            self.max_pending_sends = int(os.getenv('WS_MAX_PENDING_SENDS', '512'))
+        except ValueError:
+            self.max_pending_sends = 512
+        try:
+            self.send_timeout = float(os.getenv('WS_SEND_TIMEOUT_SECONDS', '10'))
+        except ValueError:
+            self.send_timeout = 10.0
+        
         logger.info("WebSocketAPI initialized")
 
     async def initialize(self):
@@ -188,7 +295,11 @@ class WebSocketAPI:
         """
         logger.info("Shutting down WebSocketAPI...")
         
-        # Close all connections
+        # Flush queued broadcasts, then close all connections
+        try:
+            await self.drain(timeout=self.send_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out flushing pending WebSocket sends during shutdown")
         connection_ids = list(self.connections.keys())
         for connection_id in connection_ids:
             await self.disconnect_websocket(connection_id)
@@ -197,6 +308,8 @@ class WebSocketAPI:
         self.connections.clear()
         self.user_connections.clear()
         self.session_connections.clear()
+        self.subscription_index.clear()
+        self._pattern_recipients.clear()
         self.message_history.clear()
         
         # Publish shutdown event
@@ -252,7 +365,7 @@ class WebSocketAPI:
             # Keep this conservative: filesystem events are needed by Explorer UI.
             # hop.* is needed for SSH Hop panel to maintain connection state across reconnects.
             default_topics = {"fs.*", "hop.*"}
-            connection.subscriptions.update(default_topics)
+            self._add_subscriptions(connection, default_topics)
             logger.debug(f"[WS] Connection {connection_id} auto-subscribed to defaults: {sorted(default_topics)}")
 
             # Update statistics
@@ -299,6 +412,12 @@ class WebSocketAPI:
         connection = self.connections[connection_id]
         
         try:
+            # Stop pending broadcast sends (unless we are the sender evicting itself)
+            if connection.sender is not None and connection.sender is not asyncio.current_task():
+                connection.sender.cancel()
+            connection.outbox.clear()
+            self._remove_subscriptions(connection, list(connection.subscriptions))
+            
             # Close WebSocket if still open
             if connection.websocket.client_state == WebSocketState.CONNECTED:
                 await connection.websocket.close()
@@ -404,24 +523,41 @@ class WebSocketAPI:
             return False
         
         connection = self.connections[connection_id]
+        message = WebSocketMessage(
+            data=data,
+            session_id=connection.session_id,
+            user_id=connection.user_id
+        )
+        return await self._send(connection, message)
+
+    async def _send(self, connection: WebSocketConnection, message: WebSocketMessage, history: bool = True) -> bool:
+        """Record and send an already built message to one connection.
+        
+        The message is encoded once and may be shared between recipients.
         
+        Args:
+            connection: The target connection
+            message: The message to send
+            history: Also add the message to the session replay history
+            
+        Returns:
+            True if successful, False otherwise
+        """
         try:
-            # Create message object
-            message = WebSocketMessage(
-                data=data,
-                session_id=connection.session_id,
-                user_id=connection.user_id
-            )
+            frame = message.encode()
             
-            # Add to connection queue
+            # Add to connection queue and session history
             connection.message_queue.append(message)
-            
-            # Add to session history
-            if connection.session_id:
+            if history and connection.session_id:
                 self.message_history[connection.session_id].append(message)
             
+            # Keep order behind broadcasts still queued for this connection
+            if connection.outbox or (connection.sender is not None and not connection.sender.done()):
+                self._enqueue_frame(connection, frame)
+                return True
+            
             # Send message
-            await connection.websocket.send_text(json.dumps(data))
+            await connection.websocket.send_text(frame)
             
             # Update statistics
             self.stats['messages_sent'] += 1
@@ -429,8 +565,8 @@ class WebSocketAPI:
             return True
             
         except Exception as e:
-            logger.error(f"Error sending message to {connection_id}: {e}")
-            await self.disconnect_websocket(connection_id)
+            logger.error(f"Error sending message to {connection.id}: {e}")
+            await self.disconnect_websocket(connection.id)
             return False
 
     async def send_error(self, connection_id: str, error_message: str):
@@ -464,9 +600,17 @@ class WebSocketAPI:
             # Broadcast to all connections
             target_connections.update(self.connections.keys())
         
-        # Send to all target connections
+        # Send one shared, once-encoded message to all target connections
+        message = WebSocketMessage(data=data, session_id=session_id, user_id=user_id)
+        recorded_sessions = set()
         for connection_id in target_connections:
-            await self.send_message(connection_id, data)
+            connection = self.connections.get(connection_id)
+            if connection is not None:
+                # Record the message once per session, not once per connection
+                record = bool(connection.session_id) and connection.session_id not in recorded_sessions
+                if record:
+                    recorded_sessions.add(connection.session_id)
+                await self._send(connection, message, history=record)
 
     async def get_connection_info(self, connection_id: str) -> Optional[Dict[str, Any]]:
         """Get information about a connection.
@@ -517,9 +661,29 @@ class WebSocketAPI:
             'session_connections': len(self.session_connections),
             'max_connections': self.max_connections,
             'message_history_size': sum(len(history) for history in self.message_history.values()),
+            'message_history_bytes': sum(history.bytes for history in self.message_history.values()),
+            'message_history_sessions': self.get_history_stats(),
+            'pending_sends': sum(len(c.outbox) for c in self.connections.values()),
+            'subscription_index_size': len(self.subscription_index),
             'timestamp': time.time()
         }
 
+    def get_history_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get replay history memory per session.
+        
+        Returns:
+            Dict of session_id -> messages, bytes, max_bytes and evicted count
+        """
+        return {
+            session_id: {
+                'messages': len(history),
+                'bytes': history.bytes,
+                'max_bytes': history.max_bytes,
+                'evicted': history.evicted
+            }
+            for session_id, history in self.message_history.items()
+        }
+
     async def _handle_ping(self, connection_id: str, data: Dict[str, Any]):
         """Handle ping message."""
         await self.send_message(connection_id, {
@@ -543,8 +707,7 @@ class WebSocketAPI:
         
         logger.debug(f"[WebSocketAPI] Adding subscriptions {topics} to connection {connection_id}")
         
-        for topic in topics:
-            connection.subscriptions.add(topic)
+        self._add_subscriptions(connection, topics)
         
         logger.info(f"[WS] Connection {connection_id} subscribed to topics: {topics}")
         
@@ -565,8 +728,7 @@ class WebSocketAPI:
         if isinstance(topics, str):
             topics = [topics]
         
-        for topic in topics:
-            connection.subscriptions.discard(topic)
+        self._remove_subscriptions(connection, topics)
         
         await self.send_message(connection_id, {
             'type': 'unsubscribed',
@@ -923,15 +1085,24 @@ class WebSocketAPI:
         if session_id not in self.message_history:
             return
         
+        connection = self.connections.get(connection_id)
         messages = list(self.message_history[session_id])
         
-        if messages:
-            await self.send_message(connection_id, {
+        if connection is not None and messages:
+            # Splice the already encoded messages instead of re-encoding them; the
+            # replay itself stays out of the session history so replays don't nest
+            data = {
                 'type': 'message_replay',
                 'messages': [msg.data for msg in messages],
                 'count': len(messages),
                 'timestamp': time.time()
-            })
+            }
+            envelope, _ = _encode_json({'type': 'message_replay', 'messages': [], 'count': len(messages), 'timestamp': data['timestamp']})
+            head, tail = envelope.split('[]', 1)
+            replay = WebSocketMessage(data=data, session_id=session_id, user_id=connection.user_id)
+            replay.encoded = head + '[' + ','.join(msg.encode() for msg in messages) + ']' + tail
+            replay.encoded_size = sum(msg.encoded_size for msg in messages) + len(envelope)
+            await self._send(connection, replay, history=False)
 
     async def _handle_websocket_event(self, message):
         """Handle WebSocket-related events."""
@@ -1041,19 +1212,31 @@ class WebSocketAPI:
             logger.error(f"Error handling SCM event {message.topic}: {e}")
 
     async def _broadcast_to_subscribers(self, topic_pattern: str, data: Dict[str, Any]):
-        """Broadcast message to connections subscribed to a topic pattern."""
+        """Broadcast message to connections subscribed to a topic pattern.
+        
+        Recipients come from the subscription index, the message is encoded
+        once, and each connection's copy goes onto its own send queue so one
+        slow client does not hold up the others.
+        """
         logger.debug(f"[WS] Broadcasting to subscribers of pattern '{topic_pattern}': {data}")
         
+        recipients = self._recipients_for(topic_pattern)
         sent_count = 0
-        for connection in self.connections.values():
-            for subscription in connection.subscriptions:
-                # Subscriptions are usually exact topics; allow wildcard match either way
-                matched = self._matches_pattern(subscription, topic_pattern) or self._matches_pattern(topic_pattern, subscription)
-                if matched:
-                    logger.debug(f"[WS] Sending to connection {connection.id} (subscription: {subscription})")
-                    await self.send_message(connection.id, data)
-                    sent_count += 1
-                    break
+        if recipients:
+            message = WebSocketMessage(data=data)
+            frame = message.encode()
+            recorded_sessions = set()
+            for connection_id in recipients:
+                connection = self.connections.get(connection_id)
+                if connection is None or connection.state == WebSocketConnectionState.ERROR:
+                    continue
+                connection.message_queue.append(message)
+                if connection.session_id and connection.session_id not in recorded_sessions:
+                    recorded_sessions.add(connection.session_id)
+                    self.message_history[connection.session_id].append(message)
+                self._enqueue_frame(connection, frame)
+                sent_count += 1
+            self.stats['broadcasts'] += 1
         
         # Throttled logging - only log at INFO when count changes or every 5 seconds
         current_time = time.time()
@@ -1080,10 +1263,116 @@ class WebSocketAPI:
 
     def _matches_pattern(self, subscription: str, pattern: str) -> bool:
         """Check if subscription matches pattern."""
-        import fnmatch
         # Check if the pattern matches the subscription
         # For example: pattern='fs.*' should match subscription='fs.file_created'
-        return fnmatch.fnmatch(subscription, pattern)
+        return _compile_topic_pattern(pattern).match(subscription) is not None
+
+    def _add_subscriptions(self, connection: WebSocketConnection, topics):
+        """Add topics to a connection and the subscription index."""
+        for topic in topics:
+            connection.subscriptions.add(topic)
+            self.subscription_index[topic].add(connection.id)
+        self._pattern_recipients.clear()
+
+    def _remove_subscriptions(self, connection: WebSocketConnection, topics):
+        """Remove topics from a connection and the subscription index."""
+        for topic in topics:
+            connection.subscriptions.discard(topic)
+            subscribers = self.subscription_index.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection.id)
+                if not subscribers:
+                    del self.subscription_index[topic]
+        self._pattern_recipients.clear()
+
+    def _recipients_for(self, topic_pattern: str) -> Set[str]:
+        """Resolve the connections subscribed to a broadcast pattern.
+        
+        Subscriptions are usually exact topics; wildcards match either way
+        (fs.* reaches a fs.file_created subscriber and vice versa). Matching
+        runs once per distinct subscription, not per connection, and the
+        result is cached until subscriptions change.
+        """
+        recipients = self._pattern_recipients.get(topic_pattern)
+        if recipients is None:
+            recipients = set()
+            for subscription, connection_ids in self.subscription_index.items():
+                if (subscription == topic_pattern
+                        or self._matches_pattern(subscription, topic_pattern)
+                        or self._matches_pattern(topic_pattern, subscription)):
+                    recipients.update(connection_ids)
+            self._pattern_recipients[topic_pattern] = recipients
+        return recipients
+
+    def _enqueue_frame(self, connection: WebSocketConnection, frame: str):
+        """Queue an encoded frame for a connection, evicting slow consumers."""
+        if connection.state == WebSocketConnectionState.ERROR:
+            return
+        if len(connection.outbox) >= self.max_pending_sends:
+            self._evict_slow_consumer(connection, f"{len(connection.outbox)} messages pending")
+            return
+        connection.outbox.append(frame)
+        if connection.sender is None or connection.sender.done():
+            connection.sender = asyncio.create_task(self._drain_outbox(connection))
+            if self._send_watchdog is None or self._send_watchdog.done():
+                self._send_watchdog = asyncio.create_task(self._send_watchdog_task())
+
+    async def _drain_outbox(self, connection: WebSocketConnection):
+        """Send queued frames for one connection in order."""
+        try:
+            while connection.outbox:
+                frame = connection.outbox.popleft()
+                # Timed by _send_watchdog_task; a timer per frame costs more than the send
+                connection.send_started = time.monotonic()
+                await connection.websocket.send_text(frame)
+                connection.send_started = None
+                self.stats['messages_sent'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending message to {connection.id}: {e}")
+            connection.outbox.clear()
+            await self.disconnect_websocket(connection.id)
+
+    async def _send_watchdog_task(self):
+        """Evict connections whose queued send has stalled past send_timeout.
+        
+        Runs only while some connection has a sender active.
+        """
+        while True:
+            await asyncio.sleep(max(self.send_timeout / 4, 0.01))
+            now = time.monotonic()
+            active = False
+            for connection in list(self.connections.values()):
+                if connection.sender is None or connection.sender.done():
+                    continue
+                active = True
+                started = connection.send_started
+                if started is not None and now - started > self.send_timeout:
+                    connection.sender.cancel()
+                    self._evict_slow_consumer(connection, f"send took longer than {self.send_timeout}s")
+            if not active:
+                return
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Wait until every connection's queued broadcasts have been sent"""
+        async def _drain():
+            while True:
+                senders = [c.sender for c in self.connections.values() if c.sender is not None and not c.sender.done()]
+                if not senders:
+                    return
+                await asyncio.wait(senders)
+        await asyncio.wait_for(_drain(), timeout)
+
+    def _evict_slow_consumer(self, connection: WebSocketConnection, reason: str):
+        """Disconnect a connection that cannot keep up with broadcasts."""
+        if connection.state == WebSocketConnectionState.ERROR:
+            return
+        logger.warning(f"[WS] Disconnecting slow consumer {connection.id}: {reason}")
+        connection.state = WebSocketConnectionState.ERROR
+        connection.outbox.clear()
+        self.stats['slow_consumer_evictions'] += 1
+        asyncio.create_task(self.disconnect_websocket(connection.id))
 
     async def _cleanup_connections_task(self):
         """Background task to cleanup inactive connections."""
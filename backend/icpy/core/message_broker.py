@@ -5,17 +5,17 @@ Supports topic-based subscription system with wildcard patterns
 """
 
 import asyncio
-import json
 import logging
+import re
 import time
 import uuid
-from typing import Dict, List, Any, Optional, Callable, Set, Union
+from typing import Deque, Dict, List, Any, Optional, Callable, Set, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 import fnmatch
 import weakref
 import threading
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 import os
 
 logger = logging.getLogger(__name__)
@@ -92,10 +92,309 @@ class Subscription:
     handler_task: Optional[asyncio.Task] = None
     filter_func: Optional[Callable[[Message], bool]] = None
     created_at: float = field(default_factory=time.time)
+    _matcher: Callable[[str], Any] = field(init=False, repr=False, compare=False)
+    queue: Optional['DeliveryQueue'] = field(default=None, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Compile the glob once instead of on every publish
+        self._matcher = _compile_pattern(self.topic_pattern)
     
     def matches_topic(self, topic: str) -> bool:
         """Check if topic matches subscription pattern using glob-style wildcards"""
-        return fnmatch.fnmatch(topic, self.topic_pattern)
+        return self._matcher(topic) is not None
+
+
+class OverflowPolicy(Enum):
+    """What a subscriber queue does when a message arrives while it is full"""
+    DROP_OLDEST = "drop_oldest"  # discard the oldest queued message
+    COALESCE = "coalesce"        # replace the queued message for the same topic, else drop oldest
+    BLOCK = "block"              # make the publisher wait for space
+
+
+class DeliveryQueue:
+    """
+    Bounded per-subscriber delivery queue drained by a dedicated worker.
+
+    Publishers only enqueue, so a slow subscriber backs up its own queue
+    (and is shed according to its overflow policy) instead of stalling
+    the publisher and every other subscriber.
+
+    The queue belongs to the loop it was created on. Publishers running on
+    another loop (e.g. agent tools on the tool loop thread) hand the put
+    over to that loop so the worker is woken immediately.
+    """
+
+    def __init__(self, max_size: int, policy: OverflowPolicy):
+        self.max_size = max(1, max_size)
+        self.policy = policy
+        self._loop = asyncio.get_running_loop()
+        self._items: Deque[Tuple[Message, float]] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._unfinished = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.max_depth = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def put(self, message: Message):
+        if asyncio.get_running_loop() is not self._loop:
+            self._put_threadsafe(message)
+            return
+        while len(self._items) >= self.max_size:
+            if self.policy == OverflowPolicy.BLOCK:
+                self._not_full.clear()
+                await self._not_full.wait()
+                continue
+            if self.policy == OverflowPolicy.COALESCE:
+                for i, (queued, _) in enumerate(self._items):
+                    if queued.topic == message.topic:
+                        del self._items[i]
+                        self.coalesced += 1
+                        break
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+            else:
+                self._items.popleft()
+                self.dropped += 1
+            self._unfinished -= 1
+        self._items.append((message, time.monotonic()))
+        self._unfinished += 1
+        self._finished.clear()
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+        self._not_empty.set()
+
+    def _put_threadsafe(self, message: Message):
+        """Schedule a put on the owning loop without waiting for it"""
+        if self._loop.is_closed():
+            self.dropped += 1
+            return
+
+        def _schedule():
+            task = self._loop.create_task(self.put(message))
+            task.add_done_callback(_log_put_error)
+
+        try:
+            self._loop.call_soon_threadsafe(_schedule)
+        except RuntimeError:
+            # Owning loop closed between the check and the call
+            self.dropped += 1
+
+    async def get(self) -> Message:
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        message, enqueued_at = self._items.popleft()
+        self.last_lag = time.monotonic() - enqueued_at
+        if self.last_lag > self.max_lag:
+            self.max_lag = self.last_lag
+        self._not_full.set()
+        return message
+
+    def task_done(self):
+        self._unfinished -= 1
+        self.delivered += 1
+        if self._unfinished <= 0:
+            self._finished.set()
+
+    async def join(self):
+        """Wait until every queued message has been handled"""
+        await self._finished.wait()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'depth': len(self._items),
+            'max_depth': self.max_depth,
+            'capacity': self.max_size,
+            'policy': self.policy.value,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'lag': self.last_lag,
+            'max_lag': self.max_lag,
+        }
+
+
+def _log_put_error(task: "asyncio.Task"):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error enqueueing cross-loop message: {task.exception()}")
+
+
+_GLOB_CHARS = frozenset('*?[')
+
+
+def _compile_pattern(pattern: str) -> Callable[[str], Any]:
+    """Compile a glob-style topic pattern into a match function"""
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+def _is_wildcard(pattern: str) -> bool:
+    return any(c in _GLOB_CHARS for c in pattern)
+
+
+_SIZE_SAMPLE = 16
+
+
+def _estimate_payload_bytes(payload: Any, limit: int) -> int:
+    """
+    Approximate the JSON-encoded size of a payload without serializing it.
+
+    Large containers are sampled (_SIZE_SAMPLE evenly spaced items, scaled
+    up by the container length) and the walk stops once the running total
+    passes limit, so the cost is bounded regardless of payload size.
+    """
+    total = 0.0
+    stack: List[Tuple[Any, float]] = [(payload, 1.0)]
+    while stack:
+        item, weight = stack.pop()
+        if item is None or isinstance(item, bool):
+            total += 4 * weight
+        elif isinstance(item, str):
+            total += (len(item) + 2) * weight
+        elif isinstance(item, (bytes, bytearray, memoryview)):
+            total += len(item) * weight
+        elif isinstance(item, (int, float)):
+            total += 8 * weight
+        elif isinstance(item, (dict, list, tuple, set, frozenset)):
+            size = len(item)
+            total += (2 + size * 2) * weight
+            if isinstance(item, dict):
+                entries = list(item.items()) if size <= _SIZE_SAMPLE else _sample(list(item.items()))
+                scale = weight * size / len(entries) if entries else weight
+                for key, value in entries:
+                    total += (len(key) + 2 if isinstance(key, str) else 8) * scale
+                    stack.append((value, scale))
+            else:
+                values = item if isinstance(item, (list, tuple)) else list(item)
+                entries = values if size <= _SIZE_SAMPLE else _sample(values)
+                scale = weight * size / len(entries) if entries else weight
+                stack.extend((value, scale) for value in entries)
+        else:
+            total += (len(str(item)) + 2) * weight
+        if total > limit:
+            break
+    return int(total)
+
+
+def _sample(items):
+    step = len(items) / _SIZE_SAMPLE
+    return [items[int(i * step)] for i in range(_SIZE_SAMPLE)]
+
+
+class _TopicNode:
+    """Node of the topic trie, keyed by literal dot-separated segments"""
+    __slots__ = ('children', 'exact', 'wildcards')
+
+    def __init__(self):
+        self.children: Dict[str, '_TopicNode'] = {}
+        self.exact: List[Subscription] = []      # patterns with no wildcard ending here
+        self.wildcards: List[Subscription] = []  # patterns whose first wildcard segment is below here
+
+
+class TopicTrie:
+    """
+    Wildcard-aware index of subscriptions by topic pattern.
+
+    Patterns are stored under their literal leading segments ("fs.file_*" is
+    stored at node "fs"), so resolving a topic only visits the nodes along
+    its own path and checks the wildcard patterns hanging off them. Matching
+    keeps fnmatch semantics: wildcards are verified against the full topic
+    with a pre-compiled regex, so "*" still spans dots.
+
+    Resolved topics are cached; adding or removing an exact pattern only
+    evicts that topic, while wildcard changes flush the cache.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self._root = _TopicNode()
+        self._order: Dict[int, int] = {}  # id(subscription) -> insertion sequence
+        self._seq = 0
+        self._cache: "OrderedDict[str, Tuple[Subscription, ...]]" = OrderedDict()
+        self._cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _node_for(self, pattern: str, create: bool) -> Tuple[Optional[_TopicNode], bool]:
+        node = self._root
+        for segment in pattern.split('.'):
+            if _is_wildcard(segment):
+                return node, True
+            child = node.children.get(segment)
+            if child is None:
+                if not create:
+                    return None, False
+                child = node.children[segment] = _TopicNode()
+            node = child
+        return node, False
+
+    def _invalidate(self, pattern: str, wildcard: bool):
+        if wildcard:
+            self._cache.clear()
+        else:
+            self._cache.pop(pattern, None)
+
+    def add(self, subscription: Subscription):
+        node, wildcard = self._node_for(subscription.topic_pattern, create=True)
+        (node.wildcards if wildcard else node.exact).append(subscription)
+        self._seq += 1
+        self._order[id(subscription)] = self._seq
+        self._invalidate(subscription.topic_pattern, wildcard)
+
+    def remove(self, subscription: Subscription) -> bool:
+        node, wildcard = self._node_for(subscription.topic_pattern, create=False)
+        if node is None:
+            return False
+        bucket = node.wildcards if wildcard else node.exact
+        for i, existing in enumerate(bucket):
+            if existing is subscription:
+                del bucket[i]
+                self._order.pop(id(subscription), None)
+                self._invalidate(subscription.topic_pattern, wildcard)
+                return True
+        return False
+
+    def clear(self):
+        self._root = _TopicNode()
+        self._order.clear()
+        self._cache.clear()
+
+    def match(self, topic: str) -> Tuple[Subscription, ...]:
+        """Return subscriptions whose pattern matches topic, in subscription order"""
+        cached = self._cache.get(topic)
+        if cached is not None:
+            self._cache.move_to_end(topic)
+            self.cache_hits += 1
+            return cached
+        self.cache_misses += 1
+
+        matched: List[Subscription] = []
+        node = self._root
+        for segment in topic.split('.'):
+            matched.extend(sub for sub in node.wildcards if sub.matches_topic(topic))
+            node = node.children.get(segment)
+            if node is None:
+                break
+        else:
+            matched.extend(sub for sub in node.wildcards if sub.matches_topic(topic))
+            matched.extend(node.exact)
+        if len(matched) > 1:
+            matched.sort(key=lambda sub: self._order.get(id(sub), 0))
+        result = tuple(matched)
+
+        self._cache[topic] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
 
 
 class MessageBroker:
@@ -109,9 +408,31 @@ class MessageBroker:
         default_max_history = int(os.getenv("MB_MAX_HISTORY", "200"))
         self.max_history = max_history if max_history is not None else default_max_history
         self.max_payload_history_bytes = int(os.getenv("MB_MAX_PAYLOAD_HISTORY_BYTES", str(256 * 1024)))
+        # High-volume topics that are never replayed can skip history entirely
+        exclude = os.getenv("MB_HISTORY_EXCLUDE", "terminal.output_sent,terminal.input_sent,fs.index_progress")
+        self._history_exclude: Dict[str, Callable[[str], Any]] = {
+            pattern: _compile_pattern(pattern)
+            for pattern in (p.strip() for p in exclude.split(',')) if pattern
+        }
+        self._history_topic_cache: Dict[str, bool] = {}
 
         self.subscribers: Dict[str, List[Subscription]] = defaultdict(list)
-        self.message_history: List[Message] = []
+        # Topic index used for dispatch; self.subscribers stays the registry
+        try:
+            route_cache_size = int(os.getenv("MB_ROUTE_CACHE_SIZE", "4096"))
+        except ValueError:
+            route_cache_size = 4096
+        self._topic_trie = TopicTrie(cache_size=route_cache_size)
+        # Per-subscriber delivery queues
+        try:
+            self.subscriber_queue_size = int(os.getenv("MB_SUBSCRIBER_QUEUE_SIZE", "1000"))
+        except ValueError:
+            self.subscriber_queue_size = 1000
+        try:
+            self.overflow_policy = OverflowPolicy(os.getenv("MB_OVERFLOW_POLICY", OverflowPolicy.DROP_OLDEST.value))
+        except ValueError:
+            self.overflow_policy = OverflowPolicy.DROP_OLDEST
+        self.message_history: Deque[Message] = deque(maxlen=self.max_history)
         self.pending_requests: Dict[str, asyncio.Future] = {}
         self.running = False
         self.cleanup_task: Optional[asyncio.Task] = None
@@ -124,7 +445,10 @@ class MessageBroker:
             'active_subscriptions': 0,
             'request_response_pairs': 0,
             'history_truncated': 0,
-            'history_bytes_stored': 0
+            'history_bytes_stored': 0,
+            'history_skipped': 0,
+            'messages_dropped': 0,
+            'messages_coalesced': 0
         }
     
     async def start(self):
@@ -162,8 +486,12 @@ class MessageBroker:
         self.pending_requests.clear()
         # Aggressively free memory retained by history/subscribers between tests
         async with self._lock:
+            for subscriptions in self.subscribers.values():
+                for subscription in subscriptions:
+                    self._stop_worker(subscription)
             self.message_history.clear()
             self.subscribers.clear()
+            self._topic_trie.clear()
             self.stats['active_subscriptions'] = 0
         logger.info("Message broker stopped")
     
@@ -188,42 +516,10 @@ class MessageBroker:
         )
         
         # Store in history (with truncation for very large payloads)
-        async with self._lock:
-            to_store = message
-            try:
-                # Estimate payload size
-                payload = message.payload
-                approx_bytes = 0
-                if isinstance(payload, (bytes, bytearray, memoryview)):
-                    approx_bytes = len(payload)
-                else:
-                    # Fallback to JSON size estimation
-                    approx_bytes = len(json.dumps(payload)) if payload is not None else 0
-                if approx_bytes > self.max_payload_history_bytes:
-                    # Create a shallow copy with truncated payload for history only
-                    thin = Message.from_dict(message.to_dict())
-                    keys_preview = list(payload.keys())[:10] if isinstance(payload, dict) else None
-                    thin.payload = {
-                        '_truncated': True,
-                        'approx_bytes': approx_bytes,
-                        'keys': keys_preview,
-                        'note': 'Payload omitted from history due to size'
-                    }
-                    to_store = thin
-                    self.stats['history_truncated'] += 1
-                self.message_history.append(to_store)
-                self.stats['history_bytes_stored'] += (
-                    len(json.dumps(to_store.payload)) if to_store.payload is not None else 0
-                )
-                if len(self.message_history) > self.max_history:
-                    self.message_history.pop(0)
-            except Exception as e:
-                # If sizing/truncation fails, store message metadata only
-                thin = Message.from_dict(message.to_dict())
-                thin.payload = {'_truncated': True, 'error': str(e)}
-                self.message_history.append(thin)
-                if len(self.message_history) > self.max_history:
-                    self.message_history.pop(0)
+        if self._history_enabled_for(topic):
+            self._record_history(message)
+        else:
+            self.stats['history_skipped'] += 1
         
         # Deliver to subscribers
         delivered_count = await self._deliver_message(message)
@@ -235,11 +531,74 @@ class MessageBroker:
         logger.debug(f"Published message {message.id} to topic '{topic}' - delivered to {delivered_count} subscribers")
         return message.id
     
+    def _record_history(self, message: Message):
+        """Append a message to the bounded history ring"""
+        if self.max_history <= 0:
+            return
+        to_store = message
+        try:
+            payload = message.payload
+            approx_bytes = 0
+            if payload is not None:
+                approx_bytes = _estimate_payload_bytes(payload, self.max_payload_history_bytes)
+            if approx_bytes > self.max_payload_history_bytes:
+                # Create a shallow copy with truncated payload for history only
+                thin = Message.from_dict(message.to_dict())
+                keys_preview = list(payload.keys())[:10] if isinstance(payload, dict) else None
+                thin.payload = {
+                    '_truncated': True,
+                    'approx_bytes': approx_bytes,
+                    'keys': keys_preview,
+                    'note': 'Payload omitted from history due to size'
+                }
+                to_store = thin
+                approx_bytes = 0
+                self.stats['history_truncated'] += 1
+            self.stats['history_bytes_stored'] += approx_bytes
+        except Exception as e:
+            # If sizing/truncation fails, store message metadata only
+            to_store = Message.from_dict(message.to_dict())
+            to_store.payload = {'_truncated': True, 'error': str(e)}
+        # deque(maxlen=...) drops the oldest entry in O(1)
+        self.message_history.append(to_store)
+    
+    def _history_enabled_for(self, topic: str) -> bool:
+        enabled = self._history_topic_cache.get(topic)
+        if enabled is None:
+            enabled = not any(match(topic) is not None for match in self._history_exclude.values())
+            if len(self._history_topic_cache) >= 4096:
+                self._history_topic_cache.clear()
+            self._history_topic_cache[topic] = enabled
+        return enabled
+    
+    def set_history_enabled(self, topic_pattern: str, enabled: bool):
+        """
+        Opt topics matching a pattern in or out of message history.
+        
+        Excluded topics are still delivered to subscribers but are not
+        recorded for replay.
+        
+        Args:
+            topic_pattern: Glob-style topic pattern
+            enabled: False to stop recording matching topics
+        """
+        if enabled:
+            self._history_exclude.pop(topic_pattern, None)
+        else:
+            self._history_exclude[topic_pattern] = _compile_pattern(topic_pattern)
+        self._history_topic_cache.clear()
+    
     async def subscribe(self, topic_pattern: str, callback: Callable[[Message], None],
-                       subscriber_id: Optional[str] = None, filter_func: Optional[Callable[[Message], bool]] = None) -> str:
+                       subscriber_id: Optional[str] = None, filter_func: Optional[Callable[[Message], bool]] = None,
+                       max_queue: Optional[int] = None,
+                       overflow: Optional[Union[OverflowPolicy, str]] = None) -> str:
         """
         Subscribe to messages matching a topic pattern
         Returns subscription ID
+        
+        Messages are queued per subscription and delivered in order by a
+        worker task; max_queue and overflow override the broker defaults
+        (MB_SUBSCRIBER_QUEUE_SIZE / MB_OVERFLOW_POLICY) for slow consumers.
         """
         if not self.running:
             raise RuntimeError("Message broker is not running")
@@ -253,9 +612,15 @@ class MessageBroker:
             callback=callback,
             filter_func=filter_func
         )
+        subscription.queue = DeliveryQueue(
+            max_queue if max_queue is not None else self.subscriber_queue_size,
+            OverflowPolicy(overflow) if overflow is not None else self.overflow_policy
+        )
+        subscription.handler_task = asyncio.create_task(self._delivery_worker(subscription))
         
         async with self._lock:
             self.subscribers[topic_pattern].append(subscription)
+            self._topic_trie.add(subscription)
             self.stats['active_subscriptions'] += 1
         
         logger.debug(f"Subscriber {subscriber_id} subscribed to pattern '{topic_pattern}'")
@@ -270,29 +635,34 @@ class MessageBroker:
             if topic_pattern:
                 # Unsubscribe from specific pattern
                 if topic_pattern in self.subscribers:
-                    self.subscribers[topic_pattern] = [
-                        sub for sub in self.subscribers[topic_pattern]
-                        if sub.subscriber_id != subscriber_id
-                    ]
-                    if not self.subscribers[topic_pattern]:
-                        del self.subscribers[topic_pattern]
+                    self._remove_subscriptions(topic_pattern, subscriber_id)
                     self.stats['active_subscriptions'] -= 1
             else:
                 # Unsubscribe from all patterns
                 removed_count = 0
                 for pattern in list(self.subscribers.keys()):
-                    original_count = len(self.subscribers[pattern])
-                    self.subscribers[pattern] = [
-                        sub for sub in self.subscribers[pattern]
-                        if sub.subscriber_id != subscriber_id
-                    ]
-                    removed_count += original_count - len(self.subscribers[pattern])
-                    if not self.subscribers[pattern]:
-                        del self.subscribers[pattern]
+                    removed_count += self._remove_subscriptions(pattern, subscriber_id)
                 self.stats['active_subscriptions'] -= removed_count
         
         logger.debug(f"Unsubscribed {subscriber_id} from {topic_pattern or 'all patterns'}")
     
+    def _remove_subscriptions(self, pattern: str, subscriber_id: str) -> int:
+        """Drop a subscriber's subscriptions for one pattern; caller holds _lock"""
+        kept = []
+        removed = 0
+        for sub in self.subscribers[pattern]:
+            if sub.subscriber_id == subscriber_id:
+                self._topic_trie.remove(sub)
+                self._stop_worker(sub)
+                removed += 1
+            else:
+                kept.append(sub)
+        if kept:
+            self.subscribers[pattern] = kept
+        else:
+            del self.subscribers[pattern]
+        return removed
+    
     async def request(self, topic: str, payload: Any, timeout: float = 30.0,
                      sender: Optional[str] = None) -> Any:
         """
@@ -367,6 +737,7 @@ class MessageBroker:
         """
         Replay historical messages to a subscriber
         """
+        matcher = _compile_pattern(topic_pattern)
         async with self._lock:
             filtered_messages = []
             
@@ -376,7 +747,7 @@ class MessageBroker:
                     continue
                 
                 # Check topic pattern
-                if fnmatch.fnmatch(message.topic, topic_pattern):
+                if matcher(message.topic) is not None:
                     filtered_messages.append(message)
                 
                 # Check limit
@@ -393,36 +764,87 @@ class MessageBroker:
                 'active_subscriptions': sum(len(subs) for subs in self.subscribers.values()),
                 'pending_requests': len(self.pending_requests),
                 'message_history_size': len(self.message_history),
-                'topic_patterns': list(self.subscribers.keys())
+                'topic_patterns': list(self.subscribers.keys()),
+                'route_cache_hits': self._topic_trie.cache_hits,
+                'route_cache_misses': self._topic_trie.cache_misses,
+                'queue_depth': sum(len(sub.queue) for sub in self._iter_subscriptions() if sub.queue),
+                'max_queue_lag': max(
+                    (sub.queue.last_lag for sub in self._iter_subscriptions() if sub.queue),
+                    default=0.0
+                )
             }
     
+    async def get_subscriber_metrics(self) -> List[Dict[str, Any]]:
+        """Get per-subscription queue depth, lag and drop counters"""
+        async with self._lock:
+            return [
+                {
+                    'subscriber_id': sub.subscriber_id,
+                    'topic_pattern': sub.topic_pattern,
+                    **sub.queue.get_metrics()
+                }
+                for sub in self._iter_subscriptions() if sub.queue
+            ]
+    
+    async def drain(self, timeout: Optional[float] = None):
+        """Wait until every subscriber queue has been delivered"""
+        async def _drain():
+            for sub in list(self._iter_subscriptions()):
+                if sub.queue:
+                    await sub.queue.join()
+        await asyncio.wait_for(_drain(), timeout)
+    
+    def _iter_subscriptions(self):
+        for subscriptions in self.subscribers.values():
+            yield from subscriptions
+    
     async def _deliver_message(self, message: Message) -> int:
         """Deliver message to all matching subscribers"""
         if message.is_expired():
             return 0
         
         delivered_count = 0
-        tasks = []
         
-        async with self._lock:
-            for pattern, subscriptions in self.subscribers.items():
-                for subscription in subscriptions:
-                    if subscription.matches_topic(message.topic):
-                        # Apply filter if provided
-                        if subscription.filter_func and not subscription.filter_func(message):
-                            continue
-                        
-                        # Create task for async delivery
-                        task = asyncio.create_task(self._safe_callback(subscription.callback, message))
-                        tasks.append(task)
-                        delivered_count += 1
-        
-        # Wait for all deliveries to complete
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        # Route resolution is synchronous and the trie is only mutated from
+        # this loop, so dispatch doesn't need to hold the broker lock.
+        for subscription in self._topic_trie.match(message.topic):
+            # Apply filter if provided
+            if subscription.filter_func and not subscription.filter_func(message):
+                continue
+            
+            queue = subscription.queue
+            if queue is None:
+                await self._safe_callback(subscription.callback, message)
+            else:
+                dropped, coalesced = queue.dropped, queue.coalesced
+                # Only BLOCK subscribers can make the publisher wait here
+                await queue.put(message)
+                self.stats['messages_dropped'] += queue.dropped - dropped
+                self.stats['messages_coalesced'] += queue.coalesced - coalesced
+            delivered_count += 1
         
         return delivered_count
     
+    async def _delivery_worker(self, subscription: Subscription):
+        """Drain one subscription's queue, invoking its callback in order"""
+        queue = subscription.queue
+        try:
+            while True:
+                message = await queue.get()
+                try:
+                    if not message.is_expired():
+                        await self._safe_callback(subscription.callback, message)
+                finally:
+                    queue.task_done()
+        except asyncio.CancelledError:
+            pass
+    
+    def _stop_worker(self, subscription: Subscription):
+        task = subscription.handler_task
+        if task and not task.done():
+            task.cancel()
+        subscription.handler_task = None
+    
     async def _safe_callback(self, callback: Callable[[Message], None], message: Message):
         """Safely execute callback with error handling"""
         try:
@@ -439,9 +861,10 @@ class MessageBroker:
             try:
                 async with self._lock:
                     original_count = len(self.message_history)
-                    self.message_history = [
-                        msg for msg in self.message_history if not msg.is_expired()
-                    ]
+                    self.message_history = deque(
+                        (msg for msg in self.message_history if not msg.is_expired()),
+                        maxlen=self.max_history
+                    )
                     removed_count = original_count - len(self.message_history)
                     
                     if removed_count > 0:
@@ -0,0 +1,124 @@
+"""
+LSP Framing Benchmark
+
+Measures LSPMessageReader on multi-MB server messages (publishDiagnostics
+and workspace/symbol shaped) delivered in pipe-sized chunks, and how long
+the event loop is blocked while each message is parsed.
+
+Usage:
+    python -m icpy.scripts.bench_lsp_framing [--size-mb N] [--messages N] [--offload-mb N]
+
+    Or from icotes backend directory:
+    uv run python -m icpy.scripts.bench_lsp_framing
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from icpy.utils.lsp_framing import LSPMessageReader, encode_lsp_message
+
+_PIPE_CHUNK = 65536
+
+
+class _ChunkedStream:
+    """In-memory stream that returns at most one pipe buffer per read."""
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    async def read(self, n: int) -> bytes:
+        size = min(n, _PIPE_CHUNK)
+        chunk = bytes(self.data[self.offset:self.offset + size])
+        self.offset += len(chunk)
+        # Yield like a real pipe read would
+        await asyncio.sleep(0)
+        return chunk
+
+
+def _payloads(size_bytes: int):
+    """Representative large server messages keyed by scenario name."""
+    diagnostic = {
+        'range': {'start': {'line': 120, 'character': 4}, 'end': {'line': 120, 'character': 18}},
+        'severity': 1,
+        'source': 'Pyright',
+        'message': 'Cannot access member "value" for type "None"',
+    }
+    symbol = {
+        'name': 'WorkspaceService',
+        'kind': 5,
+        'location': {
+            'uri': 'file:///workspace/backend/icpy/services/workspace_service.py',
+            'range': {'start': {'line': 40, 'character': 0}, 'end': {'line': 900, 'character': 0}},
+        },
+        'containerName': 'icpy.services.workspace_service',
+    }
+    diagnostics_count = max(1, size_bytes // len(encode_lsp_message(diagnostic)))
+    symbols_count = max(1, size_bytes // len(encode_lsp_message(symbol)))
+    return {
+        'publishDiagnostics': {
+            'jsonrpc': '2.0',
+            'method': 'textDocument/publishDiagnostics',
+            'params': {'uri': 'file:///workspace/main.py', 'diagnostics': [diagnostic] * diagnostics_count},
+        },
+        'workspace/symbol': {'jsonrpc': '2.0', 'id': 1, 'result': [symbol] * symbols_count},
+    }
+
+
+async def _run_scenario(payload, messages: int, offload_threshold):
+    data = encode_lsp_message(payload) * messages
+    reader = LSPMessageReader(_ChunkedStream(data), offload_threshold=offload_threshold)
+
+    # Measure the longest gap between loop iterations while reading
+    max_stall = 0.0
+    running = True
+
+    async def _ticker():
+        nonlocal max_stall
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            max_stall = max(max_stall, now - last)
+            last = now
+
+    ticker = asyncio.create_task(_ticker())
+    started = time.perf_counter()
+    count = 0
+    while await reader.read_message() is not None:
+        count += 1
+    elapsed = time.perf_counter() - started
+    running = False
+    await ticker
+    return len(data), count, elapsed, max_stall
+
+
+async def run_benchmark(size_mb: float, messages: int, offload_mb: float):
+    size_bytes = int(size_mb * 1024 * 1024)
+    offload_threshold = int(offload_mb * 1024 * 1024) or None
+    print(f"LSPMessageReader: {messages} x ~{size_mb} MB messages, "
+          f"offload threshold={offload_threshold or 'off'}")
+    for name, payload in _payloads(size_bytes).items():
+        total, count, elapsed, max_stall = await _run_scenario(payload, messages, offload_threshold)
+        rate = total / elapsed / (1024 * 1024) if elapsed > 0 else float('inf')
+        print(f"  {name:<20} {count:>4} msgs {rate:>10,.1f} MB/s  max loop stall {max_stall * 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LSP message framing and JSON decoding")
+    parser.add_argument('--size-mb', type=float, default=4.0, help="approximate size of each message")
+    parser.add_argument('--messages', type=int, default=10, help="messages per scenario")
+    parser.add_argument('--offload-mb', type=float, default=0.0,
+                        help="parse bodies from this size on in a worker thread (0 disables)")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.size_mb, args.messages, args.offload_mb))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Message Broker Publish Benchmark
+
+Measures MessageBroker.publish throughput for payloads shaped like the
+high-volume publishers (terminal output chunks and filesystem events).
+
+Usage:
+    python -m icpy.scripts.bench_message_broker [--messages N] [--history N]
+
+    Or from icotes backend directory:
+    uv run python -m icpy.scripts.bench_message_broker
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from icpy.core.message_broker import MessageBroker
+
+
+def _payloads():
+    """Representative payloads keyed by scenario name."""
+    return {
+        'terminal.output': {
+            'terminal_id': 'term-1',
+            'data': 'drwxr-xr-x  5 user user 4096 Jan  1 00:00 src\r\n' * 40,
+        },
+        'fs.file_modified': {
+            'file_path': '/workspace/src/components/Editor.tsx',
+            'event_type': 'modified',
+            'is_directory': False,
+            'timestamp': 1700000000.0,
+        },
+        'agent.large_result': {
+            'rows': [{'id': i, 'name': f'row-{i}', 'tags': ['a', 'b', 'c']} for i in range(2000)],
+        },
+    }
+
+
+async def _run_scenario(topic: str, payload, messages: int, history: int, subscribers: int) -> float:
+    broker = MessageBroker(max_history=history)
+    await broker.start()
+    try:
+        for _ in range(subscribers):
+            await broker.subscribe(topic.split('.')[0] + '.*', lambda message: None)
+        # Warm up caches before timing
+        for _ in range(min(100, messages)):
+            await broker.publish(topic, payload)
+        started = time.perf_counter()
+        for _ in range(messages):
+            await broker.publish(topic, payload)
+        elapsed = time.perf_counter() - started
+    finally:
+        await broker.stop()
+    return messages / elapsed if elapsed > 0 else float('inf')
+
+
+async def run_benchmark(messages: int, history: int, subscribers: int):
+    print(f"MessageBroker.publish: {messages} messages, history={history}, subscribers={subscribers}")
+    for topic, payload in _payloads().items():
+        count = messages if topic != 'agent.large_result' else max(1, messages // 50)
+        rate = await _run_scenario(topic, payload, count, history, subscribers)
+        print(f"  {topic:<20} {rate:>12,.0f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MessageBroker publish throughput")
+    parser.add_argument('--messages', type=int, default=20000, help="messages per scenario")
+    parser.add_argument('--history', type=int, default=200, help="broker max_history")
+    parser.add_argument('--subscribers', type=int, default=1, help="wildcard subscribers per topic")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.messages, args.history, args.subscribers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Line-offset index for chat history JSONL files
+
+Each session JSONL file gets a binary sidecar (``<session>.jsonl.idx``)
+holding the byte offset of every non-empty line. Range and tail reads seek
+straight to the requested lines instead of parsing the whole history.
+
+The sidecar is maintained lazily: before each read the JSONL size is
+compared with the size the index covers, and only the appended tail is
+scanned. A file that shrank or no longer lines up with the index is
+re-indexed from scratch, so writers never have to know about the index.
+"""
+
+import json
+import logging
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = '.idx'
+
+_MAGIC = b'ICHX'
+_VERSION = 1
+# magic, version, line count, bytes of the JSONL file covered by the index
+_HEADER = struct.Struct('<4sHxxQQ')
+_SCAN_CHUNK = 1024 * 1024
+
+
+class ChatHistoryIndex:
+    """Byte offsets of the lines in one chat history JSONL file."""
+
+    def __init__(self, jsonl_path: Path, persist: bool = True):
+        self.jsonl_path = Path(jsonl_path)
+        self.index_path = self.jsonl_path.with_name(self.jsonl_path.name + INDEX_SUFFIX)
+        self.persist = persist
+        self._offsets = array('Q')
+        self._indexed_size = 0
+        self._persisted_count = 0
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    def refresh(self) -> int:
+        """Bring the index up to date with the JSONL file.
+
+        Returns:
+            Number of indexed lines (0 if the file does not exist)
+        """
+        if not self._loaded:
+            self._load()
+        try:
+            size = self.jsonl_path.stat().st_size
+        except FileNotFoundError:
+            self._reset()
+            return 0
+
+        if size < self._indexed_size or not self._tail_aligned():
+            self._reset()
+        if size > self._indexed_size:
+            self._scan_from(self._indexed_size)
+            self._save()
+        return len(self._offsets)
+
+    def invalidate(self):
+        """Forget the index and remove its sidecar."""
+        self._reset()
+        self._loaded = True
+        try:
+            self.index_path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f"Failed to remove chat index {self.index_path}: {e}")
+
+    def _reset(self):
+        self._offsets = array('Q')
+        self._indexed_size = 0
+        self._persisted_count = 0
+
+    def _tail_aligned(self) -> bool:
+        """Cheap check that the file was appended to, not rewritten."""
+        if self._indexed_size == 0:
+            return True
+        try:
+            with open(self.jsonl_path, 'rb') as f:
+                f.seek(self._indexed_size - 1)
+                return f.read(1) == b'\n'
+        except OSError:
+            return False
+
+    def _scan_from(self, start: int):
+        """Index complete lines from start; a trailing partial line is left for later."""
+        with open(self.jsonl_path, 'rb') as f:
+            f.seek(start)
+            position = start
+            line_start = start
+            line_empty = True
+            while True:
+                chunk = f.read(_SCAN_CHUNK)
+                if not chunk:
+                    break
+                cursor = 0
+                while True:
+                    newline = chunk.find(b'\n', cursor)
+                    if newline == -1:
+                        if chunk[cursor:].strip():
+                            line_empty = False
+                        break
+                    if not line_empty or chunk[cursor:newline].strip():
+                        self._offsets.append(line_start)
+                    line_start = position + newline + 1
+                    line_empty = True
+                    cursor = newline + 1
+                position += len(chunk)
+            self._indexed_size = line_start
+
+    def _load(self):
+        self._loaded = True
+        if not self.persist:
+            return
+        try:
+            with open(self.index_path, 'rb') as f:
+                header = f.read(_HEADER.size)
+                magic, version, count, indexed_size = _HEADER.unpack(header)
+                if magic != _MAGIC or version != _VERSION:
+                    return
+                offsets = array('Q')
+                offsets.frombytes(f.read(count * offsets.itemsize))
+                if len(offsets) != count:
+                    return
+            self._offsets = offsets
+            self._indexed_size = indexed_size
+            self._persisted_count = count
+        except FileNotFoundError:
+            return
+        except (OSError, struct.error) as e:
+            logger.debug(f"Ignoring unreadable chat index {self.index_path}: {e}")
+
+    def _save(self):
+        if not self.persist:
+            return
+        count = len(self._offsets)
+        header = _HEADER.pack(_MAGIC, _VERSION, count, self._indexed_size)
+        try:
+            if 0 < self._persisted_count <= count and self.index_path.exists():
+                # Append new offsets, then publish them by rewriting the header
+                with open(self.index_path, 'r+b') as f:
+                    f.seek(_HEADER.size + self._persisted_count * self._offsets.itemsize)
+                    f.write(self._offsets[self._persisted_count:].tobytes())
+                    f.truncate()
+                    f.seek(0)
+                    f.write(header)
+            else:
+                tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+                with open(tmp_path, 'wb') as f:
+                    f.write(header)
+                    f.write(self._offsets.tobytes())
+                os.replace(tmp_path, self.index_path)
+            self._persisted_count = count
+        except OSError as e:
+            # The index is an optimization; keep serving from memory
+            logger.debug(f"Failed to persist chat index {self.index_path}: {e}")
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def read_range(self, start: int, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Decode lines [start, stop) of the JSONL file.
+
+        Args:
+            start: Index of the first line
+            stop: Index after the last line, or None for the end
+
+        Returns:
+            Parsed JSON objects; lines that fail to parse are skipped
+        """
+        count = len(self._offsets)
+        start = max(0, start)
+        stop = count if stop is None else min(stop, count)
+        if start >= stop:
+            return []
+        begin = self._offsets[start]
+        end = self._offsets[stop] if stop < count else self._indexed_size
+        with open(self.jsonl_path, 'rb') as f:
+            f.seek(begin)
+            block = f.read(end - begin)
+        records = []
+        for line in block.split(b'\n'):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except (ValueError, UnicodeDecodeError):
+                logger.debug(f"Skipping malformed chat history line in {self.jsonl_path.name}")
+        return records
+
+    def read_tail(self, limit: int, skip: int = 0) -> List[Dict[str, Any]]:
+        """Decode up to limit lines ending skip lines before the end of the file."""
+        stop = len(self._offsets) - max(0, skip)
+        return self.read_range(max(0, stop - limit), stop)
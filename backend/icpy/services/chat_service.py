@@ -25,6 +25,7 @@ from ..services.agent_service import AgentService, get_agent_service, AgentSessi
 from ..services.media_service import get_media_service
 from ..services.image_reference_service import ImageReferenceService, ImageReference
 from ..services.image_cache import get_image_cache
+from ..services.chat_history_index import ChatHistoryIndex
 from ..services.context_router import get_context_router
 
 # Custom agent imports
@@ -204,6 +205,14 @@ class ChatService:
         self._persist_lock = asyncio.Lock()
         self._persist_task: Optional[asyncio.Task] = None
         self._persist_interval: float = float(int(os.getenv('CHAT_STORE_FLUSH_MS', '250')))/1000.0
+        # Line-offset indexes for session JSONL files (seekable history reads)
+        self._history_indexes: Dict[Path, ChatHistoryIndex] = {}
+        # Session catalog for get_sessions: per-file message counts validated by
+        # (mtime, size) and per-session names validated by meta mtime
+        self._session_catalog: Dict[str, Dict[str, Any]] = {}
+        self._session_names: Dict[str, Dict[str, Any]] = {}
+        self._catalog_loaded = False
+        self._catalog_dirty = False
         
         # JSONL history root (workspace/.icotes/chat_history)
         try:
@@ -351,6 +360,114 @@ class ChatService:
                 return rest
         return stem
 
+    def _history_index(self, file_path: Path) -> ChatHistoryIndex:
+        """Get the (cached) line-offset index for a session file."""
+        index = self._history_indexes.get(file_path)
+        if index is None:
+            index = self._history_indexes[file_path] = ChatHistoryIndex(file_path)
+        return index
+
+    def _drop_history_index(self, file_path: Path) -> None:
+        """Forget a session file's index and remove its sidecar."""
+        index = self._history_indexes.pop(file_path, None) or ChatHistoryIndex(file_path)
+        index.invalidate()
+
+    def _catalog_path(self) -> Path:
+        return self.history_root / '.sessions_catalog.json'
+
+    def _load_session_catalog(self) -> None:
+        self._catalog_loaded = True
+        try:
+            with open(self._catalog_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._session_catalog = dict(data.get('files') or {})
+            self._session_names = dict(data.get('names') or {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable session catalog: {e}")
+
+    def _save_session_catalog(self) -> None:
+        if not self._catalog_dirty:
+            return
+        try:
+            path = self._catalog_path()
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'files': self._session_catalog, 'names': self._session_names}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._catalog_dirty = False
+        except Exception as e:
+            logger.debug(f"Failed to persist session catalog: {e}")
+
+    def _catalog_file_entry(self, file: Path, stat: os.stat_result) -> Dict[str, Any]:
+        """Message count and last timestamp for a session file, recomputed only when it changed."""
+        entry = self._session_catalog.get(file.name)
+        if entry and entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+            return entry
+        index = self._history_index(file)
+        message_count = index.refresh()
+        last_message_time = None
+        if message_count:
+            tail = index.read_tail(1)
+            if tail:
+                last_message_time = tail[-1].get('timestamp')
+        entry = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'message_count': message_count,
+            'last_message_time': last_message_time,
+        }
+        self._session_catalog[file.name] = entry
+        self._catalog_dirty = True
+        return entry
+
+    def _catalog_session_name(self, session_id: str) -> Optional[str]:
+        """Display name from the meta sidecar, re-read only when its mtime changes."""
+        meta_path = self._meta_path(session_id)
+        try:
+            meta_mtime = meta_path.stat().st_mtime
+        except OSError:
+            if self._session_names.pop(session_id, None) is not None:
+                self._catalog_dirty = True
+            return None
+        cached = self._session_names.get(session_id)
+        if cached and cached.get('mtime') == meta_mtime:
+            return cached.get('name')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as mf:
+                name = json.load(mf).get('name') or None
+        except Exception:
+            name = None
+        self._session_names[session_id] = {'mtime': meta_mtime, 'name': name}
+        self._catalog_dirty = True
+        return name
+
+    def _catalog_note_append(self, file_path: Path, start_size: int, count: int,
+                             last_message_time: Optional[str]) -> None:
+        """Advance a catalog entry after this process appended count messages."""
+        entry = self._session_catalog.get(file_path.name)
+        if not entry or entry.get('size') != start_size:
+            # Unknown or already stale: get_sessions will recompute it
+            return
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return
+        entry.update({
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'message_count': entry.get('message_count', 0) + count,
+            'last_message_time': last_message_time,
+        })
+        self._catalog_dirty = True
+
+    def _catalog_forget(self, session_id: str) -> None:
+        for name in [n for n in self._session_catalog if self._derive_session_id_from_file(Path(n)) == session_id]:
+            del self._session_catalog[name]
+        self._session_names.pop(session_id, None)
+        self._catalog_dirty = True
+
     def _meta_path(self, session_id: str) -> Path:
         return self.history_root / f"{session_id}.meta.json"
 
@@ -963,14 +1080,22 @@ class ChatService:
         try:
             # Send typing indicator
             await self._send_typing_indicator(user_message.session_id, True)
-            
+
+            # Let prompt context snapshots built on the agent's worker thread follow broker events
+            try:
+                from .context_snapshot import attach_context_snapshots
+                await attach_context_snapshots()
+            except Exception as e:
+                logger.debug(f"Context snapshot attach skipped: {e}")
+
             # Get message history for context (Phase 2: with optimized image loading)
             # Use metadata_only strategy to prevent token exhaustion from images
             history = await self.get_message_history(
                 user_message.session_id,
                 limit=10,
                 load_full_images=False,
-                context_strategy="metadata_only"
+                context_strategy="metadata_only",
+                from_end=True
             )
             history_list = []
             for msg in history:
@@ -1988,7 +2113,9 @@ class ChatService:
             else:
                 file_path = self._resolve_session_file_for_write(session_id)
                 with open(file_path, 'a', encoding='utf-8') as f:
+                    start_size = f.tell()
                     f.write(json.dumps(message_dict, ensure_ascii=False) + "\n")
+                self._catalog_note_append(file_path, start_size, 1, message_dict.get('timestamp'))
         except Exception as e:
             logger.error(f"Failed to store message (JSONL): {e}")
 
@@ -2019,8 +2146,10 @@ class ChatService:
             file_path = self._resolve_session_file_for_write(session_id)
             try:
                 with open(file_path, 'a', encoding='utf-8') as f:
+                    start_size = f.tell()
                     for msg in items:
                         f.write(json.dumps(msg.to_dict(), ensure_ascii=False) + "\n")
+                self._catalog_note_append(file_path, start_size, len(items), items[-1].timestamp)
             except Exception as e:
                 logger.error(f"Failed writing batch for session {session_id}: {e}")
     
@@ -2030,7 +2159,8 @@ class ChatService:
         limit: int = 50,
         offset: int = 0,
         load_full_images: bool = False,
-        context_strategy: str = "metadata_only"
+        context_strategy: str = "metadata_only",
+        from_end: bool = False
     ) -> List[ChatMessage]:
         """
         Get message history with pagination from JSONL files.
@@ -2041,12 +2171,15 @@ class ChatService:
             offset: Number of messages to skip
             load_full_images: Whether to load full base64 images (default: False for Phase 2)
             context_strategy: Strategy for image context ("metadata_only", "thumbnails_only", "recent_full", "selective")
+            from_end: Count offset back from the newest message, for paging backward
+                through a session (results stay in chronological order)
         
         Returns:
             List of ChatMessage objects with optimized image context
         """
         try:
             messages: List[ChatMessage] = []
+            paged = False
             if session_id:
                 # Prefer new path, then legacy candidates
                 candidates: List[Path] = []
@@ -2055,6 +2188,11 @@ class ChatService:
                     candidates = [new_p]
                 else:
                     candidates = list(self.history_root.glob(f"*_{session_id}.jsonl"))
+                if len(candidates) == 1 and limit is not None:
+                    # Single file: seek straight to the requested lines
+                    messages = self._read_indexed_history(candidates[0], limit, offset, from_end)
+                    candidates = []
+                    paged = True
                 for fp in candidates:
                     try:
                         with open(fp, 'r', encoding='utf-8') as f:
@@ -2081,10 +2219,15 @@ class ChatService:
                         continue
             # Sort chronologically by timestamp ascending
             messages.sort(key=lambda m: m.timestamp)
-            # Apply offset/limit from the beginning per tests' expectation
-            slice_start = offset if offset >= 0 else 0
-            slice_end = slice_start + limit if limit is not None else None
-            messages = messages[slice_start:slice_end]
+            if not paged:
+                # Apply offset/limit from the beginning per tests' expectation
+                slice_start = offset if offset >= 0 else 0
+                if from_end:
+                    slice_end = len(messages) - slice_start
+                    slice_start = max(0, slice_end - limit) if limit is not None else 0
+                else:
+                    slice_end = slice_start + limit if limit is not None else None
+                messages = messages[slice_start:slice_end]
             
             # Phase 2: Apply context building if enabled and not loading full images
             if not load_full_images and self.context_builder:
@@ -2118,6 +2261,27 @@ class ChatService:
             logger.error(f"Failed to retrieve message history (JSONL): {e}")
             return []
     
+    def _read_indexed_history(self, file_path: Path, limit: int, offset: int, from_end: bool) -> List[ChatMessage]:
+        """Read one page of a session file through its line-offset index.
+
+        Pages are taken in append order, which is chronological for messages
+        written by this service.
+        """
+        index = self._history_index(file_path)
+        index.refresh()
+        offset = max(0, offset)
+        if from_end:
+            records = index.read_tail(limit, skip=offset)
+        else:
+            records = index.read_range(offset, offset + limit)
+        messages = []
+        for data in records:
+            try:
+                messages.append(ChatMessage.from_dict(data))
+            except Exception as e:
+                logger.debug(f"Skipping unreadable chat message in {file_path.name}: {e}")
+        return messages
+    
     async def clear_message_history(self, session_id: str = None) -> bool:
         """Clear message history for a session or all sessions (JSONL)."""
         try:
@@ -2128,18 +2292,21 @@ class ChatService:
                 if new_p.exists():
                     new_p.unlink()
                     removed = True
+                self._drop_history_index(new_p)
                 for legacy in list(self.history_root.glob(f"*_{session_id}.jsonl")):
                     try:
                         legacy.unlink()
                         removed = True
                     except Exception:
                         pass
+                    self._drop_history_index(legacy)
             else:
                 for file in self._iter_all_session_files():
                     try:
                         file.unlink()
                     except Exception:
                         pass
+                    self._drop_history_index(file)
             logger.info(f"Cleared message history for session: {session_id or 'all'} (JSONL)")
             return True
         except Exception as e:
@@ -2222,37 +2389,25 @@ class ChatService:
 
     # Session CRUD operations
     async def get_sessions(self) -> List[Dict[str, Any]]:
-        """Get list of all chat sessions with metadata."""
+        """Get list of all chat sessions with metadata.
+
+        Counts and names come from the session catalog; a file is only
+        re-read when its mtime or size changed since it was catalogued.
+        """
         try:
+            if not self._catalog_loaded:
+                self._load_session_catalog()
             sessions_map: Dict[str, Dict[str, Any]] = {}
+            seen_files: Set[str] = set()
             for file in self._iter_all_session_files():
                 try:
                     session_id = self._derive_session_id_from_file(file)
                     stat = file.stat()
-                    # Count messages and last timestamp
-                    message_count = 0
-                    last_message_time = None
-                    with open(file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            line = line.strip()
-                            if line:
-                                message_count += 1
-                                try:
-                                    data = json.loads(line)
-                                    last_message_time = data.get('timestamp')
-                                except Exception:
-                                    pass
-
-                    # Read sidecar meta if present
-                    meta_name = None
-                    meta_path = self.history_root / f"{session_id}.meta.json"
-                    if meta_path.exists():
-                        try:
-                            with open(meta_path, 'r', encoding='utf-8') as mf:
-                                meta = json.load(mf)
-                                meta_name = meta.get('name') or None
-                        except Exception:
-                            meta_name = None
+                    seen_files.add(file.name)
+                    entry = self._catalog_file_entry(file, stat)
+                    message_count = entry['message_count']
+                    last_message_time = entry['last_message_time']
+                    meta_name = self._catalog_session_name(session_id)
 
                     # Merge if both legacy and new exist for same session
                     prev = sessions_map.get(session_id)
@@ -2277,6 +2432,12 @@ class ChatService:
                     logger.error(f"Error processing session file {file.name}: {e}")
                     continue
 
+            # Drop catalog entries for files removed behind our back
+            for name in [n for n in self._session_catalog if n not in seen_files]:
+                del self._session_catalog[name]
+                self._catalog_dirty = True
+            self._save_session_catalog()
+
             sessions = list(sessions_map.values())
             sessions.sort(key=lambda s: s['updated'], reverse=True)
             return sessions
@@ -2330,12 +2491,15 @@ class ChatService:
             if file_path.exists():
                 file_path.unlink()
                 removed = True
+            self._drop_history_index(file_path)
             for legacy in list(self.history_root.glob(f"*_{session_id}.jsonl")):
                 try:
                     legacy.unlink()
                     removed = True
                 except Exception:
                     pass
+                self._drop_history_index(legacy)
+            self._catalog_forget(session_id)
             if not removed:
                 return False
             # Remove sidecar metadata if present
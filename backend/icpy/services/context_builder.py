@@ -311,7 +311,7 @@ class ContextBuilder:
                     
                     # Cache it for next time
                     mime_type = image_ref.get('mime_type', 'image/png')
-                    self.image_cache.put(image_id, full_base64, mime_type)
+                    self.image_cache.put_bytes(image_id, image_bytes, mime_type)
                     
                     logger.debug(f"Loaded full image from disk: {resolved_path}")
                     metadata[location]['imageData'] = full_base64
@@ -0,0 +1,364 @@
+"""
+Context Snapshot Service
+Cached workspace and hop context used when assembling agent system prompts.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+from ..utils.env import env_float
+
+logger = logging.getLogger(__name__)
+
+PROJECT_MARKERS = ("package.json", "requirements.txt", "pyproject.toml", "README.md", "Dockerfile")
+_LOCAL_CONTEXT = {"contextId": "local", "status": "disconnected"}
+
+# Loop the icpy services run on; recorded by attach_context_snapshots()
+_main_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class ContextSnapshotService:
+    """
+    Keeps workspace size and project markers current for agent prompts.
+
+    One walk of the workspace runs in a background thread; after that the
+    per-file sizes are maintained from filesystem watcher events (fs.* on the
+    message broker), so reading a snapshot is O(1). Until the first walk
+    finishes the snapshot reports ready=False. Without a watcher attached the
+    walk is repeated in the background at most once per rescan_interval.
+    """
+
+    def __init__(self, workspace_root: str, rescan_interval: float = 600.0):
+        """
+        Initialize service.
+
+        Args:
+            workspace_root: Workspace directory to track
+            rescan_interval: Seconds between background rescans when no watcher is attached
+        """
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.rescan_interval = rescan_interval
+
+        self._sizes: Dict[str, int] = {}
+        self._dirs: Set[str] = set()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._ready = False
+        self._scanning = False
+        self._touched: Optional[Set[str]] = None  # paths changed while a scan runs
+        self._last_scan = 0.0
+        self._attached = False
+
+    # -------------------------
+    # Snapshot
+    # -------------------------
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Return the current workspace snapshot without touching the filesystem tree.
+
+        Returns:
+            Dict with size_bytes, file_count, ready and markers (file name -> present)
+        """
+        if not self._ready or (not self._attached and time.time() - self._last_scan >= self.rescan_interval):
+            self.start_scan()
+        with self._lock:
+            ready = self._ready
+            snapshot = {
+                "size_bytes": self._total,
+                "file_count": len(self._sizes),
+                "ready": ready,
+            }
+            if ready:
+                markers = {name: os.path.join(self.workspace_root, name) in self._sizes for name in PROJECT_MARKERS}
+        if not ready:
+            markers = {name: os.path.exists(os.path.join(self.workspace_root, name)) for name in PROJECT_MARKERS}
+        snapshot["markers"] = markers
+        return snapshot
+
+    # -------------------------
+    # Scanning
+    # -------------------------
+    def start_scan(self) -> None:
+        """Walk the workspace in a background thread unless a walk is already running."""
+        with self._lock:
+            if self._scanning:
+                return
+            self._scanning = True
+            self._touched = set()
+        threading.Thread(target=self.scan, name="context-snapshot-scan", daemon=True).start()
+
+    def scan(self) -> None:
+        """Walk the workspace and replace the tracked sizes."""
+        with self._lock:
+            self._scanning = True
+            if self._touched is None:
+                self._touched = set()
+        started = time.time()
+        sizes: Dict[str, int] = {}
+        dirs: Set[str] = set()
+        try:
+            self._walk(self.workspace_root, sizes, dirs)
+        except Exception as e:
+            logger.warning(f"Context snapshot scan of {self.workspace_root} failed: {e}")
+        with self._lock:
+            touched, self._touched = self._touched or set(), None
+            self._sizes, self._dirs = sizes, dirs
+            self._total = sum(sizes.values())
+            self._ready = True
+            self._scanning = False
+            self._last_scan = time.time()
+        # Re-apply changes reported while the walk was running
+        for path in touched:
+            self.refresh_path(path)
+        logger.debug(
+            f"Context snapshot scanned {len(sizes)} files in {self.workspace_root} "
+            f"({time.time() - started:.2f}s)"
+        )
+
+    @staticmethod
+    def _walk(root: str, sizes: Dict[str, int], dirs: Set[str]) -> None:
+        dirs.add(root)
+        for dirpath, dirnames, filenames in os.walk(root):
+            for dirname in dirnames:
+                dirs.add(os.path.join(dirpath, dirname))
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                try:
+                    sizes[file_path] = os.stat(file_path).st_size
+                except OSError:
+                    continue  # Skip files we can't access
+
+    # -------------------------
+    # Incremental updates
+    # -------------------------
+    def _in_workspace(self, path: str) -> bool:
+        return path == self.workspace_root or path.startswith(self.workspace_root + os.sep)
+
+    def refresh_path(self, path: str) -> None:
+        """Re-read one changed path: a file, a directory subtree, or something now missing."""
+        path = os.path.abspath(path)
+        if not self._in_workspace(path):
+            return
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(path)
+            if not self._ready:
+                return
+        if os.path.isdir(path):
+            sizes: Dict[str, int] = {}
+            dirs: Set[str] = set()
+            self._walk(path, sizes, dirs)
+            with self._lock:
+                self._drop_tree_locked(path)
+                for file_path, size in sizes.items():
+                    self._sizes[file_path] = size
+                    self._total += size
+                self._dirs.update(dirs)
+            return
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            with self._lock:
+                if path in self._dirs:
+                    self._drop_tree_locked(path)
+                else:
+                    self._total -= self._sizes.pop(path, 0)
+            return
+        with self._lock:
+            self._total += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+
+    def _drop_tree_locked(self, path: str) -> None:
+        prefix = path + os.sep
+        self._total -= self._sizes.pop(path, 0)
+        for file_path in [p for p in self._sizes if p.startswith(prefix)]:
+            self._total -= self._sizes.pop(file_path)
+        self._dirs.discard(path)
+        self._dirs.difference_update([d for d in self._dirs if d.startswith(prefix)])
+
+    # -------------------------
+    # Watcher integration
+    # -------------------------
+    async def attach(self, message_broker) -> None:
+        """Keep the snapshot current from FileSystemService watcher events."""
+        if self._attached:
+            return
+        self._attached = True
+        await message_broker.subscribe('fs.file_*', self._handle_fs_event)
+        await message_broker.subscribe('fs.directory_created', self._handle_fs_event)
+
+    async def _handle_fs_event(self, message) -> None:
+        topic = message.topic
+        payload = message.payload if isinstance(message.payload, dict) else {}
+        if topic.endswith('.batch'):
+            return
+        if topic in ('fs.file_created', 'fs.file_modified', 'fs.file_written', 'fs.file_deleted'):
+            paths = [payload.get('file_path')]
+        elif topic == 'fs.file_copied':
+            paths = [payload.get('dest_path')]
+        elif topic == 'fs.file_moved':
+            paths = [payload.get('src_path'), payload.get('dest_path')]
+        elif topic == 'fs.directory_created':
+            paths = [payload.get('dir_path')]
+        else:
+            return
+        loop = asyncio.get_running_loop()
+        for path in paths:
+            if not path:
+                continue
+            try:
+                if os.path.isdir(path):
+                    await loop.run_in_executor(None, self.refresh_path, path)
+                else:
+                    self.refresh_path(path)
+            except Exception as e:
+                logger.debug(f"Context snapshot failed to handle {topic} for {path}: {e}")
+
+
+class HopContextCache:
+    """
+    TTL cache of the active hop context (local vs remote) for prompt assembly.
+
+    Refreshed immediately on hop.status broker events; the TTL only bounds
+    staleness when no event arrives. Synchronous callers on worker threads
+    refresh on the services loop instead of creating a loop of their own.
+    """
+
+    def __init__(self, ttl_seconds: float = 10.0):
+        """
+        Initialize cache.
+
+        Args:
+            ttl_seconds: Maximum age of a cached context before it is refetched
+        """
+        self.ttl_seconds = ttl_seconds
+        self._context: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._attached = False
+
+    def get(self, timeout: float = 2.0) -> Dict[str, Any]:
+        """
+        Return the hop context, refetching it only when the cached copy is stale.
+
+        Args:
+            timeout: Seconds to wait for a refetch from a worker thread
+
+        Returns:
+            Context dict as returned by get_current_context()
+        """
+        if self._context is not None and time.time() - self._fetched_at < self.ttl_seconds:
+            return self._context
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            # Can't block the running loop; serve the last value and refresh behind it
+            if self._refreshing is None or self._refreshing.done():
+                self._refreshing = loop.create_task(self.refresh())
+            return self._context or dict(_LOCAL_CONTEXT)
+        if _main_loop is not None and _main_loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(self.refresh(), _main_loop)
+            try:
+                return future.result(timeout=timeout)
+            except Exception as e:
+                logger.debug(f"Hop context refresh did not complete: {e}")
+                return self._context or dict(_LOCAL_CONTEXT)
+        return asyncio.run(self.refresh())
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Fetch the current hop context and cache it."""
+        from ..agent.tools.context_helpers import get_current_context
+        context = await get_current_context()
+        self._context = context
+        self._fetched_at = time.time()
+        return context
+
+    def invalidate(self) -> None:
+        """Drop the cached context."""
+        self._context = None
+
+    async def attach(self, message_broker) -> None:
+        """Refresh the cache whenever the hop status changes."""
+        if self._attached:
+            return
+        self._attached = True
+        await message_broker.subscribe('hop.status', self._handle_hop_event)
+
+    async def _handle_hop_event(self, message) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            self.invalidate()
+            logger.debug(f"Hop context refresh after {message.topic} failed: {e}")
+
+
+# Shared instances
+_snapshots: Dict[str, ContextSnapshotService] = {}
+_hop_cache: Optional[HopContextCache] = None
+
+
+def get_context_snapshot_service(workspace_root: str) -> ContextSnapshotService:
+    """Get the shared snapshot service for a workspace, attaching it to FS events when possible."""
+    key = os.path.abspath(workspace_root)
+    service = _snapshots.get(key)
+    if service is None:
+        service = _snapshots[key] = ContextSnapshotService(
+            key, rescan_interval=env_float('AGENT_CONTEXT_RESCAN_SECONDS', 600.0)
+        )
+        _schedule_attach(service)
+    return service
+
+
+def get_hop_context_cache() -> HopContextCache:
+    """Get the shared hop context cache."""
+    global _hop_cache
+    if _hop_cache is None:
+        _hop_cache = HopContextCache(ttl_seconds=env_float('AGENT_HOP_CONTEXT_TTL_SECONDS', 10.0))
+        _schedule_attach(_hop_cache)
+    return _hop_cache
+
+
+async def attach_context_snapshots() -> None:
+    """
+    Record the services loop and attach existing snapshots to broker events.
+
+    Called from the services loop (e.g. before running an agent) so that
+    snapshots first requested from worker threads can attach later.
+    """
+    global _main_loop
+    if _main_loop is asyncio.get_running_loop():
+        return
+    _main_loop = asyncio.get_running_loop()
+    hop_cache = get_hop_context_cache()
+    for target in [*_snapshots.values(), hop_cache]:
+        await _attach_to_broker(target)
+    try:
+        await hop_cache.refresh()
+    except Exception as e:
+        logger.debug(f"Initial hop context fetch failed: {e}")
+
+
+def _schedule_attach(target) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        loop.create_task(_attach_to_broker(target))
+    elif _main_loop is not None and _main_loop.is_running():
+        asyncio.run_coroutine_threadsafe(_attach_to_broker(target), _main_loop)
+
+
+async def _attach_to_broker(target) -> None:
+    try:
+        from ..core.message_broker import get_message_broker
+        broker = await get_message_broker()
+        if broker.running:
+            await target.attach(broker)
+    except Exception as e:
+        logger.debug(f"Context snapshot not attached to broker events: {e}")
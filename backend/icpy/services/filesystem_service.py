@@ -25,14 +25,16 @@ import stat
 import time
 import uuid
 from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List, Optional, Set, Tuple, Union, Callable
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union, Callable
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 from ..core.message_broker import get_message_broker
 from ..core.connection_manager import get_connection_manager
+from .search_index import PersistentSearchIndex
 
 logger = logging.getLogger(__name__)
 
@@ -227,6 +229,8 @@ class FileSystemEventHandler(FileSystemEventHandler):
             self.logger.debug(f"[FS] on_created path={event.src_path} is_dir={event.is_directory}")
         except Exception:
             pass
+        if self.filesystem_service._is_search_index_path(event.src_path):
+            return
         if event.is_directory:
             # Suppress duplicate event if we just published from create_directory
             try:
@@ -259,6 +263,8 @@ class FileSystemEventHandler(FileSystemEventHandler):
             self.logger.debug(f"[FS] on_modified path={event.src_path} is_dir={event.is_directory}")
         except Exception:
             pass
+        if self.filesystem_service._is_search_index_path(event.src_path):
+            return
         if not event.is_directory:
             self._schedule_async_task(self._handle_file_modified(event.src_path))
 
@@ -273,6 +279,8 @@ class FileSystemEventHandler(FileSystemEventHandler):
             self.logger.debug(f"[FS] on_deleted path={event.src_path} is_dir={event.is_directory}")
         except Exception:
             pass
+        if self.filesystem_service._is_search_index_path(event.src_path):
+            return
         self._schedule_async_task(self._handle_file_deleted(event.src_path, event.is_directory))
 
     def on_moved(self, event):
@@ -286,6 +294,8 @@ class FileSystemEventHandler(FileSystemEventHandler):
             self.logger.debug(f"[FS] on_moved src={event.src_path} dest={event.dest_path} is_dir={event.is_directory}")
         except Exception:
             pass
+        if self.filesystem_service._is_search_index_path(event.src_path):
+            return
         self._schedule_async_task(self._handle_file_moved(event.src_path, event.dest_path, event.is_directory))
 
     def _schedule_async_task(self, coro):
@@ -298,6 +308,12 @@ class FileSystemEventHandler(FileSystemEventHandler):
             loop = asyncio.get_running_loop()
             loop.create_task(coro)
         except RuntimeError:
+            # Watchdog calls us from its observer thread; hand the work to the
+            # service loop so index updates never race with the event loop
+            service_loop = self.filesystem_service._loop
+            if service_loop is not None and service_loop.is_running() and not service_loop.is_closed():
+                asyncio.run_coroutine_threadsafe(coro, service_loop)
+                return
             # No running event loop, try to create one
             try:
                 asyncio.run(coro)
@@ -312,6 +328,7 @@ class FileSystemEventHandler(FileSystemEventHandler):
         """
         try:
             file_info = await self.filesystem_service.get_file_info(file_path)
+            await self.filesystem_service._reindex_path(file_path, file_info)
             if file_info:
                 # Publish created event (buffered)
                 await self.filesystem_service._publish_or_buffer('fs.file_created', {
@@ -343,6 +360,7 @@ class FileSystemEventHandler(FileSystemEventHandler):
         """
         try:
             file_info = await self.filesystem_service.get_file_info(file_path)
+            await self.filesystem_service._reindex_path(file_path, file_info)
             if file_info:
                 await self.filesystem_service._publish_or_buffer('fs.file_modified', {
                     'file_path': file_path,
@@ -361,6 +379,7 @@ class FileSystemEventHandler(FileSystemEventHandler):
             is_directory: Whether the deleted item was a directory
         """
         try:
+            self.filesystem_service._unindex_path(file_path, is_directory)
             await self.filesystem_service._publish_or_buffer('fs.file_deleted', {
                 'file_path': file_path,
                 'is_directory': is_directory,
@@ -379,7 +398,11 @@ class FileSystemEventHandler(FileSystemEventHandler):
             is_directory: Whether the moved item is a directory
         """
         try:
+            self.filesystem_service._move_indexed_path(src_path, dest_path, is_directory)
             file_info = await self.filesystem_service.get_file_info(dest_path)
+            if not is_directory:
+                # Covers files moved in from outside the indexed tree (e.g. editor temp files)
+                await self.filesystem_service._reindex_path(dest_path, file_info)
             await self.filesystem_service._publish_or_buffer('fs.file_moved', {
                 'src_path': src_path,
                 'dest_path': dest_path,
@@ -416,6 +439,7 @@ class FileSystemService:
         self.max_file_size = max_file_size
         self.message_broker = None
         self.connection_manager = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         # File watching
         self.observer = Observer()
@@ -424,7 +448,45 @@ class FileSystemService:
         
         # File indexing
         self.file_index: Dict[str, FileInfo] = {}
-        self.search_index: Dict[str, Set[str]] = defaultdict(set)  # word -> file_paths
+        # word -> file_paths, persisted under .icotes/search_index unless disabled
+        # Configurable via env: FS_PERSIST_SEARCH_INDEX, FS_SEARCH_INDEX_DIR, FS_SEARCH_INDEX_COMPACT_OPS
+        persist_index = os.getenv('FS_PERSIST_SEARCH_INDEX', '1') in ('1', 'true', 'True')
+        self.search_index_dir: Optional[str] = None
+        if persist_index:
+            self.search_index_dir = os.path.abspath(
+                os.getenv('FS_SEARCH_INDEX_DIR') or os.path.join(self.root_path, '.icotes', 'search_index')
+            )
+        try:
+            compact_after = int(os.getenv('FS_SEARCH_INDEX_COMPACT_OPS', '2000'))
+        except (ValueError, TypeError):
+            compact_after = 2000
+        self.search_index = PersistentSearchIndex(self.root_path, self.search_index_dir, compact_after=compact_after)
+        self._index_compaction_task: Optional[asyncio.Task] = None
+        try:
+            self._search_batch_size = max(1, int(os.getenv('FS_SEARCH_READ_BATCH', '16')))
+        except (ValueError, TypeError):
+            self._search_batch_size = 16
+
+        # Initial scan runs in a worker pool in the background; requests are served
+        # from the partial index meanwhile. Configurable via env: FS_INDEX_WORKERS,
+        # FS_BACKGROUND_INDEXING
+        try:
+            self._index_workers = max(1, int(os.getenv('FS_INDEX_WORKERS', str(min(8, (os.cpu_count() or 1) + 4)))))
+        except (ValueError, TypeError):
+            self._index_workers = 4
+        self._background_indexing = os.getenv('FS_BACKGROUND_INDEXING', '1') in ('1', 'true', 'True')
+        self._index_executor: Optional[ThreadPoolExecutor] = None
+        self._index_task: Optional[asyncio.Task] = None
+        self._index_ready = asyncio.Event()
+        self._index_progress: Dict[str, Any] = {
+            'state': 'idle',
+            'directories': 0,
+            'files': 0,
+            'reindexed': 0,
+            'pruned': 0,
+            'started_at': None,
+            'finished_at': None,
+        }
         
         # Statistics
         self.stats = {
@@ -435,6 +497,7 @@ class FileSystemService:
             'files_moved': 0,
             'files_copied': 0,
             'searches_performed': 0,
+            'search_full_scans': 0,
             'total_bytes_read': 0,
             'total_bytes_written': 0
         }
@@ -506,12 +569,17 @@ class FileSystemService:
         """
         self.message_broker = await get_message_broker()
         self.connection_manager = await get_connection_manager()
+        self._loop = asyncio.get_running_loop()
         
         # Start file watching
         await self._start_file_watching()
         
-        # Build initial file index
-        await self._build_file_index()
+        # Load persisted search index, then bring it up to date with the tree
+        if self._background_indexing:
+            self._start_index_build()
+        else:
+            await self._load_search_index()
+            await self._build_file_index()
         
         # Start batching loop if enabled
         if self._event_batching_enabled and self._event_flush_task is None:
@@ -530,10 +598,22 @@ class FileSystemService:
         """
         # Stop file watching
         await self._stop_file_watching()
+
+        # Stop an in-flight initial scan
+        await self._cancel_index_build()
+        if self._index_executor:
+            self._index_executor.shutdown(wait=False, cancel_futures=True)
+            self._index_executor = None
         
-        # Clear indices
+        # Persist and release the search index; drop the in-memory file index
+        if self._index_compaction_task:
+            try:
+                await self._index_compaction_task
+            except Exception:
+                pass
+            self._index_compaction_task = None
+        self.search_index.close()
         self.file_index.clear()
-        self.search_index.clear()
 
         # Stop batching task
         try:
@@ -579,7 +659,8 @@ class FileSystemService:
         """
         logger.info("[FS] Rebuilding file index...")
         
-        # Clear existing indices
+        # Stop any scan still running from startup, then clear existing indices
+        await self._cancel_index_build()
         self.file_index.clear()
         self.search_index.clear()
         
@@ -588,48 +669,302 @@ class FileSystemService:
         
         logger.info(f"[FS] File index rebuilt with {len(self.file_index)} files")
 
-    async def _build_file_index(self):
-        """Build initial file index by scanning the root directory."""
+    def _start_index_build(self):
+        """Load the persisted search index and run the initial scan as a background task."""
+        self._index_ready.clear()
+
+        async def _load_and_build():
+            await self._load_search_index()
+            await self._build_file_index()
+
+        self._index_task = asyncio.create_task(_load_and_build())
+
+    async def _load_search_index(self):
+        """Load the persisted search index in a thread.
+
+        The manifest holds an entry per indexed file and every journal is
+        replayed, which is too slow for the event loop on large workspaces.
+        """
         try:
-            for root, dirs, files in os.walk(self.root_path):
-                # Skip hidden directories
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
-                
-                for file_name in files:
-                    if file_name.startswith('.'):
-                        continue  # Skip hidden files
-                    
-                    file_path = os.path.join(root, file_name)
-                    file_info = await self.get_file_info(file_path)
-                    if file_info:
-                        self.file_index[file_path] = file_info
-                        
-                        # Add to search index if it's a text file
-                        if file_info.type in [FileType.TEXT, FileType.CODE]:
-                            await self._index_file_content(file_path)
-            
+            if await asyncio.to_thread(self.search_index.load):
+                logger.info(f"[FS] Loaded persisted search index ({self.search_index.document_count} files)")
+        except Exception as e:
+            logger.warning(f"[FS] Failed to load persisted search index: {e}")
+
+    async def _cancel_index_build(self):
+        """Cancel a background scan, if one is running."""
+        task, self._index_task = self._index_task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def wait_until_indexed(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the background scan to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
             
-            logger.info(f"[FS] Built file index with {len(self.file_index)} files")
+        Returns:
+            True if the index is complete, False on timeout
+        """
+        if self._index_task is None and self._index_progress['state'] != 'scanning':
+            return True
+        try:
+            await asyncio.wait_for(self._index_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return not self.is_indexing
+
+    @property
+    def is_indexing(self) -> bool:
+        """Whether the initial scan is still running (index may be partial)."""
+        return self._index_progress['state'] == 'scanning'
+
+    def _get_index_executor(self) -> ThreadPoolExecutor:
+        if self._index_executor is None:
+            self._index_executor = ThreadPoolExecutor(
+                max_workers=self._index_workers, thread_name_prefix='fs-index'
+            )
+        return self._index_executor
+
+    def _scan_directory_sync(self, dir_path: str) -> Tuple[List[FileInfo], List[str]]:
+        """List one directory with scandir (worker thread).
+        
+        Mirrors the former os.walk scan: hidden entries are skipped and
+        symlinked directories are not descended into.
+        
+        Returns:
+            Tuple of (file infos for regular entries, subdirectories to scan)
+        """
+        infos: List[FileInfo] = []
+        subdirs: List[str] = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                            continue
+                        is_symlink = entry.is_symlink()
+                        stat_info = entry.stat()
+                    except OSError:
+                        continue  # Broken symlink or vanished entry
+                    file_type = FileType.SYMLINK if is_symlink else self._classify_extension(entry.name)
+                    infos.append(self._make_file_info(entry.path, stat_info, file_type, False, is_symlink))
+        except OSError as e:
+            logger.debug(f"[FS] Cannot scan {dir_path}: {e}")
+        return infos, subdirs
+
+    def _read_terms_sync(self, file_path: str) -> Optional[Set[str]]:
+        """Read a text file and extract its search terms (worker thread)."""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            logger.debug(f"[FS] Skipping search indexing for {file_path}: {e}")
+            return None
+        return {word.lower() for word in self._extract_words(content)}
+
+    async def _publish_index_progress(self):
+        if not self.message_broker:
+            return
+        try:
+            await self.message_broker.publish('fs.index_progress', {
+                **self._index_progress,
+                'indexed_files': len(self.file_index),
+                'timestamp': time.time()
+            })
         except Exception as e:
+            logger.debug(f"[FS] Failed to publish index progress: {e}")
+
+    async def _build_file_index(self):
+        """Build initial file index by scanning the root directory.
+
+        Directories are listed with os.scandir in a thread pool and merged
+        into the index one directory at a time, so the event loop keeps
+        serving requests (with partial results) while the scan runs.
+        Files whose mtime/size match the persisted search index are not
+        re-read; the rest are read and tokenized in the pool as well.
+        Entries for files that disappeared while the service was down are
+        pruned once the scan completes. Progress is published on
+        ``fs.index_progress``.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_index_executor()
+        self._index_ready.clear()
+        progress = self._index_progress
+        progress.update({
+            'state': 'scanning', 'directories': 0, 'files': 0, 'reindexed': 0, 'pruned': 0,
+            'started_at': time.time(), 'finished_at': None,
+        })
+        await self._publish_index_progress()
+        last_report = time.time()
+        max_inflight = self._index_workers * 2
+        pending_dirs = [self.root_path]
+        scans: Dict[asyncio.Future, str] = {}
+        reads: Dict[asyncio.Future, FileInfo] = {}
+        try:
+            while pending_dirs or scans or reads:
+                while pending_dirs and len(scans) + len(reads) < max_inflight:
+                    dir_path = pending_dirs.pop()
+                    scans[loop.run_in_executor(executor, self._scan_directory_sync, dir_path)] = dir_path
+                done, _ = await asyncio.wait(set(scans) | set(reads), return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    if fut in scans:
+                        del scans[fut]
+                        infos, subdirs = fut.result()
+                        pending_dirs.extend(subdirs)
+                        progress['directories'] += 1
+                        progress['files'] += len(infos)
+                        for info in infos:
+                            self.file_index[info.path] = info
+                            if (
+                                info.type in (FileType.TEXT, FileType.CODE)
+                                and info.size <= self.max_file_size
+                                and self.search_index.needs_update(info.path, info.modified_at, info.size)
+                            ):
+                                reads[loop.run_in_executor(executor, self._read_terms_sync, info.path)] = info
+                    else:
+                        info = reads.pop(fut)
+                        terms = fut.result()
+                        if terms is not None:
+                            self.search_index.update_file(info.path, info.modified_at, info.size, terms)
+                            progress['reindexed'] += 1
+                if time.time() - last_report >= 0.5:
+                    last_report = time.time()
+                    self.search_index.flush()
+                    await self._publish_index_progress()
+
+            progress['pruned'] = self.search_index.prune(
+                p for p, info in self.file_index.items() if info.type in (FileType.TEXT, FileType.CODE)
+            )
+            self.search_index.flush()
+            self._schedule_index_compaction()
+            progress['state'] = 'complete'
+            progress['finished_at'] = time.time()
+
+            logger.info(
+                f"[FS] Built file index with {len(self.file_index)} files in "
+                f"{progress['finished_at'] - progress['started_at']:.2f}s "
+                f"({progress['reindexed']} re-indexed, {progress['pruned']} pruned from search index)"
+            )
+        except asyncio.CancelledError:
+            for fut in (*scans, *reads):
+                fut.cancel()
+            progress['state'] = 'cancelled'
+            self.search_index.flush()
+            raise
+        except Exception as e:
+            progress['state'] = 'failed'
             logger.error(f"[FS] Error building file index: {e}")
+        finally:
+            self._index_ready.set()
+            if progress['state'] != 'cancelled':
+                await self._publish_index_progress()
 
-    async def _index_file_content(self, file_path: str):
+    async def _index_file_content(self, file_path: str, file_info: Optional[FileInfo] = None, force: bool = False) -> bool:
         """Index file content for search functionality.
         
         Args:
             file_path: Path to the file to index
+            file_info: Known file info (avoids a second stat)
+            force: Re-index even if mtime/size match the persisted entry
+            
+        Returns:
+            True if the file was (re)indexed, False if it was up to date or skipped
         """
         try:
-            if os.path.getsize(file_path) > self.max_file_size:
-                return  # Skip large files
+            if file_info is not None:
+                mtime, size = file_info.modified_at, file_info.size
+            else:
+                stat_info = os.stat(file_path)
+                mtime, size = stat_info.st_mtime, stat_info.st_size
+            if size > self.max_file_size:
+                return False  # Skip large files
+            if not force and not self.search_index.needs_update(file_path, mtime, size):
+                return False
             
             content = await self.read_file(file_path)
-            if content:
-                words = self._extract_words(content)
-                for word in words:
-                    self.search_index[word.lower()].add(file_path)
+            if content is None:
+                return False
+            words = {word.lower() for word in self._extract_words(content)}
+            self.search_index.update_file(file_path, mtime, size, words)
+            return True
         except Exception as e:
             logger.error(f"Error indexing file content {file_path}: {e}")
+            return False
+
+    def _is_search_index_path(self, path: str) -> bool:
+        """Whether a path belongs to the persisted search index itself."""
+        if not self.search_index_dir:
+            return False
+        full_path = os.path.abspath(path)
+        return full_path == self.search_index_dir or full_path.startswith(self.search_index_dir + os.sep)
+
+    def _is_indexable_path(self, path: str) -> bool:
+        """Whether a path is covered by the file/search index (inside root, not hidden)."""
+        full_path = os.path.abspath(path)
+        if not full_path.startswith(self.root_path + os.sep):
+            return False
+        rel_path = os.path.relpath(full_path, self.root_path)
+        return not any(part.startswith('.') for part in rel_path.split(os.sep))
+
+    async def _reindex_path(self, file_path: str, file_info: Optional[FileInfo]):
+        """Bring file/search indices up to date for an externally changed file."""
+        if not file_info or file_info.is_directory or not self._is_indexable_path(file_path):
+            return
+        self.file_index[file_path] = file_info
+        if file_info.type in (FileType.TEXT, FileType.CODE):
+            if await self._index_file_content(file_path, file_info):
+                self.search_index.flush()
+                self._schedule_index_compaction()
+
+    def _unindex_path(self, file_path: str, is_directory: bool):
+        """Drop a deleted file or directory tree from file/search indices."""
+        self.file_index.pop(file_path, None)
+        if is_directory:
+            prefix = file_path.rstrip(os.sep) + os.sep
+            for path in [p for p in self.file_index if p.startswith(prefix)]:
+                del self.file_index[path]
+        self.search_index.remove_file(file_path, recursive=is_directory)
+        self.search_index.flush()
+
+    def _move_indexed_path(self, src_path: str, dest_path: str, is_directory: bool):
+        """Re-key file/search index entries after a move or rename."""
+        moves = [(src_path, dest_path)] if src_path in self.file_index else []
+        if is_directory:
+            prefix = src_path.rstrip(os.sep) + os.sep
+            moves.extend((p, dest_path + p[len(src_path):]) for p in self.file_index if p.startswith(prefix))
+        for old_path, new_path in moves:
+            file_info = self.file_index.pop(old_path)
+            file_info.path = new_path
+            file_info.name = os.path.basename(new_path)
+            if self._is_indexable_path(new_path):
+                self.file_index[new_path] = file_info
+        if self._is_indexable_path(dest_path):
+            self.search_index.move_file(src_path, dest_path, recursive=is_directory)
+        else:
+            self.search_index.remove_file(src_path, recursive=is_directory)
+        self.search_index.flush()
+        self._schedule_index_compaction()
+
+    def _schedule_index_compaction(self):
+        """Fold the search index journal into a new segment in a worker thread when due."""
+        if not self.search_index.needs_compaction():
+            return
+        if self._index_compaction_task and not self._index_compaction_task.done():
+            return
+        try:
+            self._index_compaction_task = asyncio.create_task(asyncio.to_thread(self.search_index.compact))
+        except RuntimeError:
+            # No running loop (e.g. during shutdown); compact inline
+            self.search_index.compact()
 
     def _extract_words(self, content: str) -> List[str]:
         """Extract words from content for search indexing.
@@ -659,6 +994,17 @@ class FileSystemService:
         if os.path.islink(file_path):
             return FileType.SYMLINK
         
+        return self._classify_extension(file_path)
+
+    def _classify_extension(self, file_path: str) -> FileType:
+        """Classify a regular file by its extension alone (no filesystem access).
+        
+        Args:
+            file_path: Path or name of the file to classify
+            
+        Returns:
+            FileType enum value
+        """
         _, ext = os.path.splitext(file_path)
         ext = ext.lower()
         
@@ -679,6 +1025,56 @@ class FileSystemService:
         else:
             return FileType.BINARY
 
+    def _make_file_info(self, file_path: str, stat_info: os.stat_result, file_type: FileType,
+                        is_directory: bool, is_symlink: bool, content_hash: str = "") -> FileInfo:
+        """Build a FileInfo from an already obtained stat result.
+        
+        Args:
+            file_path: Path to the file
+            stat_info: Result of os.stat / DirEntry.stat
+            file_type: Classified file type
+            is_directory: Whether the path is a directory
+            is_symlink: Whether the path is a symbolic link
+            content_hash: Content hash, if computed
+            
+        Returns:
+            FileInfo object
+        """
+        file_name = os.path.basename(file_path)
+        
+        # Get MIME type
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if not mime_type:
+            mime_type = "application/octet-stream"
+        
+        # Get file permissions
+        permissions = []
+        if stat_info.st_mode & stat.S_IRUSR:
+            permissions.append(FilePermission.READ)
+        if stat_info.st_mode & stat.S_IWUSR:
+            permissions.append(FilePermission.WRITE)
+        if stat_info.st_mode & stat.S_IXUSR:
+            permissions.append(FilePermission.EXECUTE)
+        
+        return FileInfo(
+            path=file_path,
+            name=file_name,
+            size=stat_info.st_size,
+            type=file_type,
+            mime_type=mime_type,
+            created_at=stat_info.st_ctime,
+            modified_at=stat_info.st_mtime,
+            accessed_at=stat_info.st_atime,
+            permissions=permissions,
+            owner=str(stat_info.st_uid),
+            group=str(stat_info.st_gid),
+            is_directory=is_directory,
+            is_symlink=is_symlink,
+            is_hidden=file_name.startswith('.'),
+            extension=os.path.splitext(file_name)[1].lower(),
+            content_hash=content_hash
+        )
+
     async def get_file_info(self, file_path: str) -> Optional[FileInfo]:
         """Get comprehensive information about a file.
         
@@ -693,23 +1089,8 @@ class FileSystemService:
                 return None
             
             stat_info = os.stat(file_path)
-            file_name = os.path.basename(file_path)
             file_type = self._classify_file_type(file_path)
             
-            # Get MIME type
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if not mime_type:
-                mime_type = "application/octet-stream"
-            
-            # Get file permissions
-            permissions = []
-            if stat_info.st_mode & stat.S_IRUSR:
-                permissions.append(FilePermission.READ)
-            if stat_info.st_mode & stat.S_IWUSR:
-                permissions.append(FilePermission.WRITE)
-            if stat_info.st_mode & stat.S_IXUSR:
-                permissions.append(FilePermission.EXECUTE)
-            
             # LRU cache check (by mtime + size signature)
             sig = (stat_info.st_mtime, stat_info.st_size)
             cached = self._info_cache.get(file_path)
@@ -728,22 +1109,10 @@ class FileSystemService:
                 except Exception as e:
                     logger.debug(f"Failed to compute content hash for {file_path}: {e}")
 
-            info = FileInfo(
-                path=file_path,
-                name=file_name,
-                size=stat_info.st_size,
-                type=file_type,
-                mime_type=mime_type,
-                created_at=stat_info.st_ctime,
-                modified_at=stat_info.st_mtime,
-                accessed_at=stat_info.st_atime,
-                permissions=permissions,
-                owner=str(stat_info.st_uid),
-                group=str(stat_info.st_gid),
+            info = self._make_file_info(
+                file_path, stat_info, file_type,
                 is_directory=os.path.isdir(file_path),
                 is_symlink=os.path.islink(file_path),
-                is_hidden=file_name.startswith('.'),
-                extension=os.path.splitext(file_name)[1].lower(),
                 content_hash=content_hash
             )
             # Update cache
@@ -881,7 +1250,9 @@ class FileSystemService:
                 
                 # Update search index
                 if file_info.type in [FileType.TEXT, FileType.CODE]:
-                    await self._index_file_content(file_path)
+                    await self._index_file_content(file_path, file_info, force=True)
+                    self.search_index.flush()
+                    self._schedule_index_compaction()
             
             # Update statistics
             if file_exists:
@@ -977,13 +1348,8 @@ class FileSystemService:
             else:
                 os.remove(file_path)
             
-            # Update file index
-            if file_path in self.file_index:
-                del self.file_index[file_path]
-            
-            # Remove from search index
-            for word_set in self.search_index.values():
-                word_set.discard(file_path)
+            # Update file and search indices
+            self._unindex_path(file_path, is_directory)
 
             # Invalidate caches
             self._info_cache.pop(file_path, None)
@@ -1038,28 +1404,21 @@ class FileSystemService:
                 if not overwrite:
                     return False
                 # If overwrite is permitted, remove the existing destination first
-                if os.path.isdir(dest_path):
+                dest_is_dir = os.path.isdir(dest_path)
+                if dest_is_dir:
                     shutil.rmtree(dest_path)
                 else:
                     os.remove(dest_path)
+                self._unindex_path(dest_path, dest_is_dir)
             
             # Create destination directory if needed
             os.makedirs(os.path.dirname(dest_path), exist_ok=True)
             
+            is_directory = os.path.isdir(src_path)
             shutil.move(src_path, dest_path)
             
-            # Update indices
-            if src_path in self.file_index:
-                file_info = self.file_index.pop(src_path)
-                file_info.path = dest_path
-                file_info.name = os.path.basename(dest_path)
-                self.file_index[dest_path] = file_info
-            
-            # Update search index
-            for word_set in self.search_index.values():
-                if src_path in word_set:
-                    word_set.remove(src_path)
-                    word_set.add(dest_path)
+            # Update file and search indices
+            self._move_indexed_path(src_path, dest_path, is_directory)
             
             self.stats['files_moved'] += 1
             
@@ -1112,7 +1471,9 @@ class FileSystemService:
                 
                 # Update search index
                 if file_info.type in [FileType.TEXT, FileType.CODE]:
-                    await self._index_file_content(dest_path)
+                    await self._index_file_content(dest_path, file_info, force=True)
+                    self.search_index.flush()
+                    self._schedule_index_compaction()
             
             self.stats['files_copied'] += 1
             
@@ -1134,13 +1495,16 @@ class FileSystemService:
             logger.error(f"Error copying file {src_path} -> {dest_path}: {e}")
             return False
 
-    async def list_directory(self, dir_path: str, include_hidden: bool = False, recursive: bool = False) -> List[FileInfo]:
+    async def list_directory(self, dir_path: str, include_hidden: bool = False, recursive: bool = False,
+                             refresh: bool = False) -> List[FileInfo]:
         """List contents of a directory.
         
         Args:
             dir_path: Directory path to list
             include_hidden: Whether to include hidden files
             recursive: Whether to list recursively
+            refresh: Bypass cached listings; local listings always read the disk,
+                the flag exists for parity with RemoteFileSystemAdapter
             
         Returns:
             List of FileInfo objects
@@ -1200,35 +1564,7 @@ class FileSystemService:
             List of SearchResult objects
         """
         try:
-            results = []
-            query_lower = query.lower()
-            
-            # Search by filename
-            for file_path, file_info in self.file_index.items():
-                if file_types and file_info.type not in file_types:
-                    continue
-                
-                score = 0.0
-                matches = []
-                
-                # Check filename match
-                if query_lower in file_info.name.lower():
-                    score += 1.0
-                    matches.append(f"Filename: {file_info.name}")
-                
-                # Check content match if requested
-                if search_content and file_info.type in [FileType.TEXT, FileType.CODE]:
-                    content_matches = await self._search_file_content(file_path, query)
-                    if content_matches:
-                        score += 0.5 * len(content_matches)
-                        matches.extend(content_matches)
-                
-                if score > 0:
-                    results.append(SearchResult(
-                        file_info=file_info,
-                        matches=matches,
-                        score=score
-                    ))
+            results = [result async for result in self.iter_search_files(query, search_content, file_types)]
             
             # Sort by score (descending)
             results.sort(key=lambda x: x.score, reverse=True)
@@ -1244,6 +1580,7 @@ class FileSystemService:
                 'search_content': search_content,
                 'file_types': [ft.value for ft in file_types] if file_types else None,
                 'result_count': len(results),
+                'partial': self.is_indexing,
                 'timestamp': time.time()
             })
             
@@ -1253,6 +1590,73 @@ class FileSystemService:
             logger.error(f"Error searching files: {e}")
             return []
 
+    async def iter_search_files(self, query: str, search_content: bool = True,
+                                file_types: Optional[List[FileType]] = None) -> AsyncIterator[SearchResult]:
+        """Yield search results as they are found (unranked).
+        
+        Filename matches are yielded first. Content matches come from the
+        files the search index reports as candidates, read a batch at a time,
+        so the cost scales with the number of hits rather than the workspace.
+        Queries the index cannot narrow (e.g. punctuation only) fall back to
+        scanning every indexed text file.
+        
+        Args:
+            query: Search query (case-insensitive substring)
+            search_content: Whether to search file content
+            file_types: List of file types to search (None for all)
+            
+        Yields:
+            SearchResult objects
+        """
+        query_lower = query.lower()
+        content_types = (FileType.TEXT, FileType.CODE)
+
+        def wanted(info: FileInfo) -> bool:
+            return not file_types or info.type in file_types
+
+        name_hits: Dict[str, FileInfo] = {
+            path: info for path, info in list(self.file_index.items())
+            if wanted(info) and query_lower in info.name.lower()
+        }
+
+        content_paths: List[str] = []
+        if search_content and query_lower:
+            candidates = self.search_index.query_candidates(query)
+            if candidates is None:
+                self.stats['search_full_scans'] += 1
+                content_paths = [p for p, info in list(self.file_index.items()) if info.type in content_types]
+            else:
+                content_paths = sorted(candidates)
+            content_paths = [
+                p for p in content_paths
+                if p in self.file_index and self.file_index[p].type in content_types and wanted(self.file_index[p])
+            ]
+
+        # Filename-only hits can be reported immediately
+        content_set = set(content_paths)
+        for path, info in name_hits.items():
+            if path not in content_set:
+                yield SearchResult(file_info=info, matches=[f"Filename: {info.name}"], score=1.0)
+
+        batch_size = self._search_batch_size
+        for i in range(0, len(content_paths), batch_size):
+            batch = content_paths[i:i + batch_size]
+            batch_matches = await asyncio.gather(*(self._search_file_content(p, query) for p in batch))
+            for path, content_matches in zip(batch, batch_matches):
+                info = self.file_index.get(path)
+                if info is None:
+                    continue
+                score = 0.0
+                matches: List[str] = []
+                if path in name_hits:
+                    score += 1.0
+                    matches.append(f"Filename: {info.name}")
+                if content_matches:
+                    score += 0.5 * len(content_matches)
+                    matches.extend(content_matches)
+                if score > 0:
+                    yield SearchResult(file_info=info, matches=matches, score=score)
+
     async def _search_file_content(self, file_path: str, query: str) -> List[str]:
         """Search for query in file content.
         
@@ -1350,6 +1754,8 @@ class FileSystemService:
             'indexed_files': len(self.file_index),
             'watched_paths': len(self.watched_paths),
             'search_index_size': len(self.search_index),
+            'search_index': self.search_index.get_stats(),
+            'indexing': dict(self._index_progress),
             'root_path': self.root_path,
             'max_file_size': self.max_file_size,
             'timestamp': time.time()
@@ -0,0 +1,268 @@
+"""
+Hop Connection Pool
+
+Warm SSH connections (and their SFTP clients) for hop contexts, one per
+(context, event loop). AsyncSSH objects are bound to the loop that created
+them, so callers running on another loop than the hop's own connection
+(agent tool threads, worker loops) lease a connection created on their
+loop instead of paying a full SSH handshake and SFTP startup per operation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+try:
+    import asyncssh
+except Exception:  # pragma: no cover - optional dependency
+    asyncssh = None
+
+logger = logging.getLogger(__name__)
+
+# Pooled connections unused for this long are closed
+POOL_IDLE_TIMEOUT = float(os.environ.get('HOP_POOL_IDLE_TIMEOUT', '300'))
+# Connections idle for longer than this are probed before reuse
+POOL_HEALTH_CHECK_AFTER = float(os.environ.get('HOP_POOL_HEALTH_CHECK_AFTER', '30'))
+POOL_HEALTH_CHECK_TIMEOUT = 5.0
+# SSH keepalive for pooled connections (seconds between probes, 0 disables)
+POOL_KEEPALIVE_INTERVAL = float(os.environ.get('HOP_POOL_KEEPALIVE_INTERVAL', '15'))
+POOL_KEEPALIVE_COUNT_MAX = 3
+
+if asyncssh is not None:
+    CONNECTION_ERRORS: Tuple[type, ...] = (
+        asyncssh.ConnectionLost, asyncssh.DisconnectError, asyncssh.ChannelOpenError,
+        asyncssh.sftp.SFTPConnectionLost, ConnectionError, BrokenPipeError,
+    )
+else:
+    CONNECTION_ERRORS = (ConnectionError, BrokenPipeError)
+
+
+@dataclass
+class PooledConnection:
+    """An SSH connection leased out by HopConnectionPool."""
+    context_id: str
+    loop: asyncio.AbstractEventLoop
+    conn: Any
+    sftp: Any = None
+    created_at: float = 0.0
+    last_used: float = 0.0
+    leases: int = 0
+
+    def is_closed(self) -> bool:
+        try:
+            return bool(self.conn.is_closed())
+        except Exception:
+            return False
+
+
+class HopConnectionPool:
+    """
+    Loop-affine pool of SSH/SFTP connections per hop context.
+
+    Each (context_id, loop) pair shares one connection; SSH multiplexes
+    channels and the SFTP client pipelines requests, so concurrent leases
+    do not need separate connections. Dead connections are replaced on the
+    next lease, connections idle past HOP_POOL_HEALTH_CHECK_AFTER are probed
+    before reuse, and a sweeper task on each loop closes connections idle
+    past HOP_POOL_IDLE_TIMEOUT.
+    """
+
+    def __init__(self, connect: Callable[[str], Awaitable[Any]],
+                 idle_timeout: float = POOL_IDLE_TIMEOUT,
+                 health_check_after: float = POOL_HEALTH_CHECK_AFTER):
+        """
+        Initialize pool.
+
+        Args:
+            connect: Coroutine function opening a new SSH connection for a context id
+            idle_timeout: Seconds an unused connection is kept
+            health_check_after: Idle seconds after which a connection is probed before reuse
+        """
+        self._connect = connect
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self._entries: Dict[Tuple[str, asyncio.AbstractEventLoop], PooledConnection] = {}
+        self._connect_locks: Dict[Tuple[str, asyncio.AbstractEventLoop], asyncio.Lock] = {}
+        self._sweepers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+        # Loops on other threads touch these dicts too, so they are only
+        # iterated over list() snapshots
+
+        self.stats = {
+            'connects': 0,
+            'reuses': 0,
+            'health_check_failures': 0,
+            'evictions': 0,
+        }
+
+    @asynccontextmanager
+    async def lease(self, context_id: str, sftp: bool = False):
+        """
+        Lease a connection bound to the running loop.
+
+        Args:
+            context_id: Hop context to connect to
+            sftp: Whether the lease needs the connection's SFTP client
+
+        Yields:
+            PooledConnection, or None if no connection could be opened
+        """
+        try:
+            entry = await self._acquire(context_id, sftp)
+        except Exception as e:
+            logger.error(f"[HopPool] connection for {context_id} unavailable: {e}")
+            entry = None
+        if entry is None:
+            yield None
+            return
+
+        entry.leases += 1
+        try:
+            yield entry
+        except BaseException as e:
+            if isinstance(e, CONNECTION_ERRORS) or entry.is_closed():
+                await self._discard(entry)
+            raise
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+
+    async def close_context(self, context_id: str) -> None:
+        """Close every pooled connection for a context (e.g. on disconnect)."""
+        for entry in [e for e in list(self._entries.values()) if e.context_id == context_id]:
+            await self._discard(entry)
+
+    async def close_all(self) -> None:
+        """Close every pooled connection."""
+        for entry in list(self._entries.values()):
+            await self._discard(entry)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    # ------------- internal -------------
+    async def _acquire(self, context_id: str, sftp: bool) -> PooledConnection:
+        loop = asyncio.get_running_loop()
+        self._prune_closed_loops()
+        key = (context_id, loop)
+
+        lock = self._connect_locks.get(key)
+        if lock is None:
+            lock = self._connect_locks[key] = asyncio.Lock()
+        async with lock:
+            entry = self._entries.get(key)
+            if entry is not None and not await self._healthy(entry):
+                self.stats['health_check_failures'] += 1
+                await self._discard(entry)
+                entry = None
+            if entry is None:
+                conn = await self._connect(context_id)
+                now = time.monotonic()
+                entry = PooledConnection(context_id=context_id, loop=loop, conn=conn,
+                                         created_at=now, last_used=now)
+                self._entries[key] = entry
+                self.stats['connects'] += 1
+                self._ensure_sweeper(loop)
+            else:
+                self.stats['reuses'] += 1
+            if sftp and entry.sftp is None:
+                try:
+                    entry.sftp = await entry.conn.start_sftp_client()
+                except Exception:
+                    await self._discard(entry)
+                    raise
+        entry.last_used = time.monotonic()
+        return entry
+
+    async def _healthy(self, entry: PooledConnection) -> bool:
+        if entry.is_closed():
+            return False
+        if entry.leases or time.monotonic() - entry.last_used < self.health_check_after:
+            return True
+        # Keepalive catches dead peers eventually; probe quiet connections now
+        try:
+            if entry.sftp is not None:
+                await asyncio.wait_for(entry.sftp.realpath('.'), timeout=POOL_HEALTH_CHECK_TIMEOUT)
+            else:
+                await asyncio.wait_for(entry.conn.run('true', check=False), timeout=POOL_HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.info(f"[HopPool] health check failed for {entry.context_id}: {e}")
+            return False
+
+    async def _discard(self, entry: PooledConnection) -> None:
+        key = (entry.context_id, entry.loop)
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if entry.loop is current:
+            await self._close(entry)
+        elif entry.loop.is_closed():
+            self._abort(entry)
+        else:
+            # Connection objects may only be touched from their own loop
+            try:
+                entry.loop.call_soon_threadsafe(self._abort, entry)
+            except RuntimeError:
+                self._abort(entry)
+
+    @staticmethod
+    async def _close(entry: PooledConnection) -> None:
+        try:
+            if entry.sftp is not None:
+                res = entry.sftp.exit()
+                if inspect.isawaitable(res):
+                    await asyncio.wait_for(res, timeout=1.0)
+        except Exception:
+            pass
+        try:
+            entry.conn.close()
+            await asyncio.wait_for(entry.conn.wait_closed(), timeout=2.0)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _abort(entry: PooledConnection) -> None:
+        try:
+            entry.conn.abort() if hasattr(entry.conn, 'abort') else entry.conn.close()
+        except Exception:
+            pass
+
+    def _prune_closed_loops(self) -> None:
+        for key, entry in list(self._entries.items()):
+            if entry.loop.is_closed():
+                # Its loop is gone, so the connection can only be aborted
+                self._entries.pop(key, None)
+                self._abort(entry)
+                self._connect_locks.pop(key, None)
+        for loop in [l for l in list(self._sweepers) if l.is_closed()]:
+            self._sweepers.pop(loop, None)
+
+    def _ensure_sweeper(self, loop: asyncio.AbstractEventLoop) -> None:
+        task = self._sweepers.get(loop)
+        if task is None or task.done():
+            self._sweepers[loop] = loop.create_task(self._sweep(loop))
+
+    async def _sweep(self, loop: asyncio.AbstractEventLoop) -> None:
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        while any(e.loop is loop for e in list(self._entries.values())):
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for entry in [e for e in list(self._entries.values()) if e.loop is loop]:
+                if entry.leases == 0 and (entry.is_closed() or now - entry.last_used >= self.idle_timeout):
+                    self.stats['evictions'] += 1
+                    logger.debug(f"[HopPool] evicting idle connection for {entry.context_id}")
+                    await self._discard(entry)
+        for key in [k for k in list(self._connect_locks) if k[1] is loop and k not in self._entries]:
+            self._connect_locks.pop(key, None)
+        if self._sweepers.get(loop) is asyncio.current_task():
+            del self._sweepers[loop]
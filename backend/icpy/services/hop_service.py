@@ -29,6 +29,8 @@ from ..utils.ssh_config_parser import parse_ssh_config
 from ..utils.ssh_config_writer import generate_ssh_config, credential_to_config_entry
 from ..scripts.migrate_hop_config import should_migrate, migrate_credentials_to_config
 from ..utils.process_reaper import reap_zombies
+from .hop_connection_pool import HopConnectionPool, POOL_KEEPALIVE_INTERVAL, POOL_KEEPALIVE_COUNT_MAX
+from .remote_metadata_cache import get_remote_metadata_cache
 
 try:
     import asyncssh  # Phase 2: real connectivity
@@ -45,7 +47,8 @@ logger = logging.getLogger(__name__)
 _hop_debug_handler = None
 try:
     from logging.handlers import RotatingFileHandler
-    _logs_dir = Path(__file__).parent.parent.parent.parent / 'logs'
+    # HOP_DEBUG_LOG_DIR overrides the repo-level logs/ directory (tests use a tmp dir)
+    _logs_dir = Path(os.environ.get('HOP_DEBUG_LOG_DIR') or Path(__file__).resolve().parent.parent.parent.parent / 'logs')
     _logs_dir.mkdir(parents=True, exist_ok=True)
     _hop_debug_log = _logs_dir / 'hop_disconnect_debug.log'
     
@@ -227,6 +230,8 @@ class HopService:
         self._last_credentials: Dict[str, Dict] = {}  # context_id -> credential data
         self._connection_start_times: Dict[str, float] = {}
         self._loop = None  # event loop where connection/sftp were created
+        # Warm per-loop connections for callers outside self._loop
+        self._pool = HopConnectionPool(self._open_pooled_connection)
         
         # Phase 2: Config format tracking
         self._config_format: str = "json"  # "json" or "config"
@@ -640,134 +645,72 @@ class HopService:
     def get_active_loop(self):
         return self._loop
 
+    def _connect_options(self, context_id: str) -> Optional[Dict]:
+        """asyncssh.connect arguments for a context from its credential and last-used secrets."""
+        cred = self._creds.get(context_id)
+        if not cred:
+            return None
+
+        # Retrieve last-used secret material (password/passphrase) if any
+        last = self._last_credentials.get(context_id, {})
+        client_keys = None
+        if cred.auth == 'privateKey' and cred.privateKeyId:
+            client_keys = [str(self.get_key_path(cred.privateKeyId))]
+        return {
+            'host': cred.host,
+            'port': cred.port or 22,
+            'username': cred.username or None,
+            'password': last.get('password') if cred.auth == 'password' else None,
+            'client_keys': client_keys,
+            'passphrase': last.get('passphrase') if cred.auth == 'privateKey' else None,
+            'known_hosts': None,
+            'connect_timeout': CONNECTION_TIMEOUT,
+        }
+
+    async def _open_pooled_connection(self, context_id: str):
+        """Open an SSH connection on the current loop for the connection pool."""
+        options = self._connect_options(context_id)
+        if options is None:
+            raise ValueError(f"No credential for context {context_id}")
+        if POOL_KEEPALIVE_INTERVAL > 0:
+            options['keepalive_interval'] = POOL_KEEPALIVE_INTERVAL
+            options['keepalive_count_max'] = POOL_KEEPALIVE_COUNT_MAX
+        return await asyncssh.connect(**options)
+
     @asynccontextmanager
     async def ephemeral_sftp(self, context_id: Optional[str] = None):
-        """Open a short-lived SFTP client in the CURRENT async loop.
+        """SFTP client bound to the CURRENT async loop.
 
-        This avoids cross-loop issues by creating a fresh SSH/SFTP session
-        bound to the caller's event loop. Closes both SFTP and SSH on exit.
+        This avoids cross-loop issues by using an SSH/SFTP session created
+        on the caller's event loop. Sessions come from a per-loop pool and
+        stay open for reuse; they are closed when idle or on disconnect.
         """
         if context_id is None:
             context_id = self._active_context_id
 
-        if context_id == "local" or not ASYNCSSH_AVAILABLE:
+        if context_id == "local" or not ASYNCSSH_AVAILABLE or context_id not in self._creds:
             yield None
             return
 
-        cred = self._creds.get(context_id)
-        if not cred:
-            yield None
-            return
-
-        # Retrieve last-used secret material (password/passphrase) if any
-        last = self._last_credentials.get(context_id, {})
-        password = last.get('password') if cred.auth == 'password' else None
-        passphrase = last.get('passphrase') if cred.auth == 'privateKey' else None
-        client_keys = None
-        if cred.auth == 'privateKey' and cred.privateKeyId:
-            key_path = str(self.get_key_path(cred.privateKeyId))
-            client_keys = [key_path]
-
-        conn = None
-        sftp = None
-        try:
-            conn = await asyncssh.connect(
-                host=cred.host,
-                port=cred.port or 22,
-                username=cred.username or None,
-                password=password,
-                client_keys=client_keys,
-                passphrase=passphrase,
-                known_hosts=None,
-                connect_timeout=CONNECTION_TIMEOUT,
-            )
-            try:
-                sftp = await asyncio.wait_for(conn.start_sftp_client(), timeout=OPERATION_TIMEOUT)
-            except Exception as e:
-                logger.error(f"[HopService] ephemeral SFTP start failed for {context_id}: {e}")
-                try:
-                    if conn:
-                        conn.close()
-                        await asyncio.wait_for(conn.wait_closed(), timeout=2.0)
-                except Exception:
-                    pass
-                yield None
-                return
-
-            yield sftp
-        finally:
-            # Cleanup ephemeral resources
-            try:
-                if sftp:
-                    res = sftp.exit()
-                    if inspect.isawaitable(res):
-                        try:
-                            await asyncio.wait_for(res, timeout=1.0)
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-            try:
-                if conn:
-                    conn.close()
-                    try:
-                        await asyncio.wait_for(conn.wait_closed(), timeout=2.0)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+        async with self._pool.lease(context_id, sftp=True) as lease:
+            yield lease.sftp if lease else None
 
     @asynccontextmanager
     async def ephemeral_ssh(self, context_id: Optional[str] = None):
-        """Open a short-lived SSH connection in the CURRENT async loop.
+        """SSH connection bound to the CURRENT async loop.
 
-        This is analogous to ephemeral_sftp but yields the SSH connection itself.
-        It avoids cross-loop issues by creating a fresh connection bound to the caller's loop.
+        This is analogous to ephemeral_sftp but yields the SSH connection itself,
+        leased from the same per-loop pool.
         """
         if context_id is None:
             context_id = self._active_context_id
 
-        if context_id == "local" or not ASYNCSSH_AVAILABLE:
+        if context_id == "local" or not ASYNCSSH_AVAILABLE or context_id not in self._creds:
             yield None
             return
 
-        cred = self._creds.get(context_id)
-        if not cred:
-            yield None
-            return
-
-        # Retrieve last-used secret material (password/passphrase) if any
-        last = self._last_credentials.get(context_id, {})
-        password = last.get('password') if cred.auth == 'password' else None
-        passphrase = last.get('passphrase') if cred.auth == 'privateKey' else None
-        client_keys = None
-        if cred.auth == 'privateKey' and cred.privateKeyId:
-            key_path = str(self.get_key_path(cred.privateKeyId))
-            client_keys = [key_path]
-
-        conn = None
-        try:
-            conn = await asyncssh.connect(
-                host=cred.host,
-                port=cred.port or 22,
-                username=cred.username or None,
-                password=password,
-                client_keys=client_keys,
-                passphrase=passphrase,
-                known_hosts=None,
-                connect_timeout=CONNECTION_TIMEOUT,
-            )
-            yield conn
-        finally:
-            try:
-                if conn:
-                    conn.close()
-                    try:
-                        await asyncio.wait_for(conn.wait_closed(), timeout=2.0)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+        async with self._pool.lease(context_id) as lease:
+            yield lease.conn if lease else None
 
     def _format_user_friendly_error(self, error: Exception) -> str:
         """Phase 8: Convert technical SSH errors to user-friendly messages."""
@@ -807,6 +750,13 @@ class HopService:
         sftp = self._sftp_clients.get(context_id)
         conn = self._connections.get(context_id)
         
+        try:
+            await self._pool.close_context(context_id)
+        except Exception as e:
+            logger.warning("[HopClose] closing pooled connections failed: %s", str(e))
+        # Cached remote metadata may be stale by the next connect
+        get_remote_metadata_cache().clear_context(context_id)
+        
         logger.info(
             "[HopClose] START _close_connection context_id=%s has_sftp=%s has_conn=%s timestamp=%s",
             context_id,
@@ -1267,6 +1217,12 @@ class HopService:
         if context_id == 'local':
             return None
         return self._sftp_clients.get(context_id)
+
+    def get_connection_for_context(self, context_id: str):
+        """Return SSH connection for the specified context id (None if unavailable)."""
+        if context_id == 'local':
+            return None
+        return self._connections.get(context_id)
     
     # Legacy property accessors for backward compatibility
     @property
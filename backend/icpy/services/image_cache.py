@@ -1,13 +1,22 @@
 """
 Image Cache
-LRU cache for storing recent images in memory for fast access.
+LRU cache for storing recent images in memory for fast access, backed by an
+optional content-addressed disk tier.
 """
+import base64
+import binascii
+import hashlib
+import json
+import os
 import time
 import logging
 from collections import OrderedDict
-from typing import Optional, Dict
+from pathlib import Path
+from typing import Optional, Dict, Union
 from dataclasses import dataclass
 
+from ..utils.env import env_float
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,50 +24,104 @@ logger = logging.getLogger(__name__)
 class CachedImage:
     """Cached image data with metadata"""
     image_id: str
-    base64_data: str
+    data: bytes
     mime_type: str
     size_bytes: int
     cached_at: float
     access_count: int = 0
 
+    @property
+    def base64_data(self) -> str:
+        return base64.b64encode(self.data).decode('ascii')
+
+
+@dataclass
+class _DiskEntry:
+    """Disk tier bookkeeping for one image id"""
+    digest: str
+    mime_type: str
+    size_bytes: int
+    last_access: float
+
+
+def _decode_base64(data: str) -> bytes:
+    """Decode base64 image data, tolerating data URLs and missing padding."""
+    if data.startswith('data:') and ',' in data:
+        data = data.split(',', 1)[1]
+    try:
+        return base64.b64decode(data)
+    except (binascii.Error, ValueError):
+        return base64.b64decode(data + '==')
+
 
 class ImageCache:
     """
-    LRU cache for storing base64 image data in memory.
-    
+    LRU cache for storing image bytes in memory.
+
     Used for:
     - Fast access to recently generated images
     - Immediate display within same session
     - Image editing without disk I/O
+
+    Images are kept as raw bytes (base64 is only produced on request). When
+    disk_dir is set, entries evicted from memory spill to a content-addressed
+    store (<disk_dir>/<sha256[:2]>/<sha256>) with its own LRU byte budget, and
+    a memory miss is served from disk before callers fall back to decoding
+    or regenerating the image.
     """
-    
+
     def __init__(
         self,
-        max_images: int = 5,
-        max_size_mb: float = 10.0,
-        ttl_seconds: float = 1800  # 30 minutes
+        max_images: int = 32,
+        max_size_mb: float = 64.0,
+        ttl_seconds: float = 1800,  # 30 minutes
+        disk_dir: Optional[Union[str, Path]] = None,
+        max_disk_mb: float = 256.0
     ):
         """
         Initialize cache.
-        
+
         Args:
-            max_images: Maximum number of images to cache
-            max_size_mb: Maximum total cache size in MB
-            ttl_seconds: Time-to-live for cached entries
+            max_images: Maximum number of images to cache in memory
+            max_size_mb: Maximum total in-memory cache size in MB
+            ttl_seconds: Time-to-live for in-memory entries
+            disk_dir: Directory for the disk tier, or None to disable it
+            max_disk_mb: Maximum total disk tier size in MB
         """
         self.max_images = max_images
         self.max_size_bytes = int(max_size_mb * 1024 * 1024)
         self.ttl_seconds = ttl_seconds
-        
+
         self._cache: OrderedDict[str, CachedImage] = OrderedDict()
         self._total_size = 0
-        
+
+        self.disk_dir: Optional[Path] = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self._disk: OrderedDict[str, _DiskEntry] = OrderedDict()
+        self._disk_refs: Dict[str, int] = {}  # digest -> number of image ids pointing at it
+        self._disk_size = 0
+        self._disk_dirty = False
+
+        self._metrics = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'spills': 0,
+            'disk_evictions': 0,
+        }
+
+        if self.disk_dir:
+            self._load_disk_index()
+
         # Only log on first initialization (reduce log spam)
         global _cache_already_logged_init
         if not _cache_already_logged_init:
             logger.info(
                 f"ImageCache initialized: max_images={max_images}, "
-                f"max_size={max_size_mb}MB, ttl={ttl_seconds}s"
+                f"max_size={max_size_mb}MB, ttl={ttl_seconds}s, "
+                f"disk={self.disk_dir or 'disabled'}"
             )
             _cache_already_logged_init = True
         else:
@@ -66,7 +129,7 @@ class ImageCache:
                 f"ImageCache created: max_images={max_images}, "
                 f"max_size={max_size_mb}MB, ttl={ttl_seconds}s"
             )
-    
+
     def put(
         self,
         image_id: str,
@@ -75,19 +138,39 @@ class ImageCache:
     ) -> None:
         """
         Add image to cache.
-        
+
         Args:
             image_id: Unique image identifier
             base64_data: Base64 encoded image data
             mime_type: MIME type of image
         """
-        # Calculate size
-        size_bytes = len(base64_data.encode('utf-8'))
-        
+        try:
+            data = _decode_base64(base64_data)
+        except (binascii.Error, ValueError) as e:
+            logger.warning(f"Not caching image {image_id}: invalid base64 data ({e})")
+            return
+        self.put_bytes(image_id, data, mime_type)
+
+    def put_bytes(
+        self,
+        image_id: str,
+        data: bytes,
+        mime_type: str = "image/png"
+    ) -> None:
+        """
+        Add raw image bytes to cache.
+
+        Args:
+            image_id: Unique image identifier
+            data: Image file contents
+            mime_type: MIME type of image
+        """
+        size_bytes = len(data)
+
         # Remove existing entry if present
         if image_id in self._cache:
             self._evict(image_id)
-        
+
         # Check if we need to make space
         while (
             len(self._cache) >= self.max_images or
@@ -100,146 +183,358 @@ class ImageCache:
                 )
                 break
             self._evict_oldest()
-        
+
         # Add to cache
         cached = CachedImage(
             image_id=image_id,
-            base64_data=base64_data,
+            data=bytes(data),
             mime_type=mime_type,
             size_bytes=size_bytes,
             cached_at=time.time()
         )
-        
+
         self._cache[image_id] = cached
         self._total_size += size_bytes
-        
+
         logger.debug(
             f"Cached image {image_id}: {size_bytes / 1024:.2f}KB "
             f"(total: {self._total_size / 1024 / 1024:.2f}MB, count: {len(self._cache)})"
         )
-    
+
     def get(self, image_id: str) -> Optional[str]:
         """
         Get image from cache.
-        
+
         Args:
             image_id: Image identifier
-        
+
         Returns:
             Base64 data if found and not expired, None otherwise
         """
-        if image_id not in self._cache:
-            return None
-        
-        cached = self._cache[image_id]
-        
-        # Check TTL
-        age = time.time() - cached.cached_at
-        if age > self.ttl_seconds:
-            logger.debug(f"Cache entry expired: {image_id} (age: {age:.1f}s)")
-            self._evict(image_id)
+        cached = self.get_entry(image_id)
+        return cached.base64_data if cached else None
+
+    def get_bytes(self, image_id: str) -> Optional[bytes]:
+        """
+        Get raw image bytes from cache.
+
+        Args:
+            image_id: Image identifier
+
+        Returns:
+            Image bytes if found, None otherwise
+        """
+        cached = self.get_entry(image_id)
+        return cached.data if cached else None
+
+    def get_entry(self, image_id: str) -> Optional[CachedImage]:
+        """
+        Get a cached image with its metadata, checking memory then disk.
+
+        Args:
+            image_id: Image identifier
+
+        Returns:
+            CachedImage if found, None otherwise
+        """
+        cached = self._cache.get(image_id)
+        if cached is not None:
+            # Check TTL
+            age = time.time() - cached.cached_at
+            if age > self.ttl_seconds:
+                logger.debug(f"Cache entry expired: {image_id} (age: {age:.1f}s)")
+                self._metrics['expirations'] += 1
+                self._evict(image_id, spill=True)
+            else:
+                # Move to end (most recently used)
+                self._cache.move_to_end(image_id)
+                cached.access_count += 1
+                self._metrics['hits'] += 1
+                logger.debug(f"Cache hit: {image_id} (accesses: {cached.access_count})")
+                return cached
+
+        data = self._disk_read(image_id)
+        if data is None:
+            self._metrics['misses'] += 1
             return None
-        
-        # Move to end (most recently used)
-        self._cache.move_to_end(image_id)
-        cached.access_count += 1
-        
-        logger.debug(f"Cache hit: {image_id} (accesses: {cached.access_count})")
-        return cached.base64_data
-    
+
+        # Promote back into memory
+        self._metrics['disk_hits'] += 1
+        entry = self._disk[image_id]
+        self.put_bytes(image_id, data, entry.mime_type)
+        return self._cache.get(image_id) or CachedImage(
+            image_id=image_id,
+            data=data,
+            mime_type=entry.mime_type,
+            size_bytes=len(data),
+            cached_at=time.time()
+        )
+
+    def get_mime_type(self, image_id: str) -> Optional[str]:
+        """Return the MIME type recorded for a cached image, if any."""
+        cached = self._cache.get(image_id)
+        if cached is not None:
+            return cached.mime_type
+        entry = self._disk.get(image_id)
+        return entry.mime_type if entry else None
+
     def has(self, image_id: str) -> bool:
         """
         Check if image is in cache (without retrieving).
-        
+
         Args:
             image_id: Image identifier
-        
+
         Returns:
             True if in cache and not expired
         """
-        if image_id not in self._cache:
-            return False
-        
-        cached = self._cache[image_id]
-        age = time.time() - cached.cached_at
-        
-        if age > self.ttl_seconds:
-            self._evict(image_id)
-            return False
-        
-        return True
-    
-    def _evict(self, image_id: str) -> None:
-        """Remove specific image from cache"""
+        if image_id in self._cache:
+            cached = self._cache[image_id]
+            age = time.time() - cached.cached_at
+            if age <= self.ttl_seconds:
+                return True
+            self._metrics['expirations'] += 1
+            self._evict(image_id, spill=True)
+
+        return image_id in self._disk
+
+    def _evict(self, image_id: str, spill: bool = False) -> None:
+        """Remove specific image from memory, optionally spilling it to disk"""
         if image_id in self._cache:
             cached = self._cache.pop(image_id)
             self._total_size -= cached.size_bytes
+            if spill:
+                self._disk_write(cached)
             logger.debug(f"Evicted: {image_id}")
-    
+
     def _evict_oldest(self) -> None:
-        """Remove oldest (least recently used) image from cache"""
+        """Remove oldest (least recently used) image from memory"""
         if not self._cache:
             return
-        
+
         oldest_id = next(iter(self._cache))
-        self._evict(oldest_id)
-    
+        self._metrics['evictions'] += 1
+        self._evict(oldest_id, spill=True)
+
     def clear(self) -> None:
         """Clear all cached images"""
         count = len(self._cache)
         self._cache.clear()
         self._total_size = 0
+        for image_id in list(self._disk):
+            self._disk_remove(image_id)
+        self._save_disk_index()
         logger.info(f"Cache cleared: {count} images removed")
-    
+
     def get_stats(self) -> Dict:
         """
         Get cache statistics.
-        
+
         Returns:
             Dict with cache stats
         """
+        lookups = self._metrics['hits'] + self._metrics['disk_hits'] + self._metrics['misses']
         return {
             'count': len(self._cache),
             'total_size_bytes': self._total_size,
             'total_size_mb': self._total_size / 1024 / 1024,
             'max_images': self.max_images,
             'max_size_mb': self.max_size_bytes / 1024 / 1024,
-            'ttl_seconds': self.ttl_seconds
+            'ttl_seconds': self.ttl_seconds,
+            'disk_enabled': self.disk_dir is not None,
+            'disk_count': len(self._disk),
+            'disk_size_bytes': self._disk_size,
+            'max_disk_mb': self.max_disk_bytes / 1024 / 1024,
+            'hit_rate': ((self._metrics['hits'] + self._metrics['disk_hits']) / lookups) if lookups else 0.0,
+            **self._metrics
         }
-    
+
     def cleanup_expired(self) -> int:
         """
-        Remove expired entries.
-        
+        Remove expired entries from memory (they remain available on disk).
+
         Returns:
             Number of entries removed
         """
         now = time.time()
         expired = []
-        
+
         for image_id, cached in self._cache.items():
             age = now - cached.cached_at
             if age > self.ttl_seconds:
                 expired.append(image_id)
-        
+
         for image_id in expired:
-            self._evict(image_id)
-        
+            self._metrics['expirations'] += 1
+            self._evict(image_id, spill=True)
+
         if expired:
             logger.info(f"Cleaned up {len(expired)} expired cache entries")
-        
+
         return len(expired)
 
+    def flush(self) -> None:
+        """Persist the disk tier index."""
+        self._save_disk_index()
+
+    # -------------------------
+    # Disk tier
+    # -------------------------
+    def _blob_path(self, digest: str) -> Path:
+        return self.disk_dir / digest[:2] / digest
+
+    def _index_path(self) -> Path:
+        return self.disk_dir / 'index.json'
+
+    def _load_disk_index(self) -> None:
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable image cache index: {e}")
+            return
+        entries = sorted(raw.get('entries', {}).items(), key=lambda item: item[1].get('last_access', 0))
+        for image_id, data in entries:
+            entry = _DiskEntry(
+                digest=data['digest'],
+                mime_type=data.get('mime_type', 'image/png'),
+                size_bytes=int(data.get('size_bytes', 0)),
+                last_access=float(data.get('last_access', 0))
+            )
+            if not self._blob_path(entry.digest).exists():
+                continue
+            self._disk[image_id] = entry
+            if self._disk_refs.get(entry.digest, 0) == 0:
+                self._disk_size += entry.size_bytes
+            self._disk_refs[entry.digest] = self._disk_refs.get(entry.digest, 0) + 1
+
+    def _save_disk_index(self) -> None:
+        if not self.disk_dir or not self._disk_dirty:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            payload = {
+                'entries': {
+                    image_id: {
+                        'digest': entry.digest,
+                        'mime_type': entry.mime_type,
+                        'size_bytes': entry.size_bytes,
+                        'last_access': entry.last_access,
+                    }
+                    for image_id, entry in self._disk.items()
+                }
+            }
+            tmp_path = self._index_path().with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self._index_path())
+            self._disk_dirty = False
+        except OSError as e:
+            logger.warning(f"Failed to save image cache index: {e}")
+
+    def _disk_write(self, cached: CachedImage) -> None:
+        if not self.disk_dir or cached.size_bytes > self.max_disk_bytes:
+            return
+        digest = hashlib.sha256(cached.data).hexdigest()
+        previous = self._disk.get(cached.image_id)
+        if previous and previous.digest == digest:
+            previous.last_access = time.time()
+            self._disk.move_to_end(cached.image_id)
+            self._disk_dirty = True
+            self._save_disk_index()
+            return
+        if previous:
+            self._disk_remove(cached.image_id)
+
+        try:
+            blob = self._blob_path(digest)
+            if self._disk_refs.get(digest, 0) == 0:
+                while self._disk and self._disk_size + cached.size_bytes > self.max_disk_bytes:
+                    self._metrics['disk_evictions'] += 1
+                    self._disk_remove(next(iter(self._disk)))
+                if not blob.exists():
+                    blob.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = blob.with_suffix('.tmp')
+                    with open(tmp_path, 'wb') as f:
+                        f.write(cached.data)
+                    os.replace(tmp_path, blob)
+                self._disk_size += cached.size_bytes
+            self._disk_refs[digest] = self._disk_refs.get(digest, 0) + 1
+            self._disk[cached.image_id] = _DiskEntry(
+                digest=digest,
+                mime_type=cached.mime_type,
+                size_bytes=cached.size_bytes,
+                last_access=time.time()
+            )
+            self._metrics['spills'] += 1
+            self._disk_dirty = True
+            self._save_disk_index()
+        except OSError as e:
+            logger.warning(f"Failed to spill image {cached.image_id} to disk: {e}")
+
+    def _disk_read(self, image_id: str) -> Optional[bytes]:
+        entry = self._disk.get(image_id)
+        if entry is None:
+            return None
+        try:
+            with open(self._blob_path(entry.digest), 'rb') as f:
+                data = f.read()
+        except OSError:
+            self._disk_remove(image_id)
+            self._save_disk_index()
+            return None
+        entry.last_access = time.time()
+        self._disk.move_to_end(image_id)
+        self._disk_dirty = True
+        return data
+
+    def _disk_remove(self, image_id: str) -> None:
+        entry = self._disk.pop(image_id, None)
+        if entry is None:
+            return
+        self._disk_dirty = True
+        refs = self._disk_refs.get(entry.digest, 1) - 1
+        if refs > 0:
+            self._disk_refs[entry.digest] = refs
+            return
+        self._disk_refs.pop(entry.digest, None)
+        self._disk_size -= entry.size_bytes
+        try:
+            self._blob_path(entry.digest).unlink()
+        except OSError:
+            pass
+
 
 # Global cache instance
 _global_cache: Optional[ImageCache] = None
 _cache_already_logged_init = False
 
 
+def _default_disk_dir() -> Optional[Path]:
+    """Disk tier location: <workspace>/.icotes/image_cache, unless disabled."""
+    if os.getenv('IMAGE_DISK_CACHE', '1') in ('0', 'false', 'False'):
+        return None
+    if os.environ.get('PYTEST_CURRENT_TEST') is not None and not os.getenv('IMAGE_DISK_CACHE_DIR'):
+        return None
+    explicit = os.getenv('IMAGE_DISK_CACHE_DIR')
+    if explicit:
+        return Path(explicit)
+    workspace_root = os.environ.get('WORKSPACE_ROOT') or os.environ.get('ICOTES_WORKSPACE_PATH') or str(Path.cwd())
+    return Path(workspace_root) / '.icotes' / 'image_cache'
+
+
 def get_image_cache() -> ImageCache:
     """Get global image cache instance"""
     global _global_cache, _cache_already_logged_init
     if _global_cache is None:
-        _global_cache = ImageCache()
+        _global_cache = ImageCache(
+            max_images=int(env_float('IMAGE_CACHE_MAX_IMAGES', 32)),
+            max_size_mb=env_float('IMAGE_CACHE_MAX_MB', 64.0),
+            ttl_seconds=env_float('IMAGE_CACHE_TTL_SECONDS', 1800),
+            disk_dir=_default_disk_dir(),
+            max_disk_mb=env_float('IMAGE_DISK_CACHE_MB', 256.0)
+        )
         _cache_already_logged_init = True
     return _global_cache
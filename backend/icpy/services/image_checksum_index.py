@@ -0,0 +1,441 @@
+"""
+Image Checksum Index
+Persistent checksum -> path index used to find renamed or moved images.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from ..utils.env import env_float
+from ..utils.thumbnail_generator import calculate_checksum
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.webp', '.gif'})
+_SKIP_DIRS = frozenset({
+    '.git', 'node_modules', '__pycache__', '.venv', 'venv', '.tox', '.nox',
+    '.mypy_cache', '.pytest_cache', '.ruff_cache',
+})
+_SAVE_INTERVAL = 2.0
+
+
+class ImageChecksumIndex:
+    """
+    Maps SHA-256 checksums of workspace images to their paths.
+
+    Entries are keyed by workspace-relative path and validated by
+    (mtime, size), so rebuilding after a restart only hashes images that
+    changed. The index is kept current from filesystem watcher events
+    (fs.file_* on the message broker). Lookups never scan on the caller's
+    thread: a lookup before the first build, or a miss, starts at most one
+    background rescan per rescan_interval for changes made while nothing
+    was watching.
+    """
+
+    def __init__(
+        self,
+        workspace_path: str,
+        index_path: Optional[str] = None,
+        rescan_interval: float = 30.0
+    ):
+        """
+        Initialize index.
+
+        Args:
+            workspace_path: Path to workspace directory
+            index_path: JSON file to persist the index (default: .icotes/image_checksums.json)
+            rescan_interval: Minimum seconds between rescans triggered by lookup misses
+        """
+        self.workspace_path = Path(workspace_path).resolve()
+        self.index_path = Path(index_path) if index_path else self.workspace_path / '.icotes' / 'image_checksums.json'
+        self.rescan_interval = rescan_interval
+
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._by_checksum: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._built = False
+        self._last_scan = 0.0
+        self._dirty = False
+        self._last_save = 0.0
+        self._subscribed = False
+        self._scan_thread: Optional[threading.Thread] = None
+
+    # -------------------------
+    # Path helpers
+    # -------------------------
+    def _relative(self, path: str) -> Optional[str]:
+        try:
+            rel = Path(os.path.abspath(path)).relative_to(self.workspace_path)
+        except ValueError:
+            return None
+        return rel.as_posix()
+
+    @staticmethod
+    def _is_image(path: str) -> bool:
+        return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+    @staticmethod
+    def _skip_relative(rel: str) -> bool:
+        return rel.startswith('.icotes/thumbnails/') or rel.startswith('.icotes/image_cache/')
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def load(self) -> None:
+        """Load the persisted index, if any."""
+        with self._lock:
+            self._loaded = True
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    raw = json.load(f)
+            except FileNotFoundError:
+                return
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable image checksum index {self.index_path}: {e}")
+                return
+            for rel, entry in (raw.get('entries') or {}).items():
+                if isinstance(entry, dict) and entry.get('checksum'):
+                    self._set_entry(rel, entry)
+
+    def save(self) -> None:
+        """Persist the index if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {'entries': dict(self._entries)}
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Failed to save image checksum index: {e}")
+
+    def _maybe_save(self) -> None:
+        if self._dirty and time.time() - self._last_save >= _SAVE_INTERVAL:
+            self.save()
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    def _set_entry(self, rel: str, entry: Dict[str, Any]) -> None:
+        self._drop_entry(rel)
+        self._entries[rel] = entry
+        self._by_checksum.setdefault(entry['checksum'], set()).add(rel)
+
+    def _drop_entry(self, rel: str) -> bool:
+        old = self._entries.pop(rel, None)
+        if old is None:
+            return False
+        paths = self._by_checksum.get(old['checksum'])
+        if paths is not None:
+            paths.discard(rel)
+            if not paths:
+                del self._by_checksum[old['checksum']]
+        return True
+
+    def _index_file(self, abs_path: str, rel: str, stat: Optional[os.stat_result] = None) -> bool:
+        """Hash a file unless its (mtime, size) entry is current. Returns True if changed."""
+        try:
+            stat = stat or os.stat(abs_path)
+        except OSError:
+            with self._lock:
+                if self._drop_entry(rel):
+                    self._dirty = True
+                    return True
+            return False
+        with self._lock:
+            current = self._entries.get(rel)
+            if current and current.get('mtime') == stat.st_mtime and current.get('size') == stat.st_size:
+                return False
+        try:
+            checksum = calculate_checksum(abs_path)
+        except Exception as e:
+            logger.debug(f"Error calculating checksum for {abs_path}: {e}")
+            return False
+        with self._lock:
+            self._set_entry(rel, {'mtime': stat.st_mtime, 'size': stat.st_size, 'checksum': checksum})
+            self._dirty = True
+        return True
+
+    def build(self) -> int:
+        """
+        Scan the workspace, hashing new or changed images and dropping missing ones.
+
+        Returns:
+            Number of images hashed
+        """
+        if not self._loaded:
+            self.load()
+        hashed = 0
+        seen: Set[str] = set()
+        for dirpath, dirnames, filenames in os.walk(self.workspace_path):
+            dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS]
+            for name in filenames:
+                if not self._is_image(name):
+                    continue
+                abs_path = os.path.join(dirpath, name)
+                rel = self._relative(abs_path)
+                if rel is None or self._skip_relative(rel):
+                    continue
+                seen.add(rel)
+                if self._index_file(abs_path, rel):
+                    hashed += 1
+        with self._lock:
+            for rel in [r for r in self._entries if r not in seen]:
+                self._drop_entry(rel)
+                self._dirty = True
+            self._built = True
+            self._last_scan = time.time()
+        self.save()
+        logger.info(f"Image checksum index built: {len(self._entries)} images ({hashed} hashed)")
+        return hashed
+
+    def start_build(self) -> bool:
+        """
+        Run build() on a background thread unless a scan is already running.
+
+        Returns:
+            True if a scan was started
+        """
+        with self._lock:
+            if self._scan_thread is not None and self._scan_thread.is_alive():
+                return False
+            self._last_scan = time.time()
+            self._scan_thread = threading.Thread(
+                target=self._build_in_background, name='image-checksum-scan', daemon=True
+            )
+            thread = self._scan_thread
+        thread.start()
+        return True
+
+    def _build_in_background(self) -> None:
+        try:
+            self.build()
+        except Exception as e:
+            logger.warning(f"Image checksum index scan failed: {e}")
+
+    def wait_for_build(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a running background scan. Returns True once the index has been built."""
+        thread = self._scan_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._built
+
+    def _rescan_if_due(self) -> None:
+        if not self._built or time.time() - self._last_scan >= self.rescan_interval:
+            self.start_build()
+
+    def update_path(self, path: str) -> None:
+        """Re-index a created or modified file."""
+        rel = self._relative(path)
+        if rel is None or not self._is_image(path) or self._skip_relative(rel):
+            return
+        self._index_file(os.path.abspath(path), rel)
+        self._maybe_save()
+
+    def remove_path(self, path: str, recursive: bool = False) -> None:
+        """Drop a deleted file (or directory, if recursive) from the index."""
+        rel = self._relative(path)
+        if rel is None:
+            return
+        with self._lock:
+            changed = self._drop_entry(rel)
+            if recursive:
+                prefix = rel.rstrip('/') + '/'
+                for child in [r for r in self._entries if r.startswith(prefix)]:
+                    changed = self._drop_entry(child) or changed
+            if changed:
+                self._dirty = True
+        self._maybe_save()
+
+    def move_path(self, src_path: str, dest_path: str, recursive: bool = False) -> None:
+        """Carry entries over to a moved file or directory without rehashing."""
+        src = self._relative(src_path)
+        dest = self._relative(dest_path)
+        with self._lock:
+            moves = []
+            if src is not None:
+                if src in self._entries:
+                    moves.append((src, dest))
+                if recursive:
+                    prefix = src.rstrip('/') + '/'
+                    moves.extend(
+                        (r, (dest.rstrip('/') + '/' + r[len(prefix):]) if dest is not None else None)
+                        for r in self._entries if r.startswith(prefix)
+                    )
+            for old_rel, new_rel in moves:
+                entry = self._entries[old_rel]
+                self._drop_entry(old_rel)
+                if new_rel is not None and self._is_image(new_rel) and not self._skip_relative(new_rel):
+                    self._set_entry(new_rel, entry)
+                self._dirty = True
+        if not recursive and dest is not None and not moves:
+            # Moved in from outside the index (or from a non-image name)
+            self.update_path(dest_path)
+        self._maybe_save()
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+    def lookup(self, checksum: str) -> Optional[Path]:
+        """
+        Find an image with the given checksum.
+
+        Args:
+            checksum: SHA256 checksum to match
+
+        Returns:
+            Path if found, None otherwise
+        """
+        if not self._loaded:
+            self.load()
+        found = self._lookup_indexed(checksum)
+        if found is None:
+            # Pick up changes made while no watcher was running
+            self._rescan_if_due()
+        self._maybe_save()
+        return found
+
+    def lookup_name(self, fragment: str) -> Optional[Path]:
+        """
+        Find an image whose filename contains fragment (e.g. an image_id).
+
+        Args:
+            fragment: Substring to match against indexed filenames
+
+        Returns:
+            Path if found, None otherwise
+        """
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            candidates = sorted(rel for rel in self._entries if fragment in rel.rsplit('/', 1)[-1])
+        for rel in candidates:
+            abs_path = self.workspace_path / rel
+            if abs_path.is_file():
+                return abs_path
+        self._rescan_if_due()
+        return None
+
+    def _lookup_indexed(self, checksum: str) -> Optional[Path]:
+        with self._lock:
+            candidates = sorted(self._by_checksum.get(checksum, ()))
+        for rel in candidates:
+            abs_path = self.workspace_path / rel
+            # Verify the entry is still current before trusting it
+            self._index_file(str(abs_path), rel)
+            with self._lock:
+                entry = self._entries.get(rel)
+            if entry and entry['checksum'] == checksum:
+                return abs_path
+        return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -------------------------
+    # Watcher integration
+    # -------------------------
+    async def attach(self, message_broker) -> None:
+        """Keep the index current from FileSystemService watcher events."""
+        if self._subscribed:
+            return
+        self._subscribed = True
+        await message_broker.subscribe('fs.file_*', self._handle_fs_event)
+
+    async def _handle_fs_event(self, message) -> None:
+        topic = message.topic
+        payload = message.payload if isinstance(message.payload, dict) else {}
+        if topic.endswith('.batch'):
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            if topic in ('fs.file_created', 'fs.file_modified', 'fs.file_written'):
+                path = payload.get('file_path')
+                if path and self._is_image(path):
+                    await loop.run_in_executor(None, self.update_path, path)
+            elif topic == 'fs.file_copied':
+                path = payload.get('dest_path')
+                if path and self._is_image(path):
+                    await loop.run_in_executor(None, self.update_path, path)
+            elif topic == 'fs.file_deleted':
+                path = payload.get('file_path')
+                if path:
+                    self.remove_path(path, recursive=bool(payload.get('is_directory')))
+            elif topic == 'fs.file_moved':
+                src, dest = payload.get('src_path'), payload.get('dest_path')
+                if src and dest:
+                    await loop.run_in_executor(
+                        None, self.move_path, src, dest, bool(payload.get('is_directory'))
+                    )
+        except Exception as e:
+            logger.debug(f"Image checksum index failed to handle {topic}: {e}")
+
+
+# Shared indexes per workspace
+_indexes: Dict[str, ImageChecksumIndex] = {}
+# Loop the icpy services run on; recorded by attach_image_checksum_indexes()
+_services_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_image_checksum_index(workspace_path: str) -> ImageChecksumIndex:
+    """Get the shared checksum index for a workspace, attaching it to FS events when possible."""
+    key = str(Path(workspace_path).resolve())
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = ImageChecksumIndex(
+            key, rescan_interval=env_float('IMAGE_CHECKSUM_RESCAN_SECONDS', 30.0)
+        )
+        index.start_build()
+        _schedule_attach(index)
+    return index
+
+
+async def attach_image_checksum_indexes() -> None:
+    """
+    Record the services loop and attach existing indexes to broker events.
+
+    Called at service startup. Lookups may come from agent tool loops, so
+    broker subscriptions are always made on this loop rather than on
+    whichever loop first asked for an index.
+    """
+    global _services_loop
+    _services_loop = asyncio.get_running_loop()
+    for index in list(_indexes.values()):
+        await _attach_to_broker(index)
+
+
+def _schedule_attach(index: ImageChecksumIndex) -> None:
+    # Before the services loop is known the index is attached by
+    # attach_image_checksum_indexes()
+    loop = _services_loop
+    if loop is None or not loop.is_running():
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        loop.create_task(_attach_to_broker(index))
+    else:
+        asyncio.run_coroutine_threadsafe(_attach_to_broker(index), loop)
+
+
+async def _attach_to_broker(index: ImageChecksumIndex) -> None:
+    try:
+        from ..core.message_broker import get_message_broker
+        broker = await get_message_broker()
+        if broker.running:
+            await index.attach(broker)
+    except Exception as e:
+        logger.debug(f"Image checksum index not attached to watcher events: {e}")
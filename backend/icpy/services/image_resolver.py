@@ -8,7 +8,7 @@ from typing import Optional, Dict
 from dataclasses import dataclass
 
 from .image_reference_service import ImageReference
-from ..utils.thumbnail_generator import calculate_checksum
+from .image_checksum_index import get_image_checksum_index
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +19,9 @@ class ImageResolver:
     
     Resolution strategy order:
     1. Try current_filename at relative_path (fastest)
-    2. Search workspace for files containing image_id
-    3. Search workspace for files matching checksum
+    2. Try absolute_path (in case the workspace moved)
+    3. Look up image_id in indexed filenames, then the checksum
+       (both from the workspace checksum index, no directory walk)
     4. Fallback to thumbnail_path
     5. Return None if not found
     """
@@ -72,7 +73,7 @@ class ImageResolver:
             self._cache_resolution(reference.image_id, reference.absolute_path)
             return reference.absolute_path
         
-        # Strategy 3: Search for files containing image_id in filename
+        # Strategy 3: Workspace index, by image_id in filename then by checksum
         found_by_id = self._search_by_image_id(reference.image_id)
         if found_by_id:
             logger.info(f"Resolved by image_id search: {found_by_id}")
@@ -81,7 +82,6 @@ class ImageResolver:
                 reference.current_filename = found_by_id.name
             return str(found_by_id)
         
-        # Strategy 4: Search by checksum (if available)
         if reference.checksum:
             found_by_checksum = self._search_by_checksum(reference.checksum)
             if found_by_checksum:
@@ -91,7 +91,7 @@ class ImageResolver:
                     reference.current_filename = found_by_checksum.name
                 return str(found_by_checksum)
         
-        # Strategy 5: Fallback to legacy thumbnail_path (DEPRECATED)
+        # Strategy 4: Fallback to legacy thumbnail_path (DEPRECATED)
         if reference.thumbnail_path and reference.thumbnail_path.strip():
             thumbnail_path = Path(reference.thumbnail_path)
             if thumbnail_path.exists():
@@ -110,7 +110,7 @@ class ImageResolver:
     
     def _search_by_image_id(self, image_id: str) -> Optional[Path]:
         """
-        Search workspace for files containing image_id in filename.
+        Find an indexed image whose filename contains image_id.
         
         Args:
             image_id: Image ID to search for
@@ -119,27 +119,16 @@ class ImageResolver:
             Path if found, None otherwise
         """
         try:
-            # Common image extensions
-            extensions = ['*.png', '*.jpg', '*.jpeg', '*.webp', '*.gif']
-            
-            for ext in extensions:
-                for file_path in self.workspace_path.rglob(ext):
-                    # Skip thumbnails directory
-                    if '.icotes/thumbnails' in str(file_path):
-                        continue
-                    
-                    if image_id in file_path.name:
-                        return file_path
-            
-            return None
+            return get_image_checksum_index(str(self.workspace_path)).lookup_name(image_id)
         except Exception as e:
             logger.warning(f"Error searching by image_id: {e}")
             return None
     
     def _search_by_checksum(self, target_checksum: str) -> Optional[Path]:
         """
-        Search workspace for files matching checksum.
-        This is slow but reliable for completely renamed files.
+        Find a file matching checksum via the workspace checksum index.
+        Reliable for completely renamed files; the index is built in the
+        background and then kept current from filesystem events.
         
         Args:
             target_checksum: SHA256 checksum to match
@@ -148,34 +137,7 @@ class ImageResolver:
             Path if found, None otherwise
         """
         try:
-            # Common image extensions
-            extensions = ['*.png', '*.jpg', '*.jpeg', '*.webp', '*.gif']
-            
-            # Limit search to reasonable number of files
-            max_files_to_check = 100
-            files_checked = 0
-            
-            for ext in extensions:
-                for file_path in self.workspace_path.rglob(ext):
-                    # Skip thumbnails directory
-                    if '.icotes/thumbnails' in str(file_path):
-                        continue
-                    
-                    files_checked += 1
-                    if files_checked > max_files_to_check:
-                        logger.warning(f"Checksum search limit reached ({max_files_to_check} files)")
-                        return None
-                    
-                    try:
-                        file_checksum = calculate_checksum(str(file_path))
-                        if file_checksum == target_checksum:
-                            logger.info(f"Found match by checksum after checking {files_checked} files")
-                            return file_path
-                    except Exception as e:
-                        logger.debug(f"Error calculating checksum for {file_path}: {e}")
-                        continue
-            
-            return None
+            return get_image_checksum_index(str(self.workspace_path)).lookup(target_checksum)
         except Exception as e:
             logger.warning(f"Error searching by checksum: {e}")
             return None
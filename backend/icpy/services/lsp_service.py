@@ -4,14 +4,14 @@ Provides code intelligence features through LSP client implementation
 """
 
 import asyncio
-import json
 import logging
 import os
 import tempfile
 import uuid
 import shutil
 import subprocess
-from typing import Dict, List, Optional, Any, Set, Tuple, Union, Callable
+import time
+from typing import Dict, List, Optional, Any, Set, Tuple, Union, Callable, Awaitable
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
@@ -19,6 +19,8 @@ import weakref
 
 # Internal imports
 from ..core.message_broker import MessageBroker, Message, MessageType, get_message_broker
+from ..utils.lsp_framing import LSPMessageReader, LSPProtocolError, encode_lsp_message
+from ..utils.lsp_text_sync import compute_content_changes
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +42,13 @@ class DiagnosticSeverity(Enum):
     HINT = 4
 
 
+class TextDocumentSyncKind(Enum):
+    """How a server wants textDocument/didChange content sent"""
+    NONE = 0
+    FULL = 1
+    INCREMENTAL = 2
+
+
 @dataclass
 class LSPServerConfig:
     """Configuration for an LSP server"""
@@ -90,6 +99,7 @@ class LSPServer:
     last_error: Optional[str] = None
     message_id_counter: int = 0
     pending_requests: Dict[int, asyncio.Future] = field(default_factory=dict)
+    reader: Optional[LSPMessageReader] = None
 
 
 class LSPService:
@@ -125,10 +135,28 @@ class LSPService:
         # Server configurations
         self.server_configs: Dict[str, LSPServerConfig] = self._get_default_server_configs()
         
-        # Caching
-        self.completion_cache: Dict[str, List[CompletionItem]] = {}
-        self.hover_cache: Dict[str, Dict[str, Any]] = {}
+        # Caching: (uri, document version, ...) -> (stored at, response)
+        self.completion_cache: Dict[Tuple, Tuple[float, Any]] = {}
+        self.hover_cache: Dict[Tuple, Tuple[float, Any]] = {}
+        self.symbol_cache: Dict[Tuple, Tuple[float, Any]] = {}
+        self.workspace_symbol_cache: Dict[Tuple, Tuple[float, Any]] = {}  # (language, query) -> ...
         self.cache_ttl = 300  # 5 minutes
+        self.cache_max_entries = 1000  # per cache
+        self._cache_generation = 0  # bumped on every invalidation
+        self._inflight_requests: Dict[Tuple, asyncio.Future] = {}
+        
+        # Document updates arriving within this window are sent as one didChange (0 sends each)
+        try:
+            self.change_debounce = max(0.0, float(os.getenv('LSP_CHANGE_DEBOUNCE_MS', '50')) / 1000)
+        except ValueError:
+            self.change_debounce = 0.05
+        self._change_flush_tasks: Dict[str, asyncio.Task] = {}  # uri -> pending didChange flush
+        
+        # Server messages from this size on are parsed off the event loop thread (0 disables)
+        try:
+            self.json_offload_bytes: Optional[int] = int(os.getenv('LSP_JSON_OFFLOAD_BYTES', '0')) or None
+        except ValueError:
+            self.json_offload_bytes = None
         
         # Statistics
         self.stats = {
@@ -139,6 +167,11 @@ class LSPService:
             'hover_requests': 0,
             'definition_requests': 0,
             'references_requests': 0,
+            'changes_incremental': 0,
+            'changes_full': 0,
+            'changes_coalesced': 0,
+            'cache_hits': 0,
+            'requests_coalesced': 0,
         }
         
         logger.info("LSPService initialized")
@@ -240,6 +273,9 @@ class LSPService:
         # Subscribe to LSP events
         try:
             self._broker_subscription_id = await self.message_broker.subscribe("lsp.*", self._handle_lsp_message)
+            # Workspace symbols can't be tied to one document; drop them on any file change
+            await self.message_broker.subscribe(
+                "fs.file_*", self._handle_fs_event, subscriber_id=self._broker_subscription_id)
         except Exception:
             # Non-fatal in tests if broker is mocked or unavailable
             self._broker_subscription_id = None
@@ -254,6 +290,10 @@ class LSPService:
         
         self.running = False
         
+        for task in self._change_flush_tasks.values():
+            task.cancel()
+        self._change_flush_tasks.clear()
+        
         # Stop all LSP servers
         for server_id in list(self.servers.keys()):
             await self.stop_server(server_id)
@@ -483,12 +523,8 @@ class LSPService:
             "method": method,
             "params": params,
         }
-        body = json.dumps(req).encode()
-        header = f"Content-Length: {len(body)}\r\n\r\n".encode()
-        
         # Write to server stdin
-        srv.process.stdin.write(header)
-        srv.process.stdin.write(body)
+        srv.process.stdin.write(encode_lsp_message(req))
         await srv.process.stdin.drain()
         
         # Minimal: return empty result; tests patch or only verify write
@@ -537,9 +573,13 @@ class LSPService:
             'server_id': server_id,
             'language': language,
             'version': 1,
-            'path': file_path
+            'path': file_path,
+            'text': content,  # as last sent to the server
+            'pending_text': None
         }
         server.open_documents.add(uri)
+        # Versions restart at 1, so responses from an earlier open must go
+        self._invalidate_document_cache(uri)
         self.stats['documents_open'] = len(self.open_documents)
         
         logger.debug(f"Opened document in LSP: {file_path}")
@@ -563,6 +603,11 @@ class LSPService:
         doc_info = self.open_documents[uri]
         server = self.servers.get(doc_info['server_id'])
         
+        # Changes still waiting for the debounce window are moot once closed
+        flush_task = self._change_flush_tasks.pop(uri, None)
+        if flush_task:
+            flush_task.cancel()
+        
         if server:
             # Send textDocument/didClose notification
             params = {
@@ -578,6 +623,7 @@ class LSPService:
         del self.open_documents[uri]
         if uri in self.document_diagnostics:
             del self.document_diagnostics[uri]
+        self._invalidate_document_cache(uri)
         
         self.stats['documents_open'] = len(self.open_documents)
         
@@ -588,6 +634,11 @@ class LSPService:
         """
         Update document content in LSP server
         
+        Updates within the debounce window are coalesced into one
+        textDocument/didChange, sent as a ranged edit when the server
+        supports incremental sync. Requests for the document flush any
+        pending change first.
+        
         Args:
             file_path: File path
             content: Updated content
@@ -606,28 +657,14 @@ class LSPService:
         if not server or server.state != LSPServerState.RUNNING:
             return False
         
-        # Increment version
-        doc_info['version'] += 1
-        
-        # Send textDocument/didChange notification
-        params = {
-            "textDocument": {
-                "uri": uri,
-                "version": doc_info['version']
-            },
-            "contentChanges": [
-                {
-                    "text": content
-                }
-            ]
-        }
-        
-        await self._send_notification(server, "textDocument/didChange", params)
+        if doc_info.get('pending_text') is not None:
+            self.stats['changes_coalesced'] += 1
+        doc_info['pending_text'] = content
         
-        # Clear caches for this document
-        cache_key = f"{uri}:"
-        self.completion_cache = {k: v for k, v in self.completion_cache.items() if not k.startswith(cache_key)}
-        self.hover_cache = {k: v for k, v in self.hover_cache.items() if not k.startswith(cache_key)}
+        if self.change_debounce <= 0:
+            await self._flush_document_changes(uri)
+        elif uri not in self._change_flush_tasks:
+            self._change_flush_tasks[uri] = asyncio.create_task(self._flush_document_changes_later(uri))
         
         logger.debug(f"Updated document in LSP: {file_path}")
         return True
@@ -644,55 +681,59 @@ class LSPService:
         if len(args) == 3:
             file_path, line, character = args
             uri = f"file://{os.path.abspath(file_path)}" if not str(file_path).startswith("file://") else str(file_path)
+            params = {
+                "textDocument": {"uri": uri},
+                "position": {"line": line, "character": character}
+            }
 
             if uri not in self.open_documents:
                 # Fallback: infer language and forward request directly (mock-friendly)
                 language = self._infer_language_from_path(uri)
                 if language:
-                    try:
-                        response = await self.send_request(language, "textDocument/completion", {
-                            "textDocument": {"uri": uri},
-                            "position": {"line": line, "character": character}
-                        })
+                    async def fetch_fallback():
+                        response = await self.send_request(language, "textDocument/completion", params)
                         if isinstance(response, dict) and 'items' in response:
                             return response['items']
                         return response or []
+
+                    try:
+                        return await self._document_request(
+                            self.completion_cache, uri, (line, character, language), fetch_fallback)
                     except Exception as e:
                         logger.debug(f"Completion fallback failed: {e}")
                 return []
 
-            # Check cache
-            cache_key = f"{uri}:{line}:{character}"
-            if cache_key in self.completion_cache:
-                return self.completion_cache[cache_key]
+            await self._flush_document_changes(uri)
 
             doc_info = self.open_documents[uri]
             server = self.servers.get(doc_info['server_id'])
             if not server or not (server.capabilities or {}).get('completionProvider'):
                 return []
 
-            params = {
-                "textDocument": {"uri": uri},
-                "position": {"line": line, "character": character}
-            }
-            try:
+            async def fetch_items():
                 response = await self._send_request(server, "textDocument/completion", params)
-                items: List[CompletionItem] = []
-                if response:
-                    completion_list = response if isinstance(response, list) else response.get('items', [])
-                    for item in completion_list:
-                        items.append(CompletionItem(
-                            label=item.get('label', ''),
-                            kind=item.get('kind'),
-                            detail=item.get('detail'),
-                            documentation=item.get('documentation'),
-                            insert_text=item.get('insertText'),
-                            filter_text=item.get('filterText'),
-                            sort_text=item.get('sortText')
-                        ))
-                self.completion_cache[cache_key] = items
+                if response is None:
+                    return None
+                completion_list = response if isinstance(response, list) else response.get('items', [])
+                items = [
+                    CompletionItem(
+                        label=item.get('label', ''),
+                        kind=item.get('kind'),
+                        detail=item.get('detail'),
+                        documentation=item.get('documentation'),
+                        insert_text=item.get('insertText'),
+                        filter_text=item.get('filterText'),
+                        sort_text=item.get('sortText')
+                    )
+                    for item in completion_list
+                ]
                 self.stats['completions_served'] += len(items)
                 return items
+
+            try:
+                items = await self._cached_request(
+                    self.completion_cache, self._document_cache_key(uri, line, character), fetch_items)
+                return items or []
             except Exception as e:
                 logger.error(f"Error getting completions: {e}")
                 return []
@@ -704,12 +745,17 @@ class LSPService:
                 "textDocument": {"uri": uri},
                 "position": {"line": line, "character": character}
             }
-            try:
+
+            async def fetch_raw():
                 response = await self.send_request(language, "textDocument/completion", params)
                 # If response contains items, return the list; else return raw
                 if isinstance(response, dict) and 'items' in response:
                     return response['items']
                 return response
+
+            try:
+                return await self._document_request(
+                    self.completion_cache, uri, (line, character, language, 'raw'), fetch_raw)
             except Exception as e:
                 logger.error(f"Error getting completions (lang mode): {e}")
                 return []
@@ -735,52 +781,45 @@ class LSPService:
         """
         # Support both plain paths and URIs; if URI and not opened, use send_request path
         uri = f"file://{os.path.abspath(file_path)}" if not str(file_path).startswith("file://") else str(file_path)
+        params = {
+            "textDocument": {
+                "uri": uri
+            },
+            "position": {
+                "line": line,
+                "character": character
+            }
+        }
         
         if uri not in self.open_documents:
             # Try to infer language from extension for public send_request usage
             language = self._infer_language_from_path(uri)
             try:
-                return await self.send_request(language, "textDocument/hover", {
-                    "textDocument": {"uri": uri},
-                    "position": {"line": line, "character": character}
-                })
+                return await self._document_request(
+                    self.hover_cache, uri, (line, character, language),
+                    lambda: self.send_request(language, "textDocument/hover", params))
             except Exception:
                 return None
         
-        # Check cache
-        cache_key = f"{uri}:{line}:{character}"
-        if cache_key in self.hover_cache:
-            return self.hover_cache[cache_key]
+        await self._flush_document_changes(uri)
         
         doc_info = self.open_documents[uri]
         server = self.servers.get(doc_info['server_id'])
         
-        if not server or not server.capabilities.get('hoverProvider'):
+        if not server or not (server.capabilities or {}).get('hoverProvider'):
             return None
         
-        # Send hover request
-        params = {
-            "textDocument": {
-                "uri": uri
-            },
-            "position": {
-                "line": line,
-                "character": character
-            }
-        }
-        
-        try:
+        async def fetch_hover():
             response = await self._send_request(server, "textDocument/hover", params)
-            
             if response:
-                # Cache results
-                self.hover_cache[cache_key] = response
                 self.stats['hover_requests'] += 1
-                
                 return response
-            
             return None
         
+        try:
+            return await self._cached_request(
+                self.hover_cache, self._document_cache_key(uri, line, character), fetch_hover)
+        
         except Exception as e:
             logger.error(f"Error getting hover info: {e}")
             return None
@@ -837,6 +876,145 @@ class LSPService:
     
     # Internal methods
     
+    def _document_cache_key(self, uri: str, *parts: Any) -> Tuple:
+        """Cache key for a query on a document at its current version"""
+        doc_info = self.open_documents.get(uri)
+        return (uri, doc_info['version'] if doc_info else None) + parts
+    
+    def _invalidate_document_cache(self, uri: str) -> None:
+        """Drop cached responses for a document and all workspace-wide ones"""
+        self._cache_generation += 1
+        for cache in (self.completion_cache, self.hover_cache, self.symbol_cache):
+            for key in [k for k in cache if k[0] == uri]:
+                del cache[key]
+        self.workspace_symbol_cache.clear()
+    
+    async def _document_request(self, cache: Dict[Tuple, Tuple[float, Any]], uri: str, parts: Tuple,
+                                fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cache a per-document query only while the document is open.
+        
+        Open documents are versioned, so their cached responses are
+        invalidated by edits. Files that were never opened can change on disk
+        without notice (e.g. agent edits), so those requests always go out.
+        """
+        if uri not in self.open_documents:
+            return await fetch()
+        return await self._cached_request(cache, self._document_cache_key(uri, *parts), fetch)
+    
+    async def _handle_fs_event(self, message: Message) -> None:
+        """Drop workspace symbol results when files change on disk"""
+        if not message.topic.startswith("fs.file_read"):
+            self._cache_generation += 1
+            self.workspace_symbol_cache.clear()
+    
+    async def _cached_request(self, cache: Dict[Tuple, Tuple[float, Any]], key: Tuple,
+                              fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Serve a read-only query from cache, or share one in-flight request.
+        
+        Concurrent callers with the same key await the same request. A
+        non-None result is cached unless the cache was invalidated while the
+        request was in flight. Exceptions propagate to every waiter.
+        """
+        entry = cache.get(key)
+        if entry is not None:
+            if time.monotonic() - entry[0] < self.cache_ttl:
+                self.stats['cache_hits'] += 1
+                return entry[1]
+            del cache[key]
+        
+        inflight_key = (id(cache),) + key
+        task = self._inflight_requests.get(inflight_key)
+        if task is not None:
+            self.stats['requests_coalesced'] += 1
+        else:
+            generation = self._cache_generation
+            task = asyncio.ensure_future(fetch())
+            self._inflight_requests[inflight_key] = task
+            
+            def _store(done: asyncio.Future) -> None:
+                if self._inflight_requests.get(inflight_key) is done:
+                    del self._inflight_requests[inflight_key]
+                if done.cancelled() or done.exception() is not None:
+                    return
+                result = done.result()
+                if result is None or generation != self._cache_generation:
+                    return
+                if len(cache) >= self.cache_max_entries:
+                    del cache[next(iter(cache))]
+                cache[key] = (time.monotonic(), result)
+            
+            task.add_done_callback(_store)
+        
+        # One caller going away must not cancel the request for the others
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    def _text_document_sync_kind(server: LSPServer) -> TextDocumentSyncKind:
+        """Read the change sync kind from server capabilities (full if unspecified)"""
+        sync = (server.capabilities or {}).get('textDocumentSync')
+        if isinstance(sync, dict):
+            sync = sync.get('change')
+        try:
+            return TextDocumentSyncKind(sync)
+        except ValueError:
+            return TextDocumentSyncKind.FULL
+    
+    async def _flush_document_changes_later(self, uri: str) -> None:
+        """Send a document's pending change once the debounce window ends"""
+        await asyncio.sleep(self.change_debounce)
+        if self._change_flush_tasks.get(uri) is asyncio.current_task():
+            del self._change_flush_tasks[uri]
+        await self._flush_document_changes(uri)
+    
+    async def _flush_document_changes(self, uri: str) -> None:
+        """Send the pending content of an open document as textDocument/didChange"""
+        flush_task = self._change_flush_tasks.pop(uri, None)
+        if flush_task and flush_task is not asyncio.current_task():
+            flush_task.cancel()
+        
+        doc_info = self.open_documents.get(uri)
+        if not doc_info or doc_info.get('pending_text') is None:
+            return
+        content = doc_info['pending_text']
+        doc_info['pending_text'] = None
+        
+        server = self.servers.get(doc_info['server_id'])
+        if not server or server.state != LSPServerState.RUNNING:
+            return
+        
+        # Everything up to the write happens without awaiting, so concurrent
+        # flushes still reach the server in version order
+        sync_kind = self._text_document_sync_kind(server)
+        changes = None
+        if sync_kind == TextDocumentSyncKind.INCREMENTAL and doc_info.get('text') is not None:
+            changes = compute_content_changes(doc_info['text'], content)
+            if changes == []:
+                return
+        doc_info['text'] = content
+        
+        self._invalidate_document_cache(uri)
+        
+        if sync_kind == TextDocumentSyncKind.NONE:
+            return
+        
+        doc_info['version'] += 1
+        if changes is None:
+            changes = [{"text": content}]
+            self.stats['changes_full'] += 1
+        else:
+            self.stats['changes_incremental'] += 1
+        
+        params = {
+            "textDocument": {
+                "uri": uri,
+                "version": doc_info['version']
+            },
+            "contentChanges": changes
+        }
+        await self._send_notification(server, "textDocument/didChange", params)
+    
     async def _ensure_server_running(self, language: str, workspace_path: str) -> Optional[str]:
         """Ensure LSP server is running for a language"""
         if language in self.language_servers:
@@ -963,11 +1141,7 @@ class LSPService:
         
         try:
             # Send request
-            request_data = json.dumps(request) + "\r\n"
-            content_length = len(request_data.encode('utf-8'))
-            message = f"Content-Length: {content_length}\r\n\r\n{request_data}"
-            
-            server.process.stdin.write(message.encode('utf-8'))
+            server.process.stdin.write(encode_lsp_message(request))
             await server.process.stdin.drain()
             
             # Wait for response with timeout
@@ -993,11 +1167,7 @@ class LSPService:
         
         try:
             # Send notification
-            notification_data = json.dumps(notification) + "\r\n"
-            content_length = len(notification_data.encode('utf-8'))
-            message = f"Content-Length: {content_length}\r\n\r\n{notification_data}"
-            
-            server.process.stdin.write(message.encode('utf-8'))
+            server.process.stdin.write(encode_lsp_message(notification))
             await server.process.stdin.drain()
         
         except Exception as e:
@@ -1022,58 +1192,15 @@ class LSPService:
     
     async def _read_lsp_message(self, server: LSPServer) -> Optional[Dict[str, Any]]:
         """Read LSP message from server"""
+        stdout = server.process.stdout
+        if server.reader is None or server.reader.stream is not stdout:
+            server.reader = LSPMessageReader(stdout, offload_threshold=self.json_offload_bytes)
         try:
-            # Read headers
-            headers = {}
-            while True:
-                line = await server.process.stdout.readline()
-                # Some mocks may yield a coroutine-like object again; unwrap if needed
-                if asyncio.iscoroutine(line):
-                    line = await line
-                if not line:
-                    return None
-                # Normalize to text
-                if isinstance(line, bytes):
-                    line = line.decode('utf-8')
-                else:
-                    line = str(line)
-                line = line.strip()
-                if not line:
-                    break
-                
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    headers[key.strip()] = value.strip()
-            
-            # Read content
-            content_length = int(headers.get('Content-Length', 0))
-            if content_length == 0:
-                return None
-            
-            content = await server.process.stdout.read(content_length)
-            # Some mocks don't implement read() properly; handle coroutines and fall back to readline
-            if asyncio.iscoroutine(content):
-                content = await content
-            if not content:
-                try:
-                    # Fallback: read one line for content
-                    line = await server.process.stdout.readline()
-                    if asyncio.iscoroutine(line):
-                        line = await line
-                    content = line or b""
-                except Exception:
-                    content = b""
-            if not content:
-                return None
-            
-            # Parse JSON
-            # Content may include trailing newlines
-            if isinstance(content, bytes):
-                decoded = content.decode('utf-8').strip()
-            else:
-                decoded = str(content).strip()
-            return json.loads(decoded)
-        
+            return await server.reader.read_message()
+        except LSPProtocolError as e:
+            # The stream can't be resynchronized after a framing error
+            logger.error(f"Invalid LSP message framing from {server.server_id}: {e}")
+            return None
         except Exception as e:
             logger.error(f"Error reading LSP message: {e}")
             return None
@@ -1171,12 +1298,18 @@ class LSPService:
     async def notify_file_changed(self, file_path: str, new_content: Optional[str] = None) -> None:
         """Best-effort broadcast that a file changed to running servers.
         Tests patch send_notification and only assert it was called.
+        Documents opened through open_document go through update_document so
+        the change is versioned and can be sent incrementally.
         """
         uri = file_path if str(file_path).startswith("file://") else f"file://{os.path.abspath(file_path)}"
+        if new_content is not None and uri in self.open_documents:
+            if await self.update_document(uri[len("file://"):], new_content):
+                return
         params = {
             "textDocument": {"uri": uri},
             "contentChanges": ([{"text": new_content}] if new_content is not None else [])
         }
+        self._invalidate_document_cache(uri)
         await self.send_notification("all", "textDocument/didChange", params)
 
     async def goto_definition(self, language: str, uri: str, line: int, character: int) -> Optional[Dict[str, Any]]:
@@ -1193,7 +1326,9 @@ class LSPService:
     async def workspace_symbol_search(self, language: str, query: str) -> List[Dict[str, Any]]:
         """LSP workspace/symbol wrapper."""
         try:
-            result = await self.send_request(language, "workspace/symbol", {"query": query})
+            result = await self._cached_request(
+                self.workspace_symbol_cache, (language, query),
+                lambda: self.send_request(language, "workspace/symbol", {"query": query}))
             return result or []
         except Exception as e:
             logger.error(f"Error in workspace_symbol_search: {e}")
@@ -1219,9 +1354,11 @@ class LSPService:
         if not language:
             return []
         try:
-            result = await self.send_request(language, "textDocument/documentSymbol", {
-                "textDocument": {"uri": uri}
-            })
+            result = await self._document_request(
+                self.symbol_cache, uri, (language,),
+                lambda: self.send_request(language, "textDocument/documentSymbol", {
+                    "textDocument": {"uri": uri}
+                }))
             return result or []
         except Exception as e:
             logger.error(f"Error in get_document_symbols: {e}")
@@ -15,18 +15,24 @@ Notes:
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import os
 import posixpath
+import secrets
+import shlex
 import stat
 import time
+from contextlib import aclosing, asynccontextmanager
 from dataclasses import asdict
-import io
-import secrets
 from typing import Any, Dict, List, Optional, Tuple, AsyncIterator, Coroutine, TypeVar
 from types import SimpleNamespace
 
 from .hop_service import get_hop_service, ASYNCSSH_AVAILABLE, OPERATION_TIMEOUT
+from .hop_connection_pool import CONNECTION_ERRORS
+from .sftp_transfer import TRANSFER_CHUNK_SIZE, TRANSFER_RETRIES, TransferState, read_chunks, write_chunks
+from .remote_tree_walker import WALK_CONCURRENCY, entry_mode, read_remote_dir, walk_remote_tree
+from .remote_metadata_cache import get_remote_metadata_cache
 from .filesystem_service import FileInfo, FileType, FilePermission
 from ..core.message_broker import get_message_broker
 
@@ -34,6 +40,33 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+# Run copy/delete/search as commands on the remote host when it has the tools
+REMOTE_EXEC_ENABLED = os.getenv('HOP_REMOTE_EXEC', '1') not in ('0', 'false', 'False')
+# Remote cp/rm of whole trees can take far longer than a single SFTP operation
+REMOTE_EXEC_TIMEOUT = float(os.getenv('HOP_REMOTE_EXEC_TIMEOUT', '1800'))
+# Directories left out of every remote search (find, rg/grep and the SFTP walk)
+SEARCH_SKIP_DIRS = ('.git', 'node_modules')
+# Content matches reported per file by remote search
+SEARCH_MATCHES_PER_FILE = 5
+SEARCH_LINE_MAX_CHARS = 300
+
+# fs.transfer_progress events are published for files at least this large, at most this often
+TRANSFER_PROGRESS_MIN_BYTES = 1024 * 1024
+TRANSFER_PROGRESS_INTERVAL = 0.5
+
+# context_id -> tools found on its host (see _remote_tools)
+_remote_tool_sets: Dict[str, frozenset] = {}
+
+_TOOL_PROBE = (
+    "for t in cp rm rg grep find; do command -v $t >/dev/null 2>&1 && echo $t; done; "
+    "find / -maxdepth 0 -printf '' >/dev/null 2>&1 && echo find-printf"
+)
+_FIND_TYPE_BITS = {'d': stat.S_IFDIR, 'f': stat.S_IFREG, 'l': stat.S_IFLNK}
+
+
+class RemoteCommandError(OSError):
+    """A remote command exited with a failure status."""
+
 async def _with_timeout(coro: Coroutine[Any, Any, T], timeout: float = None, operation: str = "operation") -> T:
     """Phase 8: Wrap async operations with timeout and better error messages."""
     if timeout is None:
@@ -59,6 +92,8 @@ class RemoteFileSystemAdapter:
         self.is_remote: bool = True
         # Optional binding to a specific hop context (for namespaced paths)
         self._context_id: Optional[str] = context_id
+        # Stat/listing cache shared by all adapters (see remote_metadata_cache)
+        self._cache = get_remote_metadata_cache()
 
     async def initialize(self):
         self._hop = await get_hop_service()
@@ -108,6 +143,183 @@ class RemoteFileSystemAdapter:
         # Fallback to active context
         return self._hop.get_active_sftp()
 
+    @asynccontextmanager
+    async def _loop_sftp(self, operation: str = "operation", fresh: bool = False):
+        """Yield an SFTP client usable from the running event loop.
+
+        On the hop service's own loop this is the context's live client. Any
+        other loop (e.g. agent tool threads) gets a pooled client created on
+        that loop, since AsyncSSH objects can't be shared across loops.
+        With fresh=True (retrying after a dropped connection) a pooled client
+        is leased on the hop loop too, as the live client may be dead.
+        """
+        sftp = self._sftp()
+        hop = self._hop or await get_hop_service()
+        hop_loop = None
+        try:
+            hop_loop = getattr(hop, 'get_active_loop', lambda: None)()
+        except Exception:
+            # If loop inspection fails, fall back to default SFTP
+            pass
+        if not fresh and (hop_loop is None or hop_loop is asyncio.get_running_loop()):
+            yield sftp
+            return
+
+        if fresh:
+            logger.debug("[RemoteFS] %s using pooled SFTP after a dropped connection", operation)
+        else:
+            logger.debug("[RemoteFS] %s using pooled SFTP due to loop mismatch", operation)
+        async with hop.ephemeral_sftp(self._context_id) as pooled:
+            if not pooled:
+                logger.warning("[RemoteFS] pooled SFTP unavailable; falling back to active SFTP")
+            yield pooled or sftp
+
+    @asynccontextmanager
+    async def _loop_ssh(self, operation: str = "operation"):
+        """Yield an SSH connection usable from the running event loop (see _loop_sftp)."""
+        hop = self._hop or await get_hop_service()
+        context_id = self._cache_context()
+        conn = hop.get_connection_for_context(context_id) if context_id else None
+        hop_loop = None
+        try:
+            hop_loop = hop.get_active_loop()
+        except Exception:
+            pass
+        if hop_loop is None or hop_loop is asyncio.get_running_loop():
+            yield conn
+            return
+
+        logger.debug("[RemoteFS] %s using pooled SSH due to loop mismatch", operation)
+        async with hop.ephemeral_ssh(self._context_id) as pooled:
+            yield pooled or conn
+
+    async def _run_remote(self, command: str) -> str:
+        """Run a shell command on the remote host and return its stdout."""
+        result = await self._exec(command)
+        if result is None:
+            raise ConnectionError("no SSH connection")
+        return result.stdout or ''
+
+    async def _exec(self, command: str, operation: str = "remote command", timeout: Optional[float] = None):
+        """Run a shell command over the hop's SSH connection; None if there is none.
+
+        If the command outlives timeout (default OPERATION_TIMEOUT) or the
+        caller is cancelled, the remote process is terminated rather than
+        left running after the caller has given up on it.
+        """
+        async with self._loop_ssh(operation) as conn:
+            if conn is None:
+                return None
+            process = await conn.create_process(command)
+            try:
+                return await _with_timeout(process.wait(check=False), timeout, operation=operation)
+            except BaseException:
+                _terminate_process(process)
+                raise
+
+    async def _exec_checked(self, command: str, operation: str, timeout: Optional[float] = None) -> bool:
+        """Run a remote command; False if SSH is unavailable, RemoteCommandError if it fails."""
+        result = await self._exec(command, operation, timeout)
+        if result is None:
+            return False
+        if result.exit_status != 0:
+            message = (result.stderr or '').strip() or f"exit status {result.exit_status}"
+            raise RemoteCommandError(f"{operation} failed: {message}")
+        return True
+
+    async def _exec_lines(self, command: str, operation: str = "remote command") -> AsyncIterator[str]:
+        """Stream a remote command's stdout line by line.
+
+        Closing the generator early (e.g. once enough results are in) closes
+        the channel, which stops the remote command.
+        """
+        async with self._loop_ssh(operation) as conn:
+            if conn is None:
+                return
+            process = await conn.create_process(command)
+            try:
+                while True:
+                    line = await process.stdout.readline()
+                    if not line:
+                        break
+                    yield line.rstrip('\n')
+            finally:
+                process.close()
+                try:
+                    await asyncio.wait_for(process.wait_closed(), timeout=2.0)
+                except Exception:
+                    pass
+
+    async def _remote_tools(self) -> frozenset:
+        """Server-side tools usable on this context's host, probed once per context."""
+        context_id = self._cache_context()
+        if not REMOTE_EXEC_ENABLED or not context_id:
+            return frozenset()
+        tools = _remote_tool_sets.get(context_id)
+        if tools is None:
+            try:
+                result = await self._exec(_TOOL_PROBE, "probe remote tools")
+            except Exception as e:
+                logger.debug(f"[RemoteFS] remote tool probe failed: {e}")
+                result = None
+            if result is None:
+                return frozenset()  # no connection yet; probe again next time
+            tools = frozenset((result.stdout or '').split())
+            _remote_tool_sets[context_id] = tools
+            logger.info(f"[RemoteFS] remote tools for {context_id}: {sorted(tools)}")
+        return tools
+
+    # ------------- metadata cache -------------
+    def _cache_context(self) -> Optional[str]:
+        """Hop context the adapter operates on, or None when not remote."""
+        context_id = self._context_id
+        if context_id is None and self._hop is not None:
+            try:
+                context_id = self._hop.status().contextId
+            except Exception:
+                context_id = None
+        return context_id if context_id and context_id != 'local' else None
+
+    def _invalidate(self, path: str, recursive: bool = False) -> None:
+        context_id = self._cache_context()
+        if context_id:
+            self._cache.invalidate(context_id, path, recursive=recursive)
+
+    def _watch_changes(self, context_id: str) -> None:
+        try:
+            self._cache.ensure_change_feed(context_id, self._get_cwd(), self._run_remote)
+        except Exception as e:
+            logger.debug(f"[RemoteFS] change feed unavailable: {e}")
+
+    async def _read_dir(self, sftp, path: str, fresh: bool = False) -> List[Tuple[str, Any]]:
+        """read_remote_dir served from the metadata cache when fresh.
+
+        With fresh=True the directory is always read and the cache refreshed.
+        """
+        context_id = self._cache_context()
+        if not context_id:
+            return await read_remote_dir(sftp, path)
+        entries = None if fresh else self._cache.get_listing(context_id, path)
+        if entries is None:
+            generation = self._cache.generation(context_id)
+            entries = await read_remote_dir(sftp, path)
+            self._cache.put_listing(context_id, path, entries, generation=generation)
+            self._watch_changes(context_id)
+        return entries
+
+    async def _stat(self, sftp, path: str):
+        """sftp.stat served from the metadata cache when fresh."""
+        context_id = self._cache_context()
+        if not context_id:
+            return await sftp.stat(path)
+        attrs = self._cache.get_stat(context_id, path)
+        if attrs is None:
+            generation = self._cache.generation(context_id)
+            attrs = await sftp.stat(path)
+            self._cache.put_stat(context_id, path, attrs, generation=generation)
+            self._watch_changes(context_id)
+        return attrs
+
     async def _publish(self, topic: str, payload: Dict[str, Any]):
         try:
             if self._message_broker is None:
@@ -164,127 +376,57 @@ class RemoteFileSystemAdapter:
             return None
 
     # ------------- core API -------------
-    async def list_directory(self, dir_path: str, include_hidden: bool = False, recursive: bool = False) -> List[FileInfo]:
-        sftp = self._sftp()
-        logger.info("[RemoteFS] list_directory dir=%s sftp_available=%s", dir_path, bool(sftp))
-        if not sftp:
-            return []
+    async def list_directory(self, dir_path: str, include_hidden: bool = False, recursive: bool = False,
+                             refresh: bool = False) -> List[FileInfo]:
         path = self._resolve(dir_path)
+        logger.info("[RemoteFS] list_directory dir=%s recursive=%s refresh=%s", dir_path, recursive, refresh)
         try:
-            result: List[FileInfo] = []
-            async def iter_dir(p: str):
-                # Prefer readdir which returns SFTPName entries with attrs
-                try:
-                    entries = await sftp.readdir(p)
-                    for entry in entries:
-                        yield entry.filename, getattr(entry, 'attrs', None)
-                except Exception:
-                    # Fallback to list names and stat each
-                    names = await sftp.listdir(p)
-                    for nm in names:
-                        fullp = posixpath.join(p, nm)
-                        try:
-                            attrs = await sftp.stat(fullp)
-                        except Exception:
-                            attrs = None
-                        yield nm, attrs
+            return [fi async for fi in self.iter_directory(path, include_hidden=include_hidden,
+                                                           recursive=recursive, refresh=refresh)]
+        except Exception as e:
+            logger.error(f"[RemoteFS] list_directory error {path}: {e}")
+            return []
 
+    async def iter_directory(self, dir_path: str, include_hidden: bool = False,
+                             recursive: bool = False, refresh: bool = False) -> AsyncIterator[FileInfo]:
+        """Yield entries of a remote directory, a whole directory at a time as reads complete.
+
+        Recursive listings read many directories concurrently (see
+        remote_tree_walker); hidden directories are not descended into unless
+        include_hidden is set, and symlinks are never followed. Directories
+        are served from the metadata cache unless refresh is set, which
+        forces a read (e.g. the explorer's refresh button).
+        """
+        path = self._resolve(dir_path)
+        read_dir = functools.partial(self._read_dir, fresh=True) if refresh else self._read_dir
+        async with self._loop_sftp("list_directory") as sftp:
+            if not sftp:
+                return
             if recursive:
-                # Walk recursively using manual stack
-                stack = [path]
-                visited = set()
-                while stack:
-                    cur = stack.pop()
-                    if cur in visited:
-                        continue
-                    visited.add(cur)
-                    try:
-                        async for name, attrs in _async_generator_wrapper(iter_dir(cur)):
-                            if self._is_dot_entry(name):
-                                continue
-                            if not include_hidden and name.startswith('.'):
-                                continue
-                            full = posixpath.join(cur, name)
-                            # Ensure attrs available
-                            if attrs is None:
-                                try:
-                                    attrs = await sftp.stat(full)
-                                except Exception:
-                                    attrs = None
-                            fi = await self._to_file_info(sftp, full, attrs or SimpleNamespace())
-                            if fi:
-                                result.append(fi)
-                                # Avoid following symlinks to prevent loops
-                                if fi.is_directory and not fi.is_symlink:
-                                    stack.append(full)
-                    except Exception:
-                        continue
+                walk = walk_remote_tree(
+                    sftp, path,
+                    descend=lambda parent, name, attrs: include_hidden or not name.startswith('.'),
+                    read_dir=read_dir)
             else:
-                async for name, attrs in _async_generator_wrapper(iter_dir(path)):
-                    if self._is_dot_entry(name):
-                        continue
+                walk = _single_directory(sftp, path, read_dir)
+            async for cur, entries in walk:
+                for name, attrs in entries:
                     if not include_hidden and name.startswith('.'):
                         continue
-                    full = posixpath.join(path, name)
-                    if attrs is None:
-                        try:
-                            attrs = await sftp.stat(full)
-                        except Exception:
-                            attrs = None
-                    fi = await self._to_file_info(sftp, full, attrs or SimpleNamespace())
+                    fi = await self._to_file_info(sftp, posixpath.join(cur, name), attrs or SimpleNamespace())
                     if fi:
-                        result.append(fi)
-            return result
-        except Exception as e:
-            logger.error(f"[RemoteFS] list_directory error {path}: {e}")
-            return []
+                        yield fi
 
     async def read_file(self, file_path: str, encoding: str = 'utf-8') -> Optional[str]:
-        """Read file as text with loop-safe SFTP access.
-
-        Uses an ephemeral SFTP client when the current asyncio loop differs from the
-        hop service's active loop to avoid cross-loop Future errors.
-        """
+        """Read file as text with loop-safe SFTP access (see _loop_sftp)."""
         path = self._resolve(file_path)
-        sftp = self._sftp()
-        logger.info("[RemoteFS] read_file path=%s sftp_available=%s", file_path, bool(sftp))
-
-        # Determine if we should use an ephemeral SFTP (different event loop)
-        use_ephemeral = False
-        hop = await get_hop_service()
-        try:
-            import asyncio as _asyncio
-            cur_loop = _asyncio.get_running_loop()
-            hop_loop = getattr(hop, 'get_active_loop', lambda: None)()
-            logger.info(
-                "[RemoteFS] read_file loop diag path=%s current_loop=%s hop_loop=%s",
-                path,
-                hex(id(cur_loop)) if cur_loop else None,
-                hex(id(hop_loop)) if hop_loop else None,
-            )
-            if hop_loop is not None and hop_loop is not cur_loop:
-                use_ephemeral = True
-        except Exception:
-            # If loop inspection fails, fall back to default SFTP
-            pass
+        logger.info("[RemoteFS] read_file path=%s", file_path)
 
         try:
-            # Phase 8: Add timeout protection
-            if use_ephemeral:
-                logger.info("[RemoteFS] read_file using ephemeral SFTP due to loop mismatch")
-                async with hop.ephemeral_sftp(self._context_id) as esftp:
-                    if not esftp:
-                        logger.warning("[RemoteFS] ephemeral SFTP unavailable; falling back to active SFTP")
-                        if not sftp:
-                            return None
-                        async with sftp.open(path, 'rb') as f:
-                            data = await _with_timeout(f.read(), operation=f"read file {path}")
-                    else:
-                        async with esftp.open(path, 'rb') as f:
-                            data = await _with_timeout(f.read(), operation=f"read file {path}")
-            else:
+            async with self._loop_sftp("read_file") as sftp:
                 if not sftp:
                     return None
+                # Phase 8: Add timeout protection
                 async with sftp.open(path, 'rb') as f:
                     data = await _with_timeout(f.read(), operation=f"read file {path}")
 
@@ -302,52 +444,15 @@ class RemoteFileSystemAdapter:
             return None
 
     async def read_file_binary(self, file_path: str) -> Optional[bytes]:
-        """Read file as binary data with loop-safe SFTP access.
-
-        Uses an ephemeral SFTP client when the current asyncio loop differs from the
-        hop service's active loop to avoid cross-loop Future errors.
-        """
+        """Read file as binary data with loop-safe SFTP access (see _loop_sftp)."""
         path = self._resolve(file_path)
-        sftp = self._sftp()
-        logger.info("[RemoteFS] read_file_binary path=%s sftp_available=%s", file_path, bool(sftp))
-
-        # Determine if we should use an ephemeral SFTP (different event loop)
-        use_ephemeral = False
-        hop = await get_hop_service()
-        try:
-            import asyncio as _asyncio
-            cur_loop = _asyncio.get_running_loop()
-            hop_loop = getattr(hop, 'get_active_loop', lambda: None)()
-            logger.info(
-                "[RemoteFS] read_file_binary loop diag path=%s current_loop=%s hop_loop=%s",
-                path,
-                hex(id(cur_loop)) if cur_loop else None,
-                hex(id(hop_loop)) if hop_loop else None,
-            )
-            if hop_loop is not None and hop_loop is not cur_loop:
-                use_ephemeral = True
-        except Exception:
-            # If loop inspection fails, fall back to default SFTP
-            pass
+        logger.info("[RemoteFS] read_file_binary path=%s", file_path)
 
         try:
-            if use_ephemeral:
-                logger.info("[RemoteFS] read_file_binary using ephemeral SFTP due to loop mismatch")
-                async with hop.ephemeral_sftp(self._context_id) as esftp:
-                    if not esftp:
-                        logger.warning("[RemoteFS] ephemeral SFTP unavailable; falling back to active SFTP")
-                        if not sftp:
-                            return None
-                        async with sftp.open(path, 'rb') as f:
-                            data = await _with_timeout(f.read(), operation=f"read binary file {path}")
-                    else:
-                        async with esftp.open(path, 'rb') as f:
-                            data = await _with_timeout(f.read(), operation=f"read binary file {path}")
-            else:
-                if not sftp:
-                    return None
-                async with sftp.open(path, 'rb') as f:
-                    data = await _with_timeout(f.read(), operation=f"read binary file {path}")
+            state = TransferState(path, 'download')
+            data = b''.join([chunk async for chunk in self._download(state, "read_file_binary")])
+            if state.total is None:
+                return None  # no SFTP session
 
             await self._publish('fs.file_read', {'file_path': path, 'size': len(data), 'encoding': 'binary', 'timestamp': time.time()})
             return data
@@ -359,61 +464,19 @@ class RemoteFileSystemAdapter:
             return None
 
     async def write_file(self, file_path: str, content: str, encoding: str = 'utf-8', create_dirs: bool = True) -> bool:
-        """Write text content to a remote file with loop-safe SFTP access.
-
-        Uses an ephemeral SFTP client when the current asyncio loop differs from the
-        hop service's active loop to avoid cross-loop Future errors.
-        """
-        sftp = self._sftp()
-        if not sftp:
-            return False
+        """Write text content to a remote file with loop-safe SFTP access (see _loop_sftp)."""
         path = self._resolve(file_path)
 
-        # Determine if we should use an ephemeral SFTP (different event loop)
-        use_ephemeral = False
-        hop = await get_hop_service()
         try:
-            import asyncio as _asyncio
-            cur_loop = _asyncio.get_running_loop()
-            hop_loop = getattr(hop, 'get_active_loop', lambda: None)()
-            logger.info(
-                "[RemoteFS] write_file loop diag path=%s current_loop=%s hop_loop=%s",
-                path,
-                hex(id(cur_loop)) if cur_loop else None,
-                hex(id(hop_loop)) if hop_loop else None,
-            )
-            if hop_loop is not None and hop_loop is not cur_loop:
-                use_ephemeral = True
-        except Exception:
-            # If loop inspection fails, fall back to default SFTP
-            pass
+            async with self._loop_sftp("write_file") as sftp:
+                if not sftp:
+                    return False
+                if create_dirs:
+                    await self._mkdirs(sftp, posixpath.dirname(path))
 
-        try:
-            if create_dirs:
-                dirp = posixpath.dirname(path)
-                if use_ephemeral:
-                    async with hop.ephemeral_sftp(self._context_id) as es_mkdir:
-                        if es_mkdir:
-                            await self._mkdirs(es_mkdir, dirp)
-                        else:
-                            # fallback to active sftp
-                            await self._mkdirs(sftp, dirp)
-                else:
-                    await self._mkdirs(sftp, dirp)
-
-            data = content.encode(encoding)
-
-            # Phase 8: Add timeout protection and loop-safe write
-            if use_ephemeral:
-                async with hop.ephemeral_sftp(self._context_id) as esftp:
-                    if not esftp:
-                        logger.warning("[RemoteFS] ephemeral SFTP unavailable; falling back to active SFTP")
-                        async with sftp.open(path, 'wb') as f:
-                            await _with_timeout(f.write(data), operation=f"write file {path}")
-                    else:
-                        async with esftp.open(path, 'wb') as f:
-                            await _with_timeout(f.write(data), operation=f"write file {path}")
-            else:
+                data = content.encode(encoding)
+
+                # Phase 8: Add timeout protection
                 async with sftp.open(path, 'wb') as f:
                     await _with_timeout(f.write(data), operation=f"write file {path}")
 
@@ -422,6 +485,8 @@ class RemoteFileSystemAdapter:
         except Exception as e:
             logger.error(f"[RemoteFS] write_file error {path}: {e}")
             return False
+        finally:
+            self._invalidate(path)
 
     async def write_file_binary(self, file_path: str, content: bytes, create_dirs: bool = True) -> bool:
         """
@@ -435,205 +500,147 @@ class RemoteFileSystemAdapter:
         Returns:
             True if successful, False otherwise
         """
-        sftp = self._sftp()
-        if not sftp:
-            return False
         path = self._resolve(file_path)
+        # state.path is the file being written: the temp file, then path itself
+        # if the temp route fails. A dropped connection resumes into it.
+        state = TransferState(None, 'upload', total=len(content), target=path)
         try:
-            # Loop diagnostics and potential cross-loop mitigation
-            hop = await get_hop_service()
-            use_ephemeral = False
-            try:
-                import asyncio as _asyncio
-                cur_loop = _asyncio.get_running_loop()
-                hop_loop = getattr(hop, 'get_active_loop', lambda: None)()
-                logger.info(
-                    "[RemoteFS] write_file_binary loop diag path=%s current_loop=%s hop_loop=%s",
-                    path,
-                    hex(id(cur_loop)) if cur_loop else None,
-                    hex(id(hop_loop)) if hop_loop else None,
+            while True:
+                try:
+                    async with self._loop_sftp("write_file_binary", fresh=state.resumes > 0) as sftp:
+                        if not sftp:
+                            return False
+                        if create_dirs and state.path is None:
+                            await _with_timeout(self._mkdirs(sftp, posixpath.dirname(path)), operation="create directories")
+
+                        ok = None
+                        if state.path != path:
+                            ok = await self._write_binary_via_temp(sftp, path, content, state)
+                        if ok is None:
+                            ok = await self._write_binary_streamed(sftp, path, content, state)
+                    break
+                except CONNECTION_ERRORS as e:
+                    if not await self._before_resume(state, e):
+                        raise
+            if ok:
+                await self._report_progress(state, final=True)
+                await self._publish('fs.file_written', {'file_path': path, 'size': len(content), 'encoding': 'binary', 'created': False, 'timestamp': time.time()})
+            return ok
+        except Exception as e:
+            logger.error(f"[RemoteFS] write_file_binary error {path}: {e}")
+            return False
+        finally:
+            self._invalidate(path)
+
+    async def _write_binary_via_temp(self, sftp, path: str, content: bytes, state: TransferState) -> Optional[bool]:
+        """Strategy 1: write to a temporary file, verify size, then rename over path.
+
+        Returns True/False when the write finished or definitely failed, or None
+        if the temp file route failed and a direct write should be attempted.
+        Connection errors propagate so the caller can resume into the temp file.
+        """
+        tmp_path = state.path or f"{path}.tmp.{secrets.token_hex(4)}"
+        state.path = tmp_path
+        try:
+            async with sftp.open(tmp_path, 'r+b' if state.done else 'wb') as f:
+                await write_chunks(f, content, state, request_timeout=OPERATION_TIMEOUT,
+                                   on_progress=self._report_progress)
+                try:
+                    await f.flush()
+                except Exception:
+                    pass
+            st = await sftp.stat(tmp_path)
+            size = getattr(st, 'st_size', None) or getattr(st, 'size', 0) or 0
+            if size <= 0 or size < len(content):
+                logger.error(
+                    f"[RemoteFS] Temp write verification failed: {tmp_path} size={size} expected={len(content)} written={state.done}"
                 )
-                # If loops differ and we have asyncssh, prefer ephemeral session in current loop
-                if hop_loop is not None and hop_loop is not cur_loop:
-                    use_ephemeral = True
-            except Exception:
-                pass
+                # Clean up temp before fallback
+                try:
+                    await sftp.remove(tmp_path)
+                except Exception:
+                    pass
+                return None
 
-            if create_dirs:
-                dirp = posixpath.dirname(path)
-                # mkdirs must run on the same sftp instance; if using ephemeral, do it inside the context
-                if not use_ephemeral:
-                    await _with_timeout(self._mkdirs(sftp, dirp), operation="create directories")
-            
-            # Write binary data directly
-            # Strategy 1: Write to a temporary file, verify size, then rename atomically
-            tmp_path = f"{path}.tmp.{secrets.token_hex(4)}"
+            # Attempt atomic rename over destination
             try:
-                if use_ephemeral:
-                    async with hop.ephemeral_sftp(self._context_id) as esftp:
-                        if not esftp:
-                            raise RuntimeError("ephemeral SFTP unavailable")
-                        if create_dirs:
-                            await self._mkdirs(esftp, posixpath.dirname(path))
-                        async with esftp.open(tmp_path, 'wb') as f:
-                            written = await f.write(content)
-                            try:
-                                await f.flush()
-                            except Exception:
-                                pass
-                        st = await esftp.stat(tmp_path)
-                else:
-                    async with sftp.open(tmp_path, 'wb') as f:
-                        written = await f.write(content)
-                        try:
-                            await f.flush()
-                        except Exception:
-                            pass
-                    st = await sftp.stat(tmp_path)
-                size = getattr(st, 'st_size', None) or getattr(st, 'size', 0) or 0
-                if size <= 0 or size < len(content):
-                    logger.error(
-                        f"[RemoteFS] Temp write verification failed: {tmp_path} size={size} expected={len(content)} returned={written}"
-                    )
-                    # Clean up temp before fallback
-                    try:
-                        if use_ephemeral:
-                            async with hop.ephemeral_sftp(self._context_id) as es:
-                                if es:
-                                    await es.remove(tmp_path)
-                        else:
-                            await sftp.remove(tmp_path)
-                    except Exception:
-                        pass
-                else:
-                    # Attempt atomic rename over destination
-                    try:
-                        # Remove destination if it exists
-                        if use_ephemeral:
-                            async with hop.ephemeral_sftp(self._context_id) as esftp2:
-                                if not esftp2:
-                                    raise RuntimeError("ephemeral SFTP unavailable")
-                                try:
-                                    await esftp2.remove(path)
-                                except Exception:
-                                    pass
-                                await esftp2.rename(tmp_path, path)
-                        else:
-                            try:
-                                await sftp.remove(path)
-                            except Exception:
-                                pass
-                            await sftp.rename(tmp_path, path)
-                    except Exception as rn_e:
-                        logger.error(f"[RemoteFS] Rename temp -> dest failed ({tmp_path} -> {path}): {rn_e}")
-                        try:
-                            # As a last resort, copy bytes by reopening dest
-                            if use_ephemeral:
-                                async with hop.ephemeral_sftp(self._context_id) as esftp3:
-                                    if not esftp3:
-                                        raise RuntimeError("ephemeral SFTP unavailable")
-                                    async with esftp3.open(path, 'wb') as f2:
-                                        await f2.write(content)
-                            else:
-                                async with sftp.open(path, 'wb') as f2:
-                                    await f2.write(content)
-                        except Exception as wf_e:
-                            logger.error(f"[RemoteFS] Fallback direct write failed for {path}: {wf_e}")
-                            try:
-                                if use_ephemeral:
-                                    async with hop.ephemeral_sftp(self._context_id) as esftp4:
-                                        if esftp4:
-                                            await esftp4.remove(tmp_path)
-                                else:
-                                    await sftp.remove(tmp_path)
-                            except Exception:
-                                pass
-                            return False
-                    # Final verification on destination
-                    try:
-                        if use_ephemeral:
-                            async with hop.ephemeral_sftp(self._context_id) as esftp5:
-                                if not esftp5:
-                                    raise RuntimeError("ephemeral SFTP unavailable")
-                                st2 = await esftp5.stat(path)
-                        else:
-                            st2 = await sftp.stat(path)
-                        size2 = getattr(st2, 'st_size', None) or getattr(st2, 'size', 0) or 0
-                        if size2 <= 0 or size2 < len(content):
-                            logger.error(
-                                f"[RemoteFS] Dest verification failed: {path} size={size2} expected={len(content)}"
-                            )
-                            return False
-                    except Exception as ver_e:
-                        logger.error(f"[RemoteFS] Dest stat failed for {path}: {ver_e}")
-                        return False
-                    await self._publish('fs.file_written', {'file_path': path, 'size': len(content), 'encoding': 'binary', 'created': False, 'timestamp': time.time()})
-                    return True
-            except Exception as e1:
-                logger.error(f"[RemoteFS] Temp write path failed for {path}: {e1}")
+                # Remove destination if it exists
                 try:
-                    if use_ephemeral:
-                        async with hop.ephemeral_sftp(self._context_id) as esftp6:
-                            if esftp6:
-                                await esftp6.remove(tmp_path)
-                    else:
-                        await sftp.remove(tmp_path)
+                    await sftp.remove(path)
                 except Exception:
                     pass
+                await sftp.rename(tmp_path, path)
+            except Exception as rn_e:
+                logger.error(f"[RemoteFS] Rename temp -> dest failed ({tmp_path} -> {path}): {rn_e}")
+                try:
+                    # As a last resort, copy bytes by reopening dest
+                    async with sftp.open(path, 'wb') as f2:
+                        await f2.write(content)
+                except Exception as wf_e:
+                    logger.error(f"[RemoteFS] Fallback direct write failed for {path}: {wf_e}")
+                    try:
+                        await sftp.remove(tmp_path)
+                    except Exception:
+                        pass
+                    return False
 
-            # Strategy 2: Fallback to putfo with BytesIO directly to destination
+            # Final verification on destination
             try:
-                bio = io.BytesIO(content)
-                # Open and copy in chunks via file object
-                if use_ephemeral:
-                    async with hop.ephemeral_sftp(self._context_id) as esftp7:
-                        if not esftp7:
-                            raise RuntimeError("ephemeral SFTP unavailable")
-                        async with esftp7.open(path, 'wb') as f:
-                            chunk_size = 256 * 1024
-                            total = 0
-                            while True:
-                                chunk = bio.read(chunk_size)
-                                if not chunk:
-                                    break
-                                await f.write(chunk)
-                                total += len(chunk)
-                        st3 = await esftp7.stat(path)
-                else:
-                    async with sftp.open(path, 'wb') as f:
-                        # Write in chunks to avoid issues with very large payloads
-                        chunk_size = 256 * 1024
-                        total = 0
-                        while True:
-                            chunk = bio.read(chunk_size)
-                            if not chunk:
-                                break
-                            await f.write(chunk)
-                            total += len(chunk)
-                    st3 = await sftp.stat(path)
-                size3 = getattr(st3, 'st_size', None) or getattr(st3, 'size', 0) or 0
-                if size3 <= 0 or size3 < len(content):
-                    logger.error(f"[RemoteFS] Stream write verification failed: {path} size={size3} expected={len(content)}")
+                st2 = await sftp.stat(path)
+                size2 = getattr(st2, 'st_size', None) or getattr(st2, 'size', 0) or 0
+                if size2 <= 0 or size2 < len(content):
+                    logger.error(
+                        f"[RemoteFS] Dest verification failed: {path} size={size2} expected={len(content)}"
+                    )
                     return False
-                await self._publish('fs.file_written', {'file_path': path, 'size': len(content), 'encoding': 'binary', 'created': False, 'timestamp': time.time()})
-                return True
-            except Exception as e2:
-                logger.error(f"[RemoteFS] putfo/stream write failed for {path}: {e2}")
+            except Exception as ver_e:
+                logger.error(f"[RemoteFS] Dest stat failed for {path}: {ver_e}")
                 return False
-        except Exception as e:
-            logger.error(f"[RemoteFS] write_file_binary error {path}: {e}")
+            return True
+        except CONNECTION_ERRORS:
+            raise
+        except Exception as e1:
+            logger.error(f"[RemoteFS] Temp write path failed for {path}: {e1}")
+            try:
+                await sftp.remove(tmp_path)
+            except Exception:
+                pass
+            return None
+
+    async def _write_binary_streamed(self, sftp, path: str, content: bytes, state: TransferState) -> bool:
+        """Strategy 2: write directly to path in chunks and verify the size."""
+        if state.path != path:
+            state.path = path
+            state.done = 0
+        try:
+            async with sftp.open(path, 'r+b' if state.done else 'wb') as f:
+                await write_chunks(f, content, state, request_timeout=OPERATION_TIMEOUT,
+                                   on_progress=self._report_progress)
+            st3 = await sftp.stat(path)
+            size3 = getattr(st3, 'st_size', None) or getattr(st3, 'size', 0) or 0
+            if size3 <= 0 or size3 < len(content):
+                logger.error(f"[RemoteFS] Stream write verification failed: {path} size={size3} expected={len(content)}")
+                return False
+            return True
+        except CONNECTION_ERRORS:
+            raise
+        except Exception as e2:
+            logger.error(f"[RemoteFS] putfo/stream write failed for {path}: {e2}")
             return False
 
     async def create_directory(self, dir_path: str, parents: bool = True) -> bool:
-        sftp = self._sftp()
-        if not sftp:
-            return False
         path = self._resolve(dir_path)
         try:
-            if parents:
-                await self._mkdirs(sftp, path)
-            else:
-                await sftp.mkdir(path)
+            async with self._loop_sftp("create_directory") as sftp:
+                if not sftp:
+                    return False
+                if parents:
+                    await self._mkdirs(sftp, path)
+                else:
+                    try:
+                        await sftp.mkdir(path)
+                    finally:
+                        self._invalidate(path)
             await self._publish('fs.directory_created', {'dir_path': path, 'parents': parents, 'timestamp': time.time()})
             return True
         except Exception as e:
@@ -641,152 +648,252 @@ class RemoteFileSystemAdapter:
             return False
 
     async def delete_file(self, file_path: str) -> bool:
-        sftp = self._sftp()
-        if not sftp:
-            return False
         path = self._resolve(file_path)
         try:
-            # Determine if directory
-            st = await sftp.stat(path)
-            mode = getattr(st, 'st_mode', None)
-            if mode is None:
-                mode = getattr(st, 'permissions', 0)
-            if stat.S_ISDIR(mode):
-                await self._rmtree(sftp, path)
-            else:
-                await sftp.remove(path)
-            await self._publish('fs.file_deleted', {'file_path': path, 'is_directory': stat.S_ISDIR(mode), 'timestamp': time.time()})
+            async with self._loop_sftp("delete_file") as sftp:
+                if not sftp:
+                    return False
+                # Determine if directory
+                st = await sftp.stat(path)
+                is_dir = stat.S_ISDIR(entry_mode(st))
+                if not is_dir:
+                    await sftp.remove(path)
+                elif not ('rm' in await self._remote_tools()
+                          and await self._exec_checked(f"rm -rf -- {shlex.quote(path)}", "remote rm",
+                                                   timeout=REMOTE_EXEC_TIMEOUT)):
+                    await self._rmtree(sftp, path)
+            await self._publish('fs.file_deleted', {'file_path': path, 'is_directory': is_dir, 'timestamp': time.time()})
             return True
         except Exception as e:
             logger.error(f"[RemoteFS] delete_file error {path}: {e}")
             return False
+        finally:
+            self._invalidate(path, recursive=True)
 
     async def move_file(self, src_path: str, dest_path: str, overwrite: bool = False) -> bool:
-        sftp = self._sftp()
-        if not sftp:
-            return False
         src = self._resolve(src_path)
         dst = self._resolve(dest_path)
         try:
-            if overwrite:
-                try:
-                    st = await sftp.stat(dst)
-                    # SFTP attrs might expose st_mode or permissions
-                    mode = getattr(st, 'st_mode', None)
-                    if mode is None:
-                        mode = getattr(st, 'permissions', 0)
-                    if stat.S_ISDIR(mode):
-                        await self._rmtree(sftp, dst)
-                    else:
-                        await sftp.remove(dst)
-                except Exception:
-                    pass
-            await sftp.rename(src, dst)
+            async with self._loop_sftp("move_file") as sftp:
+                if not sftp:
+                    return False
+                if overwrite:
+                    try:
+                        st = await sftp.stat(dst)
+                        if stat.S_ISDIR(entry_mode(st)):
+                            await self._rmtree(sftp, dst)
+                        else:
+                            await sftp.remove(dst)
+                    except Exception:
+                        pass
+                await sftp.rename(src, dst)
             await self._publish('fs.file_moved', {'src_path': src, 'dest_path': dst, 'timestamp': time.time()})
             return True
         except Exception as e:
             logger.error(f"[RemoteFS] move_file error {src} -> {dst}: {e}")
             return False
+        finally:
+            self._invalidate(src, recursive=True)
+            self._invalidate(dst, recursive=True)
 
     async def copy_file(self, src_path: str, dest_path: str) -> bool:
         """Naive remote copy (same host): read then write. Directories copied recursively."""
-        sftp = self._sftp()
-        if not sftp:
-            return False
         src = self._resolve(src_path)
         dst = self._resolve(dest_path)
         try:
-            st = await sftp.stat(src)
-            mode = getattr(st, 'st_mode', None)
-            if mode is None:
-                mode = getattr(st, 'permissions', 0)
-            if stat.S_ISDIR(mode):
-                await self._copytree(sftp, src, dst)
-            else:
-                await self._mkdirs(sftp, posixpath.dirname(dst))
-                async with sftp.open(src, 'rb') as rf:
-                    data = await rf.read()
-                async with sftp.open(dst, 'wb') as wf:
-                    await wf.write(data)
+            async with self._loop_sftp("copy_file") as sftp:
+                if not sftp:
+                    return False
+                st = await sftp.stat(src)
+                is_dir = stat.S_ISDIR(entry_mode(st))
+                # cp on the remote host saves pulling every byte through this process
+                if 'cp' in await self._remote_tools() and await self._exec_checked(
+                        _copy_command(src, dst, is_dir), "remote cp", timeout=REMOTE_EXEC_TIMEOUT):
+                    pass
+                elif is_dir:
+                    await self._copytree(sftp, src, dst)
+                else:
+                    await self._mkdirs(sftp, posixpath.dirname(dst))
+                    await self._copy_remote_file(sftp, src, dst)
             await self._publish('fs.file_copied', {'src_path': src, 'dest_path': dst, 'timestamp': time.time()})
             return True
         except Exception as e:
             logger.error(f"[RemoteFS] copy_file error {src} -> {dst}: {e}")
             return False
+        finally:
+            self._invalidate(dst, recursive=True)
 
     async def get_file_info(self, file_path: str) -> Optional[FileInfo]:
-        sftp = self._sftp()
-        if not sftp:
-            return None
         path = self._resolve(file_path)
         try:
-            st = await sftp.stat(path)
-            return await self._to_file_info(sftp, path, st)
+            async with self._loop_sftp("get_file_info") as sftp:
+                if not sftp:
+                    return None
+                st = await self._stat(sftp, path)
+                return await self._to_file_info(sftp, path, st)
         except Exception as e:
             logger.error(f"[RemoteFS] get_file_info error {path}: {e}")
             return None
 
     async def search_files(self, query: str, search_content: bool = True, file_types: Optional[List[FileType]] = None,
                            max_results: int = 100) -> List[Dict[str, Any]]:
-        """Simple remote search by filename; optional shallow content search for small files."""
+        """Search the remote cwd by filename and, where rg/grep exist remotely, content.
+
+        With find available the search runs on the remote host and results
+        stream back; otherwise filenames are matched over a concurrent SFTP
+        walk.
+        """
         try:
-            sftp = self._sftp()
-            if not sftp:
-                return []
-            root = self._get_cwd()
-            results: List[Dict[str, Any]] = []
-            stack = [root]
-            q = query.lower()
-            while stack and len(results) < max_results:
-                cur = stack.pop()
-                try:
-                    try:
-                        entries = await sftp.readdir(cur)
-                        iterable = [(e.filename, getattr(e, 'attrs', None)) for e in entries]
-                    except Exception:
-                        names = await sftp.listdir(cur)
-                        iterable = []
-                        for nm in names:
-                            fullp = posixpath.join(cur, nm)
-                            try:
-                                attrs = await sftp.stat(fullp)
-                            except Exception:
-                                attrs = None
-                            iterable.append((nm, attrs))
-                    for name, attrs in iterable:
-                        if self._is_dot_entry(name):
-                            continue
-                        full = posixpath.join(cur, name)
-                        mode = getattr(attrs, 'st_mode', None) if attrs else None
-                        if mode is None:
-                            mode = getattr(attrs, 'permissions', 0) if attrs else 0
-                        is_dir = stat.S_ISDIR(mode)
-                        if q in name.lower():
-                            fi = await self._to_file_info(sftp, full, attrs or SimpleNamespace())
-                            if fi:
-                                results.append({'file_info': fi.to_dict(), 'matches': [f"Filename: {name}"], 'score': 1.0, 'context': {}})
-                        if is_dir:
-                            stack.append(full)
-                except Exception:
-                    continue
+            async with self._loop_sftp("search_files") as sftp:
+                if not sftp:
+                    return []
+                results = await self._search_remote(sftp, query, search_content, max_results)
+                if results is None:
+                    results = await self._search_by_walk(sftp, query, max_results)
             await self._publish('fs.search_performed', {'query': query, 'search_content': search_content, 'result_count': len(results), 'timestamp': time.time()})
             return results
         except Exception as e:
             logger.error(f"[RemoteFS] search_files error: {e}")
             return []
 
+    async def _search_by_walk(self, sftp, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Filename search over a concurrent SFTP walk of the remote cwd."""
+        results: List[Dict[str, Any]] = []
+        q = query.lower()
+        # Leaving the walk early cancels the directory reads still in flight
+        async for cur, entries in walk_remote_tree(sftp, self._get_cwd(), read_dir=self._read_dir,
+                                                   descend=lambda parent, name, attrs: name not in SEARCH_SKIP_DIRS):
+            for name, attrs in entries:
+                if q not in name.lower() or name in SEARCH_SKIP_DIRS:
+                    continue
+                fi = await self._to_file_info(sftp, posixpath.join(cur, name), attrs or SimpleNamespace())
+                if fi:
+                    results.append({'file_info': fi.to_dict(), 'matches': [f"Filename: {name}"], 'score': 1.0, 'context': {}})
+                    if len(results) >= max_results:
+                        return results
+        return results
+
+    async def _search_remote(self, sftp, query: str, search_content: bool,
+                             max_results: int) -> Optional[List[Dict[str, Any]]]:
+        """search_files via find and rg/grep on the remote host; None if they're unavailable."""
+        tools = await self._remote_tools()
+        if 'find-printf' not in tools or not query:
+            return None
+        root = self._get_cwd()
+        name_hits: Dict[str, Any] = {}
+        async with aclosing(self._exec_lines(_find_command(root, query), "remote find")) as lines:
+            async for line in lines:
+                parsed = _parse_find_line(line)
+                if parsed:
+                    name_hits[parsed[0]] = parsed[1]
+                    if len(name_hits) >= max_results:
+                        break
+
+        content_hits: Dict[str, List[str]] = {}
+        grep = _content_search_command(tools, root, query)
+        if search_content and grep:
+            async with aclosing(self._exec_lines(grep, "remote grep")) as lines:
+                async for line in lines:
+                    path, sep, rest = line.partition('\0')
+                    line_no, sep2, text = rest.partition(':')
+                    if not sep or not sep2:
+                        continue
+                    if path not in content_hits and len(content_hits) >= max_results:
+                        break
+                    content_hits.setdefault(path, []).append(
+                        f"Line {line_no}: {text.strip()[:SEARCH_LINE_MAX_CHARS]}")
+
+        async def _result(path: str) -> Optional[Dict[str, Any]]:
+            attrs = name_hits.get(path)
+            if attrs is None:
+                try:
+                    attrs = await self._stat(sftp, path)
+                except Exception:
+                    return None
+            fi = await self._to_file_info(sftp, path, attrs)
+            if fi is None:
+                return None
+            matches: List[str] = []
+            score = 0.0
+            if path in name_hits:
+                matches.append(f"Filename: {fi.name}")
+                score += 1.0
+            if path in content_hits:
+                matches.extend(content_hits[path])
+                score += 0.5 * len(content_hits[path])
+            return {'file_info': fi.to_dict(), 'matches': matches, 'score': score, 'context': {}}
+
+        paths = list(name_hits) + [p for p in content_hits if p not in name_hits]
+        results = [r for r in await _bounded_gather([_result(p) for p in paths]) if isinstance(r, dict)]
+        results.sort(key=lambda r: r['score'], reverse=True)
+        return results[:max_results]
+
     # -------- streaming helpers for downloads --------
-    async def stream_file(self, path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
-        sftp = self._sftp()
-        if not sftp:
+    async def stream_file(self, path: str, chunk_size: int = TRANSFER_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream a remote file with pipelined reads of chunk_size bytes (see _download)."""
+        state = TransferState(self._resolve(path), 'download')
+        async for chunk in self._download(state, "stream_file", chunk_size):
+            yield chunk
+
+    async def _download(self, state: TransferState, operation: str,
+                        chunk_size: int = TRANSFER_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Read state.path with several requests in flight.
+
+        If the connection drops, the read resumes from the last byte
+        delivered on a new SFTP session, up to TRANSFER_RETRIES times.
+        Yields nothing, leaving state.total unset, when there is no SFTP
+        session at all.
+        """
+        while True:
+            try:
+                async with self._loop_sftp(operation, fresh=state.resumes > 0) as sftp:
+                    if not sftp:
+                        return
+                    if state.total is None:
+                        st = await _with_timeout(sftp.stat(state.path), operation=f"stat {state.path}")
+                        state.total = getattr(st, 'st_size', None) or getattr(st, 'size', 0) or 0
+                    async with sftp.open(state.path, 'rb') as f:
+                        async for chunk in read_chunks(f, state, chunk_size=chunk_size,
+                                                       request_timeout=OPERATION_TIMEOUT,
+                                                       on_progress=self._report_progress):
+                            yield chunk
+                break
+            except CONNECTION_ERRORS as e:
+                if not await self._before_resume(state, e):
+                    raise
+        await self._report_progress(state, final=True)
+
+    async def _before_resume(self, state: TransferState, error: BaseException) -> bool:
+        """Back off before resuming an interrupted transfer; False once retries are used up."""
+        if state.resumes >= TRANSFER_RETRIES:
+            return False
+        state.resumes += 1
+        logger.warning(
+            f"[RemoteFS] {state.direction} of {state.path} interrupted at {state.done} bytes ({error}); "
+            f"resuming (attempt {state.resumes}/{TRANSFER_RETRIES})"
+        )
+        await asyncio.sleep(min(0.5 * 2 ** state.resumes, 5.0))
+        return True
+
+    async def _report_progress(self, state: TransferState, final: bool = False) -> None:
+        """Publish fs.transfer_progress for large transfers, throttled."""
+        if (state.total or 0) < TRANSFER_PROGRESS_MIN_BYTES:
             return
-        abs_path = self._resolve(path)
-        async with sftp.open(abs_path, 'rb') as f:
-            while True:
-                chunk = await f.read(chunk_size)
-                if not chunk:
-                    break
-                yield chunk
+        now = time.monotonic()
+        if not final and now - state.reported_at < TRANSFER_PROGRESS_INTERVAL:
+            return
+        state.reported_at = now
+        await self._publish('fs.transfer_progress', {
+            'transfer_id': state.transfer_id,
+            'file_path': state.target or state.path,
+            'direction': state.direction,
+            'bytes_done': state.done,
+            'total_bytes': state.total,
+            'resumes': state.resumes,
+            'done': final,
+            'elapsed': now - state.started_at,
+            'timestamp': time.time(),
+        })
 
     # ------------- internal ops -------------
     async def _mkdirs(self, sftp, path: str):
@@ -800,102 +907,127 @@ class RemoteFileSystemAdapter:
         for d in reversed(parts):
             try:
                 await sftp.mkdir(d)
+                self._invalidate(d)
             except Exception:
                 # exists or race
                 pass
 
     async def _rmtree(self, sftp, path: str):
-        try:
-            try:
-                entries = await sftp.readdir(path)
-                iterable = [(e.filename, getattr(e, 'attrs', None)) for e in entries]
-            except Exception:
-                names = await sftp.listdir(path)
-                iterable = []
-                for nm in names:
-                    fullp = posixpath.join(path, nm)
-                    try:
-                        attrs = await sftp.stat(fullp)
-                    except Exception:
-                        attrs = None
-                    iterable.append((nm, attrs))
-            for name, attrs in iterable:
-                if self._is_dot_entry(name):
-                    continue
-                full = posixpath.join(path, name)
-                mode = getattr(attrs, 'st_mode', None) if attrs else None
-                if mode is None:
-                    mode = getattr(attrs, 'permissions', 0) if attrs else 0
-                if stat.S_ISDIR(mode):
-                    await self._rmtree(sftp, full)
+        """Remove a remote tree: walk it, delete files concurrently, then directories bottom-up."""
+        dirs = [path]
+        files: List[str] = []
+        async for cur, entries in walk_remote_tree(sftp, path):
+            for name, attrs in entries:
+                full = posixpath.join(cur, name)
+                if stat.S_ISDIR(entry_mode(attrs)):
+                    dirs.append(full)
                 else:
-                    try:
-                        await sftp.remove(full)
-                    except Exception:
-                        pass
-            try:
-                await sftp.rmdir(path)
-            except Exception:
-                pass
-        except Exception:
-            # fall back: attempt remove
+                    files.append(full)
+
+        await _bounded_gather([sftp.remove(f) for f in files])
+        # Deepest first, so every directory is empty by the time it is removed
+        for d in sorted(dirs, key=lambda d: d.count('/'), reverse=True):
             try:
-                await sftp.remove(path)
+                await sftp.rmdir(d)
             except Exception:
                 pass
 
     async def _copytree(self, sftp, src: str, dst: str):
+        """Copy a remote tree; directories are created as the walk reaches them and
+        the files of each directory are copied concurrently."""
         await self._mkdirs(sftp, dst)
+        async for cur, entries in walk_remote_tree(sftp, src):
+            target = posixpath.join(dst, posixpath.relpath(cur, src)) if cur != src else dst
+            copies = []
+            for name, attrs in entries:
+                s_path = posixpath.join(cur, name)
+                d_path = posixpath.join(target, name)
+                if stat.S_ISDIR(entry_mode(attrs)):
+                    # Parents are walked before children, so only this level is missing
+                    try:
+                        await sftp.mkdir(d_path)
+                    except Exception:
+                        pass  # exists
+                else:
+                    copies.append(self._copy_remote_file(sftp, s_path, d_path))
+            for result in await _bounded_gather(copies):
+                if isinstance(result, Exception):
+                    raise result
+
+    @staticmethod
+    async def _copy_remote_file(sftp, src: str, dst: str):
+        async with sftp.open(src, 'rb') as rf:
+            data = await rf.read()
+        async with sftp.open(dst, 'wb') as wf:
+            await wf.write(data)
+
+
+def _copy_command(src: str, dst: str, is_dir: bool) -> str:
+    """cp -a invocation with the same result as _copytree/_copy_remote_file."""
+    if is_dir:
+        # Copy the contents so an existing destination is merged into, not nested
+        return f"mkdir -p -- {shlex.quote(dst)} && cp -a -- {shlex.quote(src.rstrip('/') + '/.')} {shlex.quote(dst)}"
+    return (f"mkdir -p -- {shlex.quote(posixpath.dirname(dst) or '/')} && "
+            f"cp -a -- {shlex.quote(src)} {shlex.quote(dst)}")
+
+
+def _find_command(root: str, query: str) -> str:
+    """GNU find listing names containing query (case-insensitive) with their attributes."""
+    pattern = ''.join('\\' + ch if ch in '*?[]\\' else ch for ch in query)
+    prune = ' -o '.join(f"-name {shlex.quote(d)}" for d in SEARCH_SKIP_DIRS)
+    return (f"find {shlex.quote(root)} -mindepth 1 \\( {prune} \\) -prune "
+            f"-o -iname {shlex.quote('*' + pattern + '*')} "
+            f"-printf '%y\\t%m\\t%s\\t%T@\\t%p\\n' 2>/dev/null")
+
+
+def _terminate_process(process) -> None:
+    """Best-effort stop of a remote process whose result is no longer wanted."""
+    for stop in ('terminate', 'close'):
         try:
-            entries = await sftp.readdir(src)
-            iterable = [(e.filename, getattr(e, 'attrs', None)) for e in entries]
+            getattr(process, stop)()
         except Exception:
-            names = await sftp.listdir(src)
-            iterable = []
-            for nm in names:
-                sp = posixpath.join(src, nm)
-                try:
-                    attrs = await sftp.stat(sp)
-                except Exception:
-                    attrs = None
-                iterable.append((nm, attrs))
-        for name, attrs in iterable:
-            if self._is_dot_entry(name):
-                continue
-            s = posixpath.join(src, name)
-            d = posixpath.join(dst, name)
-            mode = getattr(attrs, 'st_mode', None) if attrs else None
-            if mode is None:
-                mode = getattr(attrs, 'permissions', 0) if attrs else 0
-            if stat.S_ISDIR(mode):
-                await self._copytree(sftp, s, d)
-            else:
-                async with sftp.open(s, 'rb') as rf:
-                    data = await rf.read()
-                async with sftp.open(d, 'wb') as wf:
-                    await wf.write(data)
-
-
-# Helper to iterate over async generator from nested function
-async def _async_generator_wrapper(agen_factory):
-    agen = agen_factory
-    # If agen_factory is a coroutine function returning an iterable, await it
-    if asyncio.iscoroutinefunction(agen_factory):
-        agen = await agen_factory()
-    else:
-        agen = agen_factory
-    # If agen is a coroutine (awaitable), await to get iterable
-    if asyncio.iscoroutine(agen):
-        agen = await agen
-    # Try async iteration
+            pass
+
+
+def _parse_find_line(line: str) -> Optional[Tuple[str, Any]]:
+    """(path, attrs) from a line printed by _find_command."""
     try:
-        async for item in agen:
-            yield item
-        return
-    except TypeError:
-        # Not an async iterator, treat as sync iterable
-        for item in agen:
-            yield item
+        kind, mode, size, mtime, path = line.split('\t', 4)
+        permissions = _FIND_TYPE_BITS.get(kind, 0) | int(mode, 8)
+        return path, SimpleNamespace(permissions=permissions, size=int(size), mtime=float(mtime))
+    except ValueError:
+        return None
+
+
+def _content_search_command(tools: frozenset, root: str, query: str) -> Optional[str]:
+    """rg (preferred) or grep invocation printing path NUL line:text per match."""
+    q, r = shlex.quote(query), shlex.quote(root)
+    if 'rg' in tools:
+        globs = ' '.join(f"--glob {shlex.quote('!' + d)}" for d in SEARCH_SKIP_DIRS)
+        return (f"rg --null --no-heading --with-filename --line-number --color never --fixed-strings "
+                f"--ignore-case --max-count {SEARCH_MATCHES_PER_FILE} --max-columns {SEARCH_LINE_MAX_CHARS} "
+                f"{globs} -e {q} -- {r} 2>/dev/null")
+    if 'grep' in tools:
+        excludes = ' '.join(f"--exclude-dir={shlex.quote(d)}" for d in SEARCH_SKIP_DIRS)
+        return (f"grep -rIiFn --null -m {SEARCH_MATCHES_PER_FILE} {excludes} "
+                f"-e {q} -- {r} 2>/dev/null")
+    return None
+
+
+async def _single_directory(sftp, path: str, read_dir) -> AsyncIterator[Tuple[str, List[Tuple[str, Any]]]]:
+    """Non-recursive counterpart of walk_remote_tree."""
+    yield path, await read_dir(sftp, path)
+
+
+async def _bounded_gather(coros: List[Coroutine[Any, Any, Any]], limit: int = WALK_CONCURRENCY) -> List[Any]:
+    """Run coroutines with at most limit in flight; exceptions are returned, not raised."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*[_run(c) for c in coros], return_exceptions=True)
 
 
 async def get_remote_filesystem_adapter(context_id: Optional[str] = None) -> RemoteFileSystemAdapter:
@@ -0,0 +1,348 @@
+"""
+Remote Metadata Cache
+
+Stat results and directory listings for hopped (SFTP) workspaces, keyed by
+(context_id, path), so expanding a remote folder or stat'ing a file that was
+seen recently does not cost another round trip. Entries expire after a TTL
+and the cache is bounded by an approximate byte budget (LRU).
+
+The remote filesystem adapter invalidates entries on its own writes, moves
+and deletes. Changes made by anyone else are picked up when entries expire,
+or sooner with RemoteChangeFeed, which polls the remote host over SSH for
+paths modified since the previous poll.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import posixpath
+import secrets
+import shlex
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..utils.env import env_float
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached stat/listing is trusted (0 disables the cache)
+REMOTE_CACHE_TTL = env_float('HOP_REMOTE_CACHE_TTL', 30.0)
+REMOTE_CACHE_MAX_MB = env_float('HOP_REMOTE_CACHE_MB', 16.0)
+# Seconds between remote change polls (0 disables the change feed)
+REMOTE_CHANGE_FEED_INTERVAL = env_float('HOP_REMOTE_CHANGE_FEED_INTERVAL', 0.0)
+# More changed paths than this in one poll drops the whole context instead
+REMOTE_CHANGE_FEED_MAX_PATHS = 2000
+
+# Rough in-memory cost of one attrs object plus its key/tuple overhead
+_ENTRY_OVERHEAD = 200
+
+_STAT = 'stat'
+_DIR = 'dir'
+
+CacheKey = Tuple[str, str, str]  # (context_id, kind, path)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    stored_at: float
+
+
+class RemoteMetadataCache:
+    """
+    TTL + LRU cache of remote stat results and directory listings.
+
+    A listing also answers stat lookups for its children. Every
+    invalidation bumps a per-context generation; a read started before
+    an invalidation passes the generation it saw to put_*, and its result
+    is dropped rather than caching data that may predate the change.
+    Adapters on other threads' loops share the cache, so it is locked.
+    """
+
+    def __init__(self, ttl_seconds: float = REMOTE_CACHE_TTL, max_size_mb: float = REMOTE_CACHE_MAX_MB):
+        """
+        Initialize cache.
+
+        Args:
+            ttl_seconds: Seconds an entry is served before it is refetched
+            max_size_mb: Approximate memory budget in MB
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._total_size = 0
+        self._generations: Dict[str, int] = {}
+        self._feeds: Dict[str, RemoteChangeFeed] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size_bytes > 0
+
+    def generation(self, context_id: str) -> int:
+        """Current invalidation generation of a context (see class docstring)."""
+        return self._generations.get(context_id, 0)
+
+    # ------------- lookups -------------
+    def get_stat(self, context_id: str, path: str) -> Optional[Any]:
+        """Cached attrs for a path, from its own stat or its parent's listing."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            attrs = None
+            entry = self._get((context_id, _STAT, path))
+            if entry is not None:
+                attrs = entry.value
+            else:
+                parent = self._get((context_id, _DIR, posixpath.dirname(path)))
+                if parent is not None:
+                    attrs = parent.value[1].get(posixpath.basename(path))
+            self.stats['hits' if attrs is not None else 'misses'] += 1
+            return attrs
+
+    def get_listing(self, context_id: str, path: str) -> Optional[List[Tuple[str, Any]]]:
+        """Cached (name, attrs) entries of a directory; callers must not modify the list."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._get((context_id, _DIR, path))
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            return entry.value[0]
+
+    # ------------- population -------------
+    def put_stat(self, context_id: str, path: str, attrs: Any, generation: Optional[int] = None) -> None:
+        if attrs is None:
+            return
+        self._put((context_id, _STAT, path), attrs, len(path) + _ENTRY_OVERHEAD, generation)
+
+    def put_listing(self, context_id: str, path: str, entries: List[Tuple[str, Any]],
+                    generation: Optional[int] = None) -> None:
+        index = {name: attrs for name, attrs in entries if attrs is not None}
+        size = len(path) + _ENTRY_OVERHEAD + sum(len(name) + _ENTRY_OVERHEAD for name, _ in entries)
+        self._put((context_id, _DIR, path), (entries, index), size, generation)
+
+    # ------------- invalidation -------------
+    def invalidate(self, context_id: str, path: str, recursive: bool = False) -> None:
+        """
+        Drop what a change to path can make stale.
+
+        That is the path's own stat and listing, its parent's listing and,
+        when its listing was cached, its children's stats. recursive also
+        drops everything below path (directory moves and deletes).
+        """
+        with self._lock:
+            self._generations[context_id] = self.generation(context_id) + 1
+            self.stats['invalidations'] += 1
+            listing = self._entries.get((context_id, _DIR, path))
+            if listing is not None:
+                for name, _ in listing.value[0]:
+                    self._drop((context_id, _STAT, posixpath.join(path, name)))
+            for key in ((context_id, _STAT, path), (context_id, _DIR, path),
+                        (context_id, _DIR, posixpath.dirname(path))):
+                self._drop(key)
+            if recursive:
+                prefix = path.rstrip('/') + '/'
+                for key in [k for k in self._entries if k[0] == context_id and k[2].startswith(prefix)]:
+                    self._drop(key)
+
+    def drop_context(self, context_id: str) -> None:
+        """Forget every cached entry of a context."""
+        with self._lock:
+            self._generations[context_id] = self.generation(context_id) + 1
+            for key in [k for k in self._entries if k[0] == context_id]:
+                self._drop(key)
+
+    def clear_context(self, context_id: str) -> None:
+        """Forget a context entirely (e.g. on disconnect) and stop its change feed."""
+        self.drop_context(context_id)
+        with self._lock:
+            feed = self._feeds.pop(context_id, None)
+        if feed is not None:
+            feed.stop()
+
+    def clear(self) -> None:
+        with self._lock:
+            for context_id in {k[0] for k in self._entries}:
+                self._generations[context_id] = self.generation(context_id) + 1
+            self._entries.clear()
+            self._total_size = 0
+
+    # ------------- change feed -------------
+    def ensure_change_feed(self, context_id: str, root: str, run: Callable[[str], Awaitable[str]],
+                           interval: float = REMOTE_CHANGE_FEED_INTERVAL) -> Optional[RemoteChangeFeed]:
+        """Start polling a context for remote changes, if enabled and not already running."""
+        if interval <= 0 or not self.enabled:
+            return None
+        with self._lock:
+            feed = self._feeds.get(context_id)
+            if feed is not None and feed.running:
+                return feed
+            feed = self._feeds[context_id] = RemoteChangeFeed(self, context_id, root, run, interval)
+        feed.start()
+        return feed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'size_bytes': self._total_size,
+            'max_size_bytes': self.max_size_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'change_feeds': len(self._feeds),
+        }
+
+    # ------------- internal -------------
+    def _get(self, key: CacheKey) -> Optional[_Entry]:
+        # Caller holds self._lock (as for _drop)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl_seconds:
+            self.stats['expirations'] += 1
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: CacheKey, value: Any, size: int, generation: Optional[int]) -> None:
+        if not self.enabled or size > self.max_size_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation(key[0]):
+                return  # invalidated while the caller was reading
+            self._drop(key)
+            self._entries[key] = _Entry(value, size, time.monotonic())
+            self._total_size += size
+            while self._total_size > self.max_size_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_size -= evicted.size
+                self.stats['evictions'] += 1
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_size -= entry.size
+
+
+class RemoteChangeFeed:
+    """
+    Polls a remote tree for changes and invalidates them in a RemoteMetadataCache.
+
+    Each poll runs `find <root> -newer <marker>` over SSH against a marker
+    file touched by the previous poll, so only paths modified since then
+    are reported. A directory's mtime changes when entries are added,
+    removed or renamed in it, which covers deletions as well. Polling
+    stands in for inotify, which is not generally available over SFTP.
+    """
+
+    def __init__(self, cache: RemoteMetadataCache, context_id: str, root: str,
+                 run: Callable[[str], Awaitable[str]], interval: float,
+                 max_paths: int = REMOTE_CHANGE_FEED_MAX_PATHS):
+        """
+        Initialize feed.
+
+        Args:
+            cache: Cache to invalidate
+            context_id: Hop context being watched
+            root: Remote directory to watch
+            run: Coroutine function running a shell command remotely, returning stdout
+            interval: Seconds between polls
+            max_paths: Changed paths per poll above which the context is dropped wholesale
+        """
+        self.cache = cache
+        self.context_id = context_id
+        self.root = root
+        self.interval = interval
+        self.max_paths = max_paths
+        self._run = run
+        # Unique per feed so several backends watching one host don't share markers
+        self._marker = f"/tmp/.icotes-changes-{secrets.token_hex(8)}"
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._poll_loop())
+
+    def stop(self) -> None:
+        task, loop = self._task, self._loop
+        if task is None or task.done() or loop is None or loop.is_closed():
+            return
+        try:
+            if loop is asyncio.get_running_loop():
+                task.cancel()
+                return
+        except RuntimeError:
+            pass
+        loop.call_soon_threadsafe(task.cancel)
+
+    def command(self) -> str:
+        marker = shlex.quote(self._marker)
+        return (
+            f"touch {marker}.next && "
+            f"if [ -e {marker} ]; then find {shlex.quote(self.root)} -xdev -newer {marker} -print 2>/dev/null "
+            f"| head -n {self.max_paths + 1}; fi; "
+            f"mv -f {marker}.next {marker}"
+        )
+
+    async def poll_once(self) -> int:
+        """Run one poll; returns the number of changed paths invalidated."""
+        output = await self._run(self.command())
+        paths = [line for line in (output or '').splitlines() if line]
+        if len(paths) > self.max_paths:
+            logger.info(f"[RemoteCache] {len(paths)}+ remote changes in {self.context_id}; dropping its cache")
+            self.cache.drop_context(self.context_id)
+            return len(paths)
+        for path in paths:
+            self.cache.invalidate(self.context_id, posixpath.normpath(path))
+        return len(paths)
+
+    async def _poll_loop(self) -> None:
+        try:
+            while True:
+                try:
+                    await self.poll_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.debug(f"[RemoteCache] change poll failed for {self.context_id}: {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            marker = shlex.quote(self._marker)
+            try:
+                await asyncio.wait_for(self._run(f"rm -f {marker} {marker}.next"), timeout=5.0)
+            except BaseException:
+                pass
+
+
+_global_cache: Optional[RemoteMetadataCache] = None
+
+
+def get_remote_metadata_cache() -> RemoteMetadataCache:
+    """Get the process-wide remote metadata cache."""
+    global _global_cache
+    if _global_cache is None:
+        _global_cache = RemoteMetadataCache()
+    return _global_cache
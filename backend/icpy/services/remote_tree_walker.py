@@ -0,0 +1,140 @@
+"""
+Remote Tree Walker
+
+Bounded-concurrency traversal of a remote directory tree over SFTP. Several
+directory reads are kept in flight at once, so a walk costs roughly
+depth x RTT instead of directories x RTT, and each directory is handed to
+the caller as soon as it has been read.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import posixpath
+import stat
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directory reads kept in flight by a walk
+WALK_CONCURRENCY = int(os.environ.get('HOP_SFTP_WALK_CONCURRENCY', '16'))
+
+# (name, attrs) as returned by readdir; attrs may be None if a stat failed
+RemoteEntry = Tuple[str, Any]
+
+
+def entry_mode(attrs: Any) -> int:
+    """File mode from SFTP attributes (AsyncSSH exposes it as permissions)."""
+    if attrs is None:
+        return 0
+    mode = getattr(attrs, 'st_mode', None)
+    if mode is None:
+        mode = getattr(attrs, 'permissions', 0)
+    return mode or 0
+
+
+def is_walkable_dir(attrs: Any) -> bool:
+    """True for directories; symlinks are not followed to avoid loops."""
+    mode = entry_mode(attrs)
+    return stat.S_ISDIR(mode) and not stat.S_ISLNK(mode)
+
+
+async def read_remote_dir(sftp, path: str, concurrency: int = WALK_CONCURRENCY) -> List[RemoteEntry]:
+    """
+    List one remote directory with attributes, skipping '.' and '..'.
+
+    Falls back to listdir plus stat per entry when readdir fails; those stats
+    are issued concurrently rather than one round trip at a time.
+    """
+    try:
+        entries = await sftp.readdir(path)
+        return [(e.filename, getattr(e, 'attrs', None)) for e in entries
+                if e.filename not in ('.', '..')]
+    except Exception:
+        names = [n for n in await sftp.listdir(path) if n not in ('.', '..')]
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _stat(name: str) -> RemoteEntry:
+        async with semaphore:
+            try:
+                return name, await sftp.stat(posixpath.join(path, name))
+            except Exception:
+                return name, None
+
+    return list(await asyncio.gather(*[_stat(n) for n in names]))
+
+
+async def walk_remote_tree(
+    sftp,
+    root: str,
+    *,
+    concurrency: int = WALK_CONCURRENCY,
+    descend: Optional[Callable[[str, str, Any], bool]] = None,
+    read_dir: Optional[Callable[[Any, str], Awaitable[List[RemoteEntry]]]] = None,
+) -> AsyncIterator[Tuple[str, List[RemoteEntry]]]:
+    """
+    Walk a remote tree, yielding (directory, entries) as each directory is read.
+
+    A parent directory is always yielded before its children. Directories
+    that cannot be read are skipped. Stopping iteration early cancels the
+    reads still in flight.
+
+    Args:
+        sftp: AsyncSSH SFTP client
+        root: Absolute remote directory to start from
+        concurrency: Maximum directory reads in flight
+        descend: Optional predicate (parent, name, attrs) deciding whether to
+            walk into a subdirectory
+        read_dir: Optional coroutine function (sftp, path) replacing
+            read_remote_dir, e.g. to serve directories from a cache
+
+    Yields:
+        Tuple of directory path and its (name, attrs) entries
+    """
+    pending: asyncio.Queue = asyncio.Queue()
+    results: asyncio.Queue = asyncio.Queue()
+    outstanding = 1  # directories queued or being read
+    visited = {root}
+    pending.put_nowait(root)
+
+    async def worker():
+        while True:
+            path = await pending.get()
+            try:
+                if read_dir is not None:
+                    entries = await read_dir(sftp, path)
+                else:
+                    entries = await read_remote_dir(sftp, path, concurrency)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"[RemoteWalk] cannot read {path}: {e}")
+                entries = None
+            await results.put((path, entries))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        while outstanding:
+            path, entries = await results.get()
+            outstanding -= 1
+            if entries is None:
+                continue
+            # Queue children before handing the directory over, so reads
+            # continue while the caller processes it
+            for name, attrs in entries:
+                if not is_walkable_dir(attrs):
+                    continue
+                child = posixpath.join(path, name)
+                if child in visited or (descend is not None and not descend(path, name, attrs)):
+                    continue
+                visited.add(child)
+                outstanding += 1
+                pending.put_nowait(child)
+            yield path, entries
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,715 @@
+"""
+Persistent Search Index for icpy Backend
+
+Inverted index (word -> files) used by FileSystemService for content search.
+The index lives on disk under ``<workspace>/.icotes/search_index`` so restarts
+only re-read files whose mtime/size changed since the last run.
+
+Layout:
+    manifest.json        Document table (path -> doc id, mtime, size) and the
+                         generation of the current segment.
+    segment-<gen>.bin    Immutable, sorted term dictionary plus posting lists,
+                         and a trigram -> term table for substring queries.
+                         Memory-mapped and binary-searched for lookups.
+    journal-<gen>.jsonl  Append-only log of updates since the segment was
+                         written. Replayed on load, folded in on compaction.
+
+Doc ids are never reused, so a document is "live" only while its id is in the
+document table. Updating a file assigns it a new id; stale postings are
+filtered at lookup time and dropped at the next compaction.
+
+Substring queries are answered by ``query_candidates``: each word of the query
+is matched against the term dictionary (exactly, by prefix, by suffix or as an
+infix, depending on where it sits in the query), and the posting lists of the
+matching terms are intersected. Only the resulting files need to be read.
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+SEGMENT_MAGIC = b'ICSI'
+
+# magic, version, reserved, n_terms, n_grams, entries_offset, gram_entries_offset,
+# strings_offset, postings_offset
+_HEADER = struct.Struct('<4sHHIIQQQQ')
+# string_offset, string_len, postings_offset (in u32 slots), postings_count
+# Term postings hold doc ids; gram postings hold term slots.
+_ENTRY = struct.Struct('<IHQI')
+
+GRAM_SIZE = 3
+_MAX_TERM_BYTES = 0xFFFF
+_QUERY_WORD_RE = re.compile(r'\w+')
+
+# How a query word must relate to an indexed term
+MATCH_EXACT = 'exact'
+MATCH_PREFIX = 'prefix'
+MATCH_SUFFIX = 'suffix'
+MATCH_INFIX = 'infix'
+
+
+def _grams(term: str) -> Set[str]:
+    return {term[i:i + GRAM_SIZE] for i in range(len(term) - GRAM_SIZE + 1)}
+
+
+def _term_matches(term: str, word: str, mode: str) -> bool:
+    if mode == MATCH_EXACT:
+        return term == word
+    if mode == MATCH_PREFIX:
+        return term.startswith(word)
+    if mode == MATCH_SUFFIX:
+        return term.endswith(word)
+    return word in term
+
+
+class _Segment:
+    """Read-only view over a memory-mapped segment file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file cannot be mapped
+            self._fh.close()
+            raise
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Truncated search index segment: {path}")
+        (magic, version, _reserved, n_terms, n_grams, entries_off, gram_entries_off,
+         strings_off, postings_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != SEGMENT_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported search index segment: {path}")
+        self.n_terms = n_terms
+        self.n_grams = n_grams
+        self._entries_off = entries_off
+        self._gram_entries_off = gram_entries_off
+        self._strings_off = strings_off
+        self._postings_off = postings_off
+
+    def close(self):
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+        try:
+            self._fh.close()
+        except Exception:
+            pass
+
+    def _string(self, table_off: int, i: int) -> str:
+        str_off, str_len, _, _ = _ENTRY.unpack_from(self._mm, table_off + i * _ENTRY.size)
+        start = self._strings_off + str_off
+        return self._mm[start:start + str_len].decode('utf-8')
+
+    def _slots(self, table_off: int, i: int) -> Tuple[int, ...]:
+        _, _, post_off, count = _ENTRY.unpack_from(self._mm, table_off + i * _ENTRY.size)
+        if not count:
+            return ()
+        return struct.unpack_from(f'<{count}I', self._mm, self._postings_off + post_off * 4)
+
+    def _lower_bound(self, table_off: int, n: int, key: str) -> int:
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string(table_off, mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def term_at(self, i: int) -> str:
+        return self._string(self._entries_off, i)
+
+    def _postings_at(self, i: int) -> Tuple[int, ...]:
+        return self._slots(self._entries_off, i)
+
+    def find(self, term: str) -> int:
+        """Binary search for a term. Returns its slot or -1."""
+        lo = self._lower_bound(self._entries_off, self.n_terms, term)
+        if lo < self.n_terms and self.term_at(lo) == term:
+            return lo
+        return -1
+
+    def postings(self, term: str) -> Tuple[int, ...]:
+        slot = self.find(term)
+        return self._postings_at(slot) if slot >= 0 else ()
+
+    def postings_for_slots(self, slots: Iterable[int]) -> Set[int]:
+        ids: Set[int] = set()
+        for slot in slots:
+            ids.update(self._postings_at(slot))
+        return ids
+
+    def prefix_slots(self, prefix: str, limit: int) -> Optional[List[int]]:
+        """Term slots starting with ``prefix``; None if more than ``limit``."""
+        slots = []
+        i = self._lower_bound(self._entries_off, self.n_terms, prefix)
+        while i < self.n_terms and self.term_at(i).startswith(prefix):
+            if len(slots) >= limit:
+                return None
+            slots.append(i)
+            i += 1
+        return slots
+
+    def gram_slots(self, word: str, mode: str, limit: int) -> Optional[List[int]]:
+        """Term slots containing ``word`` (verified against ``mode``).
+
+        Intersects the trigram -> term tables, smallest first. Returns None if
+        more than ``limit`` terms match.
+        """
+        candidates: Optional[Set[int]] = None
+        lists = []
+        for gram in _grams(word):
+            g = self._lower_bound(self._gram_entries_off, self.n_grams, gram)
+            if g >= self.n_grams or self._string(self._gram_entries_off, g) != gram:
+                return []
+            lists.append(self._slots(self._gram_entries_off, g))
+        for slots in sorted(lists, key=len):
+            candidates = set(slots) if candidates is None else candidates.intersection(slots)
+            if not candidates:
+                return []
+        matched = []
+        for slot in sorted(candidates or ()):
+            if _term_matches(self.term_at(slot), word, mode):
+                if len(matched) >= limit:
+                    return None
+                matched.append(slot)
+        return matched
+
+    def items(self) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+        for i in range(self.n_terms):
+            yield self.term_at(i), self._postings_at(i)
+
+
+class PersistentSearchIndex:
+    """Disk-backed, incrementally updated inverted index.
+
+    Paths are stored relative to ``root_path`` so the index survives the
+    workspace being mounted somewhere else. When ``index_dir`` is None the
+    index is kept purely in memory (nothing is persisted).
+    """
+
+    def __init__(self, root_path: str, index_dir: Optional[str] = None, compact_after: int = 2000,
+                 min_term_length: int = 3):
+        """Initialize the index.
+
+        Args:
+            root_path: Workspace root; stored paths are relative to it
+            index_dir: Directory holding the persisted index (None for in-memory only)
+            compact_after: Journal operations after which compaction is due
+            min_term_length: Shortest term the indexer stores (shorter words are dropped)
+        """
+        self.root_path = os.path.abspath(root_path)
+        self.index_dir = os.path.abspath(index_dir) if index_dir else None
+        self.compact_after = compact_after
+        self.min_term_length = min_term_length
+
+        self._lock = threading.RLock()
+        self._docs: Dict[str, List] = {}        # rel_path -> [doc_id, mtime, size]
+        self._paths: Dict[int, str] = {}        # doc_id -> rel_path (live docs only)
+        self._next_doc_id = 1
+        self._delta: Dict[str, Set[int]] = {}   # term -> doc ids since last compaction
+        self._frozen: Dict[str, Set[int]] = {}  # delta being folded in by a running compaction
+        self._segment: Optional[_Segment] = None
+        self._generation = 0
+        self._journal = None
+        self._journal_ops = 0
+        self._compacting = False
+
+    # ------------------------------------------------------------------
+    # Path helpers
+    # ------------------------------------------------------------------
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root_path)
+
+    def _abs(self, rel_path: str) -> str:
+        return os.path.join(self.root_path, rel_path)
+
+    # ------------------------------------------------------------------
+    # Loading / persistence
+    # ------------------------------------------------------------------
+    def load(self) -> bool:
+        """Load the persisted index from disk.
+
+        Returns:
+            True if an existing index was loaded, False if starting empty
+        """
+        if not self.index_dir:
+            return False
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            loaded = False
+            try:
+                loaded = self._load_locked()
+            except Exception as e:
+                logger.warning(f"[SearchIndex] Discarding unreadable index at {self.index_dir}: {e}")
+                self._reset_locked(remove_files=True)
+            self._open_journal_locked()
+            return loaded
+
+    def _load_locked(self) -> bool:
+        manifest_path = os.path.join(self.index_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != INDEX_VERSION:
+                raise ValueError(f"index version {manifest.get('version')} != {INDEX_VERSION}")
+            self._generation = int(manifest.get('generation', 0))
+            self._next_doc_id = int(manifest.get('next_doc_id', 1))
+            self._docs = {p: list(v) for p, v in manifest.get('docs', {}).items()}
+            self._paths = {v[0]: p for p, v in self._docs.items()}
+            segment_name = manifest.get('segment')
+            if segment_name:
+                self._segment = _Segment(os.path.join(self.index_dir, segment_name))
+
+        # Replay journals written since the segment (older ones are already folded in)
+        replayed = 0
+        for gen, name in self._journal_files():
+            if gen < self._generation:
+                continue
+            replayed += self._replay_journal(os.path.join(self.index_dir, name))
+        self._journal_ops = replayed
+        return bool(self._docs)
+
+    def _journal_files(self) -> List[Tuple[int, str]]:
+        files = []
+        for name in os.listdir(self.index_dir):
+            if name.startswith('journal-') and name.endswith('.jsonl'):
+                try:
+                    files.append((int(name[len('journal-'):-len('.jsonl')]), name))
+                except ValueError:
+                    continue
+        return sorted(files)
+
+    def _replay_journal(self, path: str) -> int:
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write at the tail of the journal; everything before it is valid
+                    break
+                self._apply_locked(op)
+                count += 1
+        return count
+
+    def _open_journal_locked(self):
+        if not self.index_dir:
+            return
+        if self._journal:
+            self._journal.close()
+        path = os.path.join(self.index_dir, f'journal-{self._generation}.jsonl')
+        self._journal = open(path, 'a', encoding='utf-8')
+
+    def _log_locked(self, op: Dict):
+        self._journal_ops += 1
+        if self._journal:
+            self._journal.write(json.dumps(op, separators=(',', ':')) + '\n')
+
+    def flush(self):
+        """Flush pending journal writes to disk."""
+        with self._lock:
+            if self._journal:
+                self._journal.flush()
+
+    def close(self):
+        """Flush and release file handles and the segment mapping."""
+        with self._lock:
+            if self._journal:
+                try:
+                    self._journal.close()
+                finally:
+                    self._journal = None
+            if self._segment:
+                self._segment.close()
+                self._segment = None
+
+    def _reset_locked(self, remove_files: bool):
+        if self._segment:
+            self._segment.close()
+            self._segment = None
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+        self._docs = {}
+        self._paths = {}
+        self._delta = {}
+        self._frozen = {}
+        self._next_doc_id = 1
+        self._generation = 0
+        self._journal_ops = 0
+        if remove_files and self.index_dir and os.path.isdir(self.index_dir):
+            for name in os.listdir(self.index_dir):
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass
+
+    def clear(self):
+        """Drop all indexed content, including the persisted files."""
+        with self._lock:
+            self._reset_locked(remove_files=True)
+            self._open_journal_locked()
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def _apply_locked(self, op: Dict):
+        kind = op.get('op')
+        if kind == 'put':
+            rel = op['path']
+            old = self._docs.get(rel)
+            if old:
+                self._paths.pop(old[0], None)
+            doc_id = int(op['doc'])
+            self._docs[rel] = [doc_id, op.get('mtime', 0.0), op.get('size', 0)]
+            self._paths[doc_id] = rel
+            self._next_doc_id = max(self._next_doc_id, doc_id + 1)
+            for term in op.get('terms', ()):
+                self._delta.setdefault(term, set()).add(doc_id)
+        elif kind == 'del':
+            for rel in self._matching_locked(op['path'], op.get('prefix', False)):
+                doc_id = self._docs.pop(rel)[0]
+                self._paths.pop(doc_id, None)
+        elif kind == 'mv':
+            src, dst = op['src'], op['dst']
+            for rel in self._matching_locked(src, op.get('prefix', False)):
+                new_rel = dst + rel[len(src):]
+                entry = self._docs.pop(rel)
+                old = self._docs.get(new_rel)
+                if old:
+                    self._paths.pop(old[0], None)
+                self._docs[new_rel] = entry
+                self._paths[entry[0]] = new_rel
+
+    def _matching_locked(self, rel: str, prefix: bool) -> List[str]:
+        matches = [rel] if rel in self._docs else []
+        if prefix:
+            base = rel.rstrip(os.sep) + os.sep
+            matches.extend(p for p in self._docs if p.startswith(base))
+        return matches
+
+    def needs_update(self, path: str, mtime: float, size: int) -> bool:
+        """Return True if the file is missing from the index or changed since indexed."""
+        entry = self._docs.get(self._rel(path))
+        return entry is None or entry[1] != mtime or entry[2] != size
+
+    def update_file(self, path: str, mtime: float, size: int, terms: Iterable[str]):
+        """(Re)index a file with the given terms."""
+        with self._lock:
+            op = {
+                'op': 'put',
+                'path': self._rel(path),
+                'doc': self._next_doc_id,
+                'mtime': mtime,
+                'size': size,
+                'terms': sorted(set(terms)),
+            }
+            self._apply_locked(op)
+            self._log_locked(op)
+
+    def remove_file(self, path: str, recursive: bool = False):
+        """Remove a file (or, with ``recursive``, everything under a directory)."""
+        with self._lock:
+            op = {'op': 'del', 'path': self._rel(path), 'prefix': recursive}
+            if not self._matching_locked(op['path'], recursive):
+                return
+            self._apply_locked(op)
+            self._log_locked(op)
+
+    def move_file(self, src_path: str, dest_path: str, recursive: bool = False):
+        """Re-key indexed content after a rename. Postings are unaffected."""
+        with self._lock:
+            op = {'op': 'mv', 'src': self._rel(src_path), 'dst': self._rel(dest_path), 'prefix': recursive}
+            if not self._matching_locked(op['src'], recursive):
+                return
+            self._apply_locked(op)
+            self._log_locked(op)
+
+    def prune(self, existing_paths: Iterable[str]) -> int:
+        """Remove indexed files that are no longer present.
+
+        Args:
+            existing_paths: Absolute paths seen by the latest scan
+
+        Returns:
+            Number of removed entries
+        """
+        keep = {self._rel(p) for p in existing_paths}
+        with self._lock:
+            stale = [rel for rel in self._docs if rel not in keep]
+            for rel in stale:
+                op = {'op': 'del', 'path': rel}
+                self._apply_locked(op)
+                self._log_locked(op)
+        return len(stale)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def lookup_ids(self, term: str) -> Set[int]:
+        """Return live doc ids containing ``term``."""
+        with self._lock:
+            ids: Set[int] = set(self._segment.postings(term)) if self._segment else set()
+            ids.update(self._frozen.get(term, ()))
+            ids.update(self._delta.get(term, ()))
+            return {d for d in ids if d in self._paths}
+
+    def lookup(self, term: str) -> Set[str]:
+        """Return absolute paths of files containing ``term``."""
+        ids = self.lookup_ids(term.lower())
+        return {self._abs(self._paths[d]) for d in ids if d in self._paths}
+
+    def _word_ids(self, word: str, mode: str, max_terms: int) -> Optional[Set[int]]:
+        """Live doc ids having a term that matches ``word`` under ``mode``.
+
+        Returns None when the word cannot narrow the search: it is shorter
+        than the indexed minimum (so matching words may not be indexed) or
+        it expands to more than ``max_terms`` terms.
+        """
+        if len(word) < self.min_term_length:
+            return None
+        if mode == MATCH_EXACT:
+            return self.lookup_ids(word)
+        with self._lock:
+            ids: Set[int] = set()
+            if self._segment:
+                if mode == MATCH_PREFIX:
+                    slots = self._segment.prefix_slots(word, max_terms)
+                else:
+                    slots = self._segment.gram_slots(word, mode, max_terms)
+                if slots is None:
+                    return None
+                ids = self._segment.postings_for_slots(slots)
+            expanded = 0
+            for source in (self._frozen, self._delta):
+                for term, term_ids in source.items():
+                    if _term_matches(term, word, mode):
+                        expanded += 1
+                        if expanded > max_terms:
+                            return None
+                        ids.update(term_ids)
+            return {d for d in ids if d in self._paths}
+
+    def query_candidates(self, query: str, max_terms: int = 5000) -> Optional[Set[str]]:
+        """Files that may contain ``query`` as a case-insensitive substring.
+
+        A superset of the true matches (callers still verify file content).
+        Returns None when the index cannot narrow the query at all, e.g. for
+        punctuation-only or very short queries.
+        """
+        query = query.lower()
+        words = list(_QUERY_WORD_RE.finditer(query))
+        constraints: List[Set[int]] = []
+        for m in words:
+            # A word touching either end of the query may continue in the file
+            open_left = m.start() == 0
+            open_right = m.end() == len(query)
+            if open_left and open_right:
+                mode = MATCH_INFIX
+            elif open_left:
+                mode = MATCH_SUFFIX
+            elif open_right:
+                mode = MATCH_PREFIX
+            else:
+                mode = MATCH_EXACT
+            ids = self._word_ids(m.group(), mode, max_terms)
+            if ids is None:
+                continue
+            if not ids:
+                return set()
+            constraints.append(ids)
+        if not constraints:
+            return None
+        constraints.sort(key=len)
+        result = set(constraints[0])
+        for ids in constraints[1:]:
+            result &= ids
+            if not result:
+                break
+        return {self._abs(self._paths[d]) for d in result if d in self._paths}
+
+    def path_for(self, doc_id: int) -> Optional[str]:
+        rel = self._paths.get(doc_id)
+        return self._abs(rel) if rel is not None else None
+
+    def __getitem__(self, term: str) -> Set[str]:
+        return self.lookup(term)
+
+    def __contains__(self, term: str) -> bool:
+        return bool(self.lookup_ids(term))
+
+    def __len__(self) -> int:
+        """Approximate number of distinct terms."""
+        with self._lock:
+            base = self._segment.n_terms if self._segment else 0
+            extra = {t for t in (*self._frozen, *self._delta)}
+            if self._segment:
+                extra = {t for t in extra if self._segment.find(t) < 0}
+            return base + len(extra)
+
+    @property
+    def document_count(self) -> int:
+        return len(self._docs)
+
+    def get_stats(self) -> Dict:
+        return {
+            'documents': len(self._docs),
+            'segment_terms': self._segment.n_terms if self._segment else 0,
+            'delta_terms': len(self._delta),
+            'journal_ops': self._journal_ops,
+            'generation': self._generation,
+            'persistent': self.index_dir is not None,
+        }
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def needs_compaction(self) -> bool:
+        return bool(self.index_dir) and not self._compacting and (
+            self._journal_ops >= self.compact_after or (self._segment is None and self._docs)
+        )
+
+    def compact(self):
+        """Fold the journal into a new memory-mapped segment.
+
+        Safe to call from a worker thread; lookups and updates keep working
+        against the previous segment while the new one is written.
+        """
+        if not self.index_dir:
+            return
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+            # Freeze the current delta/doc table; further updates go to a fresh journal
+            frozen = self._delta
+            self._frozen = frozen
+            self._delta = {}
+            docs = {p: list(v) for p, v in self._docs.items()}
+            live = set(self._paths)
+            next_doc_id = self._next_doc_id
+            base = self._segment
+            new_gen = self._generation + 1
+            if self._journal:
+                self._journal.close()
+            self._journal = open(os.path.join(self.index_dir, f'journal-{new_gen}.jsonl'), 'a', encoding='utf-8')
+            journal_ops_at_freeze = self._journal_ops
+
+        try:
+            merged: Dict[str, Set[int]] = {}
+            if base:
+                for term, ids in base.items():
+                    kept = {d for d in ids if d in live}
+                    if kept:
+                        merged[term] = kept
+            for term, ids in frozen.items():
+                kept = {d for d in ids if d in live}
+                if kept:
+                    merged.setdefault(term, set()).update(kept)
+
+            segment_name = f'segment-{new_gen}.bin'
+            self._write_segment(os.path.join(self.index_dir, segment_name), merged)
+            manifest = {
+                'version': INDEX_VERSION,
+                'generation': new_gen,
+                'segment': segment_name,
+                'next_doc_id': next_doc_id,
+                'docs': docs,
+            }
+            tmp = os.path.join(self.index_dir, 'manifest.json.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, separators=(',', ':'))
+            os.replace(tmp, os.path.join(self.index_dir, 'manifest.json'))
+            new_segment = _Segment(os.path.join(self.index_dir, segment_name))
+        except Exception as e:
+            logger.error(f"[SearchIndex] Compaction failed: {e}")
+            with self._lock:
+                # Put the frozen delta back so nothing is lost
+                for term, ids in frozen.items():
+                    self._delta.setdefault(term, set()).update(ids)
+                self._frozen = {}
+                self._compacting = False
+            return
+
+        with self._lock:
+            old = self._segment
+            self._segment = new_segment
+            self._frozen = {}
+            self._generation = new_gen
+            self._journal_ops -= journal_ops_at_freeze
+            self._compacting = False
+        if old:
+            old.close()
+        self._remove_stale_files(new_gen, segment_name)
+        logger.debug(f"[SearchIndex] Compacted {len(docs)} documents, {len(merged)} terms (gen {new_gen})")
+
+    def _write_segment(self, path: str, postings: Dict[str, Set[int]]):
+        terms = sorted(t for t in postings if len(t.encode('utf-8')) <= _MAX_TERM_BYTES)
+        strings = bytearray()
+        entries = bytearray()
+        slots: List[int] = []
+        grams: Dict[str, List[int]] = {}
+        for slot, term in enumerate(terms):
+            encoded = term.encode('utf-8')
+            ids = sorted(postings[term])
+            entries += _ENTRY.pack(len(strings), len(encoded), len(slots), len(ids))
+            strings += encoded
+            slots.extend(ids)
+            for gram in _grams(term):
+                grams.setdefault(gram, []).append(slot)
+        gram_entries = bytearray()
+        for gram in sorted(grams):
+            encoded = gram.encode('utf-8')
+            term_slots = grams[gram]
+            gram_entries += _ENTRY.pack(len(strings), len(encoded), len(slots), len(term_slots))
+            strings += encoded
+            slots.extend(term_slots)
+        entries_off = _HEADER.size
+        gram_entries_off = entries_off + len(entries)
+        strings_off = gram_entries_off + len(gram_entries)
+        postings_off = strings_off + len(strings)
+        # Align postings to 4 bytes
+        pad = (-postings_off) % 4
+        postings_off += pad
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(SEGMENT_MAGIC, INDEX_VERSION, 0, len(terms), len(grams),
+                                 entries_off, gram_entries_off, strings_off, postings_off))
+            f.write(entries)
+            f.write(gram_entries)
+            f.write(strings)
+            f.write(b'\0' * pad)
+            f.write(struct.pack(f'<{len(slots)}I', *slots))
+        os.replace(tmp, path)
+
+    def _remove_stale_files(self, generation: int, segment_name: str):
+        for name in os.listdir(self.index_dir):
+            stale = False
+            if name.startswith('segment-') and name != segment_name:
+                stale = True
+            elif name.startswith('journal-') and name.endswith('.jsonl'):
+                try:
+                    stale = int(name[len('journal-'):-len('.jsonl')]) < generation
+                except ValueError:
+                    stale = False
+            if stale:
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass
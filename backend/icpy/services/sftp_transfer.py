@@ -0,0 +1,152 @@
+"""
+SFTP Transfer
+
+Pipelined reads and writes of a single remote file. Up to max_requests
+chunk requests are in flight at once (SFTP reads and writes carry their
+own offsets), so throughput is no longer one chunk per round trip, while
+no more than max_requests chunks are buffered at a time.
+
+Progress is tracked as the contiguous number of bytes transferred from
+the start of the file, which is also where an interrupted transfer
+resumes on a fresh SFTP client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+# Bytes per read/write request
+TRANSFER_CHUNK_SIZE = int(os.environ.get('HOP_SFTP_CHUNK_KB', '256')) * 1024
+# Requests kept in flight per file
+TRANSFER_MAX_REQUESTS = int(os.environ.get('HOP_SFTP_MAX_REQUESTS', '16'))
+# Reconnect-and-resume attempts after a dropped connection
+TRANSFER_RETRIES = int(os.environ.get('HOP_SFTP_TRANSFER_RETRIES', '3'))
+
+
+@dataclass
+class TransferState:
+    """Progress of one file transfer; survives reconnects so it can be resumed."""
+    path: Optional[str]  # remote file being read or written
+    direction: str  # 'download' or 'upload'
+    total: Optional[int] = None
+    done: int = 0  # contiguous bytes transferred from offset 0
+    resumes: int = 0
+    target: Optional[str] = None  # path reported to users, if path is a temp file
+    transfer_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    started_at: float = field(default_factory=time.monotonic)
+    reported_at: float = 0.0
+
+
+ProgressCallback = Callable[[TransferState], Awaitable[None]]
+
+
+def _request(coro, timeout: Optional[float]) -> asyncio.Future:
+    return asyncio.ensure_future(asyncio.wait_for(coro, timeout) if timeout else coro)
+
+
+async def _cancel_all(tasks) -> None:
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def read_chunks(f, state: TransferState, *, chunk_size: int = TRANSFER_CHUNK_SIZE,
+                      max_requests: int = TRANSFER_MAX_REQUESTS, request_timeout: Optional[float] = None,
+                      on_progress: Optional[ProgressCallback] = None) -> AsyncIterator[bytes]:
+    """
+    Yield an open remote file from state.done up to state.total, in order.
+
+    Args:
+        f: AsyncSSH SFTPClientFile opened for reading
+        state: Transfer state; total must be set, done is advanced per chunk
+        chunk_size: Bytes per read request
+        max_requests: Read requests in flight
+        request_timeout: Optional timeout per request
+        on_progress: Awaited after each chunk is yielded
+
+    Yields:
+        Chunks of at most chunk_size bytes
+    """
+    end = state.total or 0
+    next_offset = state.done
+    pending: deque = deque()
+    try:
+        while pending or next_offset < end:
+            while next_offset < end and len(pending) < max(1, max_requests):
+                size = min(chunk_size, end - next_offset)
+                pending.append((next_offset, size, _request(f.read(size, next_offset), request_timeout)))
+                next_offset += size
+            offset, size, task = pending.popleft()
+            data = await task
+            if 0 < len(data) < size:
+                # Servers may cap the read size (e.g. OpenSSH at 256 KiB): size
+                # later requests to the cap and fetch the rest in one round trip
+                cap = len(data)
+                chunk_size = min(chunk_size, cap)
+                starts = range(offset + cap, offset + size, cap)
+                parts = await asyncio.gather(*[
+                    _request(f.read(min(cap, offset + size - start), start), request_timeout) for start in starts
+                ])
+                for start, part in zip(starts, parts):
+                    data += part
+                    if len(part) < min(cap, offset + size - start):
+                        break
+            while len(data) < size:
+                more = await f.read(size - len(data), offset + len(data))
+                if not more:
+                    break
+                data += more
+            if data:
+                state.done = offset + len(data)
+                yield data
+                if on_progress is not None:
+                    await on_progress(state)
+            if len(data) < size:
+                break  # the file shrank since it was stat'ed
+    finally:
+        await _cancel_all([task for _, _, task in pending])
+
+
+async def write_chunks(f, data: bytes, state: TransferState, *, chunk_size: int = TRANSFER_CHUNK_SIZE,
+                       max_requests: int = TRANSFER_MAX_REQUESTS, request_timeout: Optional[float] = None,
+                       on_progress: Optional[ProgressCallback] = None) -> None:
+    """
+    Write data[state.done:] to an open remote file at matching offsets.
+
+    Writes are acknowledged in order, so state.done only covers bytes that
+    are known to be on the remote side.
+
+    Args:
+        f: AsyncSSH SFTPClientFile opened for writing
+        data: Full file content
+        state: Transfer state; done is advanced as writes are acknowledged
+        chunk_size: Bytes per write request
+        max_requests: Write requests in flight
+        request_timeout: Optional timeout per request
+        on_progress: Awaited after each acknowledged chunk
+    """
+    view = memoryview(data)
+    end = len(data)
+    next_offset = state.done
+    pending: deque = deque()
+    try:
+        while pending or next_offset < end:
+            while next_offset < end and len(pending) < max(1, max_requests):
+                size = min(chunk_size, end - next_offset)
+                chunk = bytes(view[next_offset:next_offset + size])
+                pending.append((next_offset, size, _request(f.write(chunk, next_offset), request_timeout)))
+                next_offset += size
+            offset, size, task = pending.popleft()
+            await task
+            state.done = offset + size
+            if on_progress is not None:
+                await on_progress(state)
+    finally:
+        await _cancel_all([task for _, _, task in pending])
@@ -23,7 +23,6 @@ import json
 import logging
 import os
 import pty
-import select
 import signal
 import struct
 import subprocess
@@ -32,13 +31,15 @@ import fcntl
 import time
 import uuid
 from collections import defaultdict
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from enum import Enum
 from typing import Dict, Any, Optional, List, Set, Callable
 from fastapi import WebSocket
 
 from ..core.message_broker import get_message_broker
 from ..core.connection_manager import get_connection_manager
+from ..utils.pty_output_pump import PtyOutputPump, TerminalFrameWriter, wants_binary_frames
+from ..utils.terminal_scrollback import TerminalScrollback, SCROLLBACK_MODES
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +66,8 @@ class TerminalConfig:
     env: Dict[str, str] = None
     cwd: str = None
     startup_script: str = None
+    scrollback_bytes: int = None  # default: TERMINAL_SCROLLBACK_BYTES
+    scrollback_mode: str = None  # 'raw' or 'snapshot'; default: TERMINAL_SCROLLBACK_MODE
     
     def __post_init__(self):
         """Initialize default values."""
@@ -87,6 +90,13 @@ class TerminalSession:
     write_task: Optional[asyncio.Task] = None
     created_at: float = None
     last_activity: float = None
+    output_bytes: int = 0
+    output_chunks: int = 0
+    binary_frames: bool = False
+    scrollback: Optional[TerminalScrollback] = None
+    writer: Optional[TerminalFrameWriter] = None
+    websocket_id: Optional[str] = None
+    output_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
     
     def __post_init__(self):
         """Initialize timestamps."""
@@ -105,7 +115,11 @@ class TerminalSession:
             'created_at': self.created_at,
             'last_activity': self.last_activity,
             'pid': self.process.pid if self.process else None,
-            'has_process': self.process is not None
+            'has_process': self.process is not None,
+            'output_bytes': self.output_bytes,
+            'output_chunks': self.output_chunks,
+            'scrollback_bytes': len(self.scrollback) if self.scrollback else 0,
+            'attached': self.writer is not None
         }
 
 
@@ -137,6 +151,8 @@ class TerminalService:
             'sessions_destroyed': 0,
             'total_input_bytes': 0,
             'total_output_bytes': 0,
+            'output_chunks': 0,
+            'output_reads': 0,
             'resize_operations': 0,
             'startup_time': 0.0
         }
@@ -146,6 +162,30 @@ class TerminalService:
         self.session_timeout = 600  # Reduce session timeout to 10 minutes
         self.cleanup_interval = 30  # Reduce cleanup interval to 30 seconds
         
+        # Output coalescing: hold PTY output at most this long / this large before sending
+        try:
+            self.output_max_latency = float(os.getenv('TERMINAL_OUTPUT_MAX_LATENCY_MS', '5')) / 1000.0
+        except ValueError:
+            self.output_max_latency = 0.005
+        try:
+            self.output_max_chunk = int(os.getenv('TERMINAL_OUTPUT_MAX_CHUNK_BYTES', '65536'))
+        except ValueError:
+            self.output_max_chunk = 65536
+        # Seconds between aggregated terminal.output_sent metric events per session
+        try:
+            self.output_stats_interval = float(os.getenv('TERMINAL_OUTPUT_STATS_INTERVAL', '5'))
+        except ValueError:
+            self.output_stats_interval = 5.0
+        # Output kept per session for replay when a WebSocket reattaches
+        try:
+            self.scrollback_bytes = int(os.getenv('TERMINAL_SCROLLBACK_BYTES', '262144'))
+        except ValueError:
+            self.scrollback_bytes = 262144
+        self.scrollback_mode = os.getenv('TERMINAL_SCROLLBACK_MODE', 'raw')
+        if self.scrollback_mode not in SCROLLBACK_MODES:
+            logger.warning(f"Unknown TERMINAL_SCROLLBACK_MODE {self.scrollback_mode!r}, using 'raw'")
+            self.scrollback_mode = 'raw'
+        
         # Default shell paths
         self.shell_paths = ['/bin/bash', '/usr/bin/bash', '/usr/local/bin/bash']
         
@@ -277,6 +317,12 @@ class TerminalService:
         try:
             session.state = TerminalState.STARTING
             
+            # Scrollback kept across WebSocket reattaches
+            session.scrollback = TerminalScrollback(
+                max_bytes=session.config.scrollback_bytes or self.scrollback_bytes,
+                mode=session.config.scrollback_mode or self.scrollback_mode
+            )
+            
             # Create PTY
             logger.info(f"Creating PTY for session {session_id}")
             master_fd, slave_fd = pty.openpty()
@@ -362,6 +408,9 @@ class TerminalService:
             session.state = TerminalState.RUNNING
             session.last_activity = time.time()
             
+            # Output is read for the whole session lifetime, attached or not
+            session.read_task = asyncio.create_task(self._read_from_terminal(session))
+            
             # Publish event
             await self.message_broker.publish('terminal.session_started', {
                 'session_id': session_id,
@@ -486,12 +535,24 @@ class TerminalService:
         logger.info(f"Terminal session destroyed: {session_id}")
         return True
 
-    async def connect_websocket(self, websocket: WebSocket, session_id: str) -> bool:
+    async def connect_websocket(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        binary: Optional[bool] = None,
+        replay: bool = True
+    ) -> bool:
         """Connect a WebSocket to a terminal session.
         
+        The session's scrollback is replayed first, so a client reattaching
+        after a disconnect sees the output produced in the meantime. A new
+        connection takes over from any WebSocket already attached.
+        
         Args:
             websocket: The WebSocket connection
             session_id: The session ID
+            binary: Send output as binary frames (default: from ?binary=1 on the URL)
+            replay: Send the scrollback before live output
             
         Returns:
             True if successful, False otherwise
@@ -512,11 +573,25 @@ class TerminalService:
             # Generate websocket ID
             websocket_id = str(uuid.uuid4())
             self.websocket_sessions[websocket_id] = session_id
+            session.binary_frames = wants_binary_frames(websocket) if binary is None else binary
             
-            # Start I/O tasks
-            session.read_task = asyncio.create_task(
-                self._read_from_terminal(websocket, session)
-            )
+            # Take over from a previously attached WebSocket
+            if session.websocket_id is not None:
+                self.websocket_sessions.pop(session.websocket_id, None)
+            if session.write_task:
+                session.write_task.cancel()
+            
+            # Replay scrollback and attach under the output lock, so no output is
+            # missed or duplicated between the replay and live output
+            writer = TerminalFrameWriter(websocket, binary=session.binary_frames)
+            async with session.output_lock:
+                backlog = session.scrollback.snapshot() if replay and session.scrollback else b''
+                session.writer = writer
+                session.websocket_id = websocket_id
+                if backlog:
+                    await writer.send(backlog)
+            
+            # Start input task
             session.write_task = asyncio.create_task(
                 self._write_to_terminal(websocket, session)
             )
@@ -547,11 +622,10 @@ class TerminalService:
         session_id = self.websocket_sessions[websocket_id]
         session = self.sessions.get(session_id)
         
-        if session:
-            # Cancel I/O tasks
-            if session.read_task:
-                session.read_task.cancel()
-                session.read_task = None
+        if session and session.websocket_id == websocket_id:
+            # Detach; output keeps being read into the scrollback
+            session.writer = None
+            session.websocket_id = None
             if session.write_task:
                 session.write_task.cancel()
                 session.write_task = None
@@ -718,56 +792,83 @@ class TerminalService:
         
         return None
 
-    async def _read_from_terminal(self, websocket: WebSocket, session: TerminalSession):
-        """Read from terminal and send to WebSocket.
+    async def _read_from_terminal(self, session: TerminalSession):
+        """Read terminal output into the scrollback and the attached WebSocket.
+        
+        Runs for the lifetime of the session. Output is pumped by an
+        event-driven reader (loop.add_reader) and coalesced up to
+        output_max_latency / output_max_chunk per chunk, then sent as a binary
+        frame when the client asked for them, text otherwise. While no
+        WebSocket is attached output only goes to the scrollback.
         
         Args:
-            websocket: The WebSocket connection
             session: The terminal session
         """
+        window = {'bytes': 0, 'chunks': 0, 'started': time.time()}
+        
+        async def on_output(data: bytes):
+            async with session.output_lock:
+                if session.scrollback is not None:
+                    session.scrollback.append(data)
+                writer = session.writer
+                if writer is not None:
+                    # Send to WebSocket (binary frame, or text decoded across chunk boundaries)
+                    try:
+                        await writer.send(data)
+                    except Exception as e:
+                        logger.info(f"Detaching WebSocket from session {session.id} after send error: {e}")
+                        if session.writer is writer:
+                            session.writer = None
+            
+            # Update statistics
+            self.stats['total_output_bytes'] += len(data)
+            self.stats['output_chunks'] += 1
+            session.output_bytes += len(data)
+            session.output_chunks += 1
+            session.last_activity = time.time()
+            window['bytes'] += len(data)
+            window['chunks'] += 1
+            if session.last_activity - window['started'] >= self.output_stats_interval:
+                await self._publish_output_stats(session, window)
+        
+        if session.state != TerminalState.RUNNING or not session.master_fd:
+            return
+        pump = PtyOutputPump(
+            session.master_fd,
+            on_output,
+            max_latency=self.output_max_latency,
+            max_chunk=self.output_max_chunk
+        )
         try:
-            while session.state == TerminalState.RUNNING and session.master_fd:
-                try:
-                    # Use select with low timeout for responsiveness
-                    ready, _, _ = select.select([session.master_fd], [], [], 0.001)
-                    if ready:
-                        # Read available data
-                        data = os.read(session.master_fd, 8192)
-                        if data:
-                            # Decode terminal data
-                            try:
-                                decoded_data = data.decode('utf-8')
-                            except UnicodeDecodeError:
-                                decoded_data = data.decode('latin-1')
-                            
-                            # Send to WebSocket
-                            await websocket.send_text(decoded_data)
-                            
-                            # Update statistics
-                            self.stats['total_output_bytes'] += len(data)
-                            session.last_activity = time.time()
-                            
-                            # Publish event
-                            await self.message_broker.publish('terminal.output_sent', {
-                                'session_id': session.id,
-                                'data_length': len(data),
-                                'timestamp': time.time()
-                            })
-                        else:
-                            # EOF reached
-                            break
-                    else:
-                        # No data available, yield control
-                        await asyncio.sleep(0.001)
-                        
-                except Exception as e:
-                    logger.error(f"Error reading from terminal {session.id}: {e}")
-                    break
-                    
+            await pump.run()
+            if session.writer is not None:
+                await session.writer.close()
         except asyncio.CancelledError:
             logger.info(f"Read task cancelled for session {session.id}")
         except Exception as e:
             logger.error(f"Unexpected error in read task for session {session.id}: {e}")
+        finally:
+            self.stats['output_reads'] += pump.metrics['reads']
+            if window['bytes']:
+                try:
+                    await self._publish_output_stats(session, window)
+                except Exception:
+                    pass
+    
+    async def _publish_output_stats(self, session: TerminalSession, window: Dict[str, Any]):
+        """Publish one aggregated terminal.output_sent event for a metrics window."""
+        now = time.time()
+        elapsed = max(now - window['started'], 1e-6)
+        payload = {
+            'session_id': session.id,
+            'data_length': window['bytes'],
+            'chunks': window['chunks'],
+            'interval': elapsed,
+            'bytes_per_second': window['bytes'] / elapsed,
+            'timestamp': now
+        }
+        window.update(bytes=0, chunks=0, started=now)
+        await self.message_broker.publish('terminal.output_sent', payload)
 
     async def _write_to_terminal(self, websocket: WebSocket, session: TerminalSession):
         """Read from WebSocket and write to terminal.
@@ -0,0 +1,19 @@
+"""
+Environment Helpers
+
+Parsing of numeric tuning knobs read from environment variables.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float from the environment, falling back to default if unset or invalid."""
+    try:
+        return float(os.getenv(name, str(default)))
+    except (ValueError, TypeError):
+        logger.warning(f"Invalid {name} value, using default {default}")
+        return default
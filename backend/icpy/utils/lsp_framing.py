@@ -0,0 +1,198 @@
+"""
+LSP Framing
+Buffered reader and writer helpers for Language Server Protocol base
+protocol messages (Content-Length framed JSON-RPC over stdio).
+"""
+import asyncio
+import gc
+import json
+import logging
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_HEADER_END = b'\r\n\r\n'
+_READ_SIZE = 65536
+# Upper bound on a header block; anything longer is not an LSP stream
+_MAX_HEADER_BYTES = 8192
+# Bodies from this size on are decoded with the cyclic GC paused
+_LARGE_BODY_BYTES = 262144
+
+
+class LSPProtocolError(Exception):
+    """Raised when the byte stream is not valid LSP framing."""
+
+
+def encode_lsp_message(payload: Dict[str, Any]) -> bytes:
+    """Frame a JSON-RPC payload with a Content-Length header."""
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return b'Content-Length: %d\r\n\r\n%s' % (len(body), body)
+
+
+def decode_lsp_body(body) -> Any:
+    """Parse a message body (bytes, bytearray or memoryview) as JSON."""
+    if orjson is not None:
+        return orjson.loads(body)
+    if isinstance(body, memoryview):
+        body = body.tobytes()
+    return json.loads(body)
+
+
+def _decode_large_body(body) -> Any:
+    # Decoding allocates many containers and no reference cycles; pausing the
+    # cyclic GC avoids repeated collections that can double the parse time.
+    # gc.disable() is process-wide and pauses collection for every thread, so
+    # this is only used for parses that block the loop thread anyway
+    paused = gc.isenabled()
+    if paused:
+        gc.disable()
+    try:
+        return decode_lsp_body(body)
+    finally:
+        if paused:
+            gc.enable()
+
+
+class LSPMessageReader:
+    """
+    Incremental parser for Content-Length framed messages.
+
+    Reads the stream in large chunks into one bytearray and slices messages
+    out of it, so short reads and messages split across reads are handled
+    and headers are not decoded line by line. Bodies are parsed straight
+    from the buffer without a str decode step, and a body that ends the
+    buffer is handed over as a memoryview rather than copied. Large bodies
+    parsed inline are parsed with the cyclic GC paused. Parsing on a worker thread is
+    opt-in via offload_threshold: the C JSON parsers hold the GIL, so it
+    mostly helps when the loop has other threads to yield to.
+    """
+
+    def __init__(self, stream, offload_threshold: Optional[int] = None, read_size: int = _READ_SIZE):
+        """
+        Initialize reader.
+
+        Args:
+            stream: Object with an async read(n) method (e.g. asyncio.StreamReader)
+            offload_threshold: Body size in bytes from which JSON is parsed off the loop
+                thread; None to always parse inline
+            read_size: Bytes requested per read from the stream
+        """
+        self.stream = stream
+        self.offload_threshold = offload_threshold
+        self.read_size = read_size
+        self._buffer = bytearray()
+        self._pos = 0  # start of unconsumed data in the buffer
+        self._scanned = 0  # buffer offset already searched for the header terminator
+        self._eof = False
+
+        self.metrics = {
+            'messages': 0,
+            'bytes': 0,
+            'reads': 0,
+            'offloaded': 0,
+        }
+
+    async def read_message(self) -> Optional[Any]:
+        """
+        Read the next message.
+
+        Returns:
+            The parsed JSON payload, or None at end of stream
+
+        Raises:
+            LSPProtocolError: If the framing is invalid
+        """
+        body = await self.read_body()
+        if body is None:
+            return None
+        if self.offload_threshold is not None and len(body) >= self.offload_threshold:
+            self.metrics['offloaded'] += 1
+            # No GC pause here: it would apply to every thread while the
+            # loop keeps running
+            return await asyncio.get_running_loop().run_in_executor(None, decode_lsp_body, body)
+        if len(body) >= _LARGE_BODY_BYTES:
+            return _decode_large_body(body)
+        return decode_lsp_body(body)
+
+    async def read_body(self) -> Optional[memoryview]:
+        """Read the next message body without parsing it.
+
+        Returns:
+            The body as bytes or a memoryview (valid until discarded), or None at end of stream
+        """
+        buffer = self._buffer
+        pos = self._pos
+        while True:
+            header_end = buffer.find(_HEADER_END, max(pos, self._scanned))
+            if header_end != -1:
+                break
+            if len(buffer) - pos > _MAX_HEADER_BYTES:
+                raise LSPProtocolError(f"No header terminator in {len(buffer) - pos} bytes")
+            # The terminator may straddle the next read
+            self._scanned = max(pos, len(buffer) - len(_HEADER_END) + 1)
+            if not await self._fill(self.read_size):
+                if buffer[pos:].strip():
+                    logger.debug(f"LSP stream ended inside a header ({len(buffer) - pos} bytes)")
+                return None
+
+        content_length = self._content_length(bytes(buffer[pos:header_end]))
+        start = header_end + len(_HEADER_END)
+        end = start + content_length
+        while len(buffer) < end:
+            if not await self._fill(max(self.read_size, end - len(buffer))):
+                logger.debug(f"LSP stream ended inside a {content_length} byte body")
+                return None
+
+        if end == len(buffer):
+            # Nothing buffered past this body (typical for large ones): hand the
+            # buffer over instead of copying the body out of it
+            body = memoryview(buffer)[start:end]
+            self._buffer = bytearray()
+            self._pos = 0
+        else:
+            body = bytes(memoryview(buffer)[start:end])
+            self._pos = end
+            if end >= _READ_SIZE:
+                # Compact only occasionally, not per message
+                del buffer[:end]
+                self._pos = 0
+        self._scanned = self._pos
+        self.metrics['messages'] += 1
+        self.metrics['bytes'] += content_length
+        return body
+
+    async def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        chunk = await self.stream.read(size)
+        self.metrics['reads'] += 1
+        if not chunk:
+            self._eof = True
+            return False
+        if not isinstance(chunk, (bytes, bytearray)):
+            # Anything else could extend the buffer by nothing and loop forever
+            raise LSPProtocolError(f"Stream returned {type(chunk).__name__}, expected bytes")
+        self._buffer += chunk
+        return True
+
+    @staticmethod
+    def _content_length(header: bytes) -> int:
+        for line in header.split(b'\r\n'):
+            name, sep, value = line.partition(b':')
+            if sep and name.strip().lower() == b'content-length':
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    break
+                if length < 0:
+                    break
+                return length
+        raise LSPProtocolError(f"Missing or invalid Content-Length in header {header[:200]!r}")
@@ -0,0 +1,95 @@
+"""
+LSP Text Sync
+Computes incremental textDocument/didChange content changes between the
+text last sent to a language server and the current document text.
+"""
+from typing import Any, Dict, List, Optional
+
+# Slice size used to skip over long equal runs before comparing characters
+_COMPARE_STEP = 4096
+# Below this size a full-text change is always cheap enough
+_SMALL_DOCUMENT = 4096
+
+
+def _common_prefix(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    i = 0
+    while i + _COMPARE_STEP <= limit and a[i:i + _COMPARE_STEP] == b[i:i + _COMPARE_STEP]:
+        i += _COMPARE_STEP
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    la, lb = len(a), len(b)
+    j = 0
+    while j + _COMPARE_STEP <= limit and a[la - j - _COMPARE_STEP:la - j] == b[lb - j - _COMPARE_STEP:lb - j]:
+        j += _COMPARE_STEP
+    while j < limit and a[la - j - 1] == b[lb - j - 1]:
+        j += 1
+    return j
+
+
+def offset_to_position(text: str, offset: int) -> Dict[str, int]:
+    """
+    Convert a str offset into an LSP position.
+
+    Characters are counted in UTF-16 code units, the protocol's default
+    position encoding.
+    """
+    line = text.count('\n', 0, offset)
+    segment = text[text.rfind('\n', 0, offset) + 1:offset]
+    if segment.isascii():
+        character = len(segment)
+    else:
+        character = len(segment.encode('utf-16-le')) // 2
+    return {"line": line, "character": character}
+
+
+def compute_content_changes(old_text: str, new_text: str,
+                            max_change_ratio: float = 0.5) -> Optional[List[Dict[str, Any]]]:
+    """
+    Describe the edit from old_text to new_text as ranged content changes.
+
+    The edit is reduced to a single range by trimming the common prefix and
+    suffix, which covers typing, pasting and deleting in one place.
+
+    Args:
+        old_text: Text the server currently has
+        new_text: Updated document text
+        max_change_ratio: Fraction of new_text above which the replacement is
+            not worth sending as a range
+
+    Returns:
+        A list of content change events (empty if the texts are equal), or
+        None if a full-text change should be sent instead
+    """
+    if old_text == new_text:
+        return []
+    # A lone '\r' is a line break to the server but not to the line count
+    # below; such documents are rare enough to just resend in full
+    if '\r' in old_text and old_text.count('\r') != old_text.count('\r\n'):
+        return None
+
+    start = _common_prefix(old_text, new_text)
+    suffix = _common_suffix(old_text, new_text, min(len(old_text), len(new_text)) - start)
+    # Don't let either edge fall between the '\r' and '\n' of a line break
+    if start and old_text[start - 1] == '\r':
+        start -= 1
+    old_end = len(old_text) - suffix
+    if suffix and old_end and old_text[old_end - 1] == '\r':
+        suffix -= 1
+        old_end += 1
+    new_end = len(new_text) - suffix
+
+    replacement = new_text[start:new_end]
+    if len(new_text) > _SMALL_DOCUMENT and len(replacement) > len(new_text) * max_change_ratio:
+        return None
+    return [{
+        "range": {
+            "start": offset_to_position(old_text, start),
+            "end": offset_to_position(old_text, old_end),
+        },
+        "text": replacement,
+    }]
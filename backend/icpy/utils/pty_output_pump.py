@@ -0,0 +1,196 @@
+"""
+PTY Output Pump
+Event-driven reader for PTY master file descriptors with output coalescing,
+and the WebSocket framing used to deliver that output.
+"""
+import asyncio
+import codecs
+import fcntl
+import logging
+import os
+import time
+from collections.abc import Mapping
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PtyOutputPump:
+    """
+    Reads a PTY master fd via loop.add_reader and hands output to a sink in
+    coalesced chunks.
+
+    After an idle period the first bytes are flushed immediately, so
+    interactive echo is not delayed. During bursts, reads are merged until
+    max_latency has passed since the last flush or max_chunk bytes are
+    buffered. While the buffer is full the fd is removed from the loop,
+    which applies backpressure to the producing process instead of growing
+    memory when the sink is slow.
+    """
+
+    def __init__(
+        self,
+        fd: int,
+        sink: Callable[[bytes], Awaitable[None]],
+        max_latency: float = 0.005,
+        max_chunk: int = 65536
+    ):
+        """
+        Initialize pump.
+
+        Args:
+            fd: PTY master file descriptor (switched to non-blocking)
+            sink: Coroutine function called with each coalesced chunk
+            max_latency: Maximum seconds output is held back for coalescing
+            max_chunk: Maximum bytes per chunk handed to the sink
+        """
+        self.fd = fd
+        self.sink = sink
+        self.max_latency = max(0.0, max_latency)
+        self.max_chunk = max(1, max_chunk)
+
+        self._buffer = bytearray()
+        self._eof = False
+        self._reading = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_flush = 0.0
+
+        self.metrics = {
+            'reads': 0,
+            'bytes': 0,
+            'chunks': 0,
+            'pauses': 0,
+        }
+
+    async def run(self) -> None:
+        """Pump output until EOF or cancellation."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+            fcntl.fcntl(self.fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        except OSError as e:
+            logger.warning(f"Could not set PTY fd {self.fd} non-blocking: {e}")
+        self._resume_reading()
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                self._cancel_timer()
+                if self._buffer:
+                    data = bytes(self._buffer)
+                    self._buffer.clear()
+                    self._last_flush = time.monotonic()
+                    if not self._eof:
+                        # Keep reading while the sink sends this chunk
+                        self._resume_reading()
+                    self.metrics['chunks'] += 1
+                    await self.sink(data)
+                if self._eof and not self._buffer:
+                    break
+        finally:
+            self._pause_reading()
+            self._cancel_timer()
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return read/flush counters for this pump."""
+        return dict(self.metrics, buffered=len(self._buffer))
+
+    def _on_readable(self) -> None:
+        try:
+            while len(self._buffer) < self.max_chunk:
+                data = os.read(self.fd, self.max_chunk - len(self._buffer))
+                if not data:
+                    self._eof = True
+                    break
+                self._buffer += data
+                self.metrics['reads'] += 1
+                self.metrics['bytes'] += len(data)
+        except BlockingIOError:
+            pass
+        except OSError:
+            # EIO once the slave side has closed
+            self._eof = True
+
+        if self._eof or len(self._buffer) >= self.max_chunk:
+            if not self._eof:
+                self.metrics['pauses'] += 1
+            self._pause_reading()
+            self._wakeup.set()
+        elif self._buffer and self._timer is None and not self._wakeup.is_set():
+            delay = self.max_latency - (time.monotonic() - self._last_flush)
+            if delay <= 0:
+                self._wakeup.set()
+            else:
+                self._timer = self._loop.call_later(delay, self._wakeup.set)
+
+    def _resume_reading(self) -> None:
+        if not self._reading and self._loop is not None:
+            self._loop.add_reader(self.fd, self._on_readable)
+            self._reading = True
+
+    def _pause_reading(self) -> None:
+        if self._reading and self._loop is not None:
+            try:
+                self._loop.remove_reader(self.fd)
+            except (OSError, ValueError):
+                pass
+            self._reading = False
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def wants_binary_frames(websocket: Any) -> bool:
+    """Whether the client asked for binary terminal frames (?binary=1 or ?mode=binary)."""
+    params = getattr(websocket, 'query_params', None)
+    if not isinstance(params, Mapping):
+        return False
+    return params.get('binary') in ('1', 'true') or params.get('mode') == 'binary'
+
+
+class TerminalFrameWriter:
+    """
+    Sends PTY output chunks to a WebSocket.
+
+    In binary mode chunks go out unchanged as binary frames and the client
+    decodes them. In text mode they are decoded with an incremental UTF-8
+    decoder, so a multibyte character split across reads is held until its
+    remaining bytes arrive instead of being mangled.
+    """
+
+    def __init__(self, websocket: Any, binary: bool = False):
+        """
+        Initialize writer.
+
+        Args:
+            websocket: WebSocket with send_bytes/send_text coroutines
+            binary: Send raw bytes as binary frames instead of decoded text
+        """
+        self.websocket = websocket
+        self.binary = binary
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.frames = 0
+
+    async def send(self, data: bytes) -> None:
+        """Send one chunk of terminal output."""
+        if self.binary:
+            await self.websocket.send_bytes(data)
+            self.frames += 1
+            return
+        text = self._decoder.decode(data)
+        if text:
+            await self.websocket.send_text(text)
+            self.frames += 1
+
+    async def close(self) -> None:
+        """Send any bytes still held by the decoder."""
+        if not self.binary:
+            text = self._decoder.decode(b'', final=True)
+            if text:
+                await self.websocket.send_text(text)
+                self.frames += 1
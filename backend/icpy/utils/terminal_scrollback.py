@@ -0,0 +1,104 @@
+"""
+Terminal Scrollback
+Bounded buffer of recent PTY output, replayed to clients that reattach to a
+running terminal session.
+"""
+
+SCROLLBACK_MODES = ('raw', 'snapshot')
+
+# Sequences after which earlier output no longer affects what is on screen
+_SCREEN_RESETS = (b'\x1b[2J', b'\x1bc', b'\x1b[?1049h', b'\x1b[?47h')
+_MAX_RESET_LEN = max(len(seq) for seq in _SCREEN_RESETS)
+_CURSOR_HOME = b'\x1b[H'
+# How far past a trim point to look for a line boundary to resume from
+_LINE_SEARCH = 4096
+
+
+class TerminalScrollback:
+    """
+    Ring buffer of a terminal session's most recent output, capped in bytes.
+
+    Output is kept as one contiguous bytearray. When it grows past max_bytes
+    the oldest output is dropped in one step down to 7/8 of the cap, so the
+    memmove cost is amortized over many appends. Trimming resumes at a line
+    boundary (or at least a UTF-8 character boundary) so a replay does not
+    start mid-character.
+
+    In 'snapshot' mode output before the last full-screen clear, reset or
+    alternate-screen switch is discarded as it arrives. For sessions that
+    redraw the whole screen (top, watch, full-screen editors) this keeps
+    roughly one screen of state instead of the full redraw history.
+    """
+
+    def __init__(self, max_bytes: int = 262144, mode: str = 'raw'):
+        """
+        Initialize scrollback.
+
+        Args:
+            max_bytes: Maximum bytes of output retained
+            mode: 'raw' to keep the output tail, 'snapshot' to keep only the final screen state
+
+        Raises:
+            ValueError: If mode is unknown
+        """
+        if mode not in SCROLLBACK_MODES:
+            raise ValueError(f"Unknown scrollback mode: {mode}")
+        self.max_bytes = max(1, max_bytes)
+        self.mode = mode
+        self._buffer = bytearray()
+        self.total_bytes = 0
+        self.dropped_bytes = 0
+
+    def append(self, data: bytes) -> None:
+        """Record a chunk of terminal output."""
+        if not data:
+            return
+        self.total_bytes += len(data)
+        start = len(self._buffer)
+        self._buffer += data
+        if self.mode == 'snapshot':
+            # Overlap the previous chunk so sequences split across reads are found
+            self._compact(max(0, start - _MAX_RESET_LEN + 1))
+        if len(self._buffer) > self.max_bytes:
+            self._trim(len(self._buffer) - (self.max_bytes - self.max_bytes // 8))
+
+    def snapshot(self) -> bytes:
+        """Return the retained output, oldest first."""
+        return bytes(self._buffer)
+
+    def clear(self) -> None:
+        """Drop all retained output."""
+        self.dropped_bytes += len(self._buffer)
+        self._buffer.clear()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _compact(self, search_from: int) -> None:
+        buffer = self._buffer
+        cut, cut_seq = -1, b''
+        for seq in _SCREEN_RESETS:
+            index = buffer.rfind(seq, search_from)
+            if index > cut:
+                cut, cut_seq = index, seq
+        if cut <= 0:
+            return
+        self.dropped_bytes += cut
+        del buffer[:cut]
+        if cut_seq == b'\x1b[2J':
+            # A clear keeps the cursor where it was; replay from the top-left
+            buffer[:0] = _CURSOR_HOME
+            self.dropped_bytes -= len(_CURSOR_HOME)
+
+    def _trim(self, excess: int) -> None:
+        buffer = self._buffer
+        newline = buffer.find(b'\n', excess, excess + _LINE_SEARCH)
+        if newline != -1:
+            cut = newline + 1
+        else:
+            cut = excess
+            # Skip UTF-8 continuation bytes
+            while cut < len(buffer) and (buffer[cut] & 0xC0) == 0x80:
+                cut += 1
+        self.dropped_bytes += cut
+        del buffer[:cut]
@@ -194,6 +194,10 @@ async def lifespan(app: FastAPI):
             from icpy.services import initialize_preview_service
             await initialize_preview_service()
             
+            # Subscribe image checksum indexes to watcher events from this loop
+            from icpy.services.image_checksum_index import attach_image_checksum_indexes
+            await attach_image_checksum_indexes()
+            
             logger.info("icpy services initialized successfully")
             
         except Exception as e:
@@ -8,7 +8,6 @@ import json
 import logging
 import os
 import pty
-import select
 import signal
 import struct
 import subprocess
@@ -16,9 +15,12 @@ import termios
 import fcntl
 import getpass
 import pwd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from fastapi import WebSocket
 
+from icpy.utils.pty_output_pump import PtyOutputPump, TerminalFrameWriter, wants_binary_frames
+from icpy.utils.env import env_float
+
 logger = logging.getLogger(__name__)
 
 
@@ -211,38 +213,28 @@ class TerminalManager:
             del self.terminal_connections[terminal_id]
             logger.info(f"Terminal connection cleaned up: {terminal_id}")
 
-    async def read_from_terminal(self, websocket: WebSocket, master_fd: int):
-        """Read from terminal and send to WebSocket with optimized performance"""
-        while True:
-            try:
-                # Use select with very low timeout for maximum responsiveness
-                ready, _, _ = select.select([master_fd], [], [], 0.001)  # 1ms timeout for responsiveness
-                if ready:
-                    # Read available data with larger buffer for better performance
-                    data = os.read(master_fd, 8192)  # Doubled buffer size
-                    if data:
-                        # Properly decode terminal data with better error handling
-                        try:
-                            decoded_data = data.decode('utf-8')
-                        except UnicodeDecodeError:
-                            # Fallback to latin-1 for binary data
-                            decoded_data = data.decode('latin-1')
-                        
-                        # Send data to WebSocket immediately without buffering
-                        try:
-                            await websocket.send_text(decoded_data)
-                        except Exception as send_error:
-                            logger.error(f"Error sending data to WebSocket: {send_error}")
-                            break
-                    else:
-                        # EOF reached
-                        break
-                else:
-                    # No data available, yield control with minimal delay for responsiveness
-                    await asyncio.sleep(0.001)  # 1ms sleep for maximum responsiveness
-            except Exception as e:
-                logger.error(f"Error reading from terminal: {e}")
-                break
+    async def read_from_terminal(self, websocket: WebSocket, master_fd: int, binary: Optional[bool] = None):
+        """Read from terminal and send to WebSocket with optimized performance.
+        
+        Output is read event-driven and batched by time/size
+        (TERMINAL_OUTPUT_MAX_LATENCY_MS / TERMINAL_OUTPUT_MAX_CHUNK_BYTES).
+        Clients connecting with ?binary=1 get raw bytes as binary frames;
+        others get text decoded incrementally across reads.
+        """
+        if binary is None:
+            binary = wants_binary_frames(websocket)
+        writer = TerminalFrameWriter(websocket, binary=binary)
+        pump = PtyOutputPump(
+            master_fd,
+            writer.send,
+            max_latency=env_float('TERMINAL_OUTPUT_MAX_LATENCY_MS', 5.0) / 1000.0,
+            max_chunk=int(env_float('TERMINAL_OUTPUT_MAX_CHUNK_BYTES', 65536))
+        )
+        try:
+            await pump.run()
+            await writer.close()
+        except Exception as e:
+            logger.error(f"Error sending data to WebSocket: {e}")
 
     async def write_to_terminal(self, websocket: WebSocket, master_fd: int):
         """Read from WebSocket and write to terminal with optimized performance"""
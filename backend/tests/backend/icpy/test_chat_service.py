@@ -313,7 +313,52 @@ class TestChatService:
         messages = await chat_service.get_message_history(session_id, limit=3, offset=3)
         assert len(messages) == 2
         assert messages[0].content == "Message 3"
-    
+
+        # Paging backward from the newest message
+        messages = await chat_service.get_message_history(session_id, limit=2, from_end=True)
+        assert [m.content for m in messages] == ["Message 3", "Message 4"]
+        messages = await chat_service.get_message_history(session_id, limit=2, offset=4, from_end=True)
+        assert [m.content for m in messages] == ["Message 0"]
+
+    @pytest.mark.asyncio
+    async def test_session_catalog_updates_incrementally(self, chat_service):
+        """Test get_sessions serves counts from the catalog and tracks appends"""
+        session_id = await chat_service.create_session("Catalogued")
+        for i in range(3):
+            await chat_service._store_message(ChatMessage(
+                id=f"msg-{i}",
+                content=f"Message {i}",
+                sender=MessageSender.USER,
+                timestamp=f"2025-01-01T00:0{i}:00Z",
+                session_id=session_id
+            ))
+
+        sessions = await chat_service.get_sessions()
+        assert sessions[0]['name'] == "Catalogued"
+        assert sessions[0]['message_count'] == 3
+
+        # Appends by this service advance the catalog without re-reading the file
+        await chat_service._store_message(ChatMessage(
+            id="msg-3",
+            content="Message 3",
+            sender=MessageSender.AI,
+            timestamp="2025-01-01T00:03:00Z",
+            session_id=session_id
+        ))
+        with patch.object(chat_service, '_history_index', side_effect=AssertionError("file re-read")):
+            sessions = await chat_service.get_sessions()
+        assert sessions[0]['message_count'] == 4
+        assert sessions[0]['last_message_time'] == "2025-01-01T00:03:00Z"
+
+        # Writes from elsewhere are picked up through the mtime/size check
+        with open(chat_service._session_file_new(session_id), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'id': 'ext', 'content': 'x', 'sender': 'user',
+                                'timestamp': '2025-01-01T00:04:00Z'}) + "\n")
+        await chat_service.update_session(session_id, "Renamed")
+        sessions = await chat_service.get_sessions()
+        assert sessions[0]['message_count'] == 5
+        assert sessions[0]['name'] == "Renamed"
+
     @pytest.mark.asyncio
     async def test_clear_message_history(self, chat_service):
         """Test clearing message history"""
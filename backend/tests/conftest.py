@@ -5,9 +5,17 @@ Global pytest configuration and fixtures for icpy backend tests
 import os
 import glob
 import shutil
+import tempfile
 import pytest
 from pathlib import Path
 
+# hop_service opens its debug log at import time, before any fixture runs, so
+# the redirect has to happen here rather than in a fixture
+_HOP_DEBUG_LOG_DIR = None
+if not os.environ.get('HOP_DEBUG_LOG_DIR'):
+    _HOP_DEBUG_LOG_DIR = tempfile.mkdtemp(prefix='icotes_hop_logs_')
+    os.environ['HOP_DEBUG_LOG_DIR'] = _HOP_DEBUG_LOG_DIR
+
 
 @pytest.fixture(scope="session", autouse=True)
 def limit_message_broker_memory():
@@ -18,6 +26,29 @@ def limit_message_broker_memory():
     os.environ.setdefault('MB_MAX_PAYLOAD_HISTORY_BYTES', str(256 * 1024))  # 256KB per message payload in history
     yield
 
+@pytest.fixture(scope="session", autouse=True)
+def isolated_workspace_root(tmp_path_factory):
+    """Point services at a throwaway workspace for the whole run.
+    Services that fall back to WORKSPACE_ROOT (e.g. the persisted search
+    index under .icotes/search_index) would otherwise write into the repo's
+    workspace/. Tests that need a specific workspace still set it themselves.
+    """
+    previous = os.environ.get('WORKSPACE_ROOT')
+    workspace = tmp_path_factory.mktemp('workspace')
+    os.environ['WORKSPACE_ROOT'] = str(workspace)
+    yield workspace
+    if previous is None:
+        os.environ.pop('WORKSPACE_ROOT', None)
+    else:
+        os.environ['WORKSPACE_ROOT'] = previous
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_hop_debug_logs():
+    """Remove the tmp hop debug log directory created at import."""
+    yield
+    if _HOP_DEBUG_LOG_DIR:
+        shutil.rmtree(_HOP_DEBUG_LOG_DIR, ignore_errors=True)
+
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_temp_workspaces():
     """Clean up any remaining temporary workspace directories after all tests"""
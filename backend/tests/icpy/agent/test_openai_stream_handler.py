@@ -29,3 +29,139 @@ def test_handler_accepts_rich_user_messages():
     ]
     chunks = list(handler.stream_chat_with_tools(messages))
     assert "ok" in "".join(chunks)
+
+
+class SleepyTool:
+    def __init__(self, name, delay, log):
+        self.name, self.delay, self.log = name, delay, log
+
+    async def execute(self, **kwargs):
+        import asyncio
+        from icpy.agent.tools.base_tool import ToolResult
+        self.log.append(("start", self.name, kwargs.get("filePath")))
+        await asyncio.sleep(self.delay)
+        self.log.append(("end", self.name, kwargs.get("filePath")))
+        return ToolResult(success=True, data={"tool": self.name})
+
+
+def _tool_call(call_id, name, arguments):
+    import json
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+def _handler_with_tools(tools):
+    handler = OpenAIStreamingHandler(DummyClient(), "gpt-5-mini")
+    handler.tool_executor.registry = type("Registry", (), {"get": lambda self, name: tools.get(name)})()
+    return handler
+
+
+def test_tool_calls_run_concurrently_and_stream_in_completion_order():
+    import time
+    log = []
+    handler = _handler_with_tools({
+        "read_file": SleepyTool("read_file", 0.3, log),
+        "semantic_search": SleepyTool("semantic_search", 0.05, log),
+        "web_search": SleepyTool("web_search", 0.3, log),
+    })
+    conv = []
+    calls = [_tool_call("c1", "read_file", {}), _tool_call("c2", "semantic_search", {}),
+             _tool_call("c3", "web_search", {})]
+
+    started = time.monotonic()
+    output = "".join(handler._handle_tool_calls(conv, [], calls))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.55
+    # Results stream as they finish, each header paired with its result
+    assert output.index("**semantic_search**") < output.index("**read_file**")
+    assert output.index("**read_file**") < output.index("✅", output.index("**read_file**"))
+    # Conversation keeps the original call order
+    assert conv[0]["role"] == "assistant"
+    assert [m["tool_call_id"] for m in conv[1:]] == ["c1", "c2", "c3"]
+
+
+def test_tool_calls_on_same_file_keep_order_and_custom_executor_is_used():
+    log = []
+    handler = _handler_with_tools({
+        "replace_string_in_file": SleepyTool("replace_string_in_file", 0.1, log),
+        "read_file": SleepyTool("read_file", 0.0, log),
+    })
+    conv = []
+    calls = [
+        _tool_call("w", "replace_string_in_file", {"filePath": "a.txt"}),
+        _tool_call("r", "read_file", {"filePath": "./a.txt"}),
+        _tool_call("bad", "read_file", None),
+    ]
+    calls[2]["function"]["arguments"] = "{not json"
+    list(handler._handle_tool_calls(conv, [], calls))
+    assert log.index(("end", "replace_string_in_file", "a.txt")) < log.index(("start", "read_file", "./a.txt"))
+    assert [m["tool_call_id"] for m in conv[1:]] == ["w", "r", "bad"]
+    assert "Invalid JSON" in conv[3]["content"]
+
+    # Agents that replace execute_tool_call_sync keep working through the concurrent path
+    handler.tool_executor.execute_tool_call_sync = lambda name, args: {"success": True, "data": f"custom:{name}"}
+    conv = []
+    output = "".join(handler._handle_tool_calls(conv, [], [_tool_call("x", "anything", {})]))
+    assert "custom:anything" in conv[1]["content"]
+    assert "**anything**" in output
+
+
+def test_writes_and_terminal_run_after_every_earlier_call():
+    log = []
+    handler = _handler_with_tools({
+        "read_file": SleepyTool("read_file", 0.1, log),
+        "create_file": SleepyTool("create_file", 0.1, log),
+        "run_in_terminal": SleepyTool("run_in_terminal", 0.0, log),
+    })
+    calls = [
+        _tool_call("r1", "read_file", {"filePath": "notes.md"}),
+        _tool_call("w", "create_file", {"filePath": "foo.py"}),
+        _tool_call("t", "run_in_terminal", {"command": "python foo.py"}),
+        _tool_call("r2", "read_file", {"filePath": "out.txt"}),
+    ]
+    list(handler._handle_tool_calls([], [], calls))
+    assert [entry[:2] for entry in log] == [
+        ("start", "read_file"), ("end", "read_file"),
+        ("start", "create_file"), ("end", "create_file"),
+        ("start", "run_in_terminal"), ("end", "run_in_terminal"),
+        ("start", "read_file"), ("end", "read_file"),
+    ]
+
+
+class BlockingTool:
+    def __init__(self, name, delay):
+        self.name, self.delay = name, delay
+
+    async def execute(self, **kwargs):
+        import time
+        from icpy.agent.tools.base_tool import ToolResult
+        time.sleep(self.delay)  # blocks its loop, like subprocess.run or requests.post
+        return ToolResult(success=True, data={"tool": self.name})
+
+
+def test_blocking_tools_overlap_within_a_turn_and_across_sessions():
+    import threading
+    import time
+    tools = {"web_fetch": BlockingTool("web_fetch", 0.3), "web_search": BlockingTool("web_search", 0.3)}
+    handler = _handler_with_tools(tools)
+
+    started = time.monotonic()
+    conv = []
+    list(handler._handle_tool_calls(conv, [], [_tool_call("a", "web_fetch", {}), _tool_call("b", "web_search", {})]))
+    assert time.monotonic() - started < 0.55
+    assert [m["tool_call_id"] for m in conv[1:]] == ["a", "b"]
+
+    # Two chats each running a blocking tool through the sync path don't wait on each other
+    other = _handler_with_tools(tools)
+    results = []
+    threads = [
+        threading.Thread(target=lambda h=h, n=n: results.append(h.tool_executor.execute_tool_call_sync(n, {})))
+        for h, n in ((handler, "web_fetch"), (other, "web_search"))
+    ]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - started < 0.55
+    assert all(r["success"] for r in results)
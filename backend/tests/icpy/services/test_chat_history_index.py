@@ -0,0 +1,57 @@
+"""
+Tests for the chat history line-offset index
+"""
+
+import json
+
+from icpy.services.chat_history_index import ChatHistoryIndex
+
+
+def _append(path, *records, raw=None):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        if raw:
+            f.write(raw)
+
+
+def test_range_and_tail_reads(tmp_path):
+    path = tmp_path / "session_a.jsonl"
+    _append(path, *[{'n': i} for i in range(10)], raw="\n")
+    index = ChatHistoryIndex(path)
+    assert index.refresh() == 10
+    assert [r['n'] for r in index.read_range(2, 5)] == [2, 3, 4]
+    assert [r['n'] for r in index.read_tail(3)] == [7, 8, 9]
+    assert [r['n'] for r in index.read_tail(3, skip=8)] == [0, 1]
+    assert index.read_range(20, 30) == []
+
+
+def test_incremental_append_and_partial_line(tmp_path):
+    path = tmp_path / "session_b.jsonl"
+    _append(path, {'n': 0}, raw='{"n": 1')
+    index = ChatHistoryIndex(path)
+    # The unterminated line is not indexed until it is completed
+    assert index.refresh() == 1
+    _append(path, raw='}\n')
+    _append(path, {'n': 2})
+    assert index.refresh() == 3
+    assert [r['n'] for r in index.read_tail(2)] == [1, 2]
+
+
+def test_sidecar_persists_and_detects_rewrite(tmp_path):
+    path = tmp_path / "session_c.jsonl"
+    _append(path, *[{'n': i} for i in range(5)])
+    ChatHistoryIndex(path).refresh()
+    assert (tmp_path / "session_c.jsonl.idx").exists()
+
+    reopened = ChatHistoryIndex(path)
+    reopened._load()
+    assert len(reopened) == 5
+
+    # A rewritten (shorter) file is re-indexed from scratch
+    path.write_text(json.dumps({'n': 'x'}) + "\n")
+    assert reopened.refresh() == 1
+    assert reopened.read_tail(5) == [{'n': 'x'}]
+
+    reopened.invalidate()
+    assert not (tmp_path / "session_c.jsonl.idx").exists()
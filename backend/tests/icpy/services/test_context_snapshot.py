@@ -0,0 +1,90 @@
+"""
+Tests for the cached agent context snapshot (workspace size, markers, hop context)
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from icpy.services import context_snapshot
+from icpy.services.context_snapshot import ContextSnapshotService, HopContextCache
+
+
+def _ready_service(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.bin").write_bytes(b"x" * 100)
+    (tmp_path / "README.md").write_text("hi")
+    service = ContextSnapshotService(str(tmp_path))
+    service.scan()
+    return service
+
+
+def test_scan_and_incremental_updates(tmp_path):
+    service = _ready_service(tmp_path)
+    snapshot = service.get_snapshot()
+    assert snapshot["ready"] and snapshot["size_bytes"] == 102
+    assert snapshot["markers"]["README.md"] and not snapshot["markers"]["package.json"]
+
+    # Changes are applied per path, without another walk of the workspace
+    (tmp_path / "package.json").write_text("{}")
+    service.refresh_path(str(tmp_path / "package.json"))
+    (tmp_path / "pkg" / "a.bin").write_bytes(b"x" * 10)
+    service.refresh_path(str(tmp_path / "pkg" / "a.bin"))
+    snapshot = service.get_snapshot()
+    assert snapshot["markers"]["package.json"]
+    assert snapshot["size_bytes"] == 14
+
+    (tmp_path / "pkg").rename(tmp_path / "moved")
+    service.refresh_path(str(tmp_path / "pkg"))
+    assert service.get_snapshot()["size_bytes"] == 4
+    service.refresh_path(str(tmp_path / "moved"))
+    assert service.get_snapshot()["size_bytes"] == 14
+
+    # Paths outside the workspace are ignored
+    service.refresh_path(str(tmp_path.parent / "elsewhere.txt"))
+    assert service.get_snapshot()["file_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_fs_events_update_snapshot(tmp_path):
+    service = _ready_service(tmp_path)
+    (tmp_path / "new.txt").write_bytes(b"12345")
+
+    await service._handle_fs_event(SimpleNamespace(
+        topic='fs.file_created', payload={'file_path': str(tmp_path / "new.txt")}
+    ))
+    assert service.get_snapshot()["size_bytes"] == 107
+
+    (tmp_path / "new.txt").unlink()
+    await service._handle_fs_event(SimpleNamespace(
+        topic='fs.file_deleted', payload={'file_path': str(tmp_path / "new.txt"), 'is_directory': False}
+    ))
+    assert service.get_snapshot()["size_bytes"] == 102
+
+
+def test_hop_context_is_cached_within_ttl(monkeypatch):
+    calls = []
+
+    class CountingCache(HopContextCache):
+        async def refresh(self):
+            calls.append(1)
+            self._context = {"contextId": "hop1", "status": "connected", "cwd": "/srv"}
+            self._fetched_at = time.time()
+            return self._context
+
+    monkeypatch.setattr(context_snapshot, "_main_loop", None)
+    cache = CountingCache(ttl_seconds=60)
+    assert cache.get()["contextId"] == "hop1"
+    assert cache.get()["cwd"] == "/srv"
+    assert len(calls) == 1
+
+    # A hop.status event refreshes the cache immediately
+    asyncio.run(cache._handle_hop_event(SimpleNamespace(topic='hop.status', payload={})))
+    assert len(calls) == 2
+
+    # Once stale, it is refetched on next use
+    cache._fetched_at = 0
+    cache.get()
+    assert len(calls) == 3
@@ -0,0 +1,116 @@
+"""
+Tests for the per-loop hop SSH/SFTP connection pool
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from icpy.services.hop_connection_pool import HopConnectionPool
+
+
+class FakeSFTP:
+    def __init__(self):
+        self.healthy = True
+
+    async def realpath(self, path):
+        if not self.healthy:
+            raise ConnectionError("gone")
+        return "/home/user"
+
+    def exit(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.sftp_starts = 0
+        self.sftp = FakeSFTP()
+
+    def is_closed(self):
+        return self.closed
+
+    async def start_sftp_client(self):
+        self.sftp_starts += 1
+        return self.sftp
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+def _pool(**kwargs):
+    opened = []
+
+    async def connect(context_id):
+        await asyncio.sleep(0.01)  # simulated handshake
+        conn = FakeConnection()
+        opened.append((context_id, conn))
+        return conn
+
+    return HopConnectionPool(connect, **kwargs), opened
+
+
+@pytest.mark.asyncio
+async def test_leases_reuse_one_connection_per_loop():
+    pool, opened = _pool()
+
+    async def use():
+        async with pool.lease("ctx", sftp=True) as lease:
+            return lease.sftp
+
+    clients = await asyncio.gather(*[use() for _ in range(10)])
+    assert len(opened) == 1
+    assert all(c is clients[0] for c in clients)
+    assert opened[0][1].sftp_starts == 1
+    assert pool.stats["reuses"] == 9
+
+    # Another event loop (e.g. an agent thread) gets its own connection
+    thread = threading.Thread(target=lambda: asyncio.run(use()))
+    thread.start()
+    thread.join()
+    assert len(opened) == 2
+
+    await pool.close_context("ctx")
+    assert opened[0][1].closed and opened[1][1].closed
+    assert pool.size() == 0
+
+
+@pytest.mark.asyncio
+async def test_dead_connections_are_replaced():
+    pool, opened = _pool(health_check_after=0)
+
+    async with pool.lease("ctx", sftp=True):
+        pass
+    opened[0][1].sftp.healthy = False
+    async with pool.lease("ctx", sftp=True):
+        pass
+    assert len(opened) == 2
+    assert pool.stats["health_check_failures"] == 1
+
+    # A connection error raised while leased discards the connection
+    with pytest.raises(ConnectionError):
+        async with pool.lease("ctx"):
+            raise ConnectionError("reset by peer")
+    assert opened[1][1].closed
+    async with pool.lease("ctx"):
+        pass
+    assert len(opened) == 3
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_are_evicted():
+    pool, opened = _pool(idle_timeout=0.1)
+    async with pool.lease("ctx"):
+        pass
+    await asyncio.sleep(1.2)
+    assert pool.size() == 0
+    assert opened[0][1].closed
+    assert pool.stats["evictions"] == 1
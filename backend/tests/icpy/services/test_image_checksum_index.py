@@ -0,0 +1,142 @@
+"""
+Tests for the persistent image checksum index used by ImageResolver
+"""
+
+import asyncio
+import hashlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from icpy.services import image_checksum_index
+from icpy.services.image_checksum_index import ImageChecksumIndex
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_lookup_and_persistence(tmp_path):
+    checksum = _write(tmp_path / "img" / "cat.png", b"cat-bytes")
+    _write(tmp_path / ".icotes" / "thumbnails" / "cat.png", b"cat-bytes")
+    _write(tmp_path / "notes.txt", b"cat-bytes")
+    _write(tmp_path / ".venv" / "lib" / "cat.png", b"cat-bytes")
+
+    index = ImageChecksumIndex(str(tmp_path))
+    # The first lookup doesn't scan on the caller's thread; it starts a background build
+    assert index.lookup(checksum) is None
+    assert index.wait_for_build(timeout=5)
+    assert index.lookup(checksum) == tmp_path / "img" / "cat.png"
+    assert len(index) == 1
+    assert index.lookup(hashlib.sha256(b"missing").hexdigest()) is None
+
+    # A fresh instance reuses the persisted hashes instead of re-reading files
+    reopened = ImageChecksumIndex(str(tmp_path))
+    reopened.load()
+    assert len(reopened) == 1
+    assert reopened.build() == 0
+
+
+def test_watcher_updates_keep_index_current(tmp_path):
+    checksum = _write(tmp_path / "a.png", b"a-bytes")
+    index = ImageChecksumIndex(str(tmp_path), rescan_interval=3600)
+    index.build()
+
+    # Rename without any rescan: the move event carries the entry over
+    (tmp_path / "a.png").rename(tmp_path / "renamed.png")
+    index.move_path(str(tmp_path / "a.png"), str(tmp_path / "renamed.png"))
+    assert index.lookup(checksum) == tmp_path / "renamed.png"
+
+    # Directory moves carry over children
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "renamed.png").rename(tmp_path / "dir" / "renamed.png")
+    index.move_path(str(tmp_path / "renamed.png"), str(tmp_path / "dir" / "renamed.png"))
+    (tmp_path / "dir").rename(tmp_path / "moved")
+    index.move_path(str(tmp_path / "dir"), str(tmp_path / "moved"), recursive=True)
+    assert index.lookup(checksum) == tmp_path / "moved" / "renamed.png"
+
+    new_checksum = _write(tmp_path / "b.webp", b"b-bytes")
+    index.update_path(str(tmp_path / "b.webp"))
+    assert index.lookup(new_checksum) == tmp_path / "b.webp"
+
+    (tmp_path / "b.webp").unlink()
+    index.remove_path(str(tmp_path / "b.webp"))
+    assert index.lookup(new_checksum) is None
+
+
+def test_stale_entry_is_rehashed_and_miss_rescans(tmp_path):
+    old = _write(tmp_path / "a.png", b"old")
+    index = ImageChecksumIndex(str(tmp_path), rescan_interval=0)
+    index.build()
+
+    # Overwritten without an event: the candidate is verified before use
+    new = _write(tmp_path / "a.png", b"newer-content")
+    assert index.lookup(old) is None
+    assert index.lookup(new) == tmp_path / "a.png"
+
+    # Created without an event: a miss triggers a background rescan
+    other = _write(tmp_path / "sub" / "c.jpg", b"c")
+    index.wait_for_build(timeout=5)
+    index.lookup(other)
+    assert index.wait_for_build(timeout=5)
+    assert index.lookup(other) == tmp_path / "sub" / "c.jpg"
+
+
+def test_lookup_name_finds_image_id_in_filename(tmp_path):
+    _write(tmp_path / "chat" / "renamed_1234-abcd.png", b"img")
+    _write(tmp_path / ".icotes" / "thumbnails" / "thumb_5678-ef.webp", b"thumb")
+    index = ImageChecksumIndex(str(tmp_path), rescan_interval=3600)
+    index.build()
+
+    assert index.lookup_name("1234-abcd") == tmp_path / "chat" / "renamed_1234-abcd.png"
+    assert index.lookup_name("5678-ef") is None
+
+
+@pytest.mark.asyncio
+async def test_fs_events_update_index(tmp_path):
+    index = ImageChecksumIndex(str(tmp_path), rescan_interval=3600)
+    index.build()
+    checksum = _write(tmp_path / "new.png", b"new")
+
+    await index._handle_fs_event(SimpleNamespace(
+        topic='fs.file_created', payload={'file_path': str(tmp_path / "new.png")}
+    ))
+    assert index.lookup(checksum) == tmp_path / "new.png"
+
+    await index._handle_fs_event(SimpleNamespace(
+        topic='fs.file_deleted', payload={'file_path': str(tmp_path / "new.png"), 'is_directory': False}
+    ))
+    assert len(index) == 0
+
+
+@pytest.mark.asyncio
+async def test_index_from_another_loop_attaches_on_services_loop(tmp_path, monkeypatch):
+    attached = []
+
+    async def _record_attach(index):
+        attached.append((index, asyncio.get_running_loop()))
+
+    monkeypatch.setattr(image_checksum_index, "_indexes", {})
+    monkeypatch.setattr(image_checksum_index, "_services_loop", None)
+    monkeypatch.setattr(image_checksum_index, "_attach_to_broker", _record_attach)
+    await image_checksum_index.attach_image_checksum_indexes()
+    services_loop = asyncio.get_running_loop()
+
+    # A lookup from a tool thread running its own loop
+    def _tool_thread():
+        async def _lookup():
+            return image_checksum_index.get_image_checksum_index(str(tmp_path))
+        return asyncio.run(_lookup())
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(_tool_thread()))
+    thread.start()
+    while thread.is_alive():
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0)
+
+    assert attached == [(result[0], services_loop)]
+    result[0].wait_for_build(timeout=5)
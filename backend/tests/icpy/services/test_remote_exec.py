@@ -0,0 +1,229 @@
+"""
+Tests for the server-side (exec channel) copy, delete and search paths of
+RemoteFileSystemAdapter, using the local shell as the "remote" host
+"""
+
+import asyncio
+import os
+import shlex
+from types import SimpleNamespace
+
+import pytest
+
+from icpy.services import remote_fs_adapter
+from icpy.services.remote_fs_adapter import RemoteFileSystemAdapter
+from icpy.services.remote_metadata_cache import RemoteMetadataCache
+
+
+class LocalProcess:
+    def __init__(self, proc):
+        self._proc = proc
+        self.stdout = self
+        self.terminated = False
+
+    async def readline(self):
+        return (await self._proc.stdout.readline()).decode()
+
+    async def wait(self, check=False):
+        out, err = await self._proc.communicate()
+        return SimpleNamespace(exit_status=self._proc.returncode, stdout=out.decode(), stderr=err.decode())
+
+    def terminate(self):
+        self.terminated = True
+        if self._proc.returncode is None:
+            self._proc.terminate()
+
+    def close(self):
+        if self._proc.returncode is None:
+            self._proc.kill()
+
+    async def wait_closed(self):
+        await self._proc.wait()
+
+
+class LocalConnection:
+    """Stands in for an asyncssh connection by running commands locally."""
+
+    def __init__(self, hide_tools=()):
+        self.commands = []
+        self.processes = []
+        self.hide_tools = hide_tools
+
+    async def create_process(self, command):
+        self.commands.append(command)
+        if command.startswith("for t in") and self.hide_tools:
+            command = "true"
+        # exec so terminating the process stops the command itself, as sshd's signal does
+        proc = await asyncio.create_subprocess_shell(
+            f"exec sh -c {shlex.quote(command)}", stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        process = LocalProcess(proc)
+        self.processes.append(process)
+        return process
+
+
+class LocalSFTP:
+    def __init__(self):
+        self.calls = 0
+
+    async def stat(self, path):
+        self.calls += 1
+        return os.stat(path)
+
+    async def readdir(self, path):
+        self.calls += 1
+        return [SimpleNamespace(filename=n, attrs=os.lstat(os.path.join(path, n))) for n in os.listdir(path)]
+
+    async def mkdir(self, path):
+        self.calls += 1
+        os.mkdir(path)
+
+    async def remove(self, path):
+        self.calls += 1
+        os.remove(path)
+
+    async def rmdir(self, path):
+        self.calls += 1
+        os.rmdir(path)
+
+    def open(self, path, mode):
+        sftp = self
+
+        class _File:
+            async def __aenter__(self):
+                sftp.calls += 1
+                self._f = open(path, mode)
+                return self
+
+            async def __aexit__(self, *exc):
+                self._f.close()
+                return False
+
+            async def read(self):
+                return self._f.read()
+
+            async def write(self, data):
+                self._f.write(data)
+
+        return _File()
+
+
+class LocalHop:
+    def __init__(self, conn, sftp, cwd):
+        self.conn = conn
+        self.sftp = sftp
+        self.cwd = cwd
+
+    def get_active_loop(self):
+        return None
+
+    def get_connection_for_context(self, context_id):
+        return self.conn
+
+    def get_sftp_for_context(self, context_id):
+        return self.sftp
+
+    def get_session(self, context_id):
+        return SimpleNamespace(cwd=self.cwd, contextId=context_id)
+
+
+def _adapter(tmp_path, context_id, **conn_kwargs):
+    conn = LocalConnection(**conn_kwargs)
+    sftp = LocalSFTP()
+    adapter = RemoteFileSystemAdapter(context_id=context_id)
+    adapter._hop = LocalHop(conn, sftp, str(tmp_path))
+    adapter._cache = RemoteMetadataCache(ttl_seconds=60)
+
+    async def _publish(topic, payload):
+        pass
+
+    adapter._publish = _publish
+    remote_fs_adapter._remote_tool_sets.pop(context_id, None)
+    return adapter, conn, sftp
+
+
+def _make_tree(root):
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "app.py").write_text("def handler():\n    return 'needle'\n")
+    (root / "src" / "pkg" / "needle_util.py").write_text("x = 1\n")
+    (root / "src" / "pkg" / "data.bin").write_bytes(b"\0\1needle")
+    (root / "src" / "weird [name].txt").write_text("Needle here\n")
+    # Vendored trees are left out of every search path
+    (root / "node_modules" / "needle_pkg").mkdir(parents=True)
+    (root / "node_modules" / "needle_pkg" / "index.js").write_text("needle\n")
+    (root / ".git").mkdir()
+    (root / ".git" / "needle_ref").write_text("needle\n")
+
+
+@pytest.mark.asyncio
+async def test_copy_and_delete_run_on_remote_host(tmp_path):
+    _make_tree(tmp_path)
+    adapter, conn, sftp = _adapter(tmp_path, "exec-copy")
+
+    assert await adapter.copy_file(str(tmp_path / "src"), str(tmp_path / "dst"))
+    assert (tmp_path / "dst" / "pkg" / "needle_util.py").read_text() == "x = 1\n"
+    assert (tmp_path / "dst" / "weird [name].txt").exists()
+    assert any(c.startswith("mkdir -p") and "cp -a" in c for c in conn.commands)
+
+    # Copying onto an existing directory merges instead of nesting
+    assert await adapter.copy_file(str(tmp_path / "src"), str(tmp_path / "dst"))
+    assert not (tmp_path / "dst" / "src").exists()
+
+    assert await adapter.copy_file(str(tmp_path / "src" / "app.py"), str(tmp_path / "new" / "app.py"))
+    assert (tmp_path / "new" / "app.py").read_text().startswith("def handler")
+
+    assert await adapter.delete_file(str(tmp_path / "dst"))
+    assert not (tmp_path / "dst").exists()
+    assert any(c.startswith("rm -rf") for c in conn.commands)
+    # Only the stats deciding file vs directory went over SFTP
+    assert sftp.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_search_streams_filename_and_content_matches(tmp_path):
+    _make_tree(tmp_path)
+    adapter, conn, sftp = _adapter(tmp_path, "exec-search")
+
+    results = await adapter.search_files("needle")
+    by_path = {r["file_info"]["path"]: r for r in results}
+    assert str(tmp_path / "src" / "pkg" / "needle_util.py") in by_path
+    app = by_path[str(tmp_path / "src" / "app.py")]
+    assert app["matches"] == ["Line 2: return 'needle'"]
+    assert by_path[str(tmp_path / "src" / "weird [name].txt")]["matches"] == ["Line 1: Needle here"]
+    assert str(tmp_path / "src" / "pkg" / "data.bin") not in by_path  # binary files skipped
+    assert not any("node_modules" in p or ".git" in p for p in by_path)
+
+    dirs = await adapter.search_files("pkg", search_content=False)
+    assert [r["file_info"]["is_directory"] for r in dirs] == [True]
+
+    assert len(await adapter.search_files("needle", max_results=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_sftp_without_remote_tools(tmp_path):
+    _make_tree(tmp_path)
+    adapter, conn, sftp = _adapter(tmp_path, "exec-none", hide_tools=True)
+
+    assert await adapter.copy_file(str(tmp_path / "src"), str(tmp_path / "dst"))
+    assert (tmp_path / "dst" / "pkg" / "needle_util.py").exists()
+    results = await adapter.search_files("needle_util")
+    assert [r["file_info"]["name"] for r in results] == ["needle_util.py"] * 2
+    assert not await adapter.search_files("needle_pkg")
+    assert await adapter.delete_file(str(tmp_path / "dst"))
+    assert not (tmp_path / "dst").exists()
+    assert conn.commands == ["for t in cp rm rg grep find; do command -v $t >/dev/null 2>&1 && echo $t; done; "
+                             "find / -maxdepth 0 -printf '' >/dev/null 2>&1 && echo find-printf"]
+
+
+@pytest.mark.asyncio
+async def test_timed_out_remote_command_is_terminated(tmp_path):
+    adapter, conn, sftp = _adapter(tmp_path, "exec-timeout")
+    marker = tmp_path / "finished"
+
+    with pytest.raises(TimeoutError):
+        await adapter._exec(f"sleep 1 && touch {shlex.quote(str(marker))}", "remote cp", timeout=0.2)
+    assert conn.processes[-1].terminated
+    await asyncio.sleep(1.2)
+    assert not marker.exists()
+
+    # Tree operations get the longer HOP_REMOTE_EXEC_TIMEOUT
+    assert remote_fs_adapter.REMOTE_EXEC_TIMEOUT > remote_fs_adapter.OPERATION_TIMEOUT
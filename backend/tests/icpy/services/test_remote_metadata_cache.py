@@ -0,0 +1,166 @@
+"""
+Tests for the remote stat/listing cache and its change feed
+"""
+
+import asyncio
+import stat
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from icpy.services.remote_metadata_cache import RemoteChangeFeed, RemoteMetadataCache
+from icpy.services.remote_fs_adapter import RemoteFileSystemAdapter
+
+
+def _file(size=1):
+    return SimpleNamespace(permissions=stat.S_IFREG | 0o644, size=size)
+
+
+def _dir():
+    return SimpleNamespace(permissions=stat.S_IFDIR | 0o755, size=0)
+
+
+def test_listing_serves_child_stats_and_expires():
+    cache = RemoteMetadataCache(ttl_seconds=0.05)
+    cache.put_listing("ctx", "/w", [("a.py", _file(3)), ("src", _dir())])
+
+    assert [n for n, _ in cache.get_listing("ctx", "/w")] == ["a.py", "src"]
+    assert cache.get_stat("ctx", "/w/a.py").size == 3
+    assert cache.get_stat("other", "/w/a.py") is None
+
+    time.sleep(0.06)
+    assert cache.get_listing("ctx", "/w") is None
+    assert cache.stats["expirations"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = RemoteMetadataCache(ttl_seconds=60, max_size_mb=0.002)  # ~2 KB
+    for i in range(20):
+        cache.put_stat("ctx", f"/w/f{i}", _file())
+        cache.get_stat("ctx", "/w/f0")  # keep f0 hot
+    assert cache.get_stats()["size_bytes"] <= cache.max_size_bytes
+    assert cache.stats["evictions"] > 0
+    assert cache.get_stat("ctx", "/w/f0") is not None
+    assert cache.get_stat("ctx", "/w/f1") is None
+
+
+def test_invalidation_and_stale_reads():
+    cache = RemoteMetadataCache(ttl_seconds=60)
+    cache.put_listing("ctx", "/w", [("src", _dir())])
+    cache.put_listing("ctx", "/w/src", [("m.py", _file())])
+    cache.put_stat("ctx", "/w/src/m.py", _file())
+    cache.put_stat("ctx", "/w/src/pkg/deep.py", _file())
+
+    # A write to a file drops it and its parent's listing only
+    cache.invalidate("ctx", "/w/src/m.py")
+    assert cache.get_listing("ctx", "/w/src") is None
+    assert cache.get_listing("ctx", "/w") is not None
+
+    # A directory delete drops everything below it
+    cache.invalidate("ctx", "/w/src", recursive=True)
+    assert cache.get_stat("ctx", "/w/src/pkg/deep.py") is None
+    assert cache.get_listing("ctx", "/w") is None
+
+    # A read that started before an invalidation is not cached
+    generation = cache.generation("ctx")
+    cache.invalidate("ctx", "/w/x")
+    cache.put_stat("ctx", "/w/x", _file(), generation=generation)
+    assert cache.get_stat("ctx", "/w/x") is None
+
+
+@pytest.mark.asyncio
+async def test_change_feed_invalidates_reported_paths():
+    cache = RemoteMetadataCache(ttl_seconds=60)
+    cache.put_listing("ctx", "/w", [("a.py", _file())])
+    cache.put_listing("ctx", "/w/lib", [("b.py", _file())])
+    commands = []
+    outputs = ["", "/w/lib\n"]
+
+    async def run(command):
+        commands.append(command)
+        return outputs.pop(0) if outputs else ""
+
+    feed = RemoteChangeFeed(cache, "ctx", "/w", run, interval=60)
+    assert await feed.poll_once() == 0
+    assert "find /w -xdev -newer" in commands[0]
+    assert await feed.poll_once() == 1
+    assert cache.get_listing("ctx", "/w/lib") is None
+    assert cache.get_stat("ctx", "/w/lib/b.py") is None
+    assert cache.get_listing("ctx", "/w") is None
+
+    # Too many changes at once drops the whole context
+    cache.put_listing("ctx", "/w", [("a.py", _file())])
+    feed.max_paths = 2
+    outputs.append("/w/1\n/w/2\n/w/3\n")
+    await feed.poll_once()
+    assert cache.get_listing("ctx", "/w") is None
+
+
+class CountingSFTP:
+    def __init__(self):
+        self.files = {"/w/a.py": b"x"}
+        self.calls = 0
+
+    async def readdir(self, path):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return [SimpleNamespace(filename=p.rsplit("/", 1)[1], attrs=_file(len(c)))
+                for p, c in self.files.items() if p.rsplit("/", 1)[0] == path]
+
+    async def stat(self, path):
+        self.calls += 1
+        if path == "/w":
+            return _dir()
+        return _file(len(self.files[path]))
+
+    async def mkdir(self, path):
+        raise OSError("exists")
+
+    def open(self, path, mode):
+        sftp = self
+
+        class _File:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def write(self, data):
+                sftp.files[path] = data
+
+        return _File()
+
+
+@pytest.mark.asyncio
+async def test_adapter_serves_repeat_reads_from_cache():
+    sftp = CountingSFTP()
+    adapter = RemoteFileSystemAdapter(context_id="ctx")
+    adapter._sftp = lambda: sftp
+    adapter._cache = RemoteMetadataCache(ttl_seconds=60)
+
+    async def _publish(topic, payload):
+        pass
+
+    adapter._publish = _publish
+
+    assert [f.name for f in await adapter.list_directory("/w")] == ["a.py"]
+    assert (await adapter.get_file_info("/w/a.py")).size == 1
+    assert (await adapter.get_file_info("/w")).is_directory
+    await adapter.list_directory("/w")
+    assert sftp.calls == 2  # one readdir, one stat of /w
+
+    # An explicit refresh reads through, picking up changes made elsewhere
+    sftp.files["/w/b.py"] = b"yy"
+    assert [f.name for f in await adapter.list_directory("/w")] == ["a.py"]
+    assert sorted(f.name for f in await adapter.list_directory("/w", refresh=True)) == ["a.py", "b.py"]
+    assert sftp.calls == 3
+    assert (await adapter.get_file_info("/w/b.py")).size == 2
+    assert sftp.calls == 3
+
+    # Our own write invalidates the listing
+    assert await adapter.write_file("/w/new.py", "hello")
+    names = sorted(f.name for f in await adapter.list_directory("/w"))
+    assert names == ["a.py", "b.py", "new.py"]
+    assert (await adapter.get_file_info("/w/new.py")).size == 5
@@ -0,0 +1,178 @@
+"""
+Tests for the concurrent remote tree walk and the adapter methods built on it
+"""
+
+import asyncio
+import posixpath
+import stat
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from icpy.services.remote_tree_walker import walk_remote_tree
+from icpy.services.remote_fs_adapter import RemoteFileSystemAdapter
+
+
+class FakeSFTP:
+    """In-memory SFTP with a fixed round-trip latency per request."""
+
+    def __init__(self, tree, latency=0.02):
+        self.latency = latency
+        self.dirs = {"/"}
+        self.files = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        for path, content in tree.items():
+            parent = posixpath.dirname(path)
+            while parent not in self.dirs:
+                self.dirs.add(parent)
+                parent = posixpath.dirname(parent)
+            if content is None:
+                self.dirs.add(path)
+            else:
+                self.files[path] = content
+
+    async def _rtt(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+    def _attrs(self, path):
+        if path in self.dirs:
+            return SimpleNamespace(permissions=stat.S_IFDIR | 0o755, size=0)
+        return SimpleNamespace(permissions=stat.S_IFREG | 0o644, size=len(self.files[path]))
+
+    async def readdir(self, path):
+        await self._rtt()
+        if path not in self.dirs:
+            raise FileNotFoundError(path)
+        children = [p for p in self.dirs | set(self.files) if p != "/" and posixpath.dirname(p) == path]
+        return [SimpleNamespace(filename=n, attrs=None) for n in (".", "..")] + [
+            SimpleNamespace(filename=posixpath.basename(p), attrs=self._attrs(p)) for p in sorted(children)
+        ]
+
+    async def stat(self, path):
+        await self._rtt()
+        if path not in self.dirs and path not in self.files:
+            raise FileNotFoundError(path)
+        return self._attrs(path)
+
+    async def mkdir(self, path):
+        await self._rtt()
+        if path in self.dirs or posixpath.dirname(path) not in self.dirs:
+            raise OSError(path)
+        self.dirs.add(path)
+
+    async def rmdir(self, path):
+        await self._rtt()
+        if any(posixpath.dirname(p) == path for p in self.dirs | set(self.files) if p != path):
+            raise OSError("directory not empty")
+        self.dirs.discard(path)
+
+    async def remove(self, path):
+        await self._rtt()
+        del self.files[path]
+
+    def open(self, path, mode):
+        sftp = self
+
+        class _File:
+            async def __aenter__(self):
+                await sftp._rtt()
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def read(self):
+                return sftp.files[path]
+
+            async def write(self, data):
+                sftp.files[path] = data
+
+        return _File()
+
+
+def _tree(width=4, depth=3):
+    tree = {}
+
+    def build(prefix, level):
+        for i in range(width):
+            tree[f"{prefix}/f{i}.txt"] = f"{prefix}/{i}".encode()
+            if level < depth:
+                build(f"{prefix}/d{i}", level + 1)
+
+    build("/root", 1)
+    tree["/root/.hidden/secret.txt"] = b"x"
+    return tree
+
+
+def _adapter(sftp):
+    adapter = RemoteFileSystemAdapter()
+    adapter._sftp = lambda: sftp
+    adapter._get_cwd = lambda: "/root"
+
+    async def _publish(topic, payload):
+        pass
+
+    adapter._publish = _publish
+    return adapter
+
+
+@pytest.mark.asyncio
+async def test_walk_visits_every_directory_parent_first_and_concurrently():
+    sftp = FakeSFTP(_tree())
+    seen = []
+    start = time.monotonic()
+    async for path, entries in walk_remote_tree(sftp, "/root", concurrency=8):
+        assert path == "/root" or posixpath.dirname(path) in seen
+        assert all(name not in (".", "..") for name, _ in entries)
+        seen.append(path)
+    elapsed = time.monotonic() - start
+
+    assert len(seen) == 1 + 4 + 16 + 1  # root, two directory levels and .hidden
+    assert sftp.max_in_flight > 1
+    # 22 sequential reads would take ~0.44s; the walk is bounded by depth
+    assert elapsed < 0.3
+
+
+@pytest.mark.asyncio
+async def test_walk_stops_early_and_respects_descend():
+    sftp = FakeSFTP(_tree())
+    async for _ in walk_remote_tree(sftp, "/root", descend=lambda parent, name, attrs: name != "d0"):
+        break
+    await asyncio.sleep(0.05)
+    assert sftp.in_flight == 0
+
+    paths = [p async for p, _ in walk_remote_tree(sftp, "/root", descend=lambda parent, name, attrs: name != "d0")]
+    assert "/root/d0" not in paths and "/root/d1/d0" not in paths
+
+
+@pytest.mark.asyncio
+async def test_adapter_list_search_copy_and_delete():
+    tree = _tree(width=3, depth=2)
+    sftp = FakeSFTP(tree)
+    adapter = _adapter(sftp)
+
+    listed = await adapter.list_directory("/root", recursive=True)
+    assert {f.path for f in listed} == {
+        p for p in set(tree) | sftp.dirs
+        if p.startswith("/root/") and ".hidden" not in p
+    }
+    hidden = await adapter.list_directory("/root", include_hidden=True, recursive=True)
+    assert "/root/.hidden/secret.txt" in {f.path for f in hidden}
+    assert len(await adapter.list_directory("/root")) == 6
+
+    results = await adapter.search_files("f1", max_results=2)
+    assert len(results) == 2
+
+    assert await adapter.copy_file("/root", "/copy")
+    for path, content in tree.items():
+        assert sftp.files["/copy" + path[len("/root"):]] == content
+
+    assert await adapter.delete_file("/copy")
+    assert not any(p.startswith("/copy") for p in sftp.dirs | set(sftp.files))
@@ -0,0 +1,137 @@
+"""
+Tests for the persistent search index used by FileSystemService
+"""
+
+import os
+
+from icpy.services.search_index import PersistentSearchIndex
+
+
+def _index(tmp_path, compact_after=2000):
+    root = tmp_path / "ws"
+    root.mkdir(exist_ok=True)
+    idx = PersistentSearchIndex(str(root), str(root / ".icotes" / "search_index"), compact_after=compact_after)
+    idx.load()
+    return root, idx
+
+
+def test_lookup_update_and_remove(tmp_path):
+    root, idx = _index(tmp_path)
+    a = str(root / "a.py")
+    b = str(root / "b.py")
+    idx.update_file(a, 1.0, 10, {"alpha", "shared"})
+    idx.update_file(b, 1.0, 10, {"beta", "shared"})
+    assert idx.lookup("shared") == {a, b}
+
+    # Re-indexing replaces the old terms
+    idx.update_file(a, 2.0, 12, {"gamma"})
+    assert idx.lookup("alpha") == set()
+    assert idx.lookup("gamma") == {a}
+
+    idx.remove_file(b)
+    assert idx.lookup("shared") == set()
+    idx.close()
+
+
+def test_journal_survives_restart(tmp_path):
+    root, idx = _index(tmp_path)
+    a = str(root / "a.py")
+    idx.update_file(a, 1.0, 10, {"hello"})
+    idx.close()
+
+    _, reopened = _index(tmp_path)
+    assert reopened.lookup("hello") == {a}
+    assert not reopened.needs_update(a, 1.0, 10)
+    assert reopened.needs_update(a, 2.0, 10)
+    reopened.close()
+
+
+def test_compaction_writes_segment_and_truncates_journal(tmp_path):
+    root, idx = _index(tmp_path, compact_after=2)
+    a = str(root / "a.py")
+    b = str(root / "b.py")
+    idx.update_file(a, 1.0, 10, {"hello", "world"})
+    idx.update_file(b, 1.0, 10, {"world"})
+    assert idx.needs_compaction()
+    idx.compact()
+    assert not idx.needs_compaction()
+    assert idx.get_stats()["segment_terms"] == 2
+    assert idx.lookup("world") == {a, b}
+
+    # Updates after compaction layer on top of the segment
+    idx.remove_file(a)
+    assert idx.lookup("world") == {b}
+    idx.close()
+
+    files = os.listdir(root / ".icotes" / "search_index")
+    assert "manifest.json" in files
+    assert [f for f in files if f.startswith("segment-")] == ["segment-1.bin"]
+
+    _, reopened = _index(tmp_path)
+    assert reopened.lookup("world") == {b}
+    assert reopened.lookup("hello") == set()
+    reopened.close()
+
+
+def test_directory_move_and_prune(tmp_path):
+    root, idx = _index(tmp_path)
+    old = str(root / "pkg" / "mod.py")
+    idx.update_file(old, 1.0, 5, {"token"})
+    idx.move_file(str(root / "pkg"), str(root / "lib"), recursive=True)
+    new = str(root / "lib" / "mod.py")
+    assert idx.lookup("token") == {new}
+    assert not idx.needs_update(new, 1.0, 5)
+
+    assert idx.prune([]) == 1
+    assert idx.lookup("token") == set()
+    idx.close()
+
+
+def test_in_memory_mode_does_not_touch_disk(tmp_path):
+    idx = PersistentSearchIndex(str(tmp_path), None)
+    assert idx.load() is False
+    idx.update_file(str(tmp_path / "x.txt"), 1.0, 1, {"word"})
+    assert len(idx) == 1
+    assert not idx.needs_compaction()
+    assert os.listdir(tmp_path) == []
+
+
+def _query_fixture(tmp_path):
+    root, idx = _index(tmp_path)
+    files = {
+        "greet.py": {"hello", "world", "print"},
+        "other.py": {"goodbye", "worldwide"},
+        "none.txt": {"unrelated"},
+    }
+    paths = {}
+    for name, terms in files.items():
+        paths[name] = str(root / name)
+        idx.update_file(paths[name], 1.0, 1, terms)
+    return idx, paths
+
+
+def test_query_candidates_substring_modes(tmp_path):
+    idx, paths = _query_fixture(tmp_path)
+    for compacted in (False, True):
+        if compacted:
+            idx.compact()
+        # Single word: infix match against the term dictionary
+        assert idx.query_candidates("orld") == {paths["greet.py"], paths["other.py"]}
+        # Trailing word may be a prefix, leading word a suffix
+        assert idx.query_candidates("llo worldw") == set()
+        assert idx.query_candidates("llo wor") == {paths["greet.py"]}
+        # Interior words must match exactly
+        assert idx.query_candidates("x hello world y") == {paths["greet.py"]}
+        assert idx.query_candidates("missing") == set()
+    idx.close()
+
+
+def test_query_candidates_cannot_narrow(tmp_path):
+    idx, _ = _query_fixture(tmp_path)
+    # Punctuation-only or too-short words can't use the index
+    assert idx.query_candidates("->") is None
+    assert idx.query_candidates("he") is None
+    # Words that expand to too many terms are skipped rather than enumerated
+    assert idx.query_candidates("o", max_terms=1) is None
+    assert idx.query_candidates("orl", max_terms=1) is None
+    idx.close()
@@ -0,0 +1,207 @@
+"""
+Tests for pipelined, resumable SFTP transfers
+"""
+
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from icpy.services.remote_fs_adapter import RemoteFileSystemAdapter
+from icpy.services.sftp_transfer import TransferState, read_chunks, write_chunks
+
+
+class FakeRemoteFile:
+    """SFTP file over a shared bytearray with per-request latency."""
+
+    def __init__(self, sftp, path):
+        self.sftp = sftp
+        self.path = path
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def _rtt(self):
+        self.sftp.requests += 1
+        if self.sftp.dead:
+            raise ConnectionResetError("connection closed")
+        if self.sftp.fail_after is not None and self.sftp.requests > self.sftp.fail_after:
+            self.sftp.fail_after = None
+            self.sftp.dead = self.sftp.stay_dead
+            raise ConnectionResetError("connection lost")
+        self.sftp.in_flight += 1
+        self.sftp.max_in_flight = max(self.sftp.max_in_flight, self.sftp.in_flight)
+        try:
+            await asyncio.sleep(self.sftp.latency)
+        finally:
+            self.sftp.in_flight -= 1
+
+    async def read(self, size, offset):
+        await self._rtt()
+        data = self.sftp.files[self.path]
+        size = min(size, self.sftp.max_read)
+        return bytes(data[offset:offset + size])
+
+    async def write(self, data, offset):
+        await self._rtt()
+        buf = self.sftp.files.setdefault(self.path, bytearray())
+        if len(buf) < offset:
+            buf.extend(b"\0" * (offset - len(buf)))
+        buf[offset:offset + len(data)] = data
+        self.sftp.write_offsets.append(offset)
+
+
+class FakeSFTP:
+    def __init__(self, files=None, latency=0.005, max_read=1 << 30):
+        self.files = {p: bytearray(d) for p, d in (files or {}).items()}
+        self.latency = latency
+        self.max_read = max_read
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_after = None
+        self.stay_dead = False  # a real client stays closed after its connection drops
+        self.dead = False
+        self.write_offsets = []
+        self.opens = []
+
+    def open(self, path, mode):
+        self.opens.append((path, mode))
+        if mode == 'wb':
+            self.files[path] = bytearray()
+        return FakeRemoteFile(self, path)
+
+    async def stat(self, path):
+        if self.dead:
+            raise ConnectionResetError("connection closed")
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return SimpleNamespace(size=len(self.files[path]), permissions=0o100644)
+
+    async def remove(self, path):
+        del self.files[path]
+
+    async def rename(self, src, dst):
+        self.files[dst] = self.files.pop(src)
+
+    async def mkdir(self, path):
+        raise OSError("exists")
+
+
+def _adapter(sftp):
+    adapter = RemoteFileSystemAdapter()
+    adapter._sftp = lambda: sftp
+    events = []
+
+    async def _publish(topic, payload):
+        events.append((topic, payload))
+
+    adapter._publish = _publish
+    return adapter, events
+
+
+@pytest.mark.asyncio
+async def test_reads_are_pipelined_and_handle_short_reads():
+    data = os.urandom(300_000)
+    sftp = FakeSFTP({"/f": data}, max_read=10_000)
+    state = TransferState("/f", "download", total=len(data))
+    f = sftp.open("/f", "rb")
+
+    start = time.monotonic()
+    chunks = [c async for c in read_chunks(f, state, chunk_size=32_768, max_requests=8)]
+    elapsed = time.monotonic() - start
+
+    assert b"".join(chunks) == data
+    assert state.done == len(data)
+    assert sftp.max_in_flight > 1
+    # 10 chunks of 4 capped reads each would take ~0.2s one request at a time
+    assert elapsed < 0.15
+
+
+@pytest.mark.asyncio
+async def test_writes_are_pipelined_from_resume_offset():
+    data = os.urandom(100_000)
+    sftp = FakeSFTP({"/f": data[:40_000]})
+    state = TransferState("/f", "upload", total=len(data), done=40_000)
+    progress = []
+
+    async def on_progress(s):
+        progress.append(s.done)
+
+    await write_chunks(sftp.open("/f", "r+b"), data, state, chunk_size=16_384, max_requests=4,
+                       on_progress=on_progress)
+    assert bytes(sftp.files["/f"]) == data
+    assert min(sftp.write_offsets) == 40_000
+    assert progress == sorted(progress) and progress[-1] == len(data)
+    assert sftp.max_in_flight > 1
+
+
+@pytest.mark.asyncio
+async def test_download_resumes_after_dropped_connection():
+    data = os.urandom(3 * 1024 * 1024)
+    sftp = FakeSFTP({"/big.bin": data}, latency=0)
+    sftp.fail_after = 5
+    adapter, events = _adapter(sftp)
+
+    assert await adapter.read_file_binary("/big.bin") == data
+    # The second session picks up from where the first stopped
+    assert sftp.opens[1] == ("/big.bin", "rb")
+    progress = [p for t, p in events if t == "fs.transfer_progress"]
+    assert progress[-1]["done"] and progress[-1]["bytes_done"] == len(data)
+    assert progress[-1]["resumes"] == 1
+
+    streamed = b"".join([c async for c in adapter.stream_file("/big.bin", chunk_size=65_536)])
+    assert streamed == data
+
+
+@pytest.mark.asyncio
+async def test_upload_resumes_into_temp_file_after_dropped_connection():
+    data = os.urandom(2 * 1024 * 1024)
+    sftp = FakeSFTP(latency=0)
+    sftp.fail_after = 3
+    adapter, events = _adapter(sftp)
+
+    assert await adapter.write_file_binary("/out/video.mp4", data)
+    assert bytes(sftp.files["/out/video.mp4"]) == data
+    assert list(sftp.files) == ["/out/video.mp4"]  # temp file renamed into place
+    tmp_opens = [mode for path, mode in sftp.opens if ".tmp." in path]
+    assert tmp_opens == ["wb", "r+b"]
+    progress = [p for t, p in events if t == "fs.transfer_progress"]
+    assert progress[-1]["file_path"] == "/out/video.mp4" and progress[-1]["done"]
+
+
+@pytest.mark.asyncio
+async def test_resume_on_hop_loop_leases_a_fresh_client():
+    from contextlib import asynccontextmanager
+
+    data = os.urandom(3 * 1024 * 1024)
+    live = FakeSFTP({"/big.bin": data}, latency=0)
+    live.fail_after = 5
+    live.stay_dead = True
+    fresh = FakeSFTP(latency=0)
+    fresh.files = live.files  # same remote host, new session
+    adapter, events = _adapter(live)
+    leases = []
+
+    @asynccontextmanager
+    async def ephemeral_sftp(context_id=None):
+        leases.append(context_id)
+        yield fresh
+
+    # No separate hop loop: requests run where the live client belongs
+    adapter._hop = SimpleNamespace(get_active_loop=lambda: None, ephemeral_sftp=ephemeral_sftp)
+
+    assert await adapter.read_file_binary("/big.bin") == data
+    assert len(leases) == 1
+    assert fresh.opens == [("/big.bin", "rb")]
+
+    upload = os.urandom(2 * 1024 * 1024)
+    live.dead, live.fail_after = False, live.requests + 3
+    assert await adapter.write_file_binary("/out/video.mp4", upload)
+    assert bytes(live.files["/out/video.mp4"]) == upload
+    assert len(leases) == 2
@@ -867,6 +867,79 @@ class TestFileSystemService:
         assert 'read' in permission_values
         assert 'write' in permission_values
 
+    @pytest.mark.asyncio
+    async def test_search_index_persists_across_restart(self, filesystem_service, sample_files, temp_dir):
+        """Unchanged files are not re-read when the service restarts"""
+        assert sample_files['test.txt'] in filesystem_service.search_index['hello']
+        await filesystem_service.shutdown()
+        # Files removed while the service is down are pruned on the next start
+        os.remove(sample_files['script.py'])
+
+        restarted = FileSystemService(root_path=temp_dir)
+        await restarted.initialize()
+        try:
+            assert await restarted.wait_until_indexed(timeout=10)
+            stats = await restarted.get_stats()
+            assert stats['files_read'] == 0
+            assert stats['search_index']['documents'] == 3
+            assert sample_files['test.txt'] in restarted.search_index['hello']
+            assert sample_files['script.py'] not in restarted.search_index['python']
+        finally:
+            await restarted.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_content_search_reads_only_index_candidates(self, filesystem_service, sample_files):
+        """Content search uses the index to avoid reading non-matching files"""
+        read_paths = []
+        original = filesystem_service._search_file_content
+
+        async def tracking(file_path, query):
+            read_paths.append(file_path)
+            return await original(file_path, query)
+
+        filesystem_service._search_file_content = tracking
+        results = await filesystem_service.search_files("markdown fi", search_content=True)
+        assert read_paths == [sample_files['sub_file.md']]
+        assert [r.file_info.path for r in results] == [sample_files['sub_file.md']]
+
+        # Queries the index can't narrow still work via a full scan
+        read_paths.clear()
+        results = await filesystem_service.search_files("('", search_content=True)
+        assert len(read_paths) >= 3
+        assert any(r.file_info.path == sample_files['script.py'] for r in results)
+        stats = await filesystem_service.get_stats()
+        assert stats['search_full_scans'] == 1
+
+    @pytest.mark.asyncio
+    async def test_background_index_build_reports_progress(self, filesystem_service, sample_files, temp_dir):
+        """Startup scan runs in the background and publishes progress"""
+        progress_events = []
+
+        async def capture(message):
+            progress_events.append(message.payload)
+
+        await filesystem_service.message_broker.subscribe('fs.index_progress', capture)
+        await filesystem_service.shutdown()
+
+        restarted = FileSystemService(root_path=temp_dir)
+        await restarted.initialize()
+        try:
+            # initialize() returns before the scan; the service stays usable meanwhile
+            assert await restarted.read_file(sample_files['test.txt']) is not None
+            assert await restarted.wait_until_indexed(timeout=10)
+            assert not restarted.is_indexing
+            assert sample_files['sub_file.md'] in restarted.file_index
+
+            stats = await restarted.get_stats()
+            assert stats['indexing']['state'] == 'complete'
+            assert stats['indexing']['files'] == 4
+            assert stats['indexing']['directories'] == 2
+
+            await asyncio.sleep(0.1)
+            assert progress_events and progress_events[-1]['state'] == 'complete'
+        finally:
+            await restarted.shutdown()
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -19,7 +19,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from icpy.services.lsp_service import (
     LSPService, LSPServerConfig, LSPServerState, DiagnosticSeverity,
-    Diagnostic, CompletionItem,
+    Diagnostic, CompletionItem, LSPServer,
     get_lsp_service, shutdown_lsp_service
 )
 from icpy.core.message_broker import get_message_broker, shutdown_message_broker
@@ -751,6 +751,97 @@ const testVar = "Hello";
             # Since no servers are actually running, no notifications sent
             assert True  # Test passes if no exceptions
 
+    @pytest.mark.parametrize("sync_kind", [1, {"openClose": True, "change": 2}])
+    async def test_document_changes_coalesced_and_incremental(self, lsp_service, temp_workspace, sync_kind):
+        """Rapid updates become one didChange, ranged when the server syncs incrementally"""
+        server = LSPServer(
+            server_id="python-test",
+            config=LSPServerConfig(language="python", command=["pylsp"]),
+            state=LSPServerState.RUNNING,
+            capabilities={"textDocumentSync": sync_kind},
+        )
+        server.process = Mock(returncode=None)
+        server.process.stdin = Mock()
+        server.process.stdin.drain = AsyncMock()
+        lsp_service.servers[server.server_id] = server
+        lsp_service.language_servers["python"] = server.server_id
+        lsp_service.change_debounce = 0.05
+
+        test_file = os.path.join(temp_workspace, "test.py")
+        content = "x = 1\n" * 1000
+        assert await lsp_service.open_document(test_file, content, "python")
+        for i in range(5):
+            assert await lsp_service.update_document(test_file, content + f"y = {i}\n")
+        await asyncio.sleep(0.2)
+
+        writes = [call.args[0] for call in server.process.stdin.write.call_args_list]
+        changes = [json.loads(w.split(b"\r\n\r\n", 1)[1]) for w in writes if b"didChange" in w]
+        assert len(changes) == 1
+        params = changes[0]["params"]
+        assert params["textDocument"]["version"] == 2
+        if sync_kind == 1:
+            assert params["contentChanges"] == [{"text": content + "y = 4\n"}]
+        else:
+            assert params["contentChanges"] == [{
+                "range": {"start": {"line": 1000, "character": 0}, "end": {"line": 1000, "character": 0}},
+                "text": "y = 4\n",
+            }]
+        assert lsp_service.stats["changes_coalesced"] == 4
+
+    async def test_duplicate_requests_coalesced_and_cached(self, lsp_service, temp_workspace):
+        """Identical queries on an open document share one server request until it changes"""
+        server = LSPServer(
+            server_id="python-test",
+            config=LSPServerConfig(language="python", command=["pylsp"]),
+            state=LSPServerState.RUNNING,
+            capabilities={"hoverProvider": True, "textDocumentSync": 1},
+        )
+        server.process = Mock(returncode=None)
+        server.process.stdin = Mock()
+        server.process.stdin.drain = AsyncMock()
+        lsp_service.servers[server.server_id] = server
+        lsp_service.language_servers["python"] = server.server_id
+
+        test_file = os.path.join(temp_workspace, "test.py")
+        assert await lsp_service.open_document(test_file, "x = 1\n", "python")
+
+        async def slow_hover(server, method, params):
+            await asyncio.sleep(0.05)
+            return {"contents": {"kind": "plaintext", "value": "int"}}
+
+        with patch.object(lsp_service, '_send_request', side_effect=slow_hover) as mock_request:
+            results = await asyncio.gather(*[
+                lsp_service.get_hover_info(test_file, 0, 0) for _ in range(5)
+            ])
+            assert all(r == results[0] for r in results)
+            assert mock_request.call_count == 1
+            assert lsp_service.stats["requests_coalesced"] == 4
+
+            await lsp_service.get_hover_info(test_file, 0, 0)
+            assert mock_request.call_count == 1
+            assert lsp_service.stats["cache_hits"] == 1
+
+            # An edit bumps the document version and drops its cached responses
+            await lsp_service.update_document(test_file, "x = 2\n")
+            await lsp_service.get_hover_info(test_file, 0, 0)
+            assert mock_request.call_count == 2
+
+    async def test_unopened_documents_and_workspace_symbols_stay_fresh(self, lsp_service):
+        """Files not opened in the editor are never cached; workspace symbols drop on fs events"""
+        with patch.object(lsp_service, 'send_request', new=AsyncMock(return_value=[{"name": "f"}])) as mock_request:
+            await lsp_service.get_document_symbols("/test/test.py")
+            await lsp_service.get_document_symbols("/test/test.py")
+            assert mock_request.await_count == 2
+
+            await lsp_service.workspace_symbol_search("python", "f")
+            await lsp_service.workspace_symbol_search("python", "f")
+            assert mock_request.await_count == 3
+
+            await lsp_service.message_broker.publish("fs.file_modified", {"file_path": "/test/test.py"})
+            await lsp_service.message_broker.drain(timeout=1)
+            await lsp_service.workspace_symbol_search("python", "f")
+            assert mock_request.await_count == 4
+
     async def test_workspace_symbol_search_mock(self, lsp_service):
         """Test workspace symbol search (mocked)"""
         # Mock symbol search response
@@ -15,7 +15,9 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from icpy.core.message_broker import MessageBroker, Message, MessageType, Subscription
+from icpy.core.message_broker import (
+    MessageBroker, Message, MessageType, Subscription, TopicTrie, OverflowPolicy
+)
 
 
 class TestMessageBroker:
@@ -220,7 +222,40 @@ class TestMessageBroker:
         limited_history = await broker.replay_messages("test_subscriber", "test.topic", limit=1)
         assert len(limited_history) == 1
         assert limited_history[0].payload == "message1"
-    
+
+    @pytest.mark.asyncio
+    async def test_history_ring_truncation_and_opt_out(self):
+        """Test bounded history, oversized payload truncation and per-topic opt-out"""
+        broker = MessageBroker(max_history=3)
+        broker.max_payload_history_bytes = 1024
+        await broker.start()
+        try:
+            received = []
+            await broker.subscribe("noisy.*", lambda msg: received.append(msg))
+            broker.set_history_enabled("noisy.*", False)
+
+            for i in range(5):
+                await broker.publish("test.topic", i)
+            await broker.publish("test.big", {"rows": ["x" * 100] * 200})
+            await broker.publish("noisy.output", "chunk")
+            await broker.drain(timeout=1)
+
+            history = await broker.replay_messages("s", "*")
+            assert [m.topic for m in history] == ["test.topic", "test.topic", "test.big"]
+            assert history[-1].payload["_truncated"] is True
+            # Excluded topics are still delivered
+            assert len(received) == 1
+
+            stats = await broker.get_stats()
+            assert stats['history_truncated'] == 1
+            assert stats['history_skipped'] == 1
+
+            broker.set_history_enabled("noisy.*", True)
+            await broker.publish("noisy.output", "chunk")
+            assert (await broker.replay_messages("s", "noisy.*"))[0].payload == "chunk"
+        finally:
+            await broker.stop()
+
     @pytest.mark.asyncio
     async def test_message_ttl_expiration(self, broker):
         """Test message time-to-live expiration"""
@@ -354,6 +389,125 @@ class TestMessageBroker:
         assert stats['message_history_size'] == 2
         assert 'test.*' in stats['topic_patterns']
         assert 'other.*' in stats['topic_patterns']
+    
+    @pytest.mark.asyncio
+    async def test_route_cache_tracks_subscription_changes(self, broker):
+        """Test cached topic routes are refreshed when subscriptions change"""
+        received = []
+        await broker.subscribe("fs.file_changed", lambda msg: received.append("exact"), subscriber_id="a")
+        await broker.publish("fs.file_changed", 1)
+        await broker.publish("fs.file_changed", 2)
+        await broker.drain(timeout=1)
+        assert received == ["exact", "exact"]
+        
+        # A new wildcard subscriber must see the next publish despite the cached route
+        await broker.subscribe("fs.*", lambda msg: received.append("wild"), subscriber_id="b")
+        await broker.publish("fs.file_changed", 3)
+        await broker.drain(timeout=1)
+        assert sorted(received[2:]) == ["exact", "wild"]
+        
+        await broker.unsubscribe("a")
+        await broker.publish("fs.file_changed", 4)
+        await broker.drain(timeout=1)
+        assert received[4:] == ["wild"]
+        
+        stats = await broker.get_stats()
+        assert stats['route_cache_hits'] >= 1
+    
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_does_not_block_publisher(self, broker):
+        """Test a slow subscriber sheds load instead of throttling publishers"""
+        release = asyncio.Event()
+        slow_received = []
+        fast_received = []
+        
+        async def slow(message: Message):
+            await release.wait()
+            slow_received.append(message.payload)
+        
+        await broker.subscribe("fs.*", slow, subscriber_id="slow", max_queue=3)
+        await broker.subscribe("fs.*", lambda msg: fast_received.append(msg.payload), subscriber_id="fast")
+        
+        for i in range(10):
+            await asyncio.wait_for(broker.publish("fs.file_modified", i), timeout=0.5)
+        await asyncio.sleep(0.05)
+        assert fast_received == list(range(10))
+        
+        metrics = {m['subscriber_id']: m for m in await broker.get_subscriber_metrics()}
+        assert metrics['slow']['depth'] == 3
+        assert metrics['slow']['dropped'] == 6
+        
+        release.set()
+        await broker.drain(timeout=1)
+        # The first message was already in flight; the rest are the newest three
+        assert slow_received == [0, 7, 8, 9]
+        assert (await broker.get_stats())['messages_dropped'] == 6
+    
+    @pytest.mark.asyncio
+    async def test_overflow_coalesce_and_block(self, broker):
+        """Test coalescing and blocking overflow policies"""
+        release = asyncio.Event()
+        received = []
+        
+        async def slow(message: Message):
+            await release.wait()
+            received.append((message.topic, message.payload))
+        
+        await broker.subscribe("ui.*", slow, max_queue=2, overflow=OverflowPolicy.COALESCE)
+        await broker.publish("ui.first", 0)
+        await asyncio.sleep(0)  # worker picks up the first message
+        await broker.publish("ui.progress", 1)
+        await broker.publish("ui.status", 1)
+        await broker.publish("ui.progress", 2)
+        release.set()
+        await broker.drain(timeout=1)
+        assert received == [("ui.first", 0), ("ui.status", 1), ("ui.progress", 2)]
+        
+        gate = asyncio.Event()
+        blocked = []
+        
+        async def gated(message: Message):
+            await gate.wait()
+            blocked.append(message.payload)
+        
+        await broker.subscribe("job.*", gated, max_queue=1, overflow="block")
+        await broker.publish("job.run", 0)
+        await asyncio.sleep(0)
+        await broker.publish("job.run", 1)
+        pending = asyncio.create_task(broker.publish("job.run", 2))
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+        gate.set()
+        await asyncio.wait_for(pending, timeout=1)
+        await broker.drain(timeout=1)
+        assert blocked == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_publish_from_another_thread_wakes_broker_loop(self, broker):
+        """Publishing from another thread's loop is delivered without waiting for the broker loop to wake"""
+        import threading
+
+        received = []
+        arrived = asyncio.Event()
+
+        def on_message(message: Message):
+            received.append(message.payload)
+            arrived.set()
+
+        await broker.subscribe("fs.*", on_message)
+
+        publisher = threading.Thread(
+            target=lambda: asyncio.run(broker.publish("fs.file_created", {"path": "/tmp/a"}))
+        )
+        started = time.monotonic()
+        publisher.start()
+        # The broker loop sits idle here; only a threadsafe wakeup delivers promptly
+        await asyncio.wait_for(arrived.wait(), timeout=2)
+        elapsed = time.monotonic() - started
+        publisher.join()
+
+        assert received == [{"path": "/tmp/a"}]
+        assert elapsed < 0.5
 
 
 class TestMessage:
@@ -457,6 +611,33 @@ class TestSubscription:
         assert not sub3.matches_topic("user.create")
 
 
+class TestTopicTrie:
+    """Test cases for TopicTrie routing"""
+    
+    def test_matches_like_fnmatch_in_subscription_order(self):
+        """Test trie resolution agrees with glob semantics and keeps order"""
+        callback = Mock()
+        trie = TopicTrie()
+        subs = [
+            Subscription("s1", "*", callback),
+            Subscription("s2", "user.service.create", callback),
+            Subscription("s3", "*.service.*", callback),
+            Subscription("s4", "user.*", callback),
+            Subscription("s5", "user.serv?ce.create", callback),
+            Subscription("s6", "auth.*", callback),
+        ]
+        for sub in subs:
+            trie.add(sub)
+        
+        for topic in ("user.service.create", "user", "auth.login", "service.create", "user.x.y.z"):
+            expected = [sub.subscriber_id for sub in subs if sub.matches_topic(topic)]
+            assert [sub.subscriber_id for sub in trie.match(topic)] == expected
+        
+        assert trie.remove(subs[3])
+        assert not trie.remove(subs[3])
+        assert [sub.subscriber_id for sub in trie.match("user.service.create")] == ["s1", "s2", "s3", "s5"]
+
+
 if __name__ == "__main__":
     # Run tests
     pytest.main([__file__, "-v"])
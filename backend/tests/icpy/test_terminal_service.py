@@ -332,6 +332,89 @@ class TestTerminalService:
         assert session.read_task is not None
         assert session.write_task is not None
 
+    @pytest.mark.asyncio
+    async def test_websocket_output_is_coalesced(self, terminal_service):
+        """Test PTY output reaches the WebSocket in coalesced chunks with aggregated metrics"""
+        terminal_service.output_stats_interval = 0
+        session_id = await terminal_service.create_session()
+        await terminal_service.start_session(session_id)
+        
+        events = []
+        async def on_output(message):
+            events.append(message.payload)
+        await terminal_service.message_broker.subscribe('terminal.output_sent', on_output)
+        
+        mock_websocket = AsyncMock()
+        mock_websocket.accept = AsyncMock()
+        mock_websocket.send_text = AsyncMock()
+        mock_websocket.receive_text = AsyncMock(side_effect=asyncio.CancelledError())
+        session = terminal_service.sessions[session_id]
+        chunks_before = session.output_chunks
+        assert await terminal_service.connect_websocket(mock_websocket, session_id, replay=False)
+        
+        await terminal_service.send_input(session_id, "seq 1 3000\n")
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            sent = "".join(call.args[0] for call in mock_websocket.send_text.call_args_list)
+            if "\n3000" in sent:
+                break
+        assert "\n3000" in sent
+        
+        # Far fewer sends than lines of output
+        assert mock_websocket.send_text.call_count < 300
+        assert session.output_chunks - chunks_before == mock_websocket.send_text.call_count
+        
+        await terminal_service.message_broker.drain(timeout=1)
+        assert events and sum(e['data_length'] for e in events) <= session.output_bytes
+        assert all('bytes_per_second' in e for e in events)
+
+    @pytest.mark.asyncio
+    async def test_websocket_binary_frames(self, terminal_service):
+        """Test clients can receive terminal output as binary frames"""
+        session_id = await terminal_service.create_session()
+        await terminal_service.start_session(session_id)
+        
+        mock_websocket = AsyncMock()
+        mock_websocket.accept = AsyncMock()
+        mock_websocket.receive_text = AsyncMock(side_effect=asyncio.CancelledError())
+        assert await terminal_service.connect_websocket(mock_websocket, session_id, binary=True)
+        
+        await terminal_service.send_input(session_id, "printf '\\344\\270\\226\\n'\n")
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            received = b"".join(call.args[0] for call in mock_websocket.send_bytes.call_args_list)
+            if "世".encode('utf-8') in received:
+                break
+        assert "世".encode('utf-8') in received
+        mock_websocket.send_text.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_websocket_reattach_replays_scrollback(self, terminal_service):
+        """Test output produced while detached is replayed when a WebSocket reattaches"""
+        session_id = await terminal_service.create_session()
+        await terminal_service.start_session(session_id)
+        session = terminal_service.sessions[session_id]
+        
+        first = AsyncMock()
+        first.receive_text = AsyncMock(side_effect=asyncio.CancelledError())
+        assert await terminal_service.connect_websocket(first, session_id)
+        await terminal_service.disconnect_websocket(session.websocket_id)
+        assert session.writer is None
+        
+        await terminal_service.send_input(session_id, "echo detached-$((6*7))\n")
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            if b"detached-42" in session.scrollback.snapshot():
+                break
+        assert b"detached-42" in session.scrollback.snapshot()
+        assert not any("detached-42" in call.args[0] for call in first.send_text.call_args_list)
+        
+        second = AsyncMock()
+        second.receive_text = AsyncMock(side_effect=asyncio.CancelledError())
+        assert await terminal_service.connect_websocket(second, session_id)
+        assert "detached-42" in second.send_text.call_args_list[0].args[0]
+        assert session.to_dict()['attached'] is True
+
     @pytest.mark.asyncio
     async def test_websocket_connection_nonexistent_session(self, terminal_service):
         """Test WebSocket connection to non-existent session"""
@@ -377,6 +377,143 @@ class TestWebSocketAPI:
         assert websockets[1].send_text.call_count == 1  # Welcome only
         assert websockets[2].send_text.call_count == 2  # Welcome + broadcast
     
+    @pytest.mark.asyncio
+    async def test_broadcast_message_records_history_once_per_session(self, websocket_api):
+        """Test a broadcast to a session is added to its history only once."""
+        websocket_api.message_broker = AsyncMock()
+        
+        websockets = [MagicMock() for _ in range(2)]
+        for ws in websockets:
+            ws.client_state = WebSocketState.CONNECTED
+            ws.accept = AsyncMock()
+            ws.send_text = AsyncMock()
+            await websocket_api.connect_websocket(ws, session_id='session-1')
+        history_size = len(websocket_api.message_history['session-1'])
+        
+        await websocket_api.broadcast_message({'type': 'broadcast', 'content': 'hi'}, session_id='session-1')
+        
+        assert websockets[0].send_text.call_args_list[-1] == websockets[1].send_text.call_args_list[-1]
+        history = list(websocket_api.message_history['session-1'])
+        assert len(history) == history_size + 1
+        assert history[-1].data['content'] == 'hi'
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_to_subscribers_uses_subscription_index(self, websocket_api):
+        """Test topic broadcasts reach only matching subscribers, encoded once."""
+        websocket_api.message_broker = AsyncMock()
+        
+        websockets = [MagicMock() for _ in range(3)]
+        connection_ids = []
+        for ws in websockets:
+            ws.client_state = WebSocketState.CONNECTED
+            ws.accept = AsyncMock()
+            ws.send_text = AsyncMock()
+            connection_ids.append(await websocket_api.connect_websocket(ws))
+        await websocket_api.handle_websocket_message(connection_ids[1], json.dumps({
+            'type': 'subscribe', 'topics': ['scm.status_changed']
+        }))
+        
+        # Exact subscription matches the scm.* broadcast
+        await websocket_api._broadcast_to_subscribers('scm.*', {'type': 'scm_event'})
+        # Default fs.* subscription reaches everyone, with one shared frame
+        await websocket_api._broadcast_to_subscribers('fs.*', {'type': 'filesystem_event'})
+        await websocket_api.drain(timeout=1)
+        
+        frames = [[call.args[0] for call in ws.send_text.call_args_list] for ws in websockets]
+        assert ['scm_event' in f for f in frames[1]].count(True) == 1
+        assert not any('scm_event' in f for f in frames[0] + frames[2])
+        assert frames[0][-1] is frames[1][-1] is frames[2][-1]
+        
+        # Unsubscribing updates the index
+        await websocket_api.handle_websocket_message(connection_ids[1], json.dumps({
+            'type': 'unsubscribe', 'topics': ['scm.status_changed']
+        }))
+        await websocket_api._broadcast_to_subscribers('scm.*', {'type': 'scm_event'})
+        await websocket_api.drain(timeout=1)
+        assert ['scm_event' in call.args[0] for call in websockets[1].send_text.call_args_list].count(True) == 1
+    
+    @pytest.mark.asyncio
+    async def test_slow_consumer_is_evicted(self, websocket_api):
+        """Test a stalled connection is dropped without holding up other subscribers."""
+        websocket_api.message_broker = AsyncMock()
+        websocket_api.max_pending_sends = 2
+        websocket_api.send_timeout = 0.05
+        
+        fast, slow = MagicMock(), MagicMock()
+        for ws in (fast, slow):
+            ws.client_state = WebSocketState.CONNECTED
+            ws.accept = AsyncMock()
+            ws.close = AsyncMock()
+            ws.send_text = AsyncMock()
+        fast_id = await websocket_api.connect_websocket(fast)
+        slow_id = await websocket_api.connect_websocket(slow)
+        
+        stalled = asyncio.Event()
+        async def never_completes(_):
+            await stalled.wait()
+        slow.send_text = AsyncMock(side_effect=never_completes)
+        
+        for i in range(5):
+            await websocket_api._broadcast_to_subscribers('fs.*', {'type': 'filesystem_event', 'n': i})
+            await asyncio.sleep(0)
+        await websocket_api.drain(timeout=1)
+        
+        assert fast.send_text.call_count == 6  # Welcome + 5 events
+        assert slow_id not in websocket_api.connections
+        assert fast_id in websocket_api.connections
+        assert websocket_api.stats['slow_consumer_evictions'] == 1
+        
+        # A single send that never completes is cut off after send_timeout
+        fast.send_text = AsyncMock(side_effect=never_completes)
+        await websocket_api._broadcast_to_subscribers('fs.*', {'type': 'filesystem_event'})
+        for _ in range(50):
+            await asyncio.sleep(0.02)
+            if fast_id not in websocket_api.connections:
+                break
+        assert fast_id not in websocket_api.connections
+        assert websocket_api.stats['slow_consumer_evictions'] == 2
+    
+    @pytest.mark.asyncio
+    async def test_session_history_is_byte_budgeted(self, websocket_api, mock_websocket):
+        """Test replay history is bounded by encoded size and reports its memory."""
+        websocket_api.message_broker = AsyncMock()
+        websocket_api.history_max_bytes = 600
+        
+        connection_id = await websocket_api.connect_websocket(mock_websocket, session_id='session-1')
+        for i in range(20):
+            await websocket_api.send_message(connection_id, {'type': 'output', 'n': i, 'text': 'x' * 80})
+        
+        history = websocket_api.message_history['session-1']
+        assert 0 < history.bytes <= 600
+        assert list(history)[-1].data['n'] == 19
+        
+        stats = (await websocket_api.get_stats())['message_history_sessions']['session-1']
+        assert stats['bytes'] == history.bytes
+        assert stats['messages'] == len(history)
+        assert stats['evicted'] > 0
+    
+    @pytest.mark.asyncio
+    async def test_replay_is_not_added_to_history(self, websocket_api):
+        """Test reconnect replay splices encoded history without growing it."""
+        websocket_api.message_broker = AsyncMock()
+        
+        websockets = [MagicMock() for _ in range(2)]
+        for ws in websockets:
+            ws.client_state = WebSocketState.CONNECTED
+            ws.accept = AsyncMock()
+            ws.send_text = AsyncMock()
+        first = await websocket_api.connect_websocket(websockets[0], session_id='session-1')
+        await websocket_api.send_message(first, {'type': 'output', 'text': 'héllo'})
+        history_size = len(websocket_api.message_history['session-1'])
+        
+        await websocket_api.connect_websocket(websockets[1], session_id='session-1')
+        
+        replay = json.loads(websockets[1].send_text.call_args_list[-1].args[0])
+        assert replay['type'] == 'message_replay'
+        assert replay['messages'][-2] == {'type': 'output', 'text': 'héllo'}
+        assert replay['count'] == history_size + 1  # + welcome to the new connection
+        assert len(websocket_api.message_history['session-1']) == history_size + 1
+    
     @pytest.mark.asyncio
     async def test_handle_ping_message(self, websocket_api, mock_websocket):
         """Test handling ping message."""
@@ -361,6 +361,7 @@ class TestWebSocketCodeExecution:
             "execution_id": str(uuid.uuid4())
         }
         await websocket_api.handle_websocket_message(connection_id, json.dumps(execute_msg))
+        await websocket_api.drain(timeout=1)
         
         # Verify both execution result and broadcast event were sent
         assert len(mock_websocket.messages_sent) >= 2
@@ -0,0 +1,71 @@
+"""
+Tests for the buffered LSP message reader
+"""
+
+import json
+
+import pytest
+
+from icpy.utils.lsp_framing import LSPMessageReader, LSPProtocolError, encode_lsp_message
+
+
+class ChunkedStream:
+    """Stream that returns at most chunk_size bytes per read, like a pipe under load."""
+
+    def __init__(self, data: bytes, chunk_size: int):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.offset = 0
+
+    async def read(self, n: int) -> bytes:
+        size = min(n, self.chunk_size)
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+def _messages(count):
+    return [{"jsonrpc": "2.0", "id": i, "result": {"label": f"item {i} é"}} for i in range(count)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 65536])
+async def test_reads_messages_across_arbitrary_read_boundaries(chunk_size):
+    messages = _messages(20)
+    data = b"".join(encode_lsp_message(m) for m in messages)
+    reader = LSPMessageReader(ChunkedStream(data, chunk_size), read_size=64)
+
+    received = []
+    while (message := await reader.read_message()) is not None:
+        received.append(message)
+
+    assert received == messages
+    assert reader.metrics["messages"] == 20
+
+
+@pytest.mark.asyncio
+async def test_large_body_survives_short_reads_and_offload():
+    payload = {"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+               "params": {"diagnostics": [{"message": "x" * 50, "line": i} for i in range(40000)]}}
+    data = encode_lsp_message(payload) + encode_lsp_message({"jsonrpc": "2.0", "id": 1})
+    reader = LSPMessageReader(ChunkedStream(data, 65536), offload_threshold=1048576)
+
+    assert await reader.read_message() == payload
+    assert await reader.read_message() == {"jsonrpc": "2.0", "id": 1}
+    assert await reader.read_message() is None
+    assert reader.metrics["offloaded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_header_fields_and_errors():
+    body = json.dumps({"id": 7}).encode()
+    data = (b"content-length: %d\r\nContent-Type: application/vscode-jsonrpc; charset=utf-8\r\n\r\n%s"
+            % (len(body), body))
+    assert await LSPMessageReader(ChunkedStream(data, 5)).read_message() == {"id": 7}
+
+    with pytest.raises(LSPProtocolError):
+        await LSPMessageReader(ChunkedStream(b"Content-Type: x\r\n\r\n{}", 64)).read_message()
+
+    # A body cut short by EOF is end of stream, not a parse error
+    truncated = encode_lsp_message({"id": 1})[:-3]
+    assert await LSPMessageReader(ChunkedStream(truncated, 64)).read_message() is None
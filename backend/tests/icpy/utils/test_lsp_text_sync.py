@@ -0,0 +1,76 @@
+"""
+Tests for incremental textDocument/didChange content changes
+"""
+
+import random
+import re
+
+import pytest
+
+from icpy.utils.lsp_text_sync import compute_content_changes, offset_to_position
+
+
+def _apply(text, changes):
+    """Apply content changes the way a language server does (UTF-16 positions)."""
+    for change in changes:
+        line_starts = [0] + [m.end() for m in re.finditer(r"\r\n|\r|\n", text)]
+
+        def to_offset(position):
+            start = line_starts[position["line"]]
+            units = 0
+            offset = start
+            while units < position["character"]:
+                units += 2 if ord(text[offset]) > 0xFFFF else 1
+                offset += 1
+            return offset
+
+        start = to_offset(change["range"]["start"])
+        end = to_offset(change["range"]["end"])
+        text = text[:start] + change["text"] + text[end:]
+    return text
+
+
+@pytest.mark.parametrize("old, new", [
+    ("hello world", "hello brave world"),
+    ("def f():\n    return 1\n", "def f():\n    return 2\n"),
+    ("a\r\nb\r\nc", "a\r\nX\r\nb\r\nc"),
+    ("a\r\nb", "a\r\r\nb"),
+    ("a\r\nb", "ab"),
+    ("x = '😀'\ny = 1", "x = '😀😀'\ny = 1"),
+    ("aaaa", "aa"),
+    ("", "print()"),
+])
+def test_changes_round_trip(old, new):
+    changes = compute_content_changes(old, new)
+    assert changes is not None
+    assert _apply(old, changes) == new
+
+
+def test_random_edits_on_large_document_round_trip():
+    rng = random.Random(7)
+    lines = [f"    value_{i} = compute({i}, 'é')\n" for i in range(20000)]
+    text = "".join(lines)
+    for _ in range(50):
+        start = rng.randrange(len(text))
+        end = min(len(text), start + rng.randrange(40))
+        new = text[:start] + rng.choice(["", "x", "\n", "😀 ok"]) + text[end:]
+        if new == text:
+            continue
+        changes = compute_content_changes(text, new)
+        assert len(changes) == 1
+        assert len(changes[0]["text"]) < 10
+        assert _apply(text, changes) == new
+        text = new
+
+
+def test_equal_text_large_rewrite_and_lone_cr():
+    assert compute_content_changes("same", "same") == []
+    assert compute_content_changes("a" * 10000, "b" * 10000) is None
+    assert compute_content_changes("a\rb", "a\rc") is None
+
+
+def test_offset_to_position_counts_utf16_units():
+    text = "ab\n😀c"
+    assert offset_to_position(text, 0) == {"line": 0, "character": 0}
+    assert offset_to_position(text, 3) == {"line": 1, "character": 0}
+    assert offset_to_position(text, 5) == {"line": 1, "character": 3}
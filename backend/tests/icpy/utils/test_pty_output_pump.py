@@ -0,0 +1,100 @@
+"""
+Tests for the event-driven PTY output pump and terminal frame writer
+"""
+
+import asyncio
+import os
+import pty
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from icpy.utils.pty_output_pump import PtyOutputPump, TerminalFrameWriter, wants_binary_frames
+
+
+@pytest.mark.asyncio
+async def test_bursts_are_coalesced_and_capped():
+    read_fd, write_fd = os.pipe()
+    chunks = []
+
+    async def sink(data):
+        chunks.append(data)
+
+    pump = PtyOutputPump(read_fd, sink, max_latency=0.05, max_chunk=4096)
+    task = asyncio.create_task(pump.run())
+    try:
+        # An idle pump flushes the first bytes right away
+        os.write(write_fd, b"$ ")
+        await asyncio.sleep(0.01)
+        assert chunks == [b"$ "]
+
+        # Small writes inside the latency window become one chunk
+        for _ in range(20):
+            os.write(write_fd, b"x" * 10)
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.1)
+        assert b"".join(chunks[1:]) == b"x" * 200
+        assert len(chunks) <= 3
+
+        # Large output is split at max_chunk
+        os.write(write_fd, b"y" * 10000)
+        await asyncio.sleep(0.1)
+        assert all(len(c) <= 4096 for c in chunks)
+        assert b"".join(chunks).count(b"y") == 10000
+    finally:
+        os.close(write_fd)
+        await asyncio.wait_for(task, 1)
+        os.close(read_fd)
+
+    metrics = pump.get_metrics()
+    assert metrics['bytes'] == 2 + 200 + 10000
+    assert metrics['chunks'] == len(chunks)
+
+
+@pytest.mark.asyncio
+async def test_pty_eof_ends_pump():
+    master_fd, slave_fd = pty.openpty()
+    received = bytearray()
+
+    async def sink(data):
+        received.extend(data)
+
+    pump = PtyOutputPump(master_fd, sink, max_latency=0.001)
+    task = asyncio.create_task(pump.run())
+    os.write(slave_fd, b"hello\n")
+    await asyncio.sleep(0.05)
+    os.close(slave_fd)
+    await asyncio.wait_for(task, 1)
+    os.close(master_fd)
+    assert b"hello" in bytes(received)
+
+
+@pytest.mark.asyncio
+async def test_text_frames_keep_split_multibyte_characters():
+    websocket = AsyncMock()
+    writer = TerminalFrameWriter(websocket)
+    encoded = "héllo 世界".encode('utf-8')
+    # Split inside the 3-byte sequence for 世
+    cut = encoded.index("世".encode('utf-8')) + 1
+    await writer.send(encoded[:cut])
+    await writer.send(encoded[cut:])
+    await writer.close()
+    sent = "".join(call.args[0] for call in websocket.send_text.call_args_list)
+    assert sent == "héllo 世界"
+    assert "\ufffd" not in sent
+
+
+@pytest.mark.asyncio
+async def test_binary_frames_pass_bytes_through():
+    websocket = AsyncMock()
+    writer = TerminalFrameWriter(websocket, binary=True)
+    await writer.send(b"\xe4\xb8")
+    await writer.send(b"\x96\xff")
+    assert [call.args[0] for call in websocket.send_bytes.call_args_list] == [b"\xe4\xb8", b"\x96\xff"]
+    websocket.send_text.assert_not_called()
+
+    assert wants_binary_frames(SimpleNamespace(query_params={'binary': '1'}))
+    assert wants_binary_frames(SimpleNamespace(query_params={'mode': 'binary'}))
+    assert not wants_binary_frames(SimpleNamespace(query_params={}))
+    assert not wants_binary_frames(AsyncMock())
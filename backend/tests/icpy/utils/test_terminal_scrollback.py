@@ -0,0 +1,48 @@
+"""
+Tests for the terminal scrollback buffer replayed on WebSocket reattach
+"""
+
+import pytest
+
+from icpy.utils.terminal_scrollback import TerminalScrollback
+
+
+def test_raw_mode_keeps_bounded_tail_from_line_boundary():
+    scrollback = TerminalScrollback(max_bytes=1000)
+    for i in range(500):
+        scrollback.append(f"line {i}\n".encode())
+
+    data = scrollback.snapshot()
+    assert len(data) <= 1000
+    assert data.endswith(b"line 499\n")
+    assert data.startswith(b"line ")
+    assert scrollback.total_bytes == len(data) + scrollback.dropped_bytes
+
+
+def test_raw_mode_trim_does_not_split_characters():
+    scrollback = TerminalScrollback(max_bytes=64)
+    scrollback.append("世".encode() * 100)
+
+    data = scrollback.snapshot()
+    assert len(data) <= 64
+    data.decode("utf-8")
+
+
+def test_snapshot_mode_keeps_only_last_screen():
+    scrollback = TerminalScrollback(max_bytes=4096, mode="snapshot")
+    scrollback.append(b"$ top\r\n")
+    scrollback.append(b"\x1b[H\x1b[2Jframe 1\r\n")
+    # Clear sequence split across reads
+    scrollback.append(b"\x1b[H\x1b[")
+    scrollback.append(b"2Jframe 2\r\n")
+
+    assert scrollback.snapshot() == b"\x1b[H\x1b[2Jframe 2\r\n"
+
+    raw = TerminalScrollback(max_bytes=4096)
+    raw.append(b"\x1b[2Jframe 1\x1b[2Jframe 2")
+    assert b"frame 1" in raw.snapshot()
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        TerminalScrollback(mode="screen")
@@ -21,3 +21,50 @@ def test_image_cache_evict_oldest():
     cache.put('b', 'BBBB')  # should evict 'a'
     assert cache.get('a') is None
     assert cache.get('b') == 'BBBB'
+
+
+def test_image_cache_stores_raw_bytes_and_mime_type():
+    cache = ImageCache(max_images=2, max_size_mb=1.0, ttl_seconds=1000)
+    cache.put('a', 'data:image/webp;base64,AAECAw==', mime_type='image/webp')
+    assert cache.get_bytes('a') == b'\x00\x01\x02\x03'
+    assert cache.get('a') == 'AAECAw=='
+    assert cache.get_mime_type('a') == 'image/webp'
+    # Size is measured on the decoded bytes, not the base64 text
+    assert cache.get_stats()['total_size_bytes'] == 4
+
+
+def test_image_cache_spills_to_disk_tier(tmp_path):
+    disk_dir = tmp_path / '.icotes' / 'image_cache'
+    cache = ImageCache(max_images=1, max_size_mb=1.0, ttl_seconds=1000, disk_dir=disk_dir, max_disk_mb=1.0)
+    cache.put_bytes('a', b'first-image', 'image/png')
+    cache.put_bytes('b', b'second-image', 'image/jpeg')  # spills 'a' to disk
+
+    blobs = [p for p in disk_dir.rglob('*') if p.is_file() and p.name != 'index.json']
+    assert len(blobs) == 1
+    assert cache.has('a') is True
+    assert cache.get_bytes('a') == b'first-image'  # promoted back, 'b' spills
+    assert cache.get_mime_type('b') == 'image/jpeg'
+
+    stats = cache.get_stats()
+    assert stats['disk_hits'] == 1
+    assert stats['evictions'] == 2
+    assert stats['spills'] == 2
+    assert cache.get('missing') is None
+    assert cache.get_stats()['misses'] == 1
+
+    # A new process sees the disk tier through its index
+    reopened = ImageCache(max_images=1, max_size_mb=1.0, ttl_seconds=1000, disk_dir=disk_dir)
+    assert reopened.get_bytes('b') == b'second-image'
+
+
+def test_image_cache_disk_tier_lru_budget(tmp_path):
+    disk_dir = tmp_path / 'image_cache'
+    cache = ImageCache(max_images=1, max_size_mb=1.0, ttl_seconds=1000,
+                       disk_dir=disk_dir, max_disk_mb=20 / (1024 * 1024))
+    for name in ('a', 'b', 'c'):
+        cache.put_bytes(name, name.encode() * 10)
+    cache.put_bytes('d', b'd')
+    # 'a' and 'b' spilled first; 'c' spilling pushes 'a' out of the 20 byte budget
+    assert cache.get_stats()['disk_evictions'] == 1
+    assert cache.has('a') is False
+    assert cache.get_bytes('b') == b'b' * 10
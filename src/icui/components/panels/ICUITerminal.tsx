@@ -542,7 +542,7 @@ const ICUITerminal = forwardRef<ICUITerminalRef, ICUITerminalProps>(({
         }
         
         const baseUrl = `${finalProtocol}//${url.host}`;
-        const wsUrl = `${baseUrl}/ws/terminal/${terminalId.current}`;
+        const wsUrl = `${baseUrl}/ws/terminal/${terminalId.current}?binary=1`;
         
         websocket.current = new WebSocket(wsUrl);
         
@@ -563,20 +563,24 @@ const ICUITerminal = forwardRef<ICUITerminalRef, ICUITerminalProps>(({
             if ((import.meta as any).env?.VITE_DEBUG_PROTOCOL === 'true') {
               console.log(`🔒 ICUITerminal fallback protocol: page=${currentProtocol}, env=${envUrl.protocol}, final=${finalProtocol}`);
             }
-            wsUrl = `${finalProtocol}//${envUrl.host}${envUrl.pathname}/terminal/${terminalId.current}`;
+            wsUrl = `${finalProtocol}//${envUrl.host}${envUrl.pathname}/terminal/${terminalId.current}?binary=1`;
           } catch {
             // If parsing fails, fall back to simple construction
-            wsUrl = `${envWsUrl}/terminal/${terminalId.current}`;
+            wsUrl = `${envWsUrl}/terminal/${terminalId.current}?binary=1`;
           }
         } else {
           const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
           const host = window.location.host;
-          wsUrl = `${protocol}//${host}/ws/terminal/${terminalId.current}`;
+          wsUrl = `${protocol}//${host}/ws/terminal/${terminalId.current}?binary=1`;
         }
         
         websocket.current = new WebSocket(wsUrl);
       }
       
+      // Local terminals send output as binary frames (?binary=1); remote ones may still send text
+      websocket.current.binaryType = 'arraybuffer';
+      const outputDecoder = new TextDecoder('utf-8');
+
       websocket.current.onopen = () => {
         // Reduced debug: Only log in development mode
         if (process.env.NODE_ENV === 'development') {
@@ -597,6 +601,13 @@ const ICUITerminal = forwardRef<ICUITerminalRef, ICUITerminalProps>(({
       websocket.current.onmessage = (event) => {
         if (terminal.current) {
           try {
+            if (event.data instanceof ArrayBuffer) {
+              // xterm decodes UTF-8 byte streams itself, including sequences split across frames
+              const bytes = new Uint8Array(event.data);
+              terminal.current.write(bytes);
+              onTerminalOutput?.(outputDecoder.decode(bytes, { stream: true }));
+              return;
+            }
             // Use raw data like the enhanced terminal approach
             const rawData = event.data;
             terminal.current.write(rawData);